@@ -0,0 +1,130 @@
+"""
+bench_db_inserts.py — prompt_usage insert throughput, before and after pooling.
+
+Compares three write paths against throwaway databases:
+
+    legacy   — what save_prompt_usage() did up to 0.1.1: open a connection,
+               run CREATE TABLE IF NOT EXISTS, close, open another, insert,
+               commit, close; rollback-journal mode.
+    pooled   — save_prompt_usage() with the connection pool, WAL and one-time
+               schema creation.
+    batched  — save_prompt_usage() with enable_batch_writes(), timed until the
+               final flush has committed every row.
+
+Each mode is run from `--threads` concurrent threads to mimic parallel
+/api/prompt traffic.
+
+Usage:
+    python benchmarks/bench_db_inserts.py [--rows 2000] [--threads 4]
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from greenprompt import dbconn  # noqa: E402
+
+RECORD = {
+    "prompt": "Summarize the benefits of solar energy in three bullet points.",
+    "prompt_score": 52.0,
+    "prompt_score_details": {"RTCF Structure": 2, "Clarity & Specificity": 5},
+    "response": "• Renewable\n• Low operating cost\n• Scales from homes to grids" * 4,
+    "model": "llama3.2:latest",
+    "prompt_tokens": 14,
+    "completion_tokens": 63,
+    "total_tokens": 77,
+    "total_energy (Wh)": 0.000512,
+    "duration_sec": 3.84,
+    "combined_power_w (W)": 0.48,
+    "cpu_power_w (W)": 0.348,
+    "gpu_power_w (W)": 0.132,
+    "energy_estimate_tokens": 0.00077,
+    "energy_estimate_prompt": 0.00014,
+    "baseline_energy (Wh)": 0.000067,
+    "baseline_power (W)": 4.03,
+}
+
+
+def _legacy_save(path, data):
+    conn = sqlite3.connect(path, timeout=30.0)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS prompt_usage (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+        "timestamp TEXT NOT NULL, prompt TEXT, prompt_score INTEGER, "
+        "prompt_score_details TEXT, response TEXT, model TEXT, prompt_tokens INTEGER, "
+        "completion_tokens INTEGER, total_tokens INTEGER, energy_estimate_prompt REAL, "
+        "energy_estimate_tokens REAL, duration_sec REAL, energy_wh REAL, "
+        "baseline_power_w REAL, baseline_energy_wh REAL, cpu_power_w REAL, "
+        "gpu_power_w REAL, combined_power_w REAL, system_info TEXT, host_id INTEGER)"
+    )
+    conn.commit()
+    conn.close()
+    conn = sqlite3.connect(path, timeout=30.0)
+    conn.execute(dbconn._INSERT_USAGE_SQL, dbconn._usage_row(data, "2025-01-01", 1))
+    conn.commit()
+    conn.close()
+
+
+def _run_threads(n_rows, n_threads, fn):
+    per_thread = n_rows // n_threads
+
+    def worker():
+        for _ in range(per_thread):
+            fn()
+
+    threads = [threading.Thread(target=worker) for _ in range(n_threads)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return per_thread * n_threads, time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--flush-interval", type=float, default=0.05)
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_path = os.path.join(tmp, "legacy.db")
+        n, elapsed = _run_threads(
+            args.rows, args.threads, lambda: _legacy_save(legacy_path, RECORD)
+        )
+        results.append(("legacy", n, elapsed))
+
+        dbconn.DB_PATH = os.path.join(tmp, "pooled.db")
+        n, elapsed = _run_threads(
+            args.rows, args.threads, lambda: dbconn.save_prompt_usage(RECORD)
+        )
+        results.append(("pooled", n, elapsed))
+
+        dbconn.DB_PATH = os.path.join(tmp, "batched.db")
+        dbconn.init_db()
+        writer = dbconn.enable_batch_writes(flush_interval=args.flush_interval)
+        t0 = time.perf_counter()
+        n, _ = _run_threads(
+            args.rows, args.threads, lambda: dbconn.save_prompt_usage(RECORD)
+        )
+        writer.flush()
+        results.append(("batched", n, time.perf_counter() - t0))
+        dbconn.disable_batch_writes()
+        dbconn.close_connections()
+
+    base = results[0][1] / results[0][2]
+    print(f"{'mode':<10}{'rows':>8}{'seconds':>10}{'inserts/s':>12}{'speedup':>9}")
+    for mode, n, elapsed in results:
+        rate = n / elapsed
+        print(f"{mode:<10}{n:>8}{elapsed:>10.3f}{rate:>12.0f}{rate / base:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
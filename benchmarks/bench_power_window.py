@@ -0,0 +1,107 @@
+"""
+bench_power_window.py — measure_power_linux() latency, deque vs SampleBuffer.
+
+Fills a monitor with `--samples` synthetic readings at `--hz` and times the
+per-prompt measurement for a prompt window near the newest sample:
+
+    deque   — the pre-SampleBuffer algorithm: copy the deque to a list, then
+              scan it in Python for the baseline and prompt windows.
+    buffer  — measure_power_linux() on a LinuxPowerMonitor-style object whose
+              samples are a SampleBuffer (binary searches into the running
+              energy; no per-sample work).
+    long    — the same with a `--long-window` second prompt, to show the
+              cost does not grow with the window.
+
+Usage:
+    python benchmarks/bench_power_window.py [--samples 36000] [--hz 10]
+                                            [--long-window 600]
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from collections import deque
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from greenprompt.samplerCommon import SampleBuffer  # noqa: E402
+from greenprompt.sysUsage import measure_power_linux  # noqa: E402
+
+
+def _legacy_measure(start_time, end_time, monitor):
+    with monitor._lock:
+        all_samples = list(monitor.samples)
+    baseline = [s for ts, s in all_samples if start_time - 60 <= ts <= start_time]
+    window = [s for ts, s in all_samples if start_time <= ts <= end_time]
+    avg = sum(s["combined_power_w"] for s in window) / len(window)
+    base = sum(s["combined_power_w"] for s in baseline) / len(baseline)
+    return avg, base
+
+
+def _fill(samples, n, hz, t0):
+    for i in range(n):
+        cpu = 5.0 + (i % 7)
+        samples.append(
+            (
+                t0 + i / hz,
+                {"cpu_power_w": cpu, "gpu_power_w": 2.0, "combined_power_w": cpu + 2},
+            )
+        )
+
+
+def _time(fn, repeat):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--samples", type=int, default=36000)
+    parser.add_argument("--hz", type=float, default=10.0)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--long-window", type=float, default=600.0)
+    args = parser.parse_args()
+
+    t0 = 1_700_000_000.0
+    end = t0 + (args.samples - 1) / args.hz
+    start = end - 5.0
+
+    legacy = SimpleNamespace(
+        samples=deque(maxlen=args.samples), _lock=threading.Lock(), sample_interval=1
+    )
+    _fill(legacy.samples, args.samples, args.hz, t0)
+    current = SimpleNamespace(
+        samples=SampleBuffer(args.samples),
+        _lock=threading.Lock(),
+        sample_interval=1 / args.hz,
+    )
+    _fill(current.samples, args.samples, args.hz, t0)
+
+    results = [
+        ("deque", _time(lambda: _legacy_measure(start, end, legacy), args.repeat)),
+        (
+            "buffer",
+            _time(lambda: measure_power_linux(start, end, current), args.repeat),
+        ),
+        (
+            "long",
+            _time(
+                lambda: measure_power_linux(end - args.long_window, end, current),
+                args.repeat,
+            ),
+        ),
+    ]
+    base = results[0][1]
+    print(f"{args.samples} samples at {args.hz:g} Hz, 5 s prompt window")
+    print(f"{'mode':<10}{'ms/query':>10}{'speedup':>9}")
+    for mode, seconds in results:
+        print(f"{mode:<10}{seconds * 1000:>10.3f}{base / seconds:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
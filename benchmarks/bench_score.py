@@ -0,0 +1,176 @@
+"""
+bench_score.py — score_prompt() throughput, before and after the single pass.
+
+Scores a small corpus of prompts `--repeat` times with two implementations
+and reports prompts scored per second:
+
+    legacy   — the pre-rewrite scorer: every detector rescans the text with
+               its own uncompiled re.search calls, has_explicit_task()
+               re-tokenizes and re-tags the prompt three times, and the
+               stopword list is reloaded for each prompt.
+    current  — scoreBasic.score_prompt(): one tokenize/tag per text form,
+               precompiled per-dimension patterns, cached stopwords.
+
+Both are checked to return identical details for every prompt first.
+Needs the NLTK data that scoreBasic downloads on first import.
+
+Usage:
+    python benchmarks/bench_score.py [--repeat 200]
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import nltk  # noqa: E402
+from nltk.corpus import stopwords  # noqa: E402
+
+from greenprompt.scoreBasic import (  # noqa: E402
+    CORE_VERBS,
+    FILLERS,
+    normalize,
+    score_prompt,
+)
+
+CORPUS = [
+    "Explain photosynthesis.",
+    "You are a physics teacher. Explain gravity for 10-year-olds. Format: bullets.",
+    "Could you please just write me a poem about the sea, if possible?",
+    "Summarize the following article in a formal tone. Do not guess; if you do "
+    "not know, say so. Max 50 words.",
+    "First list the main causes of inflation, then compare them. Step 1: define "
+    "inflation. e.g. CPI growth.",
+    "Act as a data analyst. Context: quarterly sales. Provide a table of the top "
+    "five regions and verify each figure.",
+    "Write an imaginative, original short story that is inclusive and respectful.",
+    "Translate 'good morning' into French, Spanish and German.",
+    "Review your answer and refine it to be concise and energy efficient, with a "
+    "low carbon footprint.",
+    "what is the capital of france",
+    "I want you to classify these reviews as positive or negative. Example: "
+    "'Great product!' -> positive.",
+    "Background: a beginner audience. Describe how vaccines work in a friendly "
+    "style, briefly.",
+]
+
+_LEGACY_PATTERNS = {
+    "role": [r"you are (an?|the)?\s?\w+", r"pretend to be", r"act as", r"role:"],
+    "context": [r"context:", r"background:", r"for\s+\w+", r"audience:"],
+    "format": [
+        r"format:",
+        r"output as",
+        r"provide.*(table|bullets|list|json|csv|markdown)",
+    ],
+    "Examples & Few-Shot": [
+        r"example:",
+        r"Q:",
+        r"A:",
+        r"sample output",
+        r"for instance",
+        r"e\.g\.",
+    ],
+    "Task Decomposition": [r"first.*then", r"step [0-9]"],
+    "Positive/Negative Examples": [r"(do not|exclude|not include|except)"],
+    "Iterative Refinement": [r"(revise|improve|refine|rewrite|repeat)"],
+    "Creativity Control": [
+        r"(creative|imaginative|unusual|original|unique|be bold|inventive)"
+    ],
+    "Tone & Style": [
+        r"(tone:|style:|use a .+ tone|in a .+ style|formal|casual|friendly"
+        r"|professional|humorous|serious)"
+    ],
+    "Error Prevention": [
+        r"(do not guess|only answer if sure|if unsure, say so|if you do not know)"
+    ],
+    "Evaluation & Validation": [
+        r"(double-check|verify|validate|ensure accuracy|cross-check"
+        r"|review your answer)"
+    ],
+    "Sensitivity & Inclusivity": [
+        r"(inclusive|respectful|avoid bias|unbiased|sensitive to)"
+    ],
+    "Efficiency & Sustainability": [
+        r"(concise|briefly|short answer|max \d+ words|minimize tokens"
+        r"|eco-friendly|efficient)"
+    ],
+    "Energy Awareness": [
+        r"(energy usage|carbon|footprint|sustainable|green|efficient)"
+    ],
+}
+
+
+def _legacy_match(name, text):
+    return any(re.search(p, text, re.I) for p in _LEGACY_PATTERNS[name])
+
+
+def _legacy_verbs(text):
+    tags = nltk.pos_tag(nltk.word_tokenize(text))
+    return [word for word, tag in tags if tag.startswith("VB")]
+
+
+def _legacy_task(text):
+    return any(v.lower() in CORE_VERBS for v in _legacy_verbs(text))
+
+
+def _legacy_score(prompt):
+    norm = normalize(prompt)
+    details = {
+        "RTCF Structure": int(_legacy_match("role", norm))
+        + int(_legacy_task(norm))
+        + int(_legacy_match("context", norm))
+        + int(_legacy_match("format", norm)),
+        "Clarity & Specificity": 5
+        if _legacy_task(norm) and len(prompt) < 400
+        else 3
+        if _legacy_task(norm)
+        else 0,
+        "Conciseness": 5 - min(sum(norm.count(f) for f in FILLERS), 5),
+        "Contextual Priming": 3 if _legacy_match("context", norm) else 0,
+        "Output Specification": 5 if _legacy_match("format", norm) else 0,
+        "Instructional Tone": 3 if _legacy_verbs(prompt) else 0,
+    }
+    for name in list(_LEGACY_PATTERNS)[3:]:
+        details[name] = 2 if _legacy_match(name, norm) else 0
+    stop_words = set(stopwords.words("english"))
+    words = nltk.word_tokenize(prompt)
+    kw = len({w.lower() for w in words if w.lower() not in stop_words and w.isalpha()})
+    details["Keyword Richness"] = 2 if kw >= 5 else 1 if kw >= 2 else 0
+    return details
+
+
+def _rate(score, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for prompt in CORPUS:
+            score(prompt)
+    return repeat * len(CORPUS) / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    for prompt in CORPUS:
+        expected = _legacy_score(prompt)
+        actual = score_prompt(prompt)["details"]
+        if actual != expected:
+            sys.exit(f"Mismatch for {prompt!r}:\n  {expected}\n  {actual}")
+
+    results = [
+        ("legacy", _rate(_legacy_score, args.repeat)),
+        ("current", _rate(score_prompt, args.repeat)),
+    ]
+    base = results[0][1]
+    print(f"{len(CORPUS)} prompts × {args.repeat}")
+    print(f"{'mode':<10}{'prompts/s':>11}{'speedup':>9}")
+    for mode, rate in results:
+        print(f"{mode:<10}{rate:>11.0f}{rate / base:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""
+bench_server.py — /api/prompt throughput, Werkzeug server vs ASGI mode.
+
+Starts a fake Ollama (answers /api/generate after `--ollama-delay` seconds),
+then, for each mode, launches the API server in a subprocess pointed at it and
+fires `--requests` POST /api/prompt calls from `--concurrency` client threads:
+
+    flask   — what `greenprompt run` starts: app.run(), Werkzeug's threaded
+              development server.
+    asgi    — `greenprompt run --async`: greenprompt.asgi under uvicorn with
+              `--workers` request threads (skipped if uvicorn is missing).
+
+Reports requests/sec and p50/p99 latency. Prompt scoring is stubbed in the
+server process so the numbers reflect the HTTP path, Ollama round trip and DB
+write rather than NLTK; rows go to a throwaway database. Both servers share
+the OLLAMA_MAX_IN_FLIGHT bound, which caps throughput at roughly
+max_in_flight / ollama_delay.
+
+Usage:
+    python benchmarks/bench_server.py [--requests 400] [--concurrency 32]
+                                      [--workers 32] [--ollama-delay 0.05]
+                                      [--max-in-flight 8]
+"""
+
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+class _FakeOllama(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True  # headers and body go out as separate writes
+    delay = 0.05
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        time.sleep(self.delay)
+        body = json.dumps(
+            {"response": "ok", "done": True, "prompt_eval_count": 4, "eval_count": 8}
+        ).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _serve(mode, port, workers, db_path):
+    """Server subprocess: stub scoring, use a temp DB, then serve in `mode`."""
+    import logging
+
+    from greenprompt import core, dbconn
+
+    dbconn.DB_PATH = db_path
+    core.score_prompt = lambda prompt: {"score_percent": 50.0, "details": {}}
+    core.print = lambda *a, **k: None
+    logging.disable(logging.CRITICAL)
+    if mode == "flask":
+        from greenprompt import api
+
+        api.configure_server()
+        api.app.run(host="127.0.0.1", port=port, debug=False)
+    else:
+        from greenprompt import asgi
+
+        asgi.main(["--port", str(port), "--workers", str(workers)])
+
+
+def _wait_ready(port, timeout=30.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            requests.get(f"http://127.0.0.1:{port}/api/monitor/status", timeout=1)
+            return
+        except requests.exceptions.RequestException:
+            time.sleep(0.1)
+    raise RuntimeError(f"server on :{port} did not start")
+
+
+def _load(port, n, concurrency):
+    url = f"http://127.0.0.1:{port}/api/prompt"
+    local = threading.local()
+    latencies, errors = [], []
+
+    def one(i):
+        session = getattr(local, "session", None) or requests.Session()
+        local.session = session
+        t0 = time.perf_counter()
+        resp = session.post(url, json={"prompt": f"prompt {i}", "model": "bench"})
+        latencies.append(time.perf_counter() - t0)
+        if resp.status_code != 200:
+            errors.append(resp.status_code)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(one, range(n)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "rps": n / elapsed,
+        "p50": latencies[len(latencies) // 2],
+        "p99": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+        "errors": len(errors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=32)
+    parser.add_argument("--ollama-delay", type=float, default=0.05)
+    parser.add_argument("--max-in-flight", type=int, default=8)
+    parser.add_argument("--serve", choices=["flask", "asgi"], help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--db", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        _serve(args.serve, args.port, args.workers, args.db)
+        return
+
+    _FakeOllama.delay = args.ollama_delay
+    ollama = ThreadingHTTPServer(("127.0.0.1", 0), _FakeOllama)
+    ollama.daemon_threads = True
+    threading.Thread(target=ollama.serve_forever, daemon=True).start()
+
+    modes = ["flask"]
+    try:
+        import uvicorn  # noqa: F401
+
+        modes.append("asgi")
+    except ImportError:
+        print("uvicorn not installed — skipping asgi mode")
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        config = os.path.join(tmp, "config.json")
+        with open(config, "w") as f:
+            json.dump({"OLLAMA_MAX_IN_FLIGHT": args.max_in_flight}, f)
+        env = dict(
+            os.environ,
+            GREENPROMPT_CONFIG=config,
+            GREENPROMPT_OLLAMA_URL=f"http://127.0.0.1:{ollama.server_address[1]}",
+            PYTHONPATH=os.pathsep.join(
+                filter(None, [ROOT, os.environ.get("PYTHONPATH")])
+            ),
+        )
+        for mode in modes:
+            port = _free_port()
+            server = subprocess.Popen(
+                [
+                    sys.executable,
+                    os.path.abspath(__file__),
+                    "--serve",
+                    mode,
+                    "--port",
+                    str(port),
+                    "--workers",
+                    str(args.workers),
+                    "--db",
+                    os.path.join(tmp, f"{mode}.db"),
+                ],
+                env=env,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+            try:
+                _wait_ready(port)
+                _load(port, min(20, args.requests), args.concurrency)  # warm up
+                results.append((mode, _load(port, args.requests, args.concurrency)))
+            finally:
+                server.terminate()
+                server.wait()
+    ollama.shutdown()
+
+    print(
+        f"{args.requests} POST /api/prompt, {args.concurrency} clients, "
+        f"Ollama latency {args.ollama_delay * 1000:.0f} ms, "
+        f"OLLAMA_MAX_IN_FLIGHT={args.max_in_flight}"
+    )
+    print(f"{'mode':<8}{'req/s':>9}{'p50 ms':>9}{'p99 ms':>9}{'errors':>8}")
+    for mode, r in results:
+        print(
+            f"{mode:<8}{r['rps']:>9.1f}{r['p50'] * 1000:>9.1f}"
+            f"{r['p99'] * 1000:>9.1f}{r['errors']:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
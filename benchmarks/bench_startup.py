@@ -0,0 +1,92 @@
+"""
+bench_startup.py — cold-start import time of the CLI and the API server.
+
+Each target is imported `--repeat` times in a fresh interpreter run with
+`python -X importtime`, and the timings it prints are parsed:
+
+    cli     — `import greenprompt.cli`, paid by every `greenprompt` command,
+              including ones that are a single HTTP call (prompt, stop).
+    server  — `import greenprompt.api`, paid by `greenprompt run` before it
+              can answer its first request.
+
+Reports the median total import time and the slowest modules by cumulative
+time, and lists which heavy packages (HEAVY) each target pulled in. With
+`--budget-ms`, exits with status 1 when the CLI median exceeds the budget,
+so the check can run in CI.
+
+Usage:
+    python benchmarks/bench_startup.py [--repeat 5] [--top 10]
+                                       [--budget-ms 300]
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TARGETS = {"cli": "greenprompt.cli", "server": "greenprompt.api"}
+
+#: Packages that should load on first use only, not at CLI start.
+HEAVY = ("nltk", "pandas", "plotly", "tiktoken", "psutil", "cpuinfo", "flask")
+
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)")
+
+
+def import_times(module):
+    """
+    Import module in a fresh interpreter with -X importtime.
+
+    Returns:
+        {module name: cumulative microseconds} for module and everything it
+        imported (the interpreter's own startup imports are left out).
+    """
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        env=env,
+        cwd=ROOT,
+    )
+    if proc.returncode:
+        sys.exit(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    # Children are printed before their parent; a top-level line (no
+    # indent) closes each tree, the target's being the last one.
+    times = {}
+    for match in _LINE.finditer(proc.stderr):
+        times[match.group(4)] = int(match.group(2))
+        if not match.group(3) and match.group(4) != module:
+            times.clear()
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--budget-ms", type=float, default=None)
+    args = parser.parse_args()
+
+    medians = {}
+    for name, module in TARGETS.items():
+        runs = [import_times(module) for _ in range(args.repeat)]
+        medians[name] = statistics.median(run[module] for run in runs) / 1000
+        last = runs[-1]
+        heavy = sorted({m.split(".")[0] for m in last} & set(HEAVY))
+        print(f"{name}: import {module} — median {medians[name]:.0f} ms")
+        print(f"  heavy packages: {', '.join(heavy) or 'none'}")
+        slowest = sorted(last.items(), key=lambda item: item[1], reverse=True)
+        for mod, us in slowest[1 : args.top + 1]:
+            print(f"  {us / 1000:>8.1f} ms  {mod}")
+        print()
+
+    if args.budget_ms is not None and medians["cli"] > args.budget_ms:
+        sys.exit(f"CLI cold start {medians['cli']:.0f} ms > {args.budget_ms} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,8 +5,15 @@ Each function accepts a pandas DataFrame (from load_usage_data()) and returns
 a Plotly Figure object. These figures are serialized to JSON by api.py and
 rendered client-side by dashboard.html using Plotly.js.
 
+The totals and per-model charts also accept the pre-aggregated frame from
+load_usage_rollup(), so the dashboard never loads the full prompt history:
+aggregates come from usage_rollup, per-prompt charts from the newest
+DASHBOARD_RECENT_PROMPTS rows.
+
 Functions:
-    load_usage_data() — load all prompt_usage records into a DataFrame.
+    load_usage_data(columns, limit) — load prompt_usage records into a DataFrame.
+    load_usage_rollup(granularity) — load usage_rollup totals into a DataFrame.
+    FigureCache — serialized DASHBOARD_FIGURES, rebuilt when the data changes.
     total_prompts_energy_usage(df) — indicator grid: totals and averages.
     energy_usage_timeline(df) — line chart of energy per prompt over time.
     cpu_gpu_usage_per_prompt(df) — grouped bar: CPU vs GPU watts per prompt.
@@ -15,40 +22,104 @@ Functions:
     model_comparison(df) — bar chart of average energy per model.
 """
 
+import json
+import threading
+
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
-from greenprompt.dbconn import get_prompt_usage, PROMPT_USAGE_COLUMNS
-
-
-def load_usage_data():
+from plotly.utils import PlotlyJSONEncoder
+from greenprompt.dbconn import (
+    get_data_version,
+    get_prompt_usage,
+    get_usage_rollup,
+    PROMPT_USAGE_COLUMNS,
+    ROLLUP_COLUMNS,
+)
+
+#: Columns the dashboard charts actually read. Loading only these skips the
+#: prompt/response text and per-row system_info JSON, which dominate row size.
+DASHBOARD_COLUMNS = (
+    "id",
+    "timestamp",
+    "model",
+    "total_tokens",
+    "energy_estimate_prompt",
+    "energy_estimate_tokens",
+    "energy_wh",
+    "baseline_energy_wh",
+    "cpu_power_w",
+    "gpu_power_w",
+)
+
+#: Per-prompt dashboard charts plot only this many of the newest prompts.
+DASHBOARD_RECENT_PROMPTS = 500
+
+
+def load_usage_data(columns=None, limit=None):
     """
-    Load all prompt_usage records from SQLite into a pandas DataFrame.
+    Load prompt_usage records from SQLite into a pandas DataFrame.
 
-    Calls dbconn.get_prompt_usage() with no filters. Converts the timestamp
-    column to datetime. Prints the record count as a progress indicator.
+    Calls dbconn.get_prompt_usage() with no filters, selecting only
+    `columns`; with `limit` it fetches the newest rows (descending=True) and
+    reverses them. Converts the timestamp column to datetime. Prints the
+    record count as a progress indicator.
 
     When the database is empty, returns an empty DataFrame that still carries
-    every prompt_usage column, so the dashboard renders empty charts instead of
+    every requested column, so the dashboard renders empty charts instead of
     raising KeyError on a fresh install.
 
+    Args:
+        columns: prompt_usage columns to load (default: all). The dashboard
+            passes DASHBOARD_COLUMNS.
+        limit: If set, load only the newest `limit` records (still returned
+            oldest first).
+
     Returns:
-        pandas.DataFrame with all columns from the prompt_usage table and
-        a parsed datetime timestamp column.
+        pandas.DataFrame with the requested columns from the prompt_usage
+        table and a parsed datetime timestamp column (when selected).
     """
-    data = get_prompt_usage()
+    columns = list(columns) if columns is not None else list(PROMPT_USAGE_COLUMNS)
+    if limit is None:
+        data = get_prompt_usage(columns=columns)
+    else:
+        data = get_prompt_usage(columns=columns, limit=limit, descending=True)
+        data.reverse()
     print(f"Loaded {len(data)} records from the database")
-    df = pd.DataFrame(data, columns=list(PROMPT_USAGE_COLUMNS))
-    df["timestamp"] = pd.to_datetime(df["timestamp"])
+    df = pd.DataFrame(data, columns=columns)
+    if "timestamp" in df:
+        df["timestamp"] = pd.to_datetime(df["timestamp"])
     return df
 
 
+def load_usage_rollup(granularity="all"):
+    """
+    Load usage_rollup totals for one granularity into a pandas DataFrame.
+
+    Each row holds the sums for one (bucket_start, model) pair plus its
+    prompt_count, so totals are column sums and per-prompt averages are
+    sums divided by prompt_count. Empty databases yield an empty DataFrame
+    with every ROLLUP_COLUMNS column.
+    """
+    data = get_usage_rollup(granularity)
+    return pd.DataFrame(data, columns=list(ROLLUP_COLUMNS))
+
+
+def _prompt_count(df):
+    """Number of prompts a per-prompt or rollup DataFrame represents."""
+    if "prompt_count" in df:
+        return int(df["prompt_count"].sum())
+    return len(df)
+
+
 def total_prompts_energy_usage(df):
     """
     Display total number of prompts and total energy usage.
+
+    Accepts per-prompt rows or rollup rows from load_usage_rollup().
     """
-    total_prompts = len(df)
+    total_prompts = _prompt_count(df)
     total_energy = df["energy_wh"].sum()
     total_cpu = df["cpu_power_w"].sum()
     total_gpu = df["gpu_power_w"].sum()
@@ -243,8 +314,16 @@ def baseline_vs_total_usage(df):
 def model_comparison(df):
     """
     Bar chart comparing average energy usage across different models.
+
+    Accepts per-prompt rows or rollup rows from load_usage_rollup().
     """
-    avg_energy = df.groupby("model")["energy_wh"].mean().reset_index()
+    if "prompt_count" in df:
+        sums = df.groupby("model")[["energy_wh", "prompt_count"]].sum()
+        avg_energy = (sums["energy_wh"] / sums["prompt_count"]).reset_index(
+            name="energy_wh"
+        )
+    else:
+        avg_energy = df.groupby("model")["energy_wh"].mean().reset_index()
     fig = px.bar(
         avg_energy,
         x="model",
@@ -253,3 +332,70 @@ def model_comparison(df):
         labels={"model": "Model", "energy_wh": "Average Energy (Wh)"},
     )
     return fig
+
+
+def _load_dashboard_totals():
+    return load_usage_rollup("all")
+
+
+def _load_dashboard_recent():
+    return load_usage_data(columns=DASHBOARD_COLUMNS, limit=DASHBOARD_RECENT_PROMPTS)
+
+
+#: Data sources shared by dashboard figures; each is loaded at most once per
+#: data version.
+DASHBOARD_SOURCES = {
+    "totals": _load_dashboard_totals,
+    "recent": _load_dashboard_recent,
+}
+
+#: Dashboard figures by name: (figure function, DASHBOARD_SOURCES key).
+DASHBOARD_FIGURES = {
+    "total_prompts_energy": (total_prompts_energy_usage, "totals"),
+    "energy_usage": (energy_usage_timeline, "recent"),
+    "cpu_gpu_usage": (cpu_gpu_usage_per_prompt, "recent"),
+    "estimated_vs_actual": (estimated_vs_actual_power, "recent"),
+    "baseline_vs_total": (baseline_vs_total_usage, "recent"),
+    "model_comparison": (model_comparison, "totals"),
+}
+
+
+class FigureCache:
+    """
+    Serialized dashboard figures, rebuilt lazily when the data changes.
+
+    Entries are keyed on dbconn.get_data_version(). A request for a figure
+    whose version is current returns the cached JSON string without touching
+    pandas or Plotly; after new prompts land, each figure is rebuilt on its
+    next request only, and the DataFrame it needs is loaded once and shared
+    with the other figures built from the same source.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._frames = {}
+        self._figures = {}
+
+    def get(self, name):
+        """
+        Return (figure_json, version) for a DASHBOARD_FIGURES name.
+
+        Raises:
+            KeyError: For an unknown figure name.
+        """
+        builder, source = DASHBOARD_FIGURES[name]
+        version = get_data_version()
+        with self._lock:
+            if version != self._version:
+                self._version = version
+                self._frames.clear()
+                self._figures.clear()
+            figure = self._figures.get(name)
+            if figure is None:
+                df = self._frames.get(source)
+                if df is None:
+                    df = self._frames[source] = DASHBOARD_SOURCES[source]()
+                figure = json.dumps(builder(df).to_plotly_json(), cls=PlotlyJSONEncoder)
+                self._figures[name] = figure
+            return figure, version
@@ -1,83 +1,132 @@
 """
 api.py — GreenPrompt Flask API server.
 
-Started as a background subprocess by `greenprompt run`. Owns the PowerMonitor
-lifecycle on macOS. Exposes REST endpoints for prompt execution, usage queries,
-and the analytics dashboard. Also provides a reverse proxy to the local Ollama
-server.
+Started as a background subprocess by `greenprompt run` (or served under
+uvicorn by asgi.py with `--async`). Owns the PowerMonitor lifecycle through
+start_monitor()/stop_monitor(). Exposes REST endpoints for prompt execution,
+usage queries, and the analytics dashboard. Also provides a reverse proxy to
+the local Ollama server.
 
 Endpoints:
     POST /api/prompt          — run a prompt, measure energy, save to DB
+    POST /api/prompt/stream   — same, streamed token-by-token as Server-Sent Events
+    POST /api/prompts/batch   — run many prompts concurrently, results as NDJSON
+    POST /api/tokens/count    — token counts for prompts, before running them
+    POST /api/estimate        — predicted energy and latency, before running a prompt
     GET  /api/usage/all       — retrieve all usage records
     GET  /api/usage/model/<m> — filter usage by model
     GET  /api/usage/timeframe — filter usage by timestamp range
+        (the three above accept ?limit=&cursor=&fields= — see _usage_response)
+    GET  /api/usage/rollup    — per-minute/hour/day/all-time totals per model
     GET  /dashboard           — serve the Plotly analytics dashboard
-    ANY  /ollama/api/<path>   — transparent proxy to Ollama at :11434
+    GET  /api/dashboard/figures/<name> — one dashboard figure as Plotly JSON
+    GET  /api/monitor/status  — sampling rate and sampler CPU overhead
+    GET  /api/scores/cache    — prompt score cache hit rate and time saved
+    GET  /api/responses/cache — response cache hit rate and energy avoided
+    ANY  /ollama/api/<path>   — transparent proxy to Ollama at OLLAMA_URL
+
+Logging to LOG_FILE starts with configure_logging(), called when the server
+starts. The dashboard's analytics module (pandas, Plotly) is imported on the
+first figure request.
 
 Known issues:
-    - Line 2 import should be `from greenprompt.analytics import ...`
     - Ollama proxy URL uses /ollama/api/ but Ollama base is /api/
 """
 
-from flask import Flask, render_template, request, jsonify, Response
-from greenprompt.analytics import (
-    load_usage_data,
-    total_prompts_energy_usage,
-    energy_usage_timeline,
-    cpu_gpu_usage_per_prompt,
-    estimated_vs_actual_power,
-    baseline_vs_total_usage,
-    model_comparison,
+from flask import (
+    Flask,
+    render_template,
+    request,
+    jsonify,
+    Response,
+    stream_with_context,
 )
 from flask_cors import CORS
-from greenprompt.core import run_prompt
+from greenprompt.core import CompletionMeter, run_prompt, run_prompt_stream
+from greenprompt.batch import run_batch
+from greenprompt.ollamaClient import OllamaBusyError, get_ollama_client
+from greenprompt.scoreCache import get_score_cache
+from greenprompt.responseCache import get_response_cache
+from greenprompt.tokenCount import count_tokens, count_tokens_batch
+from greenprompt.energyModel import get_energy_model
 from greenprompt import constants
-from greenprompt.dbconn import get_prompt_usage
+from greenprompt.dbconn import (
+    get_prompt_usage_page,
+    get_usage_rollup,
+    get_current_host_id,
+    get_cache_savings,
+    enable_batch_writes,
+)
 import logging
 import json
-from plotly.utils import PlotlyJSONEncoder
+import threading
 import requests
+from contextlib import ExitStack
 
 # global variable to hold the power monitor instance
 global monitor
 monitor = None
+_monitor_lock = threading.Lock()
 
 LOG_FILE = "/tmp/api.log"
-# Clear the log file at the start of the script
-with open(LOG_FILE, "w"):
-    pass
-
-# Configure logging
-logging.basicConfig(
-    filename=LOG_FILE,
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-)
+_logging_configured = False
 
 app = Flask(__name__)
 CORS(app)  # Allow cross-origin requests
 
-# Add a StreamHandler for debugging
-console_handler = logging.StreamHandler()
-console_handler.setLevel(logging.INFO)
-console_handler.setFormatter(
-    logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
-)
-logging.getLogger().addHandler(console_handler)
+
+def configure_logging(log_file=LOG_FILE):
+    """
+    Send INFO logs to log_file (cleared first) and to the console.
+
+    Called once when the server starts, not at import, so importing this
+    module (tests, the ASGI entry point) leaves the log file alone.
+    """
+    global _logging_configured
+    if _logging_configured:
+        return
+    _logging_configured = True
+    logging.basicConfig(
+        filename=log_file,
+        filemode="w",
+        level=logging.INFO,
+        format="%(asctime)s - %(levelname)s - %(message)s",
+    )
+    # Add a StreamHandler for debugging
+    console_handler = logging.StreamHandler()
+    console_handler.setLevel(logging.INFO)
+    console_handler.setFormatter(
+        logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
+    )
+    logging.getLogger().addHandler(console_handler)
 
 
 @app.route("/api/prompt", methods=["POST"])
 def handle_prompt():
-    """Run a prompt through core.run_prompt() and return energy/token metrics."""
+    """
+    Run a prompt through core.run_prompt() and return energy/token metrics.
+
+    Body: {"prompt", "model"?, "options"?: Ollama model options,
+    "cache"?: false to skip the response cache}.
+    """
     data = request.get_json(silent=True) or {}
     prompt = data.get("prompt", "")
     model = data.get("model", "llama3.2:latest")
+    options = data.get("options")
     logging.info(f"Received prompt: {prompt} for model: {model}")
     if not prompt:
         logging.error("Prompt is required but not provided.")
         return jsonify({"error": "Prompt is required"}), 400
+    if options is not None and not isinstance(options, dict):
+        return jsonify({"error": "options must be an object"}), 400
     try:
-        result = run_prompt(prompt, model, monitor=monitor)
+        result = run_prompt(
+            prompt,
+            model,
+            monitor=monitor,
+            options=options,
+            use_cache=data.get("cache", True) is not False,
+        )
     except RuntimeError as e:
         logging.error(f"run_prompt failed: {e}")
         return jsonify({"error": str(e)}), 400
@@ -87,18 +136,137 @@ def handle_prompt():
     return jsonify(result)
 
 
+def _sse(event):
+    """Format one run_prompt_stream() event as a Server-Sent Events frame."""
+    return f"event: {event['event']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+
+@app.route("/api/prompt/stream", methods=["POST"])
+def handle_prompt_stream():
+    """
+    Run a prompt through core.run_prompt_stream() and relay events as SSE.
+
+    The first event is pulled before the response starts so that connection
+    and model errors still map to a 400 JSON body; failures after that point
+    are sent as a final "error" event because the status line is already out.
+    """
+    data = request.get_json(silent=True) or {}
+    prompt = data.get("prompt", "")
+    model = data.get("model", "llama3.2:latest")
+    logging.info(f"Received streaming prompt: {prompt} for model: {model}")
+    if not prompt:
+        logging.error("Prompt is required but not provided.")
+        return jsonify({"error": "Prompt is required"}), 400
+    events = run_prompt_stream(prompt, model, monitor=monitor)
+    try:
+        first = next(events)
+    except RuntimeError as e:
+        logging.error(f"run_prompt_stream failed: {e}")
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logging.error(f"Unexpected error in run_prompt_stream: {e}")
+        return jsonify({"error": "Internal server error", "detail": str(e)}), 500
+
+    def generate():
+        yield _sse(first)
+        try:
+            for event in events:
+                yield _sse(event)
+        except Exception as e:
+            logging.error(f"run_prompt_stream failed mid-stream: {e}")
+            yield _sse({"event": "error", "error": str(e)})
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.route("/api/prompts/batch", methods=["POST"])
+def handle_prompt_batch():
+    """
+    Run a list of prompts through batch.run_batch() and stream results as NDJSON.
+
+    Body: {"prompts": [str | {"prompt", "model"?, "id"?, "options"?}, ...],
+    "model"?: default model, "concurrency"?: prompts in flight at once,
+    "cache"?: false to skip the response cache}.
+    One JSON line is written per prompt as it completes (completion order,
+    with "index"); a failed prompt yields a line with "error" instead of
+    ending the stream.
+    """
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data, dict):
+        return jsonify({"error": "request body must be a JSON object"}), 400
+    model = data.get("model", "llama3.2:latest")
+    try:
+        concurrency = data.get("concurrency")
+        if concurrency is not None:
+            concurrency = int(concurrency)
+            if concurrency < 1:
+                raise ValueError("concurrency must be at least 1")
+        results = run_batch(
+            data.get("prompts") or [],
+            model,
+            monitor=monitor,
+            concurrency=concurrency,
+            use_cache=data.get("cache", True) is not False,
+        )
+    except (TypeError, ValueError) as e:
+        logging.error(f"Invalid batch request: {e}")
+        return jsonify({"error": str(e)}), 400
+    logging.info(f"Received batch for model: {model}")
+
+    def generate():
+        for result in results:
+            yield json.dumps(result, default=str) + "\n"
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _usage_response(**filters):
+    """
+    Run a paginated, projected usage query from the request's query string.
+
+    Query parameters:
+        limit:  page size; omit to return every matching row.
+        cursor: the X-Next-Cursor header value from the previous page.
+        fields: comma-separated prompt_usage columns to return (default: all).
+
+    The body is always a JSON array of rows. When more rows remain, the cursor
+    for the next page is returned in the X-Next-Cursor response header.
+    """
+    fields = request.args.get("fields")
+    columns = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+    try:
+        rows, next_cursor = get_prompt_usage_page(
+            columns=columns,
+            limit=request.args.get("limit"),
+            cursor=request.args.get("cursor"),
+            **filters,
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    response = jsonify(rows)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return response
+
+
 @app.route("/api/usage/all", methods=["GET"])
 def usage_all():
-    """Return all prompt_usage records as a JSON array."""
-    data = get_prompt_usage()
-    return jsonify(data)
+    """Return prompt_usage records as a JSON array (optionally paginated)."""
+    return _usage_response()
 
 
 @app.route("/api/usage/model/<model>", methods=["GET"])
 def usage_by_model(model):
     """Return usage records filtered by exact model name."""
-    data = get_prompt_usage(model=model)
-    return jsonify(data)
+    return _usage_response(model=model)
 
 
 @app.route("/api/usage/timeframe", methods=["GET"])
@@ -108,46 +276,185 @@ def usage_by_timeframe():
     end = request.args.get("end")
     if not start or not end:
         return jsonify({"error": "start and end query parameters are required"}), 400
-    data = get_prompt_usage(start_time=start, end_time=end)
+    return _usage_response(start_time=start, end_time=end)
+
+
+@app.route("/api/usage/rollup", methods=["GET"])
+def usage_rollup():
+    """Return pre-aggregated usage totals (?granularity=minute|hour|day|all)."""
+    try:
+        data = get_usage_rollup(
+            granularity=request.args.get("granularity", "all"),
+            start_time=request.args.get("start"),
+            end_time=request.args.get("end"),
+            model=request.args.get("model"),
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     return jsonify(data)
 
 
 @app.route("/dashboard")
 def dashboard():
-    """Render the Plotly analytics dashboard as an HTML page."""
-    df = load_usage_data()
+    """Render the dashboard page; it fetches each figure from the API below."""
+    return render_template("dashboard.html")
 
-    print(f"Loaded {len(df)} records from the database")
 
-    total_prompts_energy = json.dumps(
-        total_prompts_energy_usage(df).to_plotly_json(), cls=PlotlyJSONEncoder
-    )
-    energy_usage = json.dumps(
-        energy_usage_timeline(df).to_plotly_json(), cls=PlotlyJSONEncoder
-    )
-    cpu_gpu_usage = json.dumps(
-        cpu_gpu_usage_per_prompt(df).to_plotly_json(), cls=PlotlyJSONEncoder
-    )
-    estimated_vs_actual = json.dumps(
-        estimated_vs_actual_power(df).to_plotly_json(), cls=PlotlyJSONEncoder
-    )
-    baseline_vs_total = json.dumps(
-        baseline_vs_total_usage(df).to_plotly_json(), cls=PlotlyJSONEncoder
-    )
-    model_comparison_chart = json.dumps(
-        model_comparison(df).to_plotly_json(), cls=PlotlyJSONEncoder
-    )
-    logging.info("Dashboard data prepared successfully")
-
-    return render_template(
-        "dashboard.html",
-        total_prompts_energy=total_prompts_energy,
-        energy_usage=energy_usage,
-        cpu_gpu_usage=cpu_gpu_usage,
-        estimated_vs_actual=estimated_vs_actual,
-        baseline_vs_total=baseline_vs_total,
-        model_comparison=model_comparison_chart,
-    )
+#: Serialized dashboard figures, shared by all requests in this process.
+#: Created by the first figure request, so pandas and Plotly (analytics.py)
+#: are only imported once the dashboard is opened.
+figure_cache = None
+_figure_cache_lock = threading.Lock()
+
+
+def _get_figure_cache():
+    global figure_cache
+    with _figure_cache_lock:
+        if figure_cache is None:
+            from greenprompt.analytics import FigureCache
+
+            figure_cache = FigureCache()
+        return figure_cache
+
+
+@app.route("/api/dashboard/figures/<name>", methods=["GET"])
+def dashboard_figure(name):
+    """
+    Return one dashboard figure as Plotly JSON ({"data": [...], "layout": {...}}).
+
+    Figures are served from figure_cache and only rebuilt after new prompts
+    are recorded. The data version doubles as an ETag, so a browser that
+    already holds the current figure gets a 304 with no body.
+    """
+    from greenprompt.analytics import DASHBOARD_FIGURES
+
+    if name not in DASHBOARD_FIGURES:
+        return jsonify({"error": f"Unknown figure: {name}"}), 404
+    figure, version = _get_figure_cache().get(name)
+    etag = f'"{version}"'
+    if etag in request.headers.get("If-None-Match", ""):
+        response = Response(status=304)
+    else:
+        response = Response(figure, mimetype="application/json")
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+@app.route("/api/monitor/status", methods=["GET"])
+def monitor_status():
+    """
+    Report the power monitor's sampling rate and its own CPU overhead.
+
+    Returns {"running": false} when no monitor is active (e.g. unsupported OS).
+    """
+    if monitor is None or not hasattr(monitor, "status"):
+        return jsonify({"running": False})
+    return jsonify(monitor.status())
+
+
+@app.route("/api/tokens/count", methods=["POST"])
+def count_prompt_tokens():
+    """
+    Count the tokens of one prompt or many without running them.
+
+    Body: {"prompt": str} or {"prompts": [str, ...]}, "model"?: model name.
+    Returns {"model", "source", "counts", "total"}, plus "count" for a single
+    prompt. source is "ollama" or "tiktoken:<encoding>" (see tokenCount.py).
+    """
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data, dict):
+        data = {}  # no prompt to count: the 400 below
+    model = data.get("model", "llama3.2:latest")
+    single = "prompts" not in data
+    prompts = [data.get("prompt")] if single else data.get("prompts")
+    if (
+        not isinstance(prompts, list)
+        or not prompts
+        or not all(isinstance(p, str) and p for p in prompts)
+    ):
+        error = "prompt or prompts (non-empty strings) is required"
+        return jsonify({"error": error}), 400
+    try:
+        counts, source = count_tokens_batch(prompts, model)
+    except Exception as e:
+        logging.error(f"Token count failed: {e}")
+        return jsonify({"error": "Internal server error", "detail": str(e)}), 500
+    body = {"model": model, "source": source, "counts": counts, "total": sum(counts)}
+    if single:
+        body["count"] = counts[0]
+    return jsonify(body)
+
+
+def _count_field(data, key):
+    """A non-negative number from the request body, or None when absent."""
+    value = data.get(key)
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0:
+        raise ValueError(f"{key} must be a non-negative number")
+    return value
+
+
+@app.route("/api/estimate", methods=["POST"])
+def estimate_prompt():
+    """
+    Predict a prompt's energy and latency without running it.
+
+    Body: {"prompt": str} or {"prompt_tokens": int}, "model"?,
+    "completion_tokens"?, "load_duration_sec"?. Returns
+    energyModel.EnergyModel.estimate() for this host.
+    """
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data, dict):
+        return jsonify({"error": "request body must be a JSON object"}), 400
+    model = data.get("model", "llama3.2:latest")
+    try:
+        prompt_tokens = _count_field(data, "prompt_tokens")
+        completion_tokens = _count_field(data, "completion_tokens")
+        load_duration_sec = _count_field(data, "load_duration_sec")
+        prompt = data.get("prompt")
+        if prompt_tokens is None and (not isinstance(prompt, str) or not prompt):
+            raise ValueError("prompt or prompt_tokens is required")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        if prompt_tokens is None:
+            prompt_tokens = count_tokens(prompt, model)
+        estimate = get_energy_model().estimate(
+            model,
+            prompt_tokens,
+            completion_tokens=completion_tokens,
+            load_duration_sec=load_duration_sec,
+            host_id=get_current_host_id(),
+        )
+    except Exception as e:
+        logging.error(f"Estimate failed: {e}")
+        return jsonify({"error": "Internal server error", "detail": str(e)}), 500
+    return jsonify(estimate)
+
+
+@app.route("/api/scores/cache", methods=["GET"])
+def score_cache_status():
+    """Report the prompt score cache's size, hit rate and scoring time saved."""
+    return jsonify(get_score_cache().stats())
+
+
+@app.route("/api/responses/cache", methods=["GET"])
+def response_cache_status():
+    """
+    Report the response cache's hit rate and the inference it has avoided.
+
+    The top-level counters cover this server process; "all_time" sums every
+    cache hit saved in the usage database.
+    """
+    stats = get_response_cache().stats()
+    try:
+        stats["all_time"] = get_cache_savings()
+    except Exception as e:
+        logging.error(f"Failed to read cache savings: {e}")
+        return jsonify({"error": "Internal server error", "detail": str(e)}), 500
+    return jsonify(stats)
 
 
 @app.route(
@@ -156,30 +463,58 @@ def dashboard():
 )
 def ollama_proxy(subpath):
     """
-    Proxy any Ollama API request to the local Ollama server at :11434.
+    Proxy any Ollama API request to the Ollama server at OLLAMA_URL.
+
+    The upstream body is relayed chunk by chunk as it arrives, so streaming
+    /api/generate and /api/chat replies reach the client token by token. The
+    upstream socket is only read as fast as the client takes the data, and
+    the pooled connection and its stream slot are released when the response
+    closes. Proxied streams draw on OLLAMA_MAX_STREAMS, not the slots
+    /api/prompt uses; when none frees up within OLLAMA_STREAM_WAIT_S the
+    proxy answers 503.
+
+    With METER_PROXY enabled, POSTs to /api/generate and /api/chat are also
+    measured and saved like /api/prompt (core.CompletionMeter), once the
+    reply has been fully relayed.
 
     Note: the target URL path is currently /ollama/api/<subpath> which is
     incorrect — Ollama's base path is /api/<subpath>. This is a known bug.
     """
-    # Construct the target URL on the Ollama server (default port 11434)
-    target_url = f"http://localhost:11434/api/{subpath}"
     # Forward headers, preserving content type and authorization
     headers = {
         key: value
         for key, value in request.headers
         if key not in ["Host", "Content-Length"]
     }
-    # Forward the request
-    resp = requests.request(
-        method=request.method,
-        url=target_url,
-        headers=headers,
-        params=request.args,
-        data=request.get_data(),
-        cookies=request.cookies,
-        allow_redirects=False,
-        stream=True,
-    )
+    body = request.get_data()
+    meter = None
+    if constants.METER_PROXY:
+        meter = CompletionMeter.for_request(subpath, request.method, body, monitor)
+    # Everything opened here is closed when the response closes (or below).
+    upstream = ExitStack()
+    try:
+        if meter is not None:
+            upstream.enter_context(meter)
+        # Forward the request over the shared keep-alive pool (OLLAMA_URL/api/...)
+        resp = upstream.enter_context(
+            get_ollama_client().stream(
+                request.method,
+                f"/api/{subpath}",
+                headers=headers,
+                params=request.args,
+                data=body,
+                cookies=request.cookies,
+                allow_redirects=False,
+            )
+        )
+    except OllamaBusyError as e:
+        upstream.close()
+        logging.warning(f"Ollama proxy busy: {e}")
+        return jsonify({"error": f"Ollama busy: {e}"}), 503
+    except requests.exceptions.RequestException as e:
+        upstream.close()
+        logging.error(f"Ollama proxy error: {e}")
+        return jsonify({"error": f"Ollama unreachable: {e}"}), 502
     # Build a Flask Response
     excluded_headers = [
         "content-encoding",
@@ -192,7 +527,72 @@ def ollama_proxy(subpath):
         for name, value in resp.raw.headers.items()
         if name.lower() not in excluded_headers
     ]
-    return Response(resp.content, status=resp.status_code, headers=response_headers)
+
+    def relay():
+        for chunk in resp.iter_content(chunk_size=None):
+            # Fed before the yield: a client that disconnects while the
+            # last chunk is suspended there closes the generator, and that
+            # chunk carries Ollama's "done" object.
+            if meter is not None:
+                meter.feed(chunk)
+            yield chunk
+
+    proxied = Response(relay(), status=resp.status_code, headers=response_headers)
+    proxied.call_on_close(upstream.close)
+    return proxied
+
+
+def start_monitor():
+    """
+    Create and start the process-wide power monitor, once.
+
+    Safe to call from several server entry points (app.run below, asgi.py's
+    lifespan startup): later calls return the running instance, so sampling
+    is never duplicated within a process.
+
+    Returns:
+        The PowerMonitor / LinuxPowerMonitor, or None on unsupported OSes.
+    """
+    global monitor
+    with _monitor_lock:
+        if monitor is not None:
+            return monitor
+        intervals = dict(
+            sample_interval=float(constants.SAMPLE_INTERVAL_S),
+            active_interval=float(constants.ACTIVE_SAMPLE_INTERVAL_S) or None,
+        )
+        if constants.OS == "Darwin":
+            from greenprompt.samplerMac import PowerMonitor
+
+            monitor = PowerMonitor(**intervals)
+            monitor.start()
+        elif constants.OS == "Linux":
+            from greenprompt.samplerLinux import LinuxPowerMonitor
+
+            monitor = LinuxPowerMonitor(
+                cpu_tdp_w=getattr(constants, "CPU_TDP_W", 40.0),
+                gpu_attribution=bool(constants.GPU_PROCESS_ATTRIBUTION),
+                **intervals,
+            )
+            monitor.start()
+        return monitor
+
+
+def stop_monitor():
+    """Stop the process-wide power monitor if one is running."""
+    global monitor
+    with _monitor_lock:
+        if monitor is not None:
+            monitor.stop()
+        monitor = None
+
+
+def configure_server():
+    """Start the power monitor and, if configured, batched DB writes."""
+    start_monitor()
+    if constants.DB_BATCH_FLUSH_S:
+        enable_batch_writes(flush_interval=float(constants.DB_BATCH_FLUSH_S))
+        logging.info(f"Batching DB writes every {constants.DB_BATCH_FLUSH_S}s")
 
 
 if __name__ == "__main__":
@@ -201,13 +601,7 @@ if __name__ == "__main__":
     _parser.add_argument("--port", type=int, default=5000)
     _args = _parser.parse_args()
 
-    if constants.OS == "Darwin":
-        from greenprompt.samplerMac import PowerMonitor
-        monitor = PowerMonitor()
-        monitor.start()
-    elif constants.OS == "Linux":
-        from greenprompt.samplerLinux import LinuxPowerMonitor
-        monitor = LinuxPowerMonitor(cpu_tdp_w=getattr(constants, "CPU_TDP_W", 40.0))
-        monitor.start()
+    configure_logging()
+    configure_server()
     logging.info("Starting API server...")
     app.run(host="127.0.0.1", port=_args.port, debug=False)
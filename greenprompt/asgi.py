@@ -0,0 +1,318 @@
+"""
+asgi.py — ASGI entry point for the GreenPrompt API.
+
+`python -m greenprompt.api` serves the Flask app with Werkzeug's development
+server. This module serves the same app from an asyncio event loop under
+uvicorn (optional dependency: pip install uvicorn):
+
+    greenprompt run --async --workers 16
+    python -m greenprompt.asgi --port 5000 --workers 16
+    uvicorn greenprompt.asgi:app --port 5000
+
+WsgiBridge adapts the Flask WSGI app to ASGI. The event loop only moves bytes;
+each request's WSGI call — prompt handling, DB writes, the Ollama proxy — runs
+start to finish on one thread of a bounded pool (`--workers` threads), and
+response chunks are handed back to the loop as they are produced, so SSE
+streams and proxied Ollama streams stay incremental. Only QUEUE_CHUNKS chunks
+are buffered per request: a slow client makes its worker wait, which in turn
+stops reading from Ollama, instead of the response piling up in memory. When a
+client disconnects mid-stream, the response iterator is closed on its worker
+thread, which closes the Ollama stream.
+
+Everything runs in ONE process. `--workers` sets how many requests are
+handled at once, not a process count: a second process would start a second
+PowerMonitor and sample power twice. The lifespan startup calls
+api.configure_server(), which starts the process-wide monitor exactly once.
+"""
+
+import argparse
+import asyncio
+import io
+import logging
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+#: Default number of requests handled concurrently.
+DEFAULT_WORKERS = 16
+
+#: Response chunks buffered per request between its worker and the client.
+QUEUE_CHUNKS = 8
+
+_DONE = object()
+
+
+def _environ(scope, body: bytes) -> dict:
+    """Build a PEP 3333 environ from an ASGI HTTP scope and the request body."""
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode("utf8").decode("latin1"),
+        "PATH_INFO": scope["path"].encode("utf8").decode("latin1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin1"),
+        "SERVER_NAME": str(server[0]),
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": str(client[0]),
+        "REMOTE_PORT": str(client[1]),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+    }
+    for raw_name, raw_value in scope.get("headers", []):
+        name = raw_name.decode("latin1").upper().replace("-", "_")
+        value = raw_value.decode("latin1")
+        if name in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+            key = name
+        else:
+            key = f"HTTP_{name}"
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+class WsgiBridge:
+    """
+    ASGI application that runs a WSGI app on a bounded thread pool.
+
+    Handles "http" and "lifespan" scopes. on_startup/on_shutdown run on a pool
+    thread during lifespan startup/shutdown.
+    """
+
+    def __init__(
+        self, wsgi_app, workers=DEFAULT_WORKERS, on_startup=None, on_shutdown=None
+    ):
+        self.wsgi_app = wsgi_app
+        self.workers = max(1, int(workers))
+        self.on_startup = on_startup
+        self.on_shutdown = on_shutdown
+        self._pool = None
+
+    @property
+    def pool(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="greenprompt-asgi"
+            )
+        return self._pool
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http":
+            await self._http(scope, receive, send)
+        else:
+            raise ValueError(f"Unsupported ASGI scope type: {scope['type']}")
+
+    async def _lifespan(self, receive, send):
+        loop = asyncio.get_running_loop()
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                try:
+                    if self.on_startup:
+                        await loop.run_in_executor(self.pool, self.on_startup)
+                except Exception as e:
+                    await send({"type": "lifespan.startup.failed", "message": str(e)})
+                    return
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                if self.on_shutdown:
+                    await loop.run_in_executor(self.pool, self.on_shutdown)
+                self.pool.shutdown(wait=False)
+                self._pool = None
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _read_body(self, receive) -> "bytes | None":
+        """Return the full request body, or None if the client went away."""
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return None
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body"):
+                return b"".join(chunks)
+
+    async def _http(self, scope, receive, send):
+        body = await self._read_body(receive)
+        if body is None:
+            return
+        loop = asyncio.get_running_loop()
+        # Bounded: a worker producing faster than the client reads blocks in
+        # emit() instead of buffering the whole response in memory.
+        queue = asyncio.Queue(maxsize=QUEUE_CHUNKS)
+        disconnected = threading.Event()
+
+        def emit(item):
+            asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+
+        def run():
+            # The whole WSGI call happens on this one thread: Flask's request
+            # context (and stream_with_context generators) stay on the thread
+            # that pushed them.
+            pending = []
+
+            def flush_start():
+                if pending:
+                    emit(pending.pop())
+
+            def write(data):
+                flush_start()
+                emit(bytes(data))
+
+            def start_response(status, headers, exc_info=None):
+                pending[:] = [(int(status.split(" ", 1)[0]), headers)]
+                return write
+
+            iterable = None
+            try:
+                iterable = self.wsgi_app(_environ(scope, body), start_response)
+                for chunk in iterable:
+                    flush_start()
+                    if chunk:
+                        emit(bytes(chunk))
+                    if disconnected.is_set():
+                        break
+                flush_start()
+            except BaseException as e:
+                logging.error(f"ASGI worker error: {e!r}")
+                emit(e)
+            finally:
+                if hasattr(iterable, "close"):
+                    iterable.close()
+                emit(_DONE)
+
+        async def watch_disconnect():
+            while (await receive())["type"] != "http.disconnect":
+                pass
+            disconnected.set()
+
+        async def forward(message):
+            try:
+                await send(message)
+            except OSError:
+                # Client gone while sending; the worker closes the iterator.
+                disconnected.set()
+
+        watcher = asyncio.ensure_future(watch_disconnect())
+        future = loop.run_in_executor(self.pool, run)
+        started = False
+        try:
+            # Drain until _DONE even after a disconnect: the worker may be
+            # blocked in emit() waiting for queue space.
+            while True:
+                item = await queue.get()
+                if item is _DONE:
+                    break
+                if disconnected.is_set():
+                    continue
+                if isinstance(item, tuple):
+                    status, headers = item
+                    await forward(
+                        {
+                            "type": "http.response.start",
+                            "status": status,
+                            "headers": [
+                                (k.lower().encode("latin1"), v.encode("latin1"))
+                                for k, v in headers
+                            ],
+                        }
+                    )
+                    started = True
+                elif isinstance(item, BaseException):
+                    # Past the status line there is nothing to report; end the body.
+                    if not started:
+                        await forward(
+                            {
+                                "type": "http.response.start",
+                                "status": 500,
+                                "headers": [(b"content-type", b"text/plain")],
+                            }
+                        )
+                        await forward(
+                            {
+                                "type": "http.response.body",
+                                "body": b"Internal Server Error",
+                                "more_body": True,
+                            }
+                        )
+                        started = True
+                else:
+                    await forward(
+                        {"type": "http.response.body", "body": item, "more_body": True}
+                    )
+            if started and not disconnected.is_set():
+                await forward({"type": "http.response.body", "body": b""})
+        finally:
+            watcher.cancel()
+            await future
+
+
+def _shutdown():
+    from greenprompt import api
+    from greenprompt.dbconn import disable_batch_writes
+
+    api.stop_monitor()
+    disable_batch_writes()
+
+
+def create_app(workers=DEFAULT_WORKERS) -> WsgiBridge:
+    """
+    Return the GreenPrompt API as an ASGI application.
+
+    The power monitor and batched DB writes start in the lifespan startup
+    (api.configure_server) and stop at shutdown.
+    """
+    from greenprompt import api
+
+    return WsgiBridge(
+        api.app, workers, on_startup=api.configure_server, on_shutdown=_shutdown
+    )
+
+
+#: For `uvicorn greenprompt.asgi:app`. Built lazily so importing this module
+#: does not import the Flask app.
+def __getattr__(name):
+    if name == "app":
+        return create_app()
+    raise AttributeError(name)
+
+
+def main(argv=None):
+    """Serve the API under uvicorn: one process, `--workers` concurrent requests."""
+    parser = argparse.ArgumentParser(description="Run the GreenPrompt API under ASGI")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help=f"Requests handled concurrently (default: {DEFAULT_WORKERS})",
+    )
+    args = parser.parse_args(argv)
+    try:
+        import uvicorn
+    except ImportError:
+        print("ASGI mode needs uvicorn: pip install uvicorn")
+        return 1
+    from greenprompt import api
+
+    api.configure_logging()
+    uvicorn.run(
+        create_app(args.workers),
+        host=args.host,
+        port=args.port,
+        lifespan="on",
+        log_level="warning",
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
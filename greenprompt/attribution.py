@@ -0,0 +1,272 @@
+"""
+attribution.py — Split measured power among prompts that overlap in time.
+
+The power monitors measure the whole machine. A prompt's energy is the
+integral of that power over its [start, end] window, so when two requests
+overlap each used to be charged the full draw of the shared stretch and the
+per-prompt totals added up to more than the machine consumed.
+
+AttributionTracker keeps the window of every prompt in flight in this
+process — /api/prompt, /api/prompt/stream, batch runs and metered proxy
+calls all open one through core — plus recently finished windows that
+still overlap an open one. When a prompt finishes, its window is cut into
+segments at every point where the set of running prompts changes. Within a
+segment that set is fixed, so the segment's energy (SampleBuffer.integrate
+over the monitor's samples) is split among the prompts running in it.
+
+A prompt that finishes first has to claim its part of a shared segment
+while the others are still running. It records that claim, and whoever
+finishes later splits only what is left, so the parts of every segment add
+up to exactly 1 and the per-prompt energies of overlapping prompts add up
+to what the machine drew over their combined window. How a finishing
+prompt splits the unclaimed rest with the prompts still running:
+
+    equal   — evenly (the default).
+    tokens  — in proportion to generation rate (completion tokens / window
+              length), so a prompt producing twice the tokens per second
+              carries twice the load. Prompts still running are assumed to
+              generate at the average rate of recently finished ones.
+    off     — no splitting: every prompt is charged its whole window.
+
+The result is a share in [0, 1]: the fraction of the energy measured over
+the prompt's window that belongs to it. core scales the prompt's power and
+energy figures by it and reports it as "energy_share". Without monitor
+samples, segments are weighted by their length (constant power).
+
+Only prompts issued by this process are known; other Ollama clients on the
+machine still show up in the measured power.
+"""
+
+import itertools
+import threading
+import time
+
+from greenprompt import constants
+from greenprompt.samplerCommon import SampleBuffer, as_sample_buffer
+
+#: ENERGY_ATTRIBUTION values.
+WEIGHTINGS = ("equal", "tokens", "off")
+
+#: Weight of the latest finished prompt in the running rate average.
+RATE_SMOOTHING = 0.2
+
+
+class Span:
+    """
+    One prompt's window, as tracked by AttributionTracker.
+
+    Attributes:
+        start: Epoch seconds the prompt was sent.
+        end: Epoch seconds it finished, or None while running.
+        tokens: Completion tokens, set by the caller before finish() when
+            known; used by the "tokens" weighting.
+        share: Fraction of the window's energy attributed to this prompt,
+            set by finish(); 1.0 until then.
+        claims: (lo, hi, fraction) per segment, set by finish(); None until
+            then and for unsplit ("off") windows.
+    """
+
+    __slots__ = ("id", "start", "end", "tokens", "share", "claims")
+
+    def __init__(self, span_id, start):
+        self.id = span_id
+        self.start = start
+        self.end = None
+        self.tokens = None
+        self.share = 1.0
+        self.claims = None
+
+    def claimed(self, t):
+        """Fraction of the segment containing time `t` this span claimed."""
+        for lo, hi, fraction in self.claims or ():
+            if lo <= t < hi:
+                return fraction
+        return 0.0
+
+    def rate(self):
+        """Completion tokens per second, or None if not known."""
+        if self.tokens is None or self.end is None or self.end <= self.start:
+            return None
+        return self.tokens / (self.end - self.start)
+
+
+def _segments(span, others):
+    """
+    Cut span's window where the set of running prompts changes.
+
+    Args:
+        span: The finished Span.
+        others: (start, end) of every other span overlapping it, with open
+            spans' end clipped to span.end.
+
+    Returns:
+        List of (lo, hi, [indexes into `others` running throughout]).
+    """
+    edges = sorted(
+        {span.start, span.end}
+        | {t for window in others for t in window if span.start < t < span.end}
+    )
+    return [
+        (lo, hi, [i for i, (s, e) in enumerate(others) if s <= lo and e >= hi])
+        for lo, hi in zip(edges, edges[1:])
+    ]
+
+
+def _fraction(span, at, running, weighting, rate_estimate):
+    """
+    This span's fraction of the segment around time `at`, shared with the
+    `running` other spans.
+
+    Finished spans already claimed theirs; the rest is split between this
+    span and the ones still open.
+    """
+    rest = max(0.0, 1.0 - sum(o.claimed(at) for o in running if o.end is not None))
+    still_open = sum(1 for o in running if o.end is None)
+    if not still_open:
+        return rest
+    if weighting == "tokens":
+        own = span.rate()
+        if own is not None and rate_estimate:
+            return rest * own / (own + rate_estimate * still_open)
+    return rest / (1 + still_open)
+
+
+class AttributionTracker:
+    """
+    Thread-safe registry of in-flight and recently finished prompt windows.
+
+    Usage:
+        span = tracker.begin()
+        ...  # call Ollama
+        span.tokens = data.get("eval_count")
+        share = tracker.finish(span, monitor)
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+        self._spans = {}
+        self._rate_estimate = None
+
+    def begin(self) -> Span:
+        """Open a window starting now."""
+        with self._lock:
+            span = Span(next(self._ids), time.time())
+            self._spans[span.id] = span
+            return span
+
+    def open_count(self) -> int:
+        """Number of windows currently open."""
+        with self._lock:
+            return sum(1 for s in self._spans.values() if s.end is None)
+
+    def finish(self, span, monitor=None, weighting=None) -> float:
+        """
+        Close `span` now and compute its share of the energy in its window.
+
+        Args:
+            span: A Span from begin().
+            monitor: Power monitor whose samples weight the segments; segments
+                are weighted by duration when it has none.
+            weighting: "equal", "tokens" or "off"; defaults to
+                constants.ENERGY_ATTRIBUTION.
+
+        Returns:
+            The share (also stored as span.share).
+        """
+        weighting = weighting or constants.ENERGY_ATTRIBUTION
+        # Claims must be settled one finish at a time, so the whole
+        # computation runs under the lock; it is a few integrals.
+        with self._lock:
+            span.end = time.time()
+            others = [
+                s
+                for s in self._spans.values()
+                if s is not span
+                and s.start < span.end
+                and (s.end is None or s.end > span.start)
+                and not (s.end is not None and s.claims is None)
+            ]
+            if weighting == "off" or not others or span.end <= span.start:
+                span.share = 1.0
+                span.claims = (
+                    None if weighting == "off" else [(span.start, span.end, 1.0)]
+                )
+            else:
+                self._split(span, others, monitor, weighting)
+            own_rate = span.rate()
+            if own_rate is not None:
+                self._rate_estimate = (
+                    own_rate
+                    if self._rate_estimate is None
+                    else (1 - RATE_SMOOTHING) * self._rate_estimate
+                    + RATE_SMOOTHING * own_rate
+                )
+            self._prune()
+        return span.share
+
+    def _split(self, span, others, monitor, weighting):
+        """Set span.claims and span.share against overlapping `others`."""
+        windows = [
+            (s.start, span.end if s.end is None else min(s.end, span.end))
+            for s in others
+        ]
+        segments = _segments(span, windows)
+        claims = [
+            (
+                lo,
+                hi,
+                _fraction(
+                    span,
+                    (lo + hi) / 2,
+                    [others[i] for i in running],
+                    weighting,
+                    self._rate_estimate,
+                ),
+            )
+            for lo, hi, running in segments
+        ]
+        energies = _segment_energies(monitor, segments)
+        total = sum(energies)
+        if total <= 0:
+            energies = [hi - lo for lo, hi, _ in segments]
+            total = span.end - span.start
+        own = sum(energy * c[2] for energy, c in zip(energies, claims))
+        span.claims = claims
+        span.share = min(1.0, own / total)
+
+    def _prune(self):
+        """Drop finished spans that no open span overlaps (lock held)."""
+        open_starts = [s.start for s in self._spans.values() if s.end is None]
+        horizon = min(open_starts) if open_starts else float("inf")
+        for span_id in [
+            s.id for s in self._spans.values() if s.end is not None and s.end <= horizon
+        ]:
+            del self._spans[span_id]
+
+
+def _segment_energies(monitor, segments):
+    """Combined energy (J) per segment from the monitor's samples; 0.0 if none."""
+    samples = getattr(monitor, "samples", None) if monitor else None
+    if samples is None:
+        return [0.0] * len(segments)
+    buf = as_sample_buffer(samples, getattr(monitor, "_lock", None))
+    edge_window = 2 * getattr(monitor, "sample_interval", 1)
+    energies = []
+    for lo, hi, _ in segments:
+        try:
+            window = buf.integrate(lo, hi, edge_window)
+        except (TypeError, ValueError):
+            window = None
+        energies.append(
+            0.0 if window is None else float(window.energy_j[SampleBuffer.COMBINED])
+        )
+    return energies
+
+
+_tracker = AttributionTracker()
+
+
+def get_tracker() -> AttributionTracker:
+    """Return the process-wide AttributionTracker."""
+    return _tracker
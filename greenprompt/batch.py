@@ -0,0 +1,175 @@
+"""
+batch.py — Run many prompts in one call with bounded concurrency.
+
+POST /api/prompts/batch and `greenprompt batch prompts.jsonl` both end up in
+run_batch(), which sends up to `concurrency` prompts to Ollama at a time and
+yields each result as soon as it completes — completion order, tagged with
+the prompt's position in the input — so callers can stream NDJSON back
+while the rest of the batch is still running.
+
+Energy: prompts in a batch overlap. Each goes through core.generate(), so
+the machine's power over a shared stretch is split among the prompts
+running in it (attribution.py) — with each other and with any other
+traffic on the server — rather than charged to each in full.
+
+Records are written with dbconn.save_prompt_usage_many() every SAVE_EVERY
+results and when the batch ends, instead of one commit per prompt. Each is
+stamped when its prompt finished, not when it is written.
+
+With RESPONSE_CACHE on, a prompt already answered for the same model and
+options is served from responseCache without reaching Ollama, like
+core.run_prompt(); identical items in flight at the same time both run.
+"""
+
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from greenprompt import constants
+from greenprompt.core import (
+    _detect_gpu_usage,
+    cache_completion,
+    generate,
+    record_completion,
+    serve_cached,
+)
+from greenprompt.dbconn import save_prompt_usage_many, usage_timestamp
+from greenprompt.responseCache import get_response_cache
+
+#: Results buffered before they are written to the DB in one transaction.
+SAVE_EVERY = 50
+
+
+def parse_items(items, default_model):
+    """
+    Normalize batch input into a list of {"prompt", "model", "id", "options"}
+    dicts.
+
+    Each item is a prompt string or a dict with "prompt" and optionally
+    "model", "id" (echoed back in the result) and "options" (Ollama model
+    options).
+
+    Raises:
+        ValueError: If the input is empty, an item has no prompt, or its
+            options are not an object.
+    """
+    if isinstance(items, (str, dict)):
+        raise ValueError("prompts must be a list")
+    parsed = []
+    for i, item in enumerate(items):
+        if isinstance(item, str):
+            item = {"prompt": item}
+        if not isinstance(item, dict) or not item.get("prompt"):
+            raise ValueError(f"Item {i}: prompt is required")
+        options = item.get("options")
+        if options is not None and not isinstance(options, dict):
+            raise ValueError(f"Item {i}: options must be an object")
+        parsed.append(
+            {
+                "prompt": item["prompt"],
+                "model": item.get("model") or default_model,
+                "id": item.get("id"),
+                "options": options,
+            }
+        )
+    if not parsed:
+        raise ValueError("At least one prompt is required")
+    return parsed
+
+
+def run_batch(
+    items, model="llama3.2:latest", monitor=False, concurrency=None, use_cache=True
+):
+    """
+    Run prompts through Ollama, at most `concurrency` at a time.
+
+    Args:
+        items: Prompt strings or dicts (see parse_items()).
+        model: Model for items that do not name one.
+        monitor: A PowerMonitor / LinuxPowerMonitor instance, or False/None.
+        concurrency: Prompts in flight at once; defaults to
+            OLLAMA_MAX_IN_FLIGHT, which also bounds the Ollama client.
+        use_cache: False runs every prompt even when responseCache has it.
+
+    Yields:
+        One dict per prompt in completion order: the run_prompt() result
+        plus "index" (position in `items`) and "id" when given — or
+        {"index", "id", "prompt", "error"} if that prompt failed.
+
+    Raises:
+        ValueError: From parse_items(), before any prompt is sent.
+
+    Closing the generator early cancels prompts not yet sent; results that
+    were already yielded are still saved, in-flight ones are discarded.
+    """
+    parsed = parse_items(items, model)
+    concurrency = max(1, int(concurrency or constants.OLLAMA_MAX_IN_FLIGHT))
+    gpu_usage = _detect_gpu_usage()
+    cache = get_response_cache()
+
+    def run_one(index):
+        item = parsed[index]
+        prompt, item_model, options = item["prompt"], item["model"], item["options"]
+        if use_cache:
+            result = serve_cached(
+                cache, prompt, item_model, options, gpu_usage, save=False
+            )
+            if result is not None:
+                return usage_timestamp(), result
+        data, span = generate(prompt, item_model, monitor, options)
+        result = record_completion(
+            prompt,
+            item_model,
+            data,
+            data.get("response", ""),
+            span.start,
+            span.end,
+            monitor,
+            gpu_usage,
+            save=False,
+            share=span.share,
+        )
+        cache_completion(cache, prompt, item_model, options, data, result)
+        return usage_timestamp(), result
+
+    return _run(parsed, run_one, concurrency)
+
+
+def _run(parsed, run_one, concurrency):
+    pool = ThreadPoolExecutor(
+        max_workers=concurrency, thread_name_prefix="greenprompt-batch"
+    )
+    pending = {}
+    unsaved = []
+    next_index = 0
+    try:
+        while pending or next_index < len(parsed):
+            while next_index < len(parsed) and len(pending) < concurrency:
+                pending[pool.submit(run_one, next_index)] = next_index
+                next_index += 1
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = pending.pop(future)
+                tag = {"index": index}
+                if parsed[index]["id"] is not None:
+                    tag["id"] = parsed[index]["id"]
+                try:
+                    timestamp, result = future.result()
+                except Exception as e:
+                    yield {**tag, "prompt": parsed[index]["prompt"], "error": str(e)}
+                    continue
+                unsaved.append((timestamp, result))
+                if len(unsaved) >= SAVE_EVERY:
+                    _save(unsaved)
+                    unsaved = []
+                yield {**tag, **result}
+    finally:
+        # Early close: prompts already at Ollama finish in the background
+        # and are dropped; queued ones are never sent.
+        pool.shutdown(wait=False, cancel_futures=True)
+        _save(unsaved)
+
+
+def _save(records):
+    try:
+        save_prompt_usage_many(records)
+    except Exception as e:
+        print(f"Warning: Failed to save {len(records)} batch records: {e}")
@@ -6,34 +6,47 @@ subcommands and delegates to either the running API server (for prompt/monitor)
 or directly to module functions (for score). Server lifecycle (run/stop) is
 managed by spawning/killing processes on the configured port.
 
-Subcommands: setup, run, prompt, monitor, score, dashboard, stop, log_api.
+Subcommands: setup, run, prompt, batch, monitor, score, dashboard, stop,
+log_api.
 See README.md for full usage examples and flag reference.
 
 Sudo policy: no greenprompt command requires the caller to be root. On macOS,
 powermetrics requires root — samplerMac.py calls `sudo powermetrics`
 internally. Run `sudo greenprompt setup` once to configure passwordless sudo
 for powermetrics; thereafter all commands run as a normal user.
+
+Imports are kept light: most commands are one HTTP call to the API server,
+so the scorer (NLTK), the database layer and the setup routine are imported
+inside the commands that use them. `python benchmarks/bench_startup.py`
+measures the cold start.
 """
 
 import argparse
+import csv
+import json
 import requests
 import sys
 import subprocess
+import time
 import webbrowser
-from greenprompt.dbconn import get_prompt_usage
-from greenprompt.scoreBasic import score_prompt
+
+#: `greenprompt score --file` reports throughput every this many prompts.
+SCORE_PROGRESS_EVERY = 10000
 
 
-def run_api(port):
+def run_api(port, use_async=False, workers=None):
     """
     Start the GreenPrompt Flask API server as a background subprocess.
 
     If a process is already listening on `port`, kills it first. Launches
     `python -m greenprompt.api --port=<port>` via subprocess.Popen with
-    stdout/stderr suppressed.
+    stdout/stderr suppressed, or `python -m greenprompt.asgi` (uvicorn) when
+    use_async is set.
 
     Args:
         port: Integer port number to bind the Flask server to.
+        use_async: Serve through the ASGI entry point (greenprompt.asgi).
+        workers: ASGI mode only — requests handled concurrently.
     """
     # Check if the port is in use
     try:
@@ -50,12 +63,156 @@ def run_api(port):
         print(f"Error checking or killing process on port {port}: {e}")
 
     # Start the API server
-    subprocess.Popen(
-        [sys.executable, "-m", "greenprompt.api", f"--port={port}"],
-        stdout=subprocess.DEVNULL,
-        stderr=subprocess.DEVNULL,
-    )
-    print(f"API server is running on port {port} in the background.")
+    if use_async:
+        try:
+            import uvicorn  # noqa: F401
+        except ImportError:
+            print("Error: --async needs uvicorn. Install it with: pip install uvicorn")
+            sys.exit(1)
+        cmd = [sys.executable, "-m", "greenprompt.asgi", f"--port={port}"]
+        if workers:
+            cmd.append(f"--workers={workers}")
+    else:
+        cmd = [sys.executable, "-m", "greenprompt.api", f"--port={port}"]
+    subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    mode = " (ASGI)" if use_async else ""
+    print(f"API server{mode} is running on port {port} in the background.")
+
+
+def iter_prompt_file(path):
+    """
+    Yield the items of a JSONL prompt file one line at a time.
+
+    Each non-blank line is a JSON string (the prompt) or an object with
+    "prompt" and optionally "model" and "id". "-" reads standard input.
+
+    Raises:
+        ValueError: If a line is not valid JSON.
+    """
+    f = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    try:
+        for lineno, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError as e:
+                raise ValueError(f"{path}:{lineno}: invalid JSON: {e}")
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def read_batch_file(path):
+    """Read prompts for `greenprompt batch` from a JSONL file (see iter_prompt_file())."""
+    return list(iter_prompt_file(path))
+
+
+def run_batch_file(path, model, port, concurrency=None, output=None):
+    """
+    Send a JSONL file of prompts to POST /api/prompts/batch and print results.
+
+    Results are printed as they stream back (one line per prompt) and, with
+    `output`, written to that file as NDJSON. Exits with status 1 if the
+    server is unreachable, rejects the batch, or any prompt failed.
+    """
+    items = read_batch_file(path)
+    payload = {"prompts": items, "model": model}
+    if concurrency:
+        payload["concurrency"] = concurrency
+    url = f"http://127.0.0.1:{port}/api/prompts/batch"
+    out = open(output, "w", encoding="utf-8") if output else None
+    done = failed = 0
+    energy_wh = 0.0
+    try:
+        with requests.post(url, json=payload, stream=True) as response:
+            if response.status_code != 200:
+                print(f"Error: {response.json().get('error', response.text)}")
+                sys.exit(1)
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                result = json.loads(line)
+                if out:
+                    out.write(line.decode("utf-8") + "\n")
+                label = result.get("id", result.get("index"))
+                if "error" in result:
+                    failed += 1
+                    print(f"[{label}] Error: {result['error']}")
+                    continue
+                done += 1
+                energy = result.get("total_energy (Wh)") or 0.0
+                energy_wh += energy
+                print(
+                    f"[{label}] {result.get('model')}: "
+                    f"{result.get('total_tokens')} tokens, "
+                    f"{result.get('duration_sec', 0):.2f} s, {energy:.6f} Wh"
+                )
+    except requests.exceptions.ConnectionError:
+        print(f"Error: cannot connect to API server on port {port}.")
+        print(f"Start it first with: greenprompt run --port {port}")
+        sys.exit(1)
+    finally:
+        if out:
+            out.close()
+    print(f"\n{done}/{len(items)} prompts completed, {energy_wh:.6f} Wh total.")
+    if failed:
+        print(f"{failed} prompts failed.")
+        sys.exit(1)
+
+
+def score_file(path, workers=None, output=None):
+    """
+    Score every prompt in a JSONL file across worker processes.
+
+    The file uses the `greenprompt batch` format. Results are written in
+    input order as they are scored: JSON lines on stdout, or to `output` —
+    CSV (one column per dimension) when it ends in ".csv", JSON lines
+    otherwise. Throughput is reported on stderr. Exits with status 1 if any
+    prompt could not be scored.
+    """
+    from greenprompt.scoreBasic import DIMENSIONS
+    from greenprompt.scoreBatch import score_prompts
+
+    out = open(output, "w", encoding="utf-8", newline="") if output else sys.stdout
+    writer = None
+    if output and output.lower().endswith(".csv"):
+        fields = ["index", "id", "prompt", "total_score", "score_percent"]
+        writer = csv.DictWriter(out, fieldnames=[*fields, *DIMENSIONS, "error"])
+        writer.writeheader()
+    done = failed = 0
+    started = time.perf_counter()
+
+    def report():
+        elapsed = time.perf_counter() - started
+        rate = (done + failed) / elapsed if elapsed > 0 else 0.0
+        print(
+            f"Scored {done}/{done + failed} prompts in {elapsed:.1f} s "
+            f"({rate:.0f} prompts/s)",
+            file=sys.stderr,
+        )
+
+    try:
+        for result in score_prompts(iter_prompt_file(path), workers):
+            if "error" in result:
+                failed += 1
+            else:
+                done += 1
+            if writer:
+                row = {field: result.get(field) for field in fields}
+                row["error"] = result.get("error")
+                writer.writerow({**row, **result.get("details", {})})
+            else:
+                out.write(json.dumps(result) + "\n")
+            if (done + failed) % SCORE_PROGRESS_EVERY == 0:
+                report()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    report()
+    if failed:
+        print(f"{failed} prompts could not be scored.", file=sys.stderr)
+        sys.exit(1)
 
 
 def main():
@@ -81,6 +238,19 @@ def main():
     p_run.add_argument(
         "--port", type=int, default=5000, help="Port for the web server (default: 5000)"
     )
+    p_run.add_argument(
+        "--async",
+        dest="use_async",
+        action="store_true",
+        help="Serve through the ASGI entry point under uvicorn (pip install uvicorn)",
+    )
+    p_run.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="With --async: requests handled concurrently in the one server process "
+        "(default: 16)",
+    )
     # prompt command
     p_prompt = subparsers.add_parser(
         "prompt", help="Send a prompt and display energy/token stats"
@@ -92,6 +262,25 @@ def main():
     p_prompt.add_argument(
         "--port", type=int, default=5000, help="API server port (default: 5000)"
     )
+    # batch command
+    p_batch = subparsers.add_parser(
+        "batch", help="Run every prompt in a JSONL file and display energy/token stats"
+    )
+    p_batch.add_argument(
+        "file", type=str, help='JSONL file: one prompt string or {"prompt": ...} per line ("-" for stdin)'
+    )
+    p_batch.add_argument(
+        "--model", type=str, default="llama3.2:latest", help="Model for lines that do not set one (default: llama3.2:latest)"
+    )
+    p_batch.add_argument(
+        "--concurrency", type=int, default=None, help="Prompts in flight at once (default: OLLAMA_MAX_IN_FLIGHT)"
+    )
+    p_batch.add_argument(
+        "--output", type=str, default=None, help="Also write each result as a JSON line to this file"
+    )
+    p_batch.add_argument(
+        "--port", type=int, default=5000, help="API server port (default: 5000)"
+    )
     # monitor command
     p_mon = subparsers.add_parser(
         "monitor", help="Display the last N prompt usage entries"
@@ -99,6 +288,11 @@ def main():
     p_mon.add_argument(
         "--count", type=int, default=10, help="Number of entries to show (default: 10)"
     )
+    p_mon.add_argument(
+        "--brief",
+        action="store_true",
+        help="Omit prompt and response text (default: False)",
+    )
     # log_api command (optional)
     p_log = subparsers.add_parser("log_api", help="Tail the API server logs")
     p_log.add_argument(
@@ -124,7 +318,16 @@ def main():
     p_score = subparsers.add_parser(
         "score", help="Score a prompt using the built-in scoring function"
     )
-    p_score.add_argument("prompt", type=str, help="The prompt text to score")
+    p_score.add_argument("prompt", type=str, nargs="?", help="The prompt text to score")
+    p_score.add_argument(
+        "--file", type=str, default=None, help='Score every prompt in a JSONL file instead (batch format, "-" for stdin)'
+    )
+    p_score.add_argument(
+        "--workers", type=int, default=None, help="With --file: worker processes (default: CPU count)"
+    )
+    p_score.add_argument(
+        "--output", type=str, default=None, help="With --file: write results here, CSV if it ends in .csv (default: JSON lines on stdout)"
+    )
 
     args = parser.parse_args()
 
@@ -136,7 +339,7 @@ def main():
 
     elif args.command == "run":
         print(f"Starting API server on port {args.port}...")
-        run_api(port=args.port)
+        run_api(port=args.port, use_async=args.use_async, workers=args.workers)
 
     elif args.command == "prompt":
         # Make api call to run the prompt
@@ -169,12 +372,36 @@ def main():
             print(f"Error: {e}")
             sys.exit(1)
 
+    elif args.command == "batch":
+        try:
+            run_batch_file(
+                args.file, args.model, args.port, args.concurrency, args.output
+            )
+        except (OSError, ValueError) as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+
     elif args.command == "monitor":
-        entries = get_prompt_usage(start_time=None, end_time=None, model=None)
-        for entry in entries[-args.count :]:
+        columns = [
+            "timestamp",
+            "model",
+            "prompt_tokens",
+            "completion_tokens",
+            "total_tokens",
+            "duration_sec",
+            "energy_wh",
+        ]
+        if not args.brief:
+            columns += ["prompt", "response"]
+        from greenprompt.dbconn import get_prompt_usage
+
+        # Fetch only the newest N rows (newest first) and print oldest first.
+        entries = get_prompt_usage(columns=columns, limit=args.count, descending=True)
+        for entry in reversed(entries):
             print(f"Timestamp: {entry['timestamp']}")
-            print(f"Prompt: {entry['prompt']}")
-            print(f"Response: {entry['response']}")
+            if not args.brief:
+                print(f"Prompt: {entry['prompt']}")
+                print(f"Response: {entry['response']}")
             print(f"Model: {entry['model']}")
             print(f"Prompt tokens: {entry['prompt_tokens']}")
             print(f"Completion tokens: {entry['completion_tokens']}")
@@ -216,13 +443,20 @@ def main():
         except Exception as e:
             print(f"Error stopping API server on port {port}: {e}")
     elif args.command == "score":
+        if args.file:
+            try:
+                score_file(args.file, args.workers, args.output)
+            except (OSError, ValueError) as e:
+                print(f"Error: {e}")
+                sys.exit(1)
+            return
+        if not args.prompt:
+            p_score.error("a prompt or --file is required")
+        from greenprompt.scoreBasic import score_prompt
+
         # Takes a prompt as a parameter (string) and returns the score
-        parser = argparse.ArgumentParser()
-        parser.add_argument("prompt", type=str, help="The prompt text to score")
-        parsed_args, _ = parser.parse_known_args(sys.argv[2:])
-        prompt = parsed_args.prompt
         try:
-            score = score_prompt(prompt)
+            score = score_prompt(args.prompt)
             print(f"Score for the prompt: {score}")
         except Exception as e:
             print(f"Error scoring prompt: {e}")
@@ -5,8 +5,9 @@ This module is machine-independent and safe to commit. Platform values are
 derived live at import time, so they are always correct for the machine that
 is actually running — they are never baked in by whoever last ran `setup`.
 
-Tunable values (OLLAMA_URL, CPU_TDP_W) come from a user config file written by
-`greenprompt setup`, resolved in this order:
+Tunable values — the settings under "Defaults" below, listed in _OVERRIDABLE
+— come from a user config file written by `greenprompt setup`, resolved in
+this order:
 
     1. $GREENPROMPT_CONFIG            — explicit path to a JSON file
     2. $GREENPROMPT_HOME/config.json
@@ -17,8 +18,8 @@ directory and survives reinstalls and upgrades. Earlier versions generated a
 `constants.py` in the current working directory, where nothing ever imported
 it; any such stray file is obsolete and can be deleted.
 
-Only three names are read by the rest of the codebase — OS, OLLAMA_URL, and
-CPU_TDP_W. The remaining platform values are exposed for informational use;
+Only OS and those tunables are read by the rest of the codebase. The remaining
+platform values are exposed for informational use;
 `sysUsage.get_system_info()` is the authoritative source for anything
 persisted to the database.
 """
@@ -32,6 +33,30 @@ import platform
 #: Ollama server base URL (no trailing slash).
 OLLAMA_URL = "http://127.0.0.1:11434"
 
+#: Seconds to connect to Ollama, and to wait between bytes of its reply
+#: (ollamaClient). The read timeout also covers model load time.
+OLLAMA_CONNECT_TIMEOUT_S = 5.0
+OLLAMA_READ_TIMEOUT_S = 300.0
+
+#: Retries, with exponential backoff, when Ollama refuses the connection or
+#: answers 503 (queue full). Requests that reached the model are not retried.
+OLLAMA_RETRIES = 2
+
+#: Maximum requests in flight to Ollama from this process; callers beyond it
+#: wait. Also the size of the keep-alive connection pool.
+OLLAMA_MAX_IN_FLIGHT = 8
+
+#: Maximum streaming replies (the /ollama/api proxy, streamed /api/prompt)
+#: open at once, counted apart from OLLAMA_MAX_IN_FLIGHT since a stream is
+#: read at the client's pace. A stream waits OLLAMA_STREAM_WAIT_S seconds
+#: for a slot, then the proxy answers 503.
+OLLAMA_MAX_STREAMS = 8
+OLLAMA_STREAM_WAIT_S = 30.0
+
+#: Measure and save /api/generate and /api/chat calls made through the
+#: /ollama/api proxy, the same way as /api/prompt.
+METER_PROXY = False
+
 #: CPU TDP in watts. Used only by LinuxPowerMonitor's "linear_tdp" fallback
 #: mode; ignored when RAPL or ARM big.LITTLE sampling is available.
 CPU_TDP_W = 40.0
@@ -39,6 +64,55 @@ CPU_TDP_W = 40.0
 #: Informational: "rapl" (direct Intel/AMD energy counter) or "estimated".
 CPU_POWER_SOURCE = "estimated"
 
+#: Seconds between dbconn.BatchWriter flushes in the API server. 0 disables
+#: batching, so every prompt is committed before its response is returned.
+DB_BATCH_FLUSH_S = 0.0
+
+#: Seconds between power samples while no prompt is running.
+SAMPLE_INTERVAL_S = 1.0
+
+#: Seconds between power samples while a prompt is in flight, so short
+#: prompts get samples inside their window. 0 samples at SAMPLE_INTERVAL_S
+#: throughout.
+ACTIVE_SAMPLE_INTERVAL_S = 0.1
+
+#: Linux/NVIDIA only: also run `nvidia-smi pmon` and report, per GPU, the
+#: share of power used by Ollama's processes.
+GPU_PROCESS_ATTRIBUTION = False
+
+#: NVIDIA query backend: "nvml" (in-process, needs `pynvml`), "nvidia-smi"
+#: (one subprocess per read) or "auto" — NVML when it loads.
+GPU_BACKEND = "auto"
+
+#: How the power of prompts that overlap in time is split between them
+#: (attribution.py): "equal", "tokens" (by generation rate) or "off" (each
+#: prompt is charged the machine's full draw over its window).
+ENERGY_ATTRIBUTION = "equal"
+
+#: Prompt scores kept in memory by scoreCache (least recently used are
+#: evicted); scores are also stored in the database, so restarts stay warm.
+#: 0 turns the cache off and scores every prompt.
+SCORE_CACHE_SIZE = 10000
+
+#: Count tokens for local models with the model's own tokenizer through
+#: Ollama's /api/tokenize (tokenCount.py). Off: tiktoken estimates only.
+OLLAMA_TOKENIZE = False
+
+#: Ollama token counts memoized by tokenCount, per (model, text).
+TOKEN_CACHE_SIZE = 10000
+
+#: Answer repeated (model, prompt, options) requests to /api/prompt and
+#: /api/prompts/batch from earlier Ollama replies (responseCache.py) instead
+#: of running the model again.
+RESPONSE_CACHE = False
+
+#: Replies kept in memory by responseCache (least recently used are evicted);
+#: more are stored in the database.
+RESPONSE_CACHE_SIZE = 1000
+
+#: Seconds a cached reply is served for. 0 keeps replies until evicted.
+RESPONSE_CACHE_TTL_S = 86400.0
+
 
 # --- Live platform values ---------------------------------------------------
 # Derived on every import. Cheap (no psutil/cpuinfo import) and always
@@ -56,7 +130,30 @@ PROCESSOR = platform.processor()
 
 #: Keys that may be overridden by the user config file. Platform values are
 #: deliberately excluded — pinning OS to a stale value breaks power sampling.
-_OVERRIDABLE = ("OLLAMA_URL", "CPU_TDP_W", "CPU_POWER_SOURCE")
+_OVERRIDABLE = (
+    "OLLAMA_URL",
+    "OLLAMA_CONNECT_TIMEOUT_S",
+    "OLLAMA_READ_TIMEOUT_S",
+    "OLLAMA_RETRIES",
+    "OLLAMA_MAX_IN_FLIGHT",
+    "OLLAMA_MAX_STREAMS",
+    "OLLAMA_STREAM_WAIT_S",
+    "OLLAMA_TOKENIZE",
+    "METER_PROXY",
+    "CPU_TDP_W",
+    "CPU_POWER_SOURCE",
+    "DB_BATCH_FLUSH_S",
+    "SAMPLE_INTERVAL_S",
+    "ACTIVE_SAMPLE_INTERVAL_S",
+    "GPU_PROCESS_ATTRIBUTION",
+    "GPU_BACKEND",
+    "ENERGY_ATTRIBUTION",
+    "SCORE_CACHE_SIZE",
+    "TOKEN_CACHE_SIZE",
+    "RESPONSE_CACHE",
+    "RESPONSE_CACHE_SIZE",
+    "RESPONSE_CACHE_TTL_S",
+)
 
 
 def config_path():
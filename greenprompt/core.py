@@ -5,13 +5,19 @@ Orchestrates the full lifecycle of a single LLM prompt: power baseline
 capture, Ollama HTTP call, post-call power measurement, prompt scoring,
 and database persistence. This module is the primary integration point
 between all other GreenPrompt subsystems.
+
+With RESPONSE_CACHE on, run_prompt() first looks the (model, prompt, options)
+request up in responseCache: a hit is answered without calling Ollama and is
+saved with no measured energy and the original run's energy as avoided.
 """
 
+import json
 import requests
 import time
 import os
-import tiktoken
+from contextlib import ExitStack, contextmanager
 from greenprompt import constants
+from greenprompt.attribution import get_tracker
 from greenprompt.sysUsage import (
     get_system_info,
     measure_power_for_pid,
@@ -19,9 +25,42 @@ from greenprompt.sysUsage import (
     get_gpu_usage,
 )
 from greenprompt.dbconn import save_prompt_usage
-from greenprompt.scoreBasic import score_prompt
+from greenprompt.ollamaClient import OllamaBusyError, get_ollama_client
+from greenprompt.responseCache import get_response_cache
+from greenprompt.scoreCache import score_prompt
+from greenprompt.tokenCount import count_tokens
+
+GENERATE_PATH = "/api/generate"
+OLLAMA_URL = constants.OLLAMA_URL + GENERATE_PATH
+
+
+# Mapping model family to estimated energy usage per 1000 tokens (Wh)
+MODEL_ENERGY_MAP = {
+    "gpt-3.5": 0.02,
+    "gpt-4": 0.06,
+    "gpt-4o": 0.04,
+    "llama2": 0.01,
+    "mistral": 0.008,
+    "phi": 0.005,
+}
+
+#: Wh per 1000 tokens for models matching no MODEL_ENERGY_MAP entry.
+DEFAULT_WH_PER_1K_TOKENS = 0.01
 
-OLLAMA_URL = constants.OLLAMA_URL + "/api/generate"
+
+def energy_per_1k_tokens(model):
+    """
+    Return the MODEL_ENERGY_MAP rate for a model name or Ollama tag.
+
+    The ":tag" suffix is dropped and the longest entry the name starts with
+    wins, so "llama2:13b" uses "llama2", "gpt-4o-mini" uses "gpt-4o" and
+    "phi3:mini" uses "phi".
+    """
+    name = (model or "").lower().split(":", 1)[0]
+    matches = [key for key in MODEL_ENERGY_MAP if name.startswith(key)]
+    if not matches:
+        return DEFAULT_WH_PER_1K_TOKENS
+    return MODEL_ENERGY_MAP[max(matches, key=len)]
 
 
 def estimate_energy_from_tokens(model, token_count):
@@ -29,26 +68,14 @@ def estimate_energy_from_tokens(model, token_count):
     Estimate energy usage (in watt-hours, Wh) based on the model type and token count.
 
     Parameters:
-        model (str): The name of the model used (e.g., 'gpt-3.5', 'llama2').
+        model (str): The name of the model used (e.g., 'gpt-3.5', 'llama2:13b').
         token_count (int): The total number of tokens used for the prompt + response.
 
     Returns:
-        float: Estimated energy consumption in Wh.
-    """
-    # Mapping model to estimated energy usage per 1000 tokens (Wh)
-    MODEL_ENERGY_MAP = {
-        "gpt-3.5": 0.02,
-        "gpt-4": 0.06,
-        "gpt-4o": 0.04,
-        "llama2": 0.01,
-        "mistral": 0.008,
-        "phi": 0.005,
-    }
-
-    model_key = model.lower()
-    multiplier = MODEL_ENERGY_MAP.get(model_key, 0.01)  # Default fallback if unknown
-    energy = (token_count / 1000) * multiplier
-    return energy
+        float: Estimated energy consumption in Wh. energyModel refines this
+        with coefficients fitted from measured runs.
+    """
+    return (token_count / 1000) * energy_per_1k_tokens(model)
 
 
 def estimate_tokens_from_prompt(prompt, model="gpt-3.5"):
@@ -60,32 +87,200 @@ def estimate_tokens_from_prompt(prompt, model="gpt-3.5"):
         model (str): The model name for token encoding logic (default = 'gpt-3.5').
 
     Returns:
-        int: Estimated number of tokens.
+        int: Estimated number of tokens (see tokenCount.TokenCounter for how
+        each model is counted; tokenCount.count_tokens_batch() counts many).
+    """
+    return count_tokens(prompt, model)
+
+
+#: Optional measure_power_linux() keys copied into the result as "<key> (W)".
+_GPU_BREAKDOWN_KEYS = ("gpu_power_by_index", "ollama_gpu_power_by_index")
+
+
+def _unpack_power_usage(power_usage):
+    """
+    Pull the six persisted power figures out of a measure_power_for_pid() dict,
+    plus any per-GPU breakdown (_GPU_BREAKDOWN_KEYS), which is returned to
+    the caller but not stored.
+
+    Returns a dict of zeros (and prints a warning) when the measurement is
+    missing or incomplete, so callers never have to special-case it.
+    """
+    if power_usage and isinstance(power_usage, dict) and "energy_wh" in power_usage:
+        power = {
+            "total_energy": power_usage.get("energy_wh", 0),
+            "combined_power_w": power_usage.get("combined_power_w", 0),
+            "cpu_power": power_usage.get("cpu_power_w", 0),
+            "gpu_power": power_usage.get("gpu_power_w", 0),
+            "baseline_energy": power_usage.get("baseline_energy_wh", 0),
+            "baseline_power": power_usage.get("baseline_power_w", 0),
+        }
+        # Per-GPU breakdowns (multi-GPU Linux) ride along unpersisted.
+        for key in _GPU_BREAKDOWN_KEYS:
+            if key in power_usage:
+                power[key] = power_usage[key]
+        return power
+    print("Warning: Power usage data is incomplete or missing.")
+    return _no_power()
+
+
+def _no_power():
+    """The _unpack_power_usage() dict for a prompt nothing was measured for."""
+    return {
+        "total_energy": 0,
+        "combined_power_w": 0,
+        "cpu_power": 0,
+        "gpu_power": 0,
+        "baseline_energy": 0,
+        "baseline_power": 0,
+    }
+
+
+def _detect_gpu_usage():
+    """Return the get_gpu_usage() string, or "No GPU detected"."""
+    if has_gpu():
+        print("GPU detected.")
+        gpu_usage = get_gpu_usage()
+        print("GPU Usage: " + str(gpu_usage))
+        return gpu_usage
+    print("No GPU detected.")
+    return "No GPU detected"
+
+
+def _build_result(prompt, model, data, response_text, duration, power, gpu_usage):
+    """
+    Assemble the run_prompt() result dict from an Ollama reply and power figures.
+
+    Args:
+        prompt: The user's input text.
+        model: Ollama model name.
+        data: The final Ollama JSON object (carries prompt_eval_count/eval_count).
+        response_text: The full completion text.
+        duration: Wall-clock seconds for the Ollama call.
+        power: Output of _unpack_power_usage().
+        gpu_usage: Output of _detect_gpu_usage().
+    """
+    prompt_tokens = data.get("prompt_eval_count", 0)
+    completion_tokens = data.get("eval_count", 0)
+    total_tokens = prompt_tokens + completion_tokens
+    score = score_prompt(prompt)
+    return {
+        "prompt": prompt,
+        "prompt_score": score.get("score_percent", 0),
+        "prompt_score_details": score.get("details", {}),
+        "response": response_text,
+        "model": model,
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": total_tokens,
+        "total_energy (Wh)": power["total_energy"],
+        "duration_sec": duration,
+        # Ollama reports nanoseconds; 0 when the model was already loaded.
+        "load_duration_sec": (data.get("load_duration") or 0) / 1e9,
+        "combined_power_w (W)": power["combined_power_w"],
+        "cpu_power_w (W)": power["cpu_power"],
+        "gpu_power_w (W)": power["gpu_power"],
+        "energy_estimate_tokens": estimate_energy_from_tokens(model, total_tokens),
+        "energy_estimate_prompt": estimate_energy_from_tokens(model, prompt_tokens),
+        "baseline_energy (Wh)": power["baseline_energy"],
+        "baseline_power (W)": power["baseline_power"],
+        "gpu_usage": gpu_usage,
+        "system_info": get_system_info(),
+        **{f"{key} (W)": power[key] for key in _GPU_BREAKDOWN_KEYS if key in power},
+    }
+
+
+def _connection_error(exc):
+    """Return the RuntimeError message for a failed or timed-out Ollama request."""
+    if isinstance(exc, OllamaBusyError):
+        return f"❌ Ollama is busy: {exc}"
+    if isinstance(exc, requests.exceptions.Timeout):
+        return f"❌ Ollama did not respond in time at {constants.OLLAMA_URL}: {exc}"
+    return f"❌ Could not connect to Ollama at {constants.OLLAMA_URL}"
+
+
+@contextmanager
+def _monitor_activity(monitor):
     """
+    Hold the monitor at its fast sampling rate while a prompt is in flight.
+
+    Calls monitor.begin_activity() on entry and end_activity() on exit, when
+    the monitor has them (adaptive samplers); otherwise does nothing.
+    """
+    begin = getattr(monitor, "begin_activity", None) if monitor else None
+    if begin is None:
+        yield
+        return
+    begin()
     try:
-        # Try to use the model-specific encoding
-        enc = tiktoken.encoding_for_model(model)
-    except KeyError:
-        # Fallback to general-purpose encoding
-        enc = tiktoken.get_encoding("cl100k_base")
+        yield
+    finally:
+        monitor.end_activity()
 
-    tokens = enc.encode(prompt)
-    return len(tokens)
 
+@contextmanager
+def _prompt_window(monitor):
+    """
+    Bracket one Ollama call: fast sampling plus an attribution window.
 
-def run_prompt(prompt, model="llama2", monitor=False):
+    Yields the attribution.Span; set span.tokens before the block ends when
+    the completion token count is known. On exit the span is finished and
+    span.start, span.end and span.share are final.
+    """
+    with _monitor_activity(monitor):
+        tracker = get_tracker()
+        span = tracker.begin()
+        try:
+            yield span
+        finally:
+            tracker.finish(span, monitor)
+
+
+#: run_prompt() result fields measured over the prompt's whole window; scaled
+#: by its attribution share. Baseline fields describe the idle machine and
+#: are left alone.
+_SHARED_FIELDS = (
+    "total_energy (Wh)",
+    "combined_power_w (W)",
+    "cpu_power_w (W)",
+    "gpu_power_w (W)",
+)
+
+
+def _apply_share(result, share):
+    """Scale a result's window power/energy figures by the prompt's share."""
+    if share >= 1.0:
+        return result
+    for key in _SHARED_FIELDS:
+        if result.get(key) is not None:
+            result[key] = result[key] * share
+    for key in _GPU_BREAKDOWN_KEYS:
+        field = f"{key} (W)"
+        if isinstance(result.get(field), dict):
+            result[field] = {gpu: w * share for gpu, w in result[field].items()}
+    result["energy_share"] = share
+    return result
+
+
+def run_prompt(prompt, model="llama2", monitor=False, options=None, use_cache=True):
     """
     Execute a prompt through Ollama and measure its energy consumption.
 
     Sends the prompt to the local Ollama server, samples CPU/GPU power via
     the provided PowerMonitor (macOS) or falls back to zero values, scores
-    the prompt with scoreBasic, and saves everything to SQLite.
+    the prompt with scoreBasic (through scoreCache), and saves everything to
+    SQLite. With RESPONSE_CACHE on, a repeated request is answered from
+    responseCache instead (see serve_cached()).
 
     Args:
         prompt: The user's input text.
         model: Ollama model name (default "llama2"). Must be installed locally.
         monitor: A PowerMonitor instance (samplerMac.PowerMonitor) with an
             active sample buffer, or False/None to skip hardware measurement.
+        options: Ollama model options (temperature, seed, num_predict, ...),
+            sent as the request's "options"; part of the cache key.
+        use_cache: False runs the prompt even when a cached reply exists
+            (the new reply still replaces it).
 
     Returns:
         dict with keys: prompt, prompt_score, prompt_score_details, response,
@@ -93,92 +288,419 @@ def run_prompt(prompt, model="llama2", monitor=False):
         "total_energy (Wh)", duration_sec, "combined_power_w (W)",
         "cpu_power_w (W)", "gpu_power_w (W)", energy_estimate_tokens,
         energy_estimate_prompt, "baseline_energy (Wh)", "baseline_power (W)",
-        gpu_usage, system_info.
+        gpu_usage, system_info; plus cache_hit (and, for hits,
+        "energy_avoided (Wh)" and duration_avoided_sec) when the cache is on.
 
     Raises:
         RuntimeError: If Ollama is unreachable or returns a non-200 response.
     """
-    # Measure power usage before running the prompt
-    current_pid = os.getpid()
-    print(f"Current PID: {current_pid}")
+    print(f"Current PID: {os.getpid()}")
 
     # Check for GPU and its usage
-    gpu_usage = "No GPU detected"
-    if has_gpu():
-        print("GPU detected.")
-        gpu_usage = get_gpu_usage()
-        print("GPU Usage: " + str(gpu_usage))
-    else:
-        print("No GPU detected.")
+    gpu_usage = _detect_gpu_usage()
+
+    cache = get_response_cache()
+    if use_cache:
+        result = serve_cached(cache, prompt, model, options, gpu_usage)
+        if result is not None:
+            return result
 
     # Run the prompt
+    data, span = generate(prompt, model, monitor, options)
+    result = record_completion(
+        prompt,
+        model,
+        data,
+        data.get("response", ""),
+        span.start,
+        span.end,
+        monitor,
+        gpu_usage,
+        share=span.share,
+    )
+    cache_completion(cache, prompt, model, options, data, result)
+    return result
+
+
+def serve_cached(cache, prompt, model, options, gpu_usage=None, save=True):
+    """
+    Answer a prompt from a responseCache.ResponseCache, or return None on a miss.
+
+    The result has the run_prompt() shape: the cached reply's text and token
+    counts, no measured power or energy (nothing ran, so neither the model
+    load time), duration_sec of the lookup itself, cache_hit True, and the
+    original run's "energy_avoided (Wh)" and duration_avoided_sec. It is
+    saved like any other prompt unless `save` is False.
+    """
     start_time = time.time()
-    end_time = None
-    try:
-        response = requests.post(
-            OLLAMA_URL, json={"model": model, "prompt": prompt, "stream": False}
-        )
-        end_time = time.time()
-        # Measure power usage after running the prompt
-        duration = end_time - start_time
-    except requests.exceptions.ConnectionError:
-        raise RuntimeError("❌ Could not connect to Ollama at http://127.0.0.1:11434")
+    entry = cache.get(model, prompt, options)
+    if entry is None:
+        return None
+    if gpu_usage is None:
+        gpu_usage = _detect_gpu_usage()
+    reply = {**entry["reply"], "load_duration": 0}
+    result = _build_result(
+        prompt,
+        model,
+        reply,
+        reply.get("response", ""),
+        time.time() - start_time,
+        _no_power(),
+        gpu_usage,
+    )
+    result["cache_hit"] = True
+    result["energy_avoided (Wh)"] = entry["energy_wh"]
+    result["duration_avoided_sec"] = entry["duration_sec"]
+    if save:
+        try:
+            save_prompt_usage(result)
+        except Exception as e:
+            print(f"Warning: Failed to save prompt usage: {e}")
+    return result
+
+
+def cache_completion(cache, prompt, model, options, data, result):
+    """
+    Store a completed run's Ollama reply in the response cache.
+
+    The energy stored is what the run measured, or its token-based estimate
+    when there was no hardware measurement; a later hit reports it as
+    avoided. Marks the result with cache_hit False when the cache is on.
+    """
+    if not cache.enabled:
+        return
+    energy_wh = result.get("total_energy (Wh)") or result.get("energy_estimate_tokens")
+    cache.put(model, prompt, options, data, energy_wh, result.get("duration_sec"))
+    result["cache_hit"] = False
+
+
+def generate(prompt, model, monitor=False, options=None):
+    """
+    Send one non-streaming /api/generate request; no measurement or saving.
+
+    options, when given, is sent as the request's Ollama "options".
+
+    Returns:
+        (data, span): Ollama's JSON reply and the finished attribution.Span
+        of the call (start, end and share).
+
+    Raises:
+        RuntimeError: If Ollama is unreachable or returns a non-200 response.
+    """
+    payload = {"model": model, "prompt": prompt, "stream": False}
+    if options:
+        payload["options"] = options
+    with _prompt_window(monitor) as span:
+        try:
+            response = get_ollama_client().post(GENERATE_PATH, json=payload)
+        except requests.exceptions.RequestException as e:
+            raise RuntimeError(_connection_error(e))
+        if response.status_code == 200:
+            data = response.json()
+            span.tokens = data.get("eval_count")
 
     if response.status_code != 200:
         raise RuntimeError(f"❌ Ollama error: {response.status_code} – {response.text}")
+    return data, span
+
+
+def record_completion(
+    prompt,
+    model,
+    data,
+    response_text,
+    start_time,
+    end_time,
+    monitor=False,
+    gpu_usage=None,
+    save=True,
+    share=1.0,
+):
+    """
+    Measure, score and save a completion that has already run.
 
+    The accounting half of run_prompt(), shared with callers that talk to
+    Ollama themselves (the /ollama/api proxy): power is read from the
+    monitor over [start_time, end_time] and the record is saved to SQLite.
+
+    Args:
+        prompt: The user's input text.
+        model: Ollama model name.
+        data: The final Ollama JSON object (carries prompt_eval_count/eval_count).
+        response_text: The full completion text.
+        start_time, end_time: Epoch seconds bracketing the Ollama call.
+        monitor: A PowerMonitor / LinuxPowerMonitor instance, or False/None.
+        gpu_usage: A _detect_gpu_usage() string; detected now when None.
+        save: Write the record with save_prompt_usage(). Batch callers pass
+            False and save many records at once.
+        share: The prompt's attribution share of the energy measured over
+            its window (attribution.py); power and energy are scaled by it.
+
+    Returns:
+        The same dict run_prompt() returns.
+    """
+    if gpu_usage is None:
+        gpu_usage = _detect_gpu_usage()
     # Measure power usage after running the prompt
+    power_usage = measure_power_for_pid(os.getpid(), start_time, end_time, monitor)
+    result = _build_result(
+        prompt,
+        model,
+        data,
+        response_text,
+        end_time - start_time,
+        _unpack_power_usage(power_usage),
+        gpu_usage,
+    )
+    _apply_share(result, share)
+
+    if save:
+        try:
+            save_prompt_usage(result)
+        except Exception as e:
+            print(f"Warning: Failed to save prompt usage: {e}")
+
+    return result
+
+
+def _running_energy_wh(monitor, start_time, now):
+    """
+    Energy (Wh) drawn since start_time according to the monitor's sample buffer.
+
+    Uses monitor.get_range_average() so it is cheap enough to call per token.
+    Returns 0.0 when there is no monitor or no sample has landed yet.
+    """
+    if not monitor or not hasattr(monitor, "get_range_average"):
+        return 0.0
+    avg_w = monitor.get_range_average(start_time, now)
+    if avg_w is None:
+        return 0.0
+    return (avg_w * (now - start_time)) / 3600.0
+
+
+def run_prompt_stream(prompt, model="llama2", monitor=False):
+    """
+    Execute a prompt through Ollama in streaming mode, yielding tokens as they arrive.
+
+    Generator counterpart of run_prompt(). Posts with "stream": True and yields
+    one event per Ollama chunk, each carrying the time-to-first-token and a
+    running energy figure read from the monitor's sample buffer. Once Ollama
+    reports done, power is measured separately for the prefill window
+    [start, first token] and the decode window [first token, end], the record
+    is saved to SQLite, and a final "done" event carries the full result.
+
+    Args:
+        prompt: The user's input text.
+        model: Ollama model name (default "llama2"). Must be installed locally.
+        monitor: A PowerMonitor / LinuxPowerMonitor instance, or False/None.
+
+    Yields:
+        {"event": "token", "token", "index", "elapsed_sec",
+         "time_to_first_token_sec", "running_energy (Wh)"} per chunk, then
+        {"event": "done", **run_prompt() result, "time_to_first_token_sec",
+         "prefill_energy (Wh)", "decode_energy (Wh)"}.
+
+    Raises:
+        RuntimeError: If Ollama is unreachable, returns a non-200 response, or
+            reports an error mid-stream. Connection errors are raised on the
+            first next() call, before any event is yielded.
+    """
+    current_pid = os.getpid()
+    gpu_usage = _detect_gpu_usage()
+
+    with _prompt_window(monitor) as span, ExitStack() as stack:
+        start_time = span.start
+        try:
+            response = stack.enter_context(
+                get_ollama_client().stream(
+                    "POST",
+                    GENERATE_PATH,
+                    json={"model": model, "prompt": prompt, "stream": True},
+                )
+            )
+        except requests.exceptions.RequestException as e:
+            raise RuntimeError(_connection_error(e))
+
+        if response.status_code != 200:
+            raise RuntimeError(
+                f"❌ Ollama error: {response.status_code} – {response.text}"
+            )
+
+        first_token_time = None
+        pieces = []
+        data = {}
+        try:
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if "error" in chunk:
+                    raise RuntimeError(f"❌ Ollama error: {chunk['error']}")
+                now = time.time()
+                token = chunk.get("response", "")
+                if token:
+                    if first_token_time is None:
+                        first_token_time = now
+                    pieces.append(token)
+                    yield {
+                        "event": "token",
+                        "token": token,
+                        "index": len(pieces) - 1,
+                        "elapsed_sec": now - start_time,
+                        "time_to_first_token_sec": first_token_time - start_time,
+                        "running_energy (Wh)": _running_energy_wh(
+                            monitor, start_time, now
+                        ),
+                    }
+                if chunk.get("done"):
+                    data = chunk
+                    span.tokens = data.get("eval_count")
+                    break
+        except requests.exceptions.RequestException as e:
+            raise RuntimeError(_connection_error(e))
+
+    end_time = span.end
+    duration = end_time - start_time
+    if first_token_time is None:
+        first_token_time = end_time
+
     power_usage = measure_power_for_pid(current_pid, start_time, end_time, monitor)
+    prefill = _unpack_power_usage(
+        measure_power_for_pid(current_pid, start_time, first_token_time, monitor)
+    )
+    decode = _unpack_power_usage(
+        measure_power_for_pid(current_pid, first_token_time, end_time, monitor)
+    )
 
-    data = response.json()
-    prompt_tokens = data.get("prompt_eval_count", 0)
-    completion_tokens = data.get("eval_count", 0)
-    total_tokens = prompt_tokens + completion_tokens
-    # Check if power usage data is complete
-    if power_usage and isinstance(power_usage, dict) and "energy_wh" in power_usage:
-        total_energy = power_usage.get("energy_wh", 0)
-        combined_power_w = power_usage.get("combined_power_w", 0)
-        cpu_power = power_usage.get("cpu_power_w", 0)
-        gpu_power = power_usage.get("gpu_power_w", 0)
-        baseline_energy = power_usage.get("baseline_energy_wh", 0)
-        baseline_power = power_usage.get("baseline_power_w", 0)
-    else:
-        total_energy = 0
-        combined_power_w = 0
-        cpu_power = 0
-        gpu_power = 0
-        baseline_energy = 0
-        baseline_power = 0
-        print("Warning: Power usage data is incomplete or missing.")
-
-    energy_estimate_tokens = estimate_energy_from_tokens(model, total_tokens)
-    energy_estimate_prompt = estimate_energy_from_tokens(model, prompt_tokens)
-
-    response = {
-        "prompt": prompt,
-        "prompt_score": score_prompt(prompt).get("score_percent", 0),
-        "prompt_score_details": score_prompt(prompt).get("details", {}),
-        "response": data.get("response", ""),
-        "model": model,
-        "prompt_tokens": prompt_tokens,
-        "completion_tokens": completion_tokens,
-        "total_tokens": total_tokens,
-        "total_energy (Wh)": total_energy,
-        "duration_sec": duration,
-        "combined_power_w (W)": combined_power_w,
-        "cpu_power_w (W)": cpu_power,
-        "gpu_power_w (W)": gpu_power,
-        "energy_estimate_tokens": energy_estimate_tokens,
-        "energy_estimate_prompt": energy_estimate_prompt,
-        "baseline_energy (Wh)": baseline_energy,
-        "baseline_power (W)": baseline_power,
-        "gpu_usage": gpu_usage if has_gpu() else "No GPU detected",
-        "system_info": get_system_info(),
-    }
+    result = _build_result(
+        prompt,
+        model,
+        data,
+        "".join(pieces),
+        duration,
+        _unpack_power_usage(power_usage),
+        gpu_usage,
+    )
+    _apply_share(result, span.share)
+    result["time_to_first_token_sec"] = first_token_time - start_time
+    # The phases get the whole window's share; overlap is not tracked per phase.
+    result["prefill_energy (Wh)"] = prefill["total_energy"] * span.share
+    result["decode_energy (Wh)"] = decode["total_energy"] * span.share
 
     try:
-        save_prompt_usage(response)
+        save_prompt_usage(result)
     except Exception as e:
         print(f"Warning: Failed to save prompt usage: {e}")
 
-    return response
+    yield {"event": "done", **result}
+
+
+class CompletionMeter:
+    """
+    Energy and token accounting for an Ollama call GreenPrompt relays but does
+    not issue itself — the /ollama/api proxy.
+
+    Use as a context manager around the upstream call and feed() it every
+    response chunk as it is passed on. Ollama streams NDJSON (one object per
+    line; a non-streaming reply is a single object), so chunks are split into
+    lines and the completion text and final "done" object are collected
+    without holding up the relay. On exit the window [enter, exit] is
+    measured, scored and saved via record_completion(), provided Ollama sent
+    its "done" object; failed or abandoned calls are not recorded.
+    """
+
+    #: Ollama endpoints whose replies carry a completion and token counts.
+    METERED_PATHS = ("generate", "chat")
+
+    def __init__(self, path, payload, monitor=False):
+        """
+        Args:
+            path: "generate" or "chat" (the part after /api/).
+            payload: The decoded JSON request body.
+            monitor: A PowerMonitor / LinuxPowerMonitor instance, or False/None.
+        """
+        self.path = path
+        self.monitor = monitor
+        self.model = payload.get("model", "")
+        if path == "chat":
+            user = [
+                m.get("content", "")
+                for m in payload.get("messages") or []
+                if isinstance(m, dict) and m.get("role") == "user"
+            ]
+            self.prompt = user[-1] if user else ""
+        else:
+            self.prompt = payload.get("prompt", "")
+        self.result = None
+        self._buffer = b""
+        self._pieces = []
+        self._done = None
+        self._window = None
+        self._span = None
+
+    @classmethod
+    def for_request(cls, path, method, body, monitor=False):
+        """Return a meter for a proxied request, or None if it is not a completion."""
+        if method != "POST" or path.strip("/") not in cls.METERED_PATHS:
+            return None
+        try:
+            payload = json.loads(body or b"{}")
+        except ValueError:
+            return None
+        if not isinstance(payload, dict):
+            return None
+        return cls(path.strip("/"), payload, monitor)
+
+    def __enter__(self):
+        self._window = _prompt_window(self.monitor)
+        self._span = self._window.__enter__()
+        return self
+
+    def feed(self, chunk):
+        """Consume one response chunk (bytes) as it is relayed."""
+        self._buffer += chunk
+        *lines, self._buffer = self._buffer.split(b"\n")
+        for line in lines:
+            self._parse(line)
+
+    def _parse(self, line):
+        if not line.strip():
+            return
+        try:
+            obj = json.loads(line)
+        except ValueError:
+            return
+        if not isinstance(obj, dict):
+            return
+        if self.path == "chat":
+            piece = (obj.get("message") or {}).get("content", "")
+        else:
+            piece = obj.get("response", "")
+        if piece:
+            self._pieces.append(piece)
+        if obj.get("done"):
+            self._done = obj
+
+    def __exit__(self, *exc):
+        self._parse(self._buffer)
+        self._buffer = b""
+        if self._done is not None:
+            self._span.tokens = self._done.get("eval_count")
+        self._window.__exit__(*exc)
+        if self._done is None:
+            return False
+        span = self._span
+        try:
+            self.result = record_completion(
+                self.prompt,
+                self.model or self._done.get("model", ""),
+                self._done,
+                "".join(self._pieces),
+                span.start,
+                span.end,
+                self.monitor,
+                share=span.share,
+            )
+        except Exception as e:
+            print(f"Warning: Failed to record proxied completion: {e}")
+        return False
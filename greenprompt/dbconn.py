@@ -1,22 +1,58 @@
 """
 dbconn.py — SQLite persistence layer for GreenPrompt.
 
-Manages the prompt_usage table: schema creation, inserting prompt run records,
-and querying with optional filters. The database file is created in the
-current working directory at the time of the first init_db() or save call.
+Manages the prompt_usage, hosts, usage_rollup, score_cache and
+response_cache tables: schema creation, inserting prompt run records, and
+querying with optional filters.
+The database file is created in the current working directory at the time of
+the first init_db() or save call.
+
+Each machine's static hardware profile (sysUsage.get_host_profile()) is stored
+once in the hosts table; prompt_usage rows reference it through host_id rather
+than repeating a system_info JSON blob per row. Rows written before host_id
+existed keep their inline system_info, and get_prompt_usage() returns
+whichever of the two is present, so callers see the same shape either way.
 
 DB_PATH: os.path.join(os.getcwd(), "greenprompt_usage.db")
 
+The usage_rollup table holds per-minute/hour/day and all-time totals per
+model. It is updated in the same transaction as each prompt_usage insert (and
+backfilled once from existing rows), so the dashboard reads a few hundred
+aggregate rows through get_usage_rollup() instead of the full history.
+
+The score_cache table persists scoreCache's memoized prompt scores (keyed by
+a hash of the prompt and scorer version) so they survive restarts. The
+response_cache table is responseCache's stored tier: Ollama replies keyed by
+a hash of (model, prompt, options), with the energy and time the original
+run took. Prompts served from it are saved to prompt_usage with cache_hit = 1,
+no measured energy and that figure in energy_avoided_wh.
+
+get_energy_samples() reads measured rows (tokens, model load time, energy,
+duration) in id order for energyModel, which fits its coefficients from them
+incrementally.
+
+Connections are pooled per DB_PATH and opened in WAL mode, and the schema is
+created once per path per process rather than on every read and write. For
+write-heavy servers, enable_batch_writes() starts a background BatchWriter
+that groups save_prompt_usage() inserts into one transaction per flush
+interval (rows become visible to readers after the next flush).
+
 All timestamps are stored as UTC ISO 8601 strings. JSON blobs (system_info,
 prompt_score_details) are serialized with json.dumps and must be parsed by
 callers with json.loads.
 """
 
+import atexit
+import base64
+import queue
 import sqlite3
 import os
 import json
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime
-from greenprompt.sysUsage import get_system_info
+from greenprompt.sysUsage import get_host_profile, host_fingerprint
 
 # Path to the SQLite database file
 DB_PATH = os.path.join(os.getcwd(), "greenprompt_usage.db")
@@ -45,28 +81,167 @@ PROMPT_USAGE_COLUMNS = (
     "gpu_power_w",
     "combined_power_w",
     "system_info",
+    "host_id",
+    "load_duration_sec",
+    "cache_hit",
+    "energy_avoided_wh",
+)
+
+#: Rollup granularities and the ISO 8601 timestamp prefix length that names
+#: each bucket ("2025-01-31T14:05" for minute, ... "" for "all").
+ROLLUP_GRANULARITIES = {"minute": 16, "hour": 13, "day": 10, "all": 0}
+
+#: prompt_usage columns summed into usage_rollup. Power columns are summed too
+#: so averages are sum / prompt_count, matching a per-row mean.
+ROLLUP_SUM_COLUMNS = (
+    "prompt_tokens",
+    "completion_tokens",
+    "total_tokens",
+    "energy_estimate_prompt",
+    "energy_estimate_tokens",
+    "duration_sec",
+    "energy_wh",
+    "baseline_energy_wh",
+    "cpu_power_w",
+    "gpu_power_w",
+)
+
+#: Column order of usage_rollup rows returned by get_usage_rollup().
+ROLLUP_COLUMNS = ("granularity", "bucket_start", "model", "prompt_count") + (
+    ROLLUP_SUM_COLUMNS
 )
 
+#: Bumped by rebuild_usage_rollup(), which changes aggregates without adding
+#: rows; part of the get_data_version() token.
+_rollup_generation = 0
+
+#: host_id already resolved for a (DB_PATH, fingerprint) pair in this process,
+#: so save_prompt_usage() does not re-upsert the hosts row on every insert.
+_host_ids = {}
+
+
+#: Idle connections kept per database path by ConnectionPool.
+POOL_SIZE = 8
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+#: DB paths whose schema init_db() has already created in this process.
+_initialized = set()
+_init_lock = threading.Lock()
+
+#: Active BatchWriter, or None when save_prompt_usage() writes synchronously.
+_batch_writer = None
+
+
+def _connect(path):
+    """Open a connection to `path` configured for concurrent use (WAL, Row factory)."""
+    conn = sqlite3.connect(path, timeout=30.0, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    # WAL lets readers proceed during a write and turns each commit into an
+    # append to the log; NORMAL sync is durable across application crashes.
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class ConnectionPool:
+    """
+    A bounded pool of reusable SQLite connections to one database file.
+
+    Connections are lent out exclusively — a borrowed connection is never
+    shared between threads — so check_same_thread can safely be disabled.
+    Up to `max_idle` connections are kept open between uses; extras opened
+    under a burst of concurrent requests are closed when returned.
+    """
+
+    def __init__(self, path, max_idle=POOL_SIZE):
+        self.path = path
+        self._idle = queue.LifoQueue(maxsize=max_idle)
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection; rolls back uncommitted work before returning it."""
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = _connect(self.path)
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            try:
+                self._idle.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+
+    def close(self):
+        """Close every idle connection."""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+def _pool(path=None):
+    """Return the ConnectionPool for `path` (default DB_PATH), creating it on first use."""
+    path = path or DB_PATH
+    with _pools_lock:
+        pool = _pools.get(path)
+        if pool is None:
+            pool = _pools[path] = ConnectionPool(path)
+        return pool
+
+
+def close_connections():
+    """
+    Close all pooled connections and forget which schemas were initialized
+    and which host ids were resolved, so a database recreated at the same
+    path starts clean.
+    """
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
+    with _init_lock:
+        _initialized.clear()
+        _host_ids.clear()
+
 
 def get_connection():
     """
-    Returns a new SQLite connection.
+    Returns a new SQLite connection (WAL mode, Row factory) owned by the caller.
+
+    Internal reads and writes borrow from the connection pool instead; this is
+    for ad-hoc callers that want a connection they close themselves.
     """
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+    return _connect(DB_PATH)
+
+
+def _ensure_schema():
+    """Run init_db() once per DB_PATH for the life of the process."""
+    if DB_PATH not in _initialized:
+        init_db()
 
 
 def init_db():
     """
-    Initializes the database and creates the prompt_usage table.
+    Initializes the database and creates the prompt_usage and hosts tables.
 
-    Idempotent — uses CREATE TABLE IF NOT EXISTS, so it is safe to call on
-    every read/write path. save_prompt_usage() and get_prompt_usage() both
-    call it so that a fresh working directory never raises
-    "no such table: prompt_usage".
+    Idempotent — uses CREATE TABLE IF NOT EXISTS, so it is always safe to
+    call. save_prompt_usage() and get_prompt_usage() reach it through
+    _ensure_schema(), which runs it once per DB_PATH per process, so a fresh
+    working directory never raises "no such table: prompt_usage".
     """
-    conn = get_connection()
+    with _init_lock, _pool().connection() as conn:
+        _create_schema(conn)
+        _initialized.add(DB_PATH)
+
+
+def _create_schema(conn):
     cursor = conn.cursor()
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS prompt_usage (
@@ -89,11 +264,124 @@ def init_db():
             cpu_power_w REAL,
             gpu_power_w REAL,
             combined_power_w REAL,
-            system_info TEXT
+            system_info TEXT,
+            host_id INTEGER REFERENCES hosts(id),
+            load_duration_sec REAL,
+            cache_hit INTEGER,
+            energy_avoided_wh REAL
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS hosts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            fingerprint TEXT NOT NULL UNIQUE,
+            hostname TEXT,
+            first_seen TEXT NOT NULL,
+            profile TEXT NOT NULL
         )
     """)
+    # Databases created before the hosts table lack prompt_usage.host_id.
+    existing = {
+        row["name"] for row in cursor.execute("PRAGMA table_info(prompt_usage)")
+    }
+    if "host_id" not in existing:
+        cursor.execute(
+            "ALTER TABLE prompt_usage ADD COLUMN host_id INTEGER REFERENCES hosts(id)"
+        )
+    # ...and before Ollama's model load time was recorded.
+    if "load_duration_sec" not in existing:
+        cursor.execute("ALTER TABLE prompt_usage ADD COLUMN load_duration_sec REAL")
+    # ...and before responses were cached.
+    if "cache_hit" not in existing:
+        cursor.execute("ALTER TABLE prompt_usage ADD COLUMN cache_hit INTEGER")
+        cursor.execute("ALTER TABLE prompt_usage ADD COLUMN energy_avoided_wh REAL")
+    # Every index implicitly ends with the rowid (id), so these also serve the
+    # (timestamp, id) keyset order used by get_prompt_usage_page().
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_prompt_usage_timestamp "
+        "ON prompt_usage (timestamp)"
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_prompt_usage_model_timestamp "
+        "ON prompt_usage (model, timestamp)"
+    )
+    token_counts = ("prompt_tokens", "completion_tokens", "total_tokens")
+    sums = ",\n            ".join(
+        f"{c} {'INTEGER' if c in token_counts else 'REAL'} NOT NULL DEFAULT 0"
+        for c in ROLLUP_SUM_COLUMNS
+    )
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS usage_rollup (
+            granularity TEXT NOT NULL,
+            bucket_start TEXT NOT NULL,
+            model TEXT NOT NULL,
+            prompt_count INTEGER NOT NULL DEFAULT 0,
+            {sums},
+            PRIMARY KEY (granularity, bucket_start, model)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS score_cache (
+            key TEXT PRIMARY KEY,
+            scorer_version TEXT NOT NULL,
+            result TEXT NOT NULL,
+            cost_s REAL NOT NULL,
+            created TEXT NOT NULL
+        ) WITHOUT ROWID
+    """)
+    # created is epoch seconds, compared against the cache's TTL.
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS response_cache (
+            key TEXT PRIMARY KEY,
+            model TEXT,
+            reply TEXT NOT NULL,
+            energy_wh REAL NOT NULL,
+            duration_sec REAL NOT NULL,
+            created REAL NOT NULL
+        ) WITHOUT ROWID
+    """)
+    conn.commit()
+    # Databases created before usage_rollup existed get it filled once here;
+    # from then on _insert_usage() keeps it current. The emptiness check and
+    # the backfill share one write transaction, so a concurrent first save
+    # (from this or another process) is neither missed nor counted twice.
+    cursor.execute("BEGIN IMMEDIATE")
+    if cursor.execute("SELECT 1 FROM usage_rollup LIMIT 1").fetchone() is None:
+        _backfill_rollup(cursor)
     conn.commit()
-    conn.close()
+
+
+def _backfill_rollup(cursor):
+    """Aggregate every existing prompt_usage row into usage_rollup."""
+    sums = ", ".join(f"COALESCE(SUM({c}), 0)" for c in ROLLUP_SUM_COLUMNS)
+    for granularity, width in ROLLUP_GRANULARITIES.items():
+        cursor.execute(
+            f"""
+            INSERT INTO usage_rollup ({", ".join(ROLLUP_COLUMNS)})
+            SELECT ?, substr(timestamp, 1, ?) AS bucket, COALESCE(model, '') AS m,
+                   COUNT(*), {sums}
+            FROM prompt_usage
+            GROUP BY bucket, m
+            """,
+            (granularity, width),
+        )
+
+
+def rebuild_usage_rollup():
+    """
+    Recompute usage_rollup from prompt_usage.
+
+    Only needed after prompt_usage has been edited outside save_prompt_usage()
+    (e.g. rows deleted by hand); normal writes keep the rollup current.
+    """
+    _ensure_schema()
+    with _pool().connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM usage_rollup")
+        _backfill_rollup(cursor)
+        conn.commit()
+    global _rollup_generation
+    _rollup_generation += 1
 
 
 def _first_not_none(data: dict, *keys):
@@ -105,82 +393,667 @@ def _first_not_none(data: dict, *keys):
     return None
 
 
-def save_prompt_usage(data: dict):
+def get_host_id(conn, path=None) -> int:
     """
-    Saves a prompt usage record to the prompt_usage table.
+    Return the hosts.id for this machine, inserting its profile on first use.
+
+    The profile is the static part of the system info, so it is identified by a
+    content fingerprint; the id is cached per database for the process lifetime.
     """
-    init_db()
-    conn = get_connection()
+    profile = get_host_profile()
+    fingerprint = host_fingerprint(profile)
+    key = (path or DB_PATH, fingerprint)
+    if key in _host_ids:
+        return _host_ids[key]
     cursor = conn.cursor()
-    system_info = json.dumps(get_system_info())
     cursor.execute(
         """
-        INSERT INTO prompt_usage (
-            timestamp, prompt, prompt_score, prompt_score_details, response, model, prompt_tokens,
-            completion_tokens, total_tokens, energy_estimate_prompt, energy_estimate_tokens, duration_sec, energy_wh,
-            baseline_power_w, baseline_energy_wh,
-            cpu_power_w, gpu_power_w, combined_power_w, system_info
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        INSERT OR IGNORE INTO hosts (fingerprint, hostname, first_seen, profile)
+        VALUES (?, ?, ?, ?)
     """,
         (
+            fingerprint,
+            profile.get("Hostname"),
             datetime.utcnow().isoformat(),
-            data.get("prompt"),
-            data.get("prompt_score"),
-            json.dumps(data.get("prompt_score_details", {})),
-            data.get("response"),
-            data.get("model"),
-            data.get("prompt_tokens"),
-            data.get("completion_tokens"),
-            data.get("total_tokens"),
-            data.get("energy_estimate_prompt"),
-            data.get("energy_estimate_tokens"),
-            data.get("duration_sec"),
-            _first_not_none(data, "total_energy (Wh)", "energy_wh"),
-            _first_not_none(data, "baseline_power (W)", "baseline_power_w"),
-            _first_not_none(data, "baseline_energy (Wh)", "baseline_energy_wh"),
-            _first_not_none(data, "cpu_power_w (W)", "cpu_power_w"),
-            _first_not_none(data, "gpu_power_w (W)", "gpu_power_w"),
-            _first_not_none(data, "combined_power_w (W)", "combined_power_w"),
-            system_info,
+            json.dumps(profile),
         ),
     )
+    cursor.execute("SELECT id FROM hosts WHERE fingerprint = ?", (fingerprint,))
+    host_id = cursor.fetchone()["id"]
     conn.commit()
-    conn.close()
+    _host_ids[key] = host_id
+    return host_id
 
 
-def get_prompt_usage(start_time=None, end_time=None, model=None):
+#: Column order of the tuples built by _usage_row().
+_INSERT_USAGE_COLUMNS = (
+    "timestamp",
+    "prompt",
+    "prompt_score",
+    "prompt_score_details",
+    "response",
+    "model",
+    "prompt_tokens",
+    "completion_tokens",
+    "total_tokens",
+    "energy_estimate_prompt",
+    "energy_estimate_tokens",
+    "duration_sec",
+    "energy_wh",
+    "baseline_power_w",
+    "baseline_energy_wh",
+    "cpu_power_w",
+    "gpu_power_w",
+    "combined_power_w",
+    "host_id",
+    "load_duration_sec",
+    "cache_hit",
+    "energy_avoided_wh",
+)
+
+_INSERT_USAGE_SQL = f"""
+    INSERT INTO prompt_usage ({", ".join(_INSERT_USAGE_COLUMNS)})
+    VALUES ({", ".join("?" * len(_INSERT_USAGE_COLUMNS))})
+"""
+
+_UPSERT_ROLLUP_SQL = f"""
+    INSERT INTO usage_rollup ({", ".join(ROLLUP_COLUMNS)})
+    VALUES ({", ".join("?" * len(ROLLUP_COLUMNS))})
+    ON CONFLICT (granularity, bucket_start, model) DO UPDATE SET
+        {", ".join(f"{c} = {c} + excluded.{c}" for c in ROLLUP_COLUMNS[3:])}
+"""
+
+
+def _usage_row(data: dict, timestamp: str, host_id: int) -> tuple:
+    """Map a run_prompt() result dict onto the _INSERT_USAGE_SQL parameters."""
+    return (
+        timestamp,
+        data.get("prompt"),
+        data.get("prompt_score"),
+        json.dumps(data.get("prompt_score_details", {})),
+        data.get("response"),
+        data.get("model"),
+        data.get("prompt_tokens"),
+        data.get("completion_tokens"),
+        data.get("total_tokens"),
+        data.get("energy_estimate_prompt"),
+        data.get("energy_estimate_tokens"),
+        data.get("duration_sec"),
+        _first_not_none(data, "total_energy (Wh)", "energy_wh"),
+        _first_not_none(data, "baseline_power (W)", "baseline_power_w"),
+        _first_not_none(data, "baseline_energy (Wh)", "baseline_energy_wh"),
+        _first_not_none(data, "cpu_power_w (W)", "cpu_power_w"),
+        _first_not_none(data, "gpu_power_w (W)", "gpu_power_w"),
+        _first_not_none(data, "combined_power_w (W)", "combined_power_w"),
+        host_id,
+        data.get("load_duration_sec"),
+        1 if data.get("cache_hit") else 0,
+        data.get("energy_avoided (Wh)"),
+    )
+
+
+def _rollup_rows(rows):
     """
-    Retrieve prompt_usage records with optional filters.
+    Fold _usage_row() tuples into one usage_rollup delta per bucket and model.
+
+    Aggregating in Python first means a batch of N inserts costs one upsert
+    per distinct (granularity, bucket, model) rather than 4 * N.
+    """
+    ts_idx = _INSERT_USAGE_COLUMNS.index("timestamp")
+    model_idx = _INSERT_USAGE_COLUMNS.index("model")
+    sum_idx = [_INSERT_USAGE_COLUMNS.index(c) for c in ROLLUP_SUM_COLUMNS]
+    deltas = {}
+    for row in rows:
+        values = [row[i] or 0 for i in sum_idx]
+        for granularity, width in ROLLUP_GRANULARITIES.items():
+            key = (granularity, row[ts_idx][:width], row[model_idx] or "")
+            delta = deltas.get(key)
+            if delta is None:
+                deltas[key] = [1] + values
+            else:
+                delta[0] += 1
+                for i, v in enumerate(values, 1):
+                    delta[i] += v
+    return [key + tuple(delta) for key, delta in deltas.items()]
+
+
+def _insert_usage(conn, records, path=None):
+    """
+    Insert (timestamp, data) pairs into prompt_usage in a single transaction,
+    updating usage_rollup in the same transaction.
+    """
+    host_id = get_host_id(conn, path)
+    rows = [_usage_row(data, ts, host_id) for ts, data in records]
+    conn.executemany(_INSERT_USAGE_SQL, rows)
+    conn.executemany(_UPSERT_ROLLUP_SQL, _rollup_rows(rows))
+    conn.commit()
+
+
+def usage_timestamp() -> str:
+    """Return the current time as a prompt_usage timestamp (UTC, ISO 8601)."""
+    return datetime.utcnow().isoformat()
+
+
+def save_prompt_usage(data: dict):
+    """
+    Saves a prompt usage record to the prompt_usage table.
+
+    The machine's profile is referenced through host_id; the per-row
+    system_info column is left NULL for new records. When batch writes are
+    enabled the record is queued and committed by the BatchWriter's next
+    flush; the timestamp is still taken at call time.
+    """
+    timestamp = usage_timestamp()
+    writer = _batch_writer
+    if writer is not None and writer.path == DB_PATH:
+        writer.submit(timestamp, data)
+        return
+    _ensure_schema()
+    with _pool().connection() as conn:
+        _insert_usage(conn, [(timestamp, data)])
+
+
+def save_prompt_usage_many(records):
+    """
+    Save several prompt usage records at once.
+
+    Args:
+        records: (timestamp, data) pairs — data a run_prompt() result dict,
+            timestamp from usage_timestamp() taken when that prompt finished,
+            so each row lands where a save_prompt_usage() call would have
+            put it.
+
+    Without a BatchWriter they are inserted in one transaction — one commit
+    for the lot instead of one per record. With batch writes enabled they are
+    queued like save_prompt_usage() calls.
+    """
+    records = list(records)
+    if not records:
+        return
+    writer = _batch_writer
+    if writer is not None and writer.path == DB_PATH:
+        for timestamp, data in records:
+            writer.submit(timestamp, data)
+        return
+    _ensure_schema()
+    with _pool().connection() as conn:
+        _insert_usage(conn, records)
+
+
+def get_cached_score(key):
+    """
+    Return (score_prompt() result, seconds it took) stored under `key`, or None.
+    """
+    _ensure_schema()
+    with _pool().connection() as conn:
+        row = conn.execute(
+            "SELECT result, cost_s FROM score_cache WHERE key = ?", (key,)
+        ).fetchone()
+    return None if row is None else (json.loads(row["result"]), row["cost_s"])
+
+
+def save_cached_score(key, scorer_version, result, cost_s):
+    """Store a score_prompt() result and the seconds it took under `key`."""
+    _ensure_schema()
+    with _pool().connection() as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO score_cache "
+            "(key, scorer_version, result, cost_s, created) VALUES (?, ?, ?, ?, ?)",
+            (
+                key,
+                scorer_version,
+                json.dumps(result),
+                cost_s,
+                datetime.utcnow().isoformat(),
+            ),
+        )
+        conn.commit()
+
+
+def prune_score_cache(scorer_version, max_rows):
+    """
+    Delete cached scores from other scorer versions, then the oldest rows
+    beyond `max_rows`. Returns the number of rows deleted.
+    """
+    _ensure_schema()
+    with _pool().connection() as conn:
+        deleted = conn.execute(
+            "DELETE FROM score_cache WHERE scorer_version != ?", (scorer_version,)
+        ).rowcount
+        deleted += conn.execute(
+            "DELETE FROM score_cache WHERE key IN ("
+            "SELECT key FROM score_cache ORDER BY created DESC LIMIT -1 OFFSET ?)",
+            (max_rows,),
+        ).rowcount
+        conn.commit()
+    return deleted
+
+
+def get_cached_response(key, min_created=None):
+    """
+    Return (reply, energy_wh, duration_sec, created) stored under `key`, or
+    None. Entries created before `min_created` (epoch seconds) are ignored.
+    """
+    _ensure_schema()
+    with _pool().connection() as conn:
+        row = conn.execute(
+            "SELECT reply, energy_wh, duration_sec, created FROM response_cache "
+            "WHERE key = ? AND created >= ?",
+            (key, min_created or 0),
+        ).fetchone()
+    if row is None:
+        return None
+    return (
+        json.loads(row["reply"]),
+        row["energy_wh"],
+        row["duration_sec"],
+        row["created"],
+    )
+
+
+def save_cached_response(key, model, reply, energy_wh, duration_sec, created):
+    """Store an Ollama reply and what the run that produced it cost."""
+    _ensure_schema()
+    with _pool().connection() as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO response_cache "
+            "(key, model, reply, energy_wh, duration_sec, created) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (key, model, json.dumps(reply), energy_wh, duration_sec, created),
+        )
+        conn.commit()
+
+
+def prune_response_cache(min_created, max_rows):
+    """
+    Delete cached responses created before `min_created` (epoch seconds; None
+    keeps them), then the oldest rows beyond `max_rows`. Returns the number of
+    rows deleted.
+    """
+    _ensure_schema()
+    with _pool().connection() as conn:
+        deleted = 0
+        if min_created is not None:
+            deleted += conn.execute(
+                "DELETE FROM response_cache WHERE created < ?", (min_created,)
+            ).rowcount
+        deleted += conn.execute(
+            "DELETE FROM response_cache WHERE key IN ("
+            "SELECT key FROM response_cache ORDER BY created DESC LIMIT -1 OFFSET ?)",
+            (max_rows,),
+        ).rowcount
+        conn.commit()
+    return deleted
+
+
+def get_cache_savings():
+    """
+    All-time totals for prompts served from the response cache: hits, tokens
+    and Wh avoided, from the prompt_usage rows with cache_hit = 1.
+    """
+    _ensure_schema()
+    with _pool().connection() as conn:
+        row = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(total_tokens), 0), "
+            "COALESCE(SUM(energy_avoided_wh), 0) FROM prompt_usage "
+            "WHERE cache_hit = 1"
+        ).fetchone()
+    return {"hits": row[0], "tokens_avoided": row[1], "energy_avoided_wh": row[2]}
+
+
+#: Columns returned by get_energy_samples(), in order.
+ENERGY_SAMPLE_COLUMNS = (
+    "id",
+    "model",
+    "host_id",
+    "prompt_tokens",
+    "completion_tokens",
+    "load_duration_sec",
+    "energy_wh",
+    "duration_sec",
+)
+
+
+def get_energy_samples(after_id=0, limit=None):
+    """
+    Return measured prompt_usage rows with id > after_id, oldest first.
+
+    Only rows with a positive energy_wh (a hardware measurement was taken)
+    are returned, as tuples in ENERGY_SAMPLE_COLUMNS order. Missing token
+    counts and load times read as 0.
+    """
+    _ensure_schema()
+    query = (
+        "SELECT id, model, host_id, COALESCE(prompt_tokens, 0), "
+        "COALESCE(completion_tokens, 0), COALESCE(load_duration_sec, 0), "
+        "energy_wh, COALESCE(duration_sec, 0) FROM prompt_usage "
+        "WHERE id > ? AND energy_wh > 0 ORDER BY id"
+    )
+    params = [after_id]
+    if limit is not None:
+        query += " LIMIT ?"
+        params.append(int(limit))
+    with _pool().connection() as conn:
+        return [tuple(row) for row in conn.execute(query, params)]
+
+
+def get_current_host_id() -> int:
+    """Return this machine's hosts.id in the current database."""
+    _ensure_schema()
+    with _pool().connection() as conn:
+        return get_host_id(conn)
+
+
+class BatchWriter:
+    """
+    Background thread that commits queued prompt_usage inserts in batches.
+
+    save_prompt_usage() enqueues records while a writer is active; the thread
+    waits for the first record, keeps collecting for `flush_interval` seconds
+    (or until `max_batch` records are queued), then writes them all in one
+    transaction — one fsync per flush instead of one per prompt.
+
+    Usage:
+        enable_batch_writes(flush_interval=0.5)
+        # ... save_prompt_usage() calls return immediately ...
+        disable_batch_writes()   # flushes and stops the thread
+    """
+
+    def __init__(self, path, flush_interval=0.5, max_batch=500):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def submit(self, timestamp, data):
+        self._queue.put((timestamp, data))
+
+    def flush(self):
+        """Block until every record submitted so far has been committed."""
+        self._queue.join()
+
+    def stop(self):
+        """Flush outstanding records and stop the thread."""
+        self._stop_event.set()
+        self.thread.join()
+
+    def _take_batch(self):
+        try:
+            batch = [self._queue.get(timeout=0.1)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or self._stop_event.is_set():
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch):
+        try:
+            with _pool(self.path).connection() as conn:
+                if self.path not in _initialized:
+                    with _init_lock:
+                        _create_schema(conn)
+                        _initialized.add(self.path)
+                _insert_usage(conn, batch, self.path)
+        except Exception as e:
+            print(f"Warning: BatchWriter failed to save {len(batch)} records: {e}")
+        finally:
+            for _ in batch:
+                self._queue.task_done()
+
+    def _run(self):
+        while not (self._stop_event.is_set() and self._queue.empty()):
+            batch = self._take_batch()
+            if batch:
+                self._write(batch)
+
+
+def enable_batch_writes(flush_interval=0.5, max_batch=500):
+    """
+    Route save_prompt_usage() for the current DB_PATH through a BatchWriter.
+
+    Idempotent; returns the active writer. The writer is flushed and stopped
+    automatically at interpreter exit.
+    """
+    global _batch_writer
+    if _batch_writer is None:
+        _batch_writer = BatchWriter(DB_PATH, flush_interval, max_batch)
+        _batch_writer.start()
+        atexit.register(disable_batch_writes)
+    return _batch_writer
+
+
+def disable_batch_writes():
+    """Flush and stop the active BatchWriter; later saves write synchronously."""
+    global _batch_writer
+    writer, _batch_writer = _batch_writer, None
+    if writer is not None:
+        writer.stop()
+
+
+#: Columns that hold free text or JSON blobs; dashboards and list views can
+#: leave them out of a `columns=` projection to keep result sets small.
+LARGE_TEXT_COLUMNS = ("prompt", "response", "prompt_score_details", "system_info")
+
+
+def encode_cursor(row) -> str:
+    """Encode a row's (timestamp, id) position as an opaque pagination cursor."""
+    raw = json.dumps([row["timestamp"], row["id"]]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(cursor: str):
+    """
+    Decode a cursor from encode_cursor() into a (timestamp, id) tuple.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    try:
+        timestamp, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return str(timestamp), int(row_id)
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+
+
+def _select_list(columns):
+    """Build the SELECT list for `columns`, resolving system_info through hosts."""
+    return ", ".join(
+        "COALESCE(p.system_info, h.profile) AS system_info"
+        if col == "system_info"
+        else f"p.{col}"
+        for col in columns
+    )
+
+
+def get_prompt_usage_page(
+    start_time=None,
+    end_time=None,
+    model=None,
+    columns=None,
+    limit=None,
+    cursor=None,
+    descending=False,
+):
+    """
+    Retrieve one keyset-paginated page of prompt_usage records.
+
+    Rows are ordered by (timestamp, id), which the timestamp and
+    (model, timestamp) indexes serve directly, so fetching any page costs an
+    index seek plus `limit` rows regardless of how deep into the table it is.
 
     Args:
         start_time: ISO 8601 string; only rows with timestamp >= this value.
         end_time: ISO 8601 string; only rows with timestamp <= this value.
         model: Exact model name string to filter on (case-sensitive).
+        columns: Iterable of PROMPT_USAGE_COLUMNS to return (default: all).
+            id and timestamp are always included when paginating, since the
+            cursor is built from them.
+        limit: Maximum rows to return, or None for no limit.
+        cursor: next_cursor from a previous page, or None to start at the top.
+        descending: If True, newest rows first.
 
     Returns:
-        List of dicts, one per row, ordered by timestamp ASC. Each dict has
-        all prompt_usage columns. system_info and prompt_score_details are
-        JSON strings; callers must parse with json.loads if needed.
+        (rows, next_cursor) — rows as a list of dicts; next_cursor is None
+        when this is the last page.
+
+    Raises:
+        ValueError: For unknown column names, a non-positive limit, or a
+            malformed cursor.
     """
-    init_db()
-    conn = get_connection()
-    cursor = conn.cursor()
-    query = "SELECT * FROM prompt_usage"
+    if columns is None:
+        columns = list(PROMPT_USAGE_COLUMNS)
+    else:
+        columns = list(dict.fromkeys(columns))
+        unknown = [c for c in columns if c not in PROMPT_USAGE_COLUMNS]
+        if unknown:
+            raise ValueError(f"Unknown column(s): {', '.join(unknown)}")
+        if not columns:
+            raise ValueError("At least one column is required")
+    if limit is not None:
+        limit = int(limit)
+        if limit <= 0:
+            raise ValueError("limit must be a positive integer")
+        columns += [c for c in ("id", "timestamp") if c not in columns]
+
+    _ensure_schema()
+    query = f"SELECT {_select_list(columns)} FROM prompt_usage p"
+    if "system_info" in columns:
+        query += " LEFT JOIN hosts h ON h.id = p.host_id"
     conditions = []
     params = []
     if model:
-        conditions.append("model = ?")
+        conditions.append("p.model = ?")
         params.append(model)
     if start_time:
-        conditions.append("timestamp >= ?")
+        conditions.append("p.timestamp >= ?")
         params.append(start_time)
     if end_time:
-        conditions.append("timestamp <= ?")
+        conditions.append("p.timestamp <= ?")
         params.append(end_time)
+    if cursor:
+        conditions.append(f"(p.timestamp, p.id) {'<' if descending else '>'} (?, ?)")
+        params.extend(decode_cursor(cursor))
     if conditions:
         query += " WHERE " + " AND ".join(conditions)
-    query += " ORDER BY timestamp ASC"
-    cursor.execute(query, params)
-    rows = cursor.fetchall()
-    conn.close()
-    return [dict(row) for row in rows]
+    direction = "DESC" if descending else "ASC"
+    query += f" ORDER BY p.timestamp {direction}, p.id {direction}"
+    if limit is not None:
+        query += " LIMIT ?"
+        params.append(limit + 1)  # one extra row tells us whether a next page exists
+    with _pool().connection() as conn:
+        rows = [dict(row) for row in conn.execute(query, params).fetchall()]
+
+    next_cursor = None
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1])
+    return rows, next_cursor
+
+
+def get_prompt_usage(
+    start_time=None,
+    end_time=None,
+    model=None,
+    columns=None,
+    limit=None,
+    descending=False,
+):
+    """
+    Retrieve prompt_usage records with optional filters.
+
+    Args:
+        start_time: ISO 8601 string; only rows with timestamp >= this value.
+        end_time: ISO 8601 string; only rows with timestamp <= this value.
+        model: Exact model name string to filter on (case-sensitive).
+        columns: Iterable of PROMPT_USAGE_COLUMNS to return (default: all).
+            Leaving out LARGE_TEXT_COLUMNS avoids reading prompt/response text.
+        limit: Maximum rows to return, or None for every matching row.
+        descending: If True, newest rows first.
+
+    Returns:
+        List of dicts, one per row, ordered by timestamp ASC (DESC when
+        descending). Each dict has the requested prompt_usage columns.
+        system_info is the row's own blob for legacy rows and the referenced
+        hosts.profile otherwise. system_info and prompt_score_details are JSON
+        strings; callers must parse with json.loads if needed.
+    """
+    rows, _ = get_prompt_usage_page(
+        start_time=start_time,
+        end_time=end_time,
+        model=model,
+        columns=columns,
+        limit=limit,
+        descending=descending,
+    )
+    return rows
+
+
+def get_usage_rollup(granularity="all", start_time=None, end_time=None, model=None):
+    """
+    Retrieve pre-aggregated usage totals from the usage_rollup table.
+
+    Args:
+        granularity: One of ROLLUP_GRANULARITIES ("minute", "hour", "day" or
+            "all"; "all" has a single bucket per model with bucket_start "").
+        start_time: ISO 8601 string; only buckets containing or after it.
+        end_time: ISO 8601 string; only buckets starting at or before it.
+        model: Exact model name string to filter on (case-sensitive).
+
+    Returns:
+        List of dicts with ROLLUP_COLUMNS keys, ordered by bucket_start then
+        model. Sums cover every prompt in the bucket; divide by prompt_count
+        for per-prompt averages. Records saved without a model have model "".
+
+    Raises:
+        ValueError: For an unknown granularity.
+    """
+    if granularity not in ROLLUP_GRANULARITIES:
+        raise ValueError(
+            f"granularity must be one of: {', '.join(ROLLUP_GRANULARITIES)}"
+        )
+    width = ROLLUP_GRANULARITIES[granularity]
+    conditions = ["granularity = ?"]
+    params = [granularity]
+    if model:
+        conditions.append("model = ?")
+        params.append(model)
+    if start_time and width:
+        conditions.append("bucket_start >= ?")
+        params.append(start_time[:width])
+    if end_time and width:
+        conditions.append("bucket_start <= ?")
+        params.append(end_time)
+    query = (
+        f"SELECT {', '.join(ROLLUP_COLUMNS)} FROM usage_rollup "
+        f"WHERE {' AND '.join(conditions)} ORDER BY bucket_start, model"
+    )
+    _ensure_schema()
+    with _pool().connection() as conn:
+        return [dict(row) for row in conn.execute(query, params)]
+
+
+def get_data_version() -> str:
+    """
+    Return a cheap token that changes whenever stored usage data changes.
+
+    Built from MAX(prompt_usage.id), a rowid lookup that costs the same at any
+    table size, and a counter bumped by rebuild_usage_rollup(). Used to decide
+    whether cached dashboard figures are still current; rows queued by a
+    BatchWriter change the version once they are flushed.
+    """
+    _ensure_schema()
+    with _pool().connection() as conn:
+        max_id = conn.execute("SELECT MAX(id) FROM prompt_usage").fetchone()[0]
+    return f"{max_id or 0}-{_rollup_generation}"
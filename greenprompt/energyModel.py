@@ -0,0 +1,216 @@
+"""
+energyModel.py — Energy and latency predicted from measured history.
+
+core.estimate_energy_from_tokens() multiplies the token count by a fixed
+per-family rate. EnergyModel instead fits, for every model on every host,
+
+    energy_wh    ≈ a·prompt_tokens + b·completion_tokens + c·load_s + d
+    duration_sec ≈ (same features, separate coefficients)
+
+by least squares over the measured prompt_usage rows: prefill and decode
+cost differ by an order of magnitude, and a cold model load dominates short
+prompts. Only the sufficient statistics XᵀX and Xᵀy are kept per group, so
+refresh() reads just the rows added since the last call and adds them in
+(one vectorized pass per group); solving a 4×4 system is then cheap enough to
+do per estimate.
+
+estimate() picks the most specific fit with MIN_SAMPLES rows — this host,
+then the model on any host — and falls back to the static per-token rate
+(source "static") when neither has enough history. POST /api/estimate
+serves it, so a prompt's cost is known before it spends any energy.
+"""
+
+import threading
+
+import numpy as np
+
+from greenprompt import dbconn
+from greenprompt.core import estimate_energy_from_tokens
+
+#: Fit features, in coefficient order (an intercept follows).
+FEATURES = ("prompt_tokens", "completion_tokens", "load_duration_sec")
+
+#: Rows a group needs before its fit is used.
+MIN_SAMPLES = 8
+
+#: Completion length assumed when neither the caller nor history gives one.
+DEFAULT_COMPLETION_TOKENS = 256
+
+#: Rows read from the database per refresh() query.
+REFRESH_BATCH = 5000
+
+
+class _Fit:
+    """Running XᵀX / Xᵀy for one (model, host) group."""
+
+    __slots__ = ("xtx", "xty", "n")
+
+    def __init__(self):
+        width = len(FEATURES) + 1
+        self.xtx = np.zeros((width, width))
+        self.xty = np.zeros((width, 2))  # energy_wh, duration_sec
+        self.n = 0
+
+    def add(self, x, y):
+        self.xtx += x.T @ x
+        self.xty += x.T @ y
+        self.n += len(x)
+
+    def coefficients(self):
+        """(len(FEATURES) + 1) × 2 least-squares solution, minimum-norm."""
+        return np.linalg.lstsq(self.xtx, self.xty, rcond=None)[0]
+
+    def means(self):
+        """Mean of each feature over the group (the intercept column is 1)."""
+        return self.xtx[-1, :-1] / self.n
+
+
+class EnergyModel:
+    """
+    Per-model, per-host least-squares energy and latency estimator.
+
+    Usage:
+        model = EnergyModel()
+        model.estimate("llama3.2:latest", prompt_tokens=120)
+    """
+
+    def __init__(self, min_samples=MIN_SAMPLES):
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+        self._fits = {}  # (model, host_id or None) -> _Fit
+        self._last_id = 0
+        self._path = None
+
+    def refresh(self):
+        """
+        Fold prompt_usage rows added since the last refresh into the fits.
+
+        Returns the number of rows read. Switching DB_PATH starts over.
+        """
+        with self._lock:
+            if self._path != dbconn.DB_PATH:
+                self._path = dbconn.DB_PATH
+                self._fits.clear()
+                self._last_id = 0
+            added = 0
+            while True:
+                rows = dbconn.get_energy_samples(self._last_id, REFRESH_BATCH)
+                if not rows:
+                    return added
+                self._add(rows)
+                self._last_id = rows[-1][0]
+                added += len(rows)
+
+    def _add(self, rows):
+        """Add get_energy_samples() rows, one matrix product per group."""
+        models = np.array([row[1] or "" for row in rows], dtype=object)
+        hosts = np.array([-1 if row[2] is None else row[2] for row in rows])
+        values = np.array([row[3:] for row in rows], dtype=float)
+        x = np.column_stack([values[:, : len(FEATURES)], np.ones(len(rows))])
+        y = values[:, len(FEATURES) :]
+        for model in np.unique(models):
+            in_model = models == model
+            self._fit(model, None).add(x[in_model], y[in_model])
+            for host in np.unique(hosts[in_model]):
+                if host < 0:
+                    continue
+                rows_mask = in_model & (hosts == host)
+                self._fit(model, int(host)).add(x[rows_mask], y[rows_mask])
+
+    def _fit(self, model, host_id):
+        fit = self._fits.get((model, host_id))
+        if fit is None:
+            fit = self._fits[(model, host_id)] = _Fit()
+        return fit
+
+    def estimate(
+        self,
+        model,
+        prompt_tokens,
+        completion_tokens=None,
+        load_duration_sec=None,
+        host_id=None,
+    ):
+        """
+        Predict energy (Wh) and latency (s) for a prompt before it runs.
+
+        Args:
+            model: Model name or Ollama tag, matched exactly against history.
+            prompt_tokens: Prompt (prefill) tokens.
+            completion_tokens: Expected completion tokens; defaults to the
+                group's mean, or DEFAULT_COMPLETION_TOKENS without history.
+            load_duration_sec: Expected model load time; defaults to the
+                group's mean (0 without history).
+            host_id: hosts.id to prefer; other hosts' data is used when this
+                one has fewer than min_samples measured rows.
+
+        Returns:
+            dict with the inputs used, "energy_wh", "duration_sec" (None for
+            the static estimate), "source" ("host", "model" or "static"),
+            "samples" and, for fitted estimates, the "coefficients".
+        """
+        self.refresh()
+        candidates = [("model", (model, None))]
+        if host_id is not None:
+            candidates.insert(0, ("host", (model, host_id)))
+        chosen = None
+        with self._lock:
+            for source, key in candidates:
+                fit = self._fits.get(key)
+                if fit is not None and fit.n >= self.min_samples:
+                    chosen = source, fit.n, fit.coefficients(), fit.means()
+                    break
+
+        if chosen is None:
+            if completion_tokens is None:
+                completion_tokens = DEFAULT_COMPLETION_TOKENS
+            return {
+                "model": model,
+                "host_id": host_id,
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "load_duration_sec": load_duration_sec or 0.0,
+                "energy_wh": estimate_energy_from_tokens(
+                    model, prompt_tokens + completion_tokens
+                ),
+                "duration_sec": None,
+                "source": "static",
+                "samples": 0,
+            }
+
+        source, samples, coefficients, means = chosen
+        if completion_tokens is None:
+            completion_tokens = round(float(means[1]))
+        if load_duration_sec is None:
+            load_duration_sec = float(means[2])
+        x = np.array([prompt_tokens, completion_tokens, load_duration_sec, 1.0])
+        energy_wh, duration_sec = (max(float(v), 0.0) for v in x @ coefficients)
+        names = [*FEATURES, "intercept"]
+        return {
+            "model": model,
+            "host_id": host_id,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "load_duration_sec": load_duration_sec,
+            "energy_wh": energy_wh,
+            "duration_sec": duration_sec,
+            "source": source,
+            "samples": samples,
+            "coefficients": {
+                "energy_wh": dict(zip(names, coefficients[:, 0].tolist())),
+                "duration_sec": dict(zip(names, coefficients[:, 1].tolist())),
+            },
+        }
+
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def get_energy_model() -> EnergyModel:
+    """Return the process-wide EnergyModel, created on first use."""
+    global _model
+    with _model_lock:
+        if _model is None:
+            _model = EnergyModel()
+        return _model
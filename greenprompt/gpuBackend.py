@@ -0,0 +1,235 @@
+"""
+gpuBackend.py — NVIDIA GPU queries through NVML, falling back to nvidia-smi.
+
+has_gpu(), get_gpu_usage() and LinuxPowerMonitor all need the same three
+facts: how many GPUs there are, how much power each draws, and a utilization /
+memory snapshot. Forking nvidia-smi for each costs tens of milliseconds per
+call. NVML (the library nvidia-smi itself is built on) answers the same
+questions in-process in microseconds.
+
+Backends (selected by constants.GPU_BACKEND):
+  nvml        — the optional `pynvml` module (pip install nvidia-ml-py).
+                nvmlInit() runs once and device handles are cached, so each
+                read is a single library call.
+  nvidia-smi  — one subprocess per read. The device count is cached after
+                the first `nvidia-smi -L`, so has_gpu() forks at most once.
+  auto        — nvml when pynvml imports and initializes, else nvidia-smi.
+
+Both backends expose the same methods: device_count(), power_by_gpu() and
+usage(). get_gpu_backend() returns the process-wide instance.
+"""
+
+import subprocess
+import threading
+
+from greenprompt import constants
+
+_NA = ("", "[N/A]", "N/A", "[Not Supported]", "Unknown Error")
+
+#: Field order of a usage() entry; also the nvidia-smi --query-gpu order.
+USAGE_FIELDS = (
+    "name",
+    "power_draw_w",
+    "power_limit_w",
+    "gpu_util_pct",
+    "mem_util_pct",
+    "mem_used_mib",
+    "mem_total_mib",
+    "temperature_c",
+)
+
+_SMI_QUERY = (
+    "name,power.draw,power.limit,utilization.gpu,utilization.memory,"
+    "memory.used,memory.total,temperature.gpu"
+)
+
+
+def _parse_number(raw: str) -> "float | None":
+    """Parse one nvidia-smi CSV value; None for N/A and unparseable fields."""
+    raw = raw.strip()
+    if raw in _NA:
+        return None
+    try:
+        return float(raw)
+    except ValueError:
+        return None
+
+
+class NvmlBackend:
+    """
+    GPU queries through NVML with cached device handles.
+
+    Readings a device does not support (NVMLError on that call, e.g. power on
+    unified-memory parts) come back as None — or 0.0 in power_by_gpu(), to
+    match how nvidia-smi's [N/A] is treated elsewhere.
+    """
+
+    name = "nvml"
+
+    def __init__(self, nvml):
+        """
+        Args:
+            nvml: The pynvml module (or a stand-in with the same API).
+
+        Raises:
+            nvml.NVMLError: if NVML cannot be initialized (no driver).
+        """
+        self._nvml = nvml
+        nvml.nvmlInit()
+        self._handles = [
+            nvml.nvmlDeviceGetHandleByIndex(i) for i in range(nvml.nvmlDeviceGetCount())
+        ]
+        self._names = [self._call(nvml.nvmlDeviceGetName, h) for h in self._handles]
+        self._names = [n.decode() if isinstance(n, bytes) else n for n in self._names]
+
+    def _call(self, fn, *args):
+        try:
+            return fn(*args)
+        except self._nvml.NVMLError:
+            return None
+
+    def device_count(self) -> int:
+        return len(self._handles)
+
+    def power_by_gpu(self) -> dict:
+        """Return {gpu_index: watts}; NVML reports milliwatts."""
+        nvml = self._nvml
+        out = {}
+        for i, handle in enumerate(self._handles):
+            mw = self._call(nvml.nvmlDeviceGetPowerUsage, handle)
+            out[i] = mw / 1000.0 if mw is not None else 0.0
+        return out
+
+    def usage(self) -> list:
+        """Return one dict of USAGE_FIELDS per GPU; unsupported fields are None."""
+        nvml = self._nvml
+        out = []
+        for name, handle in zip(self._names, self._handles):
+            power = self._call(nvml.nvmlDeviceGetPowerUsage, handle)
+            limit = self._call(nvml.nvmlDeviceGetEnforcedPowerLimit, handle)
+            rates = self._call(nvml.nvmlDeviceGetUtilizationRates, handle)
+            mem = self._call(nvml.nvmlDeviceGetMemoryInfo, handle)
+            temp = self._call(
+                nvml.nvmlDeviceGetTemperature, handle, nvml.NVML_TEMPERATURE_GPU
+            )
+            out.append(
+                {
+                    "name": name,
+                    "power_draw_w": power / 1000.0 if power is not None else None,
+                    "power_limit_w": limit / 1000.0 if limit is not None else None,
+                    "gpu_util_pct": rates.gpu if rates is not None else None,
+                    "mem_util_pct": rates.memory if rates is not None else None,
+                    "mem_used_mib": mem.used / 2**20 if mem is not None else None,
+                    "mem_total_mib": mem.total / 2**20 if mem is not None else None,
+                    "temperature_c": temp,
+                }
+            )
+        return out
+
+    def shutdown(self):
+        """Release NVML. The backend must not be used afterwards."""
+        self._handles = []
+        self._call(self._nvml.nvmlShutdown)
+
+
+class NvidiaSmiBackend:
+    """GPU queries by running nvidia-smi; every read except the count forks."""
+
+    name = "nvidia-smi"
+
+    def __init__(self):
+        self._count = None
+
+    def _query(self, fields: str) -> "list | None":
+        """Return nvidia-smi's CSV rows for fields, or None if it cannot run."""
+        try:
+            out = subprocess.check_output(
+                [
+                    "nvidia-smi",
+                    f"--query-gpu={fields}",
+                    "--format=csv,nounits,noheader",
+                ],
+                stderr=subprocess.DEVNULL,
+            ).decode()
+        except (subprocess.CalledProcessError, FileNotFoundError, OSError):
+            return None
+        return [line.split(",") for line in out.splitlines() if line.strip()]
+
+    def device_count(self) -> int:
+        """Count GPUs via `nvidia-smi -L`, once per process."""
+        if self._count is None:
+            try:
+                out = subprocess.check_output(
+                    ["nvidia-smi", "-L"], stderr=subprocess.DEVNULL
+                ).decode()
+                self._count = len([line for line in out.splitlines() if line.strip()])
+            except (subprocess.CalledProcessError, FileNotFoundError, OSError):
+                self._count = 0
+        return self._count
+
+    def power_by_gpu(self) -> dict:
+        """Return {gpu_index: watts}; N/A readings count as 0.0."""
+        rows = self._query("power.draw") or []
+        return {i: _parse_number(row[0]) or 0.0 for i, row in enumerate(rows)}
+
+    def usage(self) -> list:
+        """Return one dict of USAGE_FIELDS per GPU; N/A fields are None."""
+        rows = self._query(_SMI_QUERY)
+        if rows is None:
+            raise OSError("nvidia-smi failed")
+        out = []
+        for row in rows:
+            values = [row[0].strip()] + [_parse_number(v) for v in row[1:]]
+            out.append(dict(zip(USAGE_FIELDS, values)))
+        return out
+
+    def shutdown(self):
+        pass
+
+
+def _load_nvml():
+    """Return an NvmlBackend, or None if pynvml is missing or NVML will not start."""
+    try:
+        import pynvml
+    except ImportError:
+        return None
+    try:
+        return NvmlBackend(pynvml)
+    except Exception:
+        return None
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_gpu_backend():
+    """
+    Return the shared GPU backend, creating it on first use.
+
+    constants.GPU_BACKEND picks it: "nvml", "nvidia-smi" or "auto" (NVML when
+    available). A requested NVML that cannot load falls back to nvidia-smi
+    with a warning.
+    """
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            choice = str(constants.GPU_BACKEND).lower()
+            if choice != "nvidia-smi":
+                _backend = _load_nvml()
+                if _backend is None and choice == "nvml":
+                    print(
+                        "GPU_BACKEND is 'nvml' but NVML is unavailable; using nvidia-smi."
+                    )
+            if _backend is None:
+                _backend = NvidiaSmiBackend()
+        return _backend
+
+
+def reset_gpu_backend():
+    """Shut down and forget the shared backend; the next call re-selects one."""
+    global _backend
+    with _backend_lock:
+        if _backend is not None:
+            _backend.shutdown()
+        _backend = None
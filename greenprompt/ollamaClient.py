@@ -0,0 +1,198 @@
+"""
+ollamaClient.py — Shared, pooled HTTP client for the local Ollama server.
+
+Every prompt used to go out through a bare requests.post(): a new TCP
+connection per call, no timeout, and no limit on how many requests one
+GreenPrompt instance could pile onto Ollama. OllamaClient keeps one
+requests.Session for the process, so connections are reused (keep-alive), and
+adds:
+
+  - timeouts  — (connect, read) from OLLAMA_CONNECT_TIMEOUT_S and
+                OLLAMA_READ_TIMEOUT_S. The read timeout bounds the gap between
+                bytes, not the whole generation.
+  - retries   — OLLAMA_RETRIES attempts with exponential backoff, only where
+                the request never ran: connection failures and 503 (Ollama's
+                "server busy" when its queue is full). A prompt that reached
+                the model is never sent twice.
+  - a bound   — at most OLLAMA_MAX_IN_FLIGHT requests are outstanding at once;
+                further callers wait for a slot.
+  - streams   — streaming responses are read only as fast as the downstream
+                client takes them, so they hold a slot from a separate budget
+                of OLLAMA_MAX_STREAMS until the stream is closed. A stream
+                waits at most OLLAMA_STREAM_WAIT_S for a slot, then fails
+                with OllamaBusyError; slow streaming clients never hold up
+                request() callers.
+
+The same client serves asyncio callers: arequest()/apost() run the blocking
+call in a worker thread via asyncio.to_thread(), sharing the pool and bound.
+
+get_ollama_client() returns the process-wide instance.
+"""
+
+import asyncio
+import threading
+from contextlib import contextmanager
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from greenprompt import constants
+
+
+class OllamaBusyError(requests.exceptions.RequestException):
+    """Every stream slot stayed taken for the client's stream_wait_s."""
+
+
+class OllamaClient:
+    """Pooled, bounded, retrying HTTP client for one Ollama base URL."""
+
+    def __init__(
+        self,
+        base_url: str = None,
+        connect_timeout: float = None,
+        read_timeout: float = None,
+        retries: int = None,
+        backoff: float = 0.25,
+        max_in_flight: int = None,
+        max_streams: int = None,
+        stream_wait_s: float = None,
+    ):
+        """
+        Args:
+            base_url: Ollama server URL, e.g. "http://127.0.0.1:11434".
+                Defaults to constants.OLLAMA_URL.
+            connect_timeout: Seconds to establish a connection.
+            read_timeout: Seconds to wait between bytes of the response.
+            retries: Extra attempts after a connection failure or a 503.
+            backoff: Retry backoff factor in seconds (0.25 → 0.25 s, 0.5 s, ...).
+            max_in_flight: Maximum concurrent request() calls.
+            max_streams: Maximum open stream() responses, counted apart
+                from max_in_flight. The pool holds both.
+            stream_wait_s: Seconds stream() waits for a free stream slot.
+
+        The timeout, retry and concurrency defaults come from constants.
+        """
+        self.base_url = (base_url or constants.OLLAMA_URL).rstrip("/")
+        self.timeout = (
+            float(connect_timeout or constants.OLLAMA_CONNECT_TIMEOUT_S),
+            float(read_timeout or constants.OLLAMA_READ_TIMEOUT_S),
+        )
+        if retries is None:
+            retries = int(constants.OLLAMA_RETRIES)
+        self.max_in_flight = max(
+            1, int(max_in_flight or constants.OLLAMA_MAX_IN_FLIGHT)
+        )
+        self._slots = threading.BoundedSemaphore(self.max_in_flight)
+        self.max_streams = max(1, int(max_streams or constants.OLLAMA_MAX_STREAMS))
+        self._stream_slots = threading.BoundedSemaphore(self.max_streams)
+        if stream_wait_s is None:
+            stream_wait_s = float(constants.OLLAMA_STREAM_WAIT_S)
+        self.stream_wait_s = stream_wait_s
+
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=False,  # surface read timeouts as-is; never resend
+            status=retries,
+            status_forcelist=(503,),
+            allowed_methods=None,  # every method: only unsent requests are retried
+            backoff_factor=backoff,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=self.max_in_flight + self.max_streams,
+            max_retries=retry,
+        )
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def url(self, path: str) -> str:
+        """Return the absolute URL for an Ollama API path such as "/api/generate"."""
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def request(self, method: str, path: str, **kwargs) -> requests.Response:
+        """
+        Send a request and read the whole response.
+
+        Keyword arguments go to requests.Session.request(); timeout defaults to
+        the client's. Use stream() for responses that should be read
+        incrementally.
+
+        Raises:
+            requests.exceptions.ConnectionError: Ollama unreachable after retries.
+            requests.exceptions.Timeout: connect or read timeout.
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        kwargs["stream"] = False
+        with self._slots:
+            return self.session.request(method, self.url(path), **kwargs)
+
+    def get(self, path: str, **kwargs) -> requests.Response:
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path: str, **kwargs) -> requests.Response:
+        return self.request("POST", path, **kwargs)
+
+    @contextmanager
+    def stream(self, method: str, path: str, **kwargs):
+        """
+        Send a request and yield the unread response, closing it on exit.
+
+        A stream slot is held until the block exits, since the connection
+        stays busy while the body is being read.
+
+        Raises:
+            OllamaBusyError: no stream slot freed up within stream_wait_s.
+            requests.exceptions.RequestException: as for request().
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        kwargs["stream"] = True
+        if not self._stream_slots.acquire(timeout=self.stream_wait_s):
+            raise OllamaBusyError(
+                f"all {self.max_streams} Ollama stream slots busy "
+                f"for {self.stream_wait_s:g}s"
+            )
+        try:
+            response = self.session.request(method, self.url(path), **kwargs)
+            try:
+                yield response
+            finally:
+                response.close()
+        finally:
+            self._stream_slots.release()
+
+    async def arequest(self, method: str, path: str, **kwargs) -> requests.Response:
+        """Async request(): runs in a worker thread, sharing the pool and bound."""
+        return await asyncio.to_thread(self.request, method, path, **kwargs)
+
+    async def apost(self, path: str, **kwargs) -> requests.Response:
+        return await self.arequest("POST", path, **kwargs)
+
+    def close(self):
+        """Close pooled connections. The client can still be used afterwards."""
+        self.session.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_ollama_client() -> OllamaClient:
+    """Return the shared OllamaClient, creating it on first use."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = OllamaClient()
+        return _client
+
+
+def reset_ollama_client():
+    """Close and forget the shared client; the next call builds a new one."""
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+        _client = None
@@ -0,0 +1,183 @@
+"""
+responseCache.py — Exact-match cache of Ollama replies.
+
+Batch jobs and retried clients send the same (model, prompt, options) request
+over and over, and each one used to run the model again. With RESPONSE_CACHE
+on, core.run_prompt() and batch.run_batch() look the request up here first:
+
+    memory hit  — an LRU of RESPONSE_CACHE_SIZE recent replies.
+    stored hit  — the response_cache table in the usage database, so a
+                  restarted server keeps its replies; the entry is then
+                  kept in memory.
+    miss        — Ollama runs as before, and the reply is stored in both
+                  together with the energy and time the run took.
+
+Entries are keyed by a SHA-256 of the model, the prompt and the options,
+serialized with sorted keys, and served for RESPONSE_CACHE_TTL_S seconds
+after the original run. The table keeps the MAX_STORED newest entries;
+expired and excess rows are pruned every PRUNE_EVERY stores.
+
+A prompt served from the cache is still saved to prompt_usage, with no
+measured energy, cache_hit = 1 and the original run's energy as
+energy_avoided_wh (core.serve_cached()). stats() reports hits, misses and the
+energy, time and tokens avoided since the process started;
+GET /api/responses/cache serves it with all-time totals from prompt_usage.
+
+Only exact repeats hit, and a reply is reused even if the options ask for
+sampling (temperature > 0); send "cache": false to force a fresh run.
+Identical requests that are in flight at the same time both run. Database
+errors never fail a prompt: the cache degrades to memory only. The two tiers
+are tieredCache.TieredCache, shared with scoreCache.
+"""
+
+import hashlib
+import json
+import threading
+import time
+
+from greenprompt import constants, dbconn
+from greenprompt.tieredCache import TieredCache
+
+#: Rows kept in response_cache; the oldest beyond this are pruned.
+MAX_STORED = 10_000
+
+#: Stores between prunes of the response_cache table.
+PRUNE_EVERY = 100
+
+
+def cache_key(model, prompt, options=None):
+    """Hex SHA-256 of the model, prompt and options."""
+    payload = json.dumps([model, prompt, options or {}], sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _reply_to_store(reply):
+    # "context" is the conversation's token ids: large, and unused here.
+    return {key: value for key, value in reply.items() if key != "context"}
+
+
+class ResponseCache(TieredCache):
+    """
+    Thread-safe LRU of Ollama replies with a TTL, persisted in the usage DB.
+
+    Usage:
+        cache = ResponseCache(enabled=True)
+        entry = cache.get(model, prompt, options)
+        if entry is None:
+            ...  # run the prompt
+            cache.put(model, prompt, options, reply, energy_wh, duration_sec)
+        cache.stats()
+    """
+
+    what = "cached response"
+
+    def __init__(self, enabled=None, max_size=None, ttl_s=None):
+        """
+        Args:
+            enabled: Serve and store replies. Defaults to
+                constants.RESPONSE_CACHE; when off, get() always misses and
+                put() does nothing.
+            max_size: Replies kept in memory; defaults to
+                constants.RESPONSE_CACHE_SIZE.
+            ttl_s: Seconds a reply is served for; defaults to
+                constants.RESPONSE_CACHE_TTL_S. 0 never expires.
+        """
+        super().__init__(
+            constants.RESPONSE_CACHE_SIZE if max_size is None else max_size
+        )
+        self.enabled = constants.RESPONSE_CACHE if enabled is None else enabled
+        self.ttl_s = constants.RESPONSE_CACHE_TTL_S if ttl_s is None else ttl_s
+        self.energy_avoided_wh = 0.0
+        self.duration_avoided_s = 0.0
+        self.tokens_avoided = 0
+
+    def get(self, model, prompt, options=None):
+        """
+        Return the cached reply for this request, or None.
+
+        Returns:
+            {"reply": Ollama's JSON reply (without "context"), "energy_wh"
+            and "duration_sec" of the run that produced it, "created": its
+            epoch time} on a hit.
+        """
+        if not self.enabled:
+            return None
+        entry = self.lookup(cache_key(model, prompt, options))
+        if entry is None:
+            return None
+        reply, energy_wh, duration_sec, created = entry
+        return {
+            "reply": dict(reply),
+            "energy_wh": energy_wh,
+            "duration_sec": duration_sec,
+            "created": created,
+        }
+
+    def put(self, model, prompt, options, reply, energy_wh, duration_sec):
+        """Store a reply and what the run that produced it cost."""
+        if not self.enabled:
+            return
+        entry = (
+            _reply_to_store(reply),
+            energy_wh or 0.0,
+            duration_sec or 0.0,
+            time.time(),
+        )
+        self.insert(cache_key(model, prompt, options), entry, model=model)
+
+    def stats(self):
+        """Hit/miss counters, hit rate and the energy, time and tokens avoided."""
+        with self._lock:
+            return {
+                "enabled": bool(self.enabled),
+                **self._counts(),
+                "ttl_s": self.ttl_s,
+                "energy_avoided_wh": self.energy_avoided_wh,
+                "duration_avoided_s": round(self.duration_avoided_s, 6),
+                "tokens_avoided": self.tokens_avoided,
+            }
+
+    def clear(self):
+        """Forget the in-memory entries and counters (the table is kept)."""
+        super().clear()
+        with self._lock:
+            self.energy_avoided_wh = self.duration_avoided_s = 0.0
+            self.tokens_avoided = 0
+
+    def _min_created(self):
+        """Oldest creation time still served (0 when nothing expires)."""
+        return time.time() - self.ttl_s if self.ttl_s > 0 else 0.0
+
+    def _fresh(self, entry):
+        return entry[3] >= self._min_created()
+
+    def _on_hit(self, entry):
+        reply, energy_wh, duration_sec, _ = entry
+        self.energy_avoided_wh += energy_wh
+        self.duration_avoided_s += duration_sec
+        self.tokens_avoided += (reply.get("prompt_eval_count") or 0) + (
+            reply.get("eval_count") or 0
+        )
+
+    def _load(self, key):
+        return dbconn.get_cached_response(key, self._min_created())
+
+    def _save(self, key, entry, model=None):
+        dbconn.save_cached_response(key, model, *entry)
+
+    def _prune(self, stores):
+        if stores % PRUNE_EVERY == 1:
+            dbconn.prune_response_cache(self._min_created() or None, MAX_STORED)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """Return the process-wide ResponseCache, created on first use."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache()
+        return _cache
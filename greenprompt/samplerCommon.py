@@ -0,0 +1,518 @@
+"""
+samplerCommon.py — Sample storage shared by the platform power monitors.
+
+Provides SampleBuffer, a preallocated columnar ring buffer of power samples.
+Timestamps and the cpu/gpu/combined power readings live in float64 NumPy
+arrays instead of a deque of (timestamp, dict) tuples, so:
+
+  - appending a sample allocates nothing,
+  - a [start, end] lookup is two binary searches (np.searchsorted) plus a
+    slice of the k matching rows — O(log n + k) instead of a full scan,
+  - energy and average power over a window are O(log n): each row also
+    holds the running (prefix-sum) trapezoidal energy up to that sample,
+    so a window is two binary searches and one subtraction,
+  - memory is fixed at 2 * maxlen * 9 floats (about 5.2 MB for an hour at
+    10 Hz), whatever the sample rate.
+
+The arrays are allocated at twice the capacity and every row is written to
+both halves, so the live window is always one contiguous slice
+[start, start + size) and range queries never have to stitch a wrapped
+ring back together.
+
+SampleBuffer.integrate() turns a window of samples into energy: it
+interpolates power linearly between samples (and at the window edges) and
+integrates with the trapezoidal rule, so irregular sample spacing and
+partial intervals at each edge are weighted by time. It reads the running
+energy at each edge (adding the partial trapezoid from the nearest sample)
+rather than summing the samples in between, so a 60 s baseline costs the
+same as a 1 s prompt. When the samples carry a cumulative cpu_energy_j
+counter (RAPL), CPU energy is the counter delta.
+
+SampleScheduler sets the monitors' sampling cadence. In adaptive mode the
+sampling thread runs at a fast interval (e.g. 100 ms) while any prompt is
+in flight — core.run_prompt() brackets each prompt with the monitor's
+begin_activity()/end_activity() — and drops back to the idle interval
+(1 s) otherwise. It also charges the sampling thread's CPU time
+(time.thread_time) to each sample so the cost of the extra samples can be
+reported.
+
+SampleBuffer keeps the parts of the deque interface the monitors and their
+callers rely on (append/extend of (timestamp, dict) tuples, len, iteration,
+maxlen), so code that treats monitor.samples as a deque keeps working.
+"""
+
+import threading
+import time
+from typing import NamedTuple
+
+import numpy as np
+
+
+class WindowEnergy(NamedTuple):
+    """
+    Result of SampleBuffer.integrate() for one [start, end] window.
+
+    Attributes:
+        energy_j: Energy in joules per SampleBuffer.FIELDS column.
+        power_w: Time-weighted average power per column (energy / duration;
+            the interpolated power at start for a zero-length window).
+        samples: Number of samples inside [start, end].
+        extrapolated: True when no sample fell inside the window and the
+            result was interpolated from neighbours just outside it.
+    """
+
+    energy_j: np.ndarray
+    power_w: np.ndarray
+    samples: int
+    extrapolated: bool
+
+
+class SampleBuffer:
+    """
+    Fixed-capacity, thread-safe ring buffer of timestamped power samples.
+
+    Samples are (float timestamp, dict) tuples, where the dict carries the
+    FIELDS keys (missing keys are stored as 0.0) and optionally COUNTER_FIELD,
+    a cumulative energy counter in joules. Timestamps are expected in
+    non-decreasing order — the monitors append time.time() as they sample —
+    and a timestamp earlier than the newest one (e.g. after a wall-clock step)
+    is clamped to it so the timestamp column stays sorted for searchsorted.
+
+    Alongside each sample the buffer stores the running trapezoidal energy of
+    every FIELDS column up to that sample, and a running count of samples
+    without COUNTER_FIELD. Both are extended by one step per append, so
+    window queries difference two entries instead of summing the window.
+    The running totals start at the first sample ever appended; evicted
+    samples leave them untouched, so only differences are meaningful.
+
+    Attributes:
+        FIELDS: Power columns stored per sample, in column order. A buffer
+            built with `fields=` (e.g. one column per GPU) stores those
+            instead; CPU, GPU and COMBINED then do not apply.
+        CPU, GPU, COMBINED: Column indexes of the FIELDS entries.
+        COUNTER_FIELD: Optional cumulative CPU energy key (NaN when absent).
+        maxlen: Capacity; once full, each append evicts the oldest sample.
+    """
+
+    FIELDS = ("cpu_power_w", "gpu_power_w", "combined_power_w")
+    #: Column indexes into FIELDS and the values arrays returned by queries.
+    CPU, GPU, COMBINED = range(len(FIELDS))
+    COUNTER_FIELD = "cpu_energy_j"
+
+    def __init__(self, maxlen: int = 600, fields=None):
+        if maxlen < 1:
+            raise ValueError("maxlen must be at least 1")
+        if fields is not None:
+            self.FIELDS = tuple(fields)
+        self._maxlen = int(maxlen)
+        self._ts = np.zeros(2 * self._maxlen)
+        self._values = np.zeros((2 * self._maxlen, len(self.FIELDS)))
+        self._counter = np.full(2 * self._maxlen, np.nan)
+        # Running trapezoidal energy (J) per column, and running count of
+        # samples whose counter is NaN, both inclusive of the row.
+        self._energy = np.zeros((2 * self._maxlen, len(self.FIELDS)))
+        self._missing = np.zeros(2 * self._maxlen)
+        self._start = 0
+        self._size = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_samples(cls, samples, maxlen: "int | None" = None) -> "SampleBuffer":
+        """
+        Build a buffer from any iterable of (timestamp, dict) tuples.
+
+        Used to run the vectorized queries over legacy sample containers such
+        as a plain deque. maxlen defaults to the number of samples given.
+        """
+        samples = list(samples)
+        buf = cls(maxlen or max(len(samples), 1))
+        buf.extend(samples)
+        return buf
+
+    @property
+    def maxlen(self) -> int:
+        return self._maxlen
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self):
+        """Yield (timestamp, dict) tuples, oldest first, from a snapshot."""
+        with self._lock:
+            ts, values, counter = (a.copy() for a in self._live()[:3])
+        for t, row, c in zip(ts.tolist(), values.tolist(), counter.tolist()):
+            sample = dict(zip(self.FIELDS, row))
+            if c == c:  # not NaN
+                sample[self.COUNTER_FIELD] = c
+            yield t, sample
+
+    def _live(self):
+        """
+        Views of the live timestamps, values, counter, running energy and
+        running missing-counter count. Caller holds the lock.
+        """
+        start, end = self._start, self._start + self._size
+        return (
+            self._ts[start:end],
+            self._values[start:end],
+            self._counter[start:end],
+            self._energy[start:end],
+            self._missing[start:end],
+        )
+
+    def _row(self, sample):
+        counter = sample.get(self.COUNTER_FIELD)
+        return (
+            np.array([sample.get(f, 0.0) or 0.0 for f in self.FIELDS], dtype=float),
+            np.nan if counter is None else counter,
+        )
+
+    def _append_locked(self, ts, row, counter):
+        cap = self._maxlen
+        missing = float(counter != counter)
+        if self._size:
+            last = self._start + self._size - 1
+            ts = max(ts, self._ts[last])
+            energy = self._energy[last] + (self._values[last] + row) / 2 * (
+                ts - self._ts[last]
+            )
+            missing += self._missing[last]
+        else:
+            energy = 0.0
+        if self._size < cap:
+            idx = (self._start + self._size) % cap
+            self._size += 1
+        else:
+            idx = self._start
+            self._start = (self._start + 1) % cap
+        self._ts[idx] = self._ts[idx + cap] = ts
+        self._values[idx] = self._values[idx + cap] = row
+        self._counter[idx] = self._counter[idx + cap] = counter
+        self._energy[idx] = self._energy[idx + cap] = energy
+        self._missing[idx] = self._missing[idx + cap] = missing
+
+    def append(self, item):
+        """Append one (timestamp, dict) sample, evicting the oldest when full."""
+        ts, sample = item
+        row, counter = self._row(sample)
+        with self._lock:
+            self._append_locked(float(ts), row, counter)
+
+    def extend(self, items):
+        """Append each (timestamp, dict) sample from an iterable, in order."""
+        rows = [(float(ts), *self._row(sample)) for ts, sample in items]
+        with self._lock:
+            for ts, row, counter in rows:
+                self._append_locked(ts, row, counter)
+
+    def clear(self):
+        """Drop every sample."""
+        with self._lock:
+            self._start = 0
+            self._size = 0
+
+    def slice(self, start_ts: float, end_ts: float):
+        """
+        Return copies of the samples with start_ts <= timestamp <= end_ts.
+
+        Returns:
+            (timestamps, values) — a 1-D array of timestamps and a
+            (k, len(FIELDS)) array of power readings, oldest first.
+        """
+        with self._lock:
+            ts, values = self._live()[:2]
+            lo = np.searchsorted(ts, start_ts, side="left")
+            hi = np.searchsorted(ts, end_ts, side="right")
+            return ts[lo:hi].copy(), values[lo:hi].copy()
+
+    def range_average(self, start_ts: float, end_ts: float) -> "np.ndarray | None":
+        """
+        Time-weighted average power per FIELDS column over the samples in
+        [start_ts, end_ts].
+
+        The average runs from the first to the last sample in range (the
+        span they actually cover), from two binary searches and one
+        difference of the running energy. A single sample, or samples that
+        share one timestamp, average to their plain mean.
+
+        Returns:
+            1-D array aligned with FIELDS, or None if no samples are in range.
+        """
+        with self._lock:
+            ts, values, _, energy, _ = self._live()
+            lo = np.searchsorted(ts, start_ts, side="left")
+            hi = np.searchsorted(ts, end_ts, side="right")
+            if hi <= lo:
+                return None
+            span = ts[hi - 1] - ts[lo]
+            if span <= 0:
+                return values[lo:hi].mean(axis=0)
+            return (energy[hi - 1] - energy[lo]) / span
+
+    def integrate(
+        self,
+        start_ts: float,
+        end_ts: float,
+        edge_window: float,
+        require_inside: bool = False,
+    ) -> "WindowEnergy | None":
+        """
+        Time-weighted trapezoidal energy over [start_ts, end_ts].
+
+        Power is interpolated linearly between samples, including at
+        start_ts and end_ts, and held constant beyond the outermost sample.
+        Only samples within `edge_window` seconds of the window are used, so
+        a stale reading from long before the window never leaks into it.
+        When every sample used carries COUNTER_FIELD, CPU energy is the
+        counter delta (interpolated at the edges) instead of the integral,
+        and combined energy is that plus the integrated GPU energy.
+
+        The cost is a handful of binary searches whatever the window length:
+        the running energy is read at each edge and differenced.
+
+        Args:
+            start_ts: Unix timestamp for the start of the window.
+            end_ts: Unix timestamp for the end of the window.
+            edge_window: Seconds beyond each edge to look for neighbours —
+                typically 2 * sample_interval.
+            require_inside: If True, return None unless at least one sample
+                lies inside the window (no neighbour-only estimate).
+
+        Returns:
+            WindowEnergy, or None when no usable samples exist.
+        """
+        with self._lock:
+            ts, values, counter, energy, missing = self._live()
+            lo = int(np.searchsorted(ts, start_ts - edge_window, side="left"))
+            hi = int(np.searchsorted(ts, end_ts + edge_window, side="right"))
+            if hi <= lo:
+                return None
+            inside = int(
+                np.searchsorted(ts, end_ts, side="right")
+                - np.searchsorted(ts, start_ts, side="left")
+            )
+            if require_inside and not inside:
+                return None
+
+            # Only rows [lo, hi) are usable neighbours.
+            usable = (ts, values, energy, lo, hi)
+            start_j, start_w = _energy_at(start_ts, *usable)
+            end_j, _ = _energy_at(end_ts, *usable)
+            window_j = end_j - start_j
+            if missing[hi - 1] - missing[lo] + (counter[lo] != counter[lo]) == 0:
+                usable = (ts, values[:, self.CPU], counter, lo, hi)
+                cpu_j = _counter_at(end_ts, *usable) - _counter_at(start_ts, *usable)
+                window_j[self.CPU] = cpu_j
+                window_j[self.COMBINED] = cpu_j + window_j[self.GPU]
+
+        duration = end_ts - start_ts
+        avg = window_j / duration if duration > 0 else start_w.copy()
+        return WindowEnergy(window_j, avg, inside, inside == 0)
+
+
+def _locate(t, ts, lo, hi):
+    """
+    Index of the last row in [lo, hi) with timestamp <= t, clamped to
+    [lo - 1, hi - 1]: lo - 1 means t precedes every usable row.
+    """
+    j = int(np.searchsorted(ts, t, side="right")) - 1
+    return min(max(j, lo - 1), hi - 1)
+
+
+def _energy_at(t, ts, values, energy, lo, hi):
+    """
+    Running energy and interpolated power at time t, using rows [lo, hi).
+
+    Between two rows the power is linear, so the partial step from row j
+    to t is a trapezoid ending at the interpolated power. Before the first
+    or after the last usable row the power is held at that row's reading.
+
+    Returns:
+        (energy_j, power_w) — arrays aligned with SampleBuffer.FIELDS.
+    """
+    j = _locate(t, ts, lo, hi)
+    if j < lo:
+        return energy[lo] - values[lo] * (ts[lo] - t), values[lo]
+    if j == hi - 1:
+        return energy[j] + values[j] * (t - ts[j]), values[j]
+    frac = (t - ts[j]) / (ts[j + 1] - ts[j])
+    power = values[j] + (values[j + 1] - values[j]) * frac
+    return energy[j] + (values[j] + power) / 2 * (t - ts[j]), power
+
+
+def _counter_at(t, ts, power, counter, lo, hi):
+    """
+    Cumulative counter value at time t, using rows [lo, hi).
+
+    Linear between readings; beyond the first or last reading the counter is
+    extended at that reading's power, since a counter-derived power sample is
+    the average over the interval it closes.
+    """
+    j = _locate(t, ts, lo, hi)
+    if j < lo:
+        return counter[lo] - power[lo] * (ts[lo] - t)
+    if j == hi - 1:
+        return counter[j] + power[j] * (t - ts[j])
+    frac = (t - ts[j]) / (ts[j + 1] - ts[j])
+    return counter[j] + (counter[j + 1] - counter[j]) * frac
+
+
+def as_sample_buffer(samples, lock=None) -> SampleBuffer:
+    """
+    Return samples as a SampleBuffer, converting other containers.
+
+    A SampleBuffer is returned as-is. Anything else (e.g. a deque of
+    (timestamp, dict) tuples on an older or hand-built monitor) is copied
+    into a new buffer, under `lock` when one is given so the copy is a
+    consistent snapshot.
+    """
+    if isinstance(samples, SampleBuffer):
+        return samples
+    if lock is None:
+        return SampleBuffer.from_samples(samples)
+    with lock:
+        return SampleBuffer.from_samples(samples)
+
+
+class SampleScheduler:
+    """
+    Sampling cadence and overhead accounting for a monitor's sampling thread.
+
+    With `active_interval` set, the interval is `active_interval` while at
+    least one begin_activity() is outstanding and `idle_interval` otherwise;
+    begin_activity() wakes a sleeping thread so the first fast sample lands
+    at the start of the prompt rather than up to one idle interval later.
+    Without it, sampling runs at the fixed `idle_interval`.
+
+    The sampling loop is:
+
+        while running:
+            started = time.perf_counter()
+            power = schedule.sample(self.sample_once)
+            ...
+            schedule.wait(started)
+
+    wait() sleeps for what remains of the interval, so the time spent
+    sampling does not stretch the period.
+
+    Attributes:
+        idle_interval: Seconds between samples with no prompt in flight.
+        active_interval: Seconds between samples during a prompt, or None
+            for fixed-rate sampling.
+    """
+
+    def __init__(
+        self, idle_interval: float = 1.0, active_interval: "float | None" = None
+    ):
+        if idle_interval <= 0 or (active_interval is not None and active_interval <= 0):
+            raise ValueError("sampling intervals must be positive")
+        self.idle_interval = float(idle_interval)
+        self.active_interval = (
+            None if active_interval is None else float(active_interval)
+        )
+        self._active = 0
+        self._samples = 0
+        self._cpu_s = 0.0
+        self._started = time.perf_counter()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+
+    @property
+    def adaptive(self) -> bool:
+        return self.active_interval is not None
+
+    @property
+    def active(self) -> int:
+        """Number of begin_activity() calls not yet matched by end_activity()."""
+        return self._active
+
+    @property
+    def interval(self) -> float:
+        """Seconds until the next sample should be taken."""
+        if self._active and self.active_interval is not None:
+            return self.active_interval
+        return self.idle_interval
+
+    @property
+    def min_interval(self) -> float:
+        """The fastest interval this schedule can run at."""
+        return min(self.idle_interval, self.active_interval or self.idle_interval)
+
+    def begin_activity(self):
+        """Switch to the active interval until the matching end_activity()."""
+        with self._lock:
+            self._active += 1
+        self._wake.set()
+
+    def end_activity(self):
+        """Drop back to the idle interval once no activity is outstanding."""
+        with self._lock:
+            self._active = max(0, self._active - 1)
+
+    def wake(self):
+        """Cut the current wait() short, e.g. so stop() returns promptly."""
+        self._wake.set()
+
+    def wait(self, started: float):
+        """
+        Sleep until `started + interval` (time.perf_counter() seconds), or
+        until woken by begin_activity() or wake().
+        """
+        remaining = started + self.interval - time.perf_counter()
+        if remaining > 0:
+            self._wake.wait(remaining)
+        self._wake.clear()
+
+    def sample(self, sample_once):
+        """
+        Call sample_once() and charge its CPU time to the overhead counters.
+
+        time.thread_time() counts only the calling thread, so concurrent
+        request handling is not mistaken for sampler cost. CPU burned by
+        child processes (nvidia-smi, powermetrics) is not included.
+        """
+        cpu0 = time.thread_time()
+        try:
+            return sample_once()
+        finally:
+            self.charge(time.thread_time() - cpu0)
+
+    def charge(self, cpu_s: float):
+        """Count one sample costing `cpu_s` seconds of sampler-thread CPU."""
+        with self._lock:
+            self._samples += 1
+            self._cpu_s += cpu_s
+
+    def status(self) -> dict:
+        """
+        Cadence and overhead snapshot.
+
+        Returns:
+            dict with mode ("adaptive" or "fixed"), idle_interval_sec,
+            active_interval_sec, interval_sec (current), active_prompts and
+            overhead: {samples_taken, sampler_cpu_sec, cpu_ms_per_sample,
+            uptime_sec, cpu_percent} — cpu_percent being the sampler thread's
+            CPU time as a percentage of one core since the schedule started.
+        """
+        with self._lock:
+            samples, cpu_s, active = self._samples, self._cpu_s, self._active
+        uptime = time.perf_counter() - self._started
+        return {
+            "mode": "adaptive" if self.adaptive else "fixed",
+            "idle_interval_sec": self.idle_interval,
+            "active_interval_sec": self.active_interval,
+            "interval_sec": self.interval,
+            "active_prompts": active,
+            "overhead": {
+                "samples_taken": samples,
+                "sampler_cpu_sec": cpu_s,
+                "cpu_ms_per_sample": cpu_s * 1000 / samples if samples else 0.0,
+                "uptime_sec": uptime,
+                "cpu_percent": cpu_s * 100 / uptime if uptime > 0 else 0.0,
+            },
+        }
+
+
+def window_samples(seconds: float, schedule: SampleScheduler) -> int:
+    """Buffer capacity that holds `seconds` of history at the schedule's fastest rate."""
+    return max(1, int(round(seconds / schedule.min_interval)))
@@ -2,35 +2,46 @@
 samplerLinux.py — Continuous Linux power sampling via psutil, sysfs, and nvidia-smi.
 
 Provides LinuxPowerMonitor, a daemon thread that samples CPU and GPU power every
-second, maintaining a 10-minute ring buffer identical in structure to
-samplerMac.PowerMonitor.
+second into a 10-minute samplerCommon.SampleBuffer (a columnar NumPy ring
+buffer with binary-search range lookup). With an active_interval it samples
+faster while a prompt is in flight (see samplerCommon.SampleScheduler).
 
 CPU measurement strategy (auto-detected at startup, priority order):
   1. rapl       — Intel/AMD only: reads energy_uj counter delta from sysfs.
-                  Ground-truth watts, no estimation.
+                  Ground-truth watts, no estimation. Each sample also carries
+                  the running counter total (cpu_energy_j), so per-prompt CPU
+                  energy is an exact counter delta rather than an integral.
   2. arm_biglittle — ARM big.LITTLE (e.g. Cortex-X925 + A725): per-cluster
                   frequency-squared model. Reads scaling_cur_freq from sysfs.
                   Better than linear because power ∝ V²f and V scales with freq.
   3. linear_tdp — Fallback: cpu_percent / 100 * cpu_tdp_w.
 
 GPU measurement:
-  One long-running `nvidia-smi dmon -s p -d 1` process (NvidiaDmonReader)
-  instead of a subprocess fork every second. Falls back to per-call subprocess
-  if dmon fails to start.
+  With NVML available (gpuBackend), in-process reads on every sample. Otherwise
+  one long-running `nvidia-smi dmon -s p -d 1` process (NvidiaDmonReader)
+  instead of a subprocess fork every second, falling back to per-call
+  nvidia-smi if dmon fails to start.
 
-Thread safety: self.samples is protected by self._lock. Stop uses threading.Event
+Thread safety: SampleBuffer locks internally; self._lock is still taken around
+appends so callers that snapshot under it keep working. Stop uses threading.Event
 so stop() returns immediately instead of waiting up to 1s for sleep() to expire.
 
 This module is Linux-only. For macOS, see samplerMac.py.
 """
 
-from collections import deque
 import glob
 import os
 import threading
 import time
 import subprocess
 import psutil
+from greenprompt.gpuBackend import get_gpu_backend
+from greenprompt.samplerCommon import (
+    SampleBuffer,
+    SampleScheduler,
+    as_sample_buffer,
+    window_samples,
+)
 
 
 # Per-cluster TDP and idle power estimates for known ARM big.LITTLE configurations.
@@ -100,20 +111,22 @@ class NvidiaDmonReader:
     Wraps a single long-running `nvidia-smi dmon` process for efficient GPU power polling.
 
     Instead of forking nvidia-smi on every sample tick, one process streams output
-    continuously. A daemon thread reads lines and updates _power_w under a lock.
-    Callers read get_power() with no subprocess overhead.
+    continuously. A daemon thread reads lines and updates the latest power per
+    GPU index under a lock. Callers read get_power() (the total across GPUs) or
+    get_power_by_gpu() with no subprocess overhead.
 
     dmon output format (columns vary by -s flag; -s p gives power and temp):
         # gpu   pwr  gtemp  mtemp    sm   mem   enc   dec   jpg   ofa
         # Idx     W      C      C     %     %     %     %     %     %
             0     4     40      -     2     -     0     0     -     -
+            1   212     71      -    98     -     0     0     -     -
 
-    Column index 1 (0-indexed after split) = power in watts.
-    Header lines start with '#' and are skipped.
+    dmon prints one row per GPU per interval. Column 0 = GPU index, column 1 =
+    power in watts. Header lines start with '#' and are skipped.
     """
 
     def __init__(self):
-        self._power_w = 0.0
+        self._power_by_gpu = {}
         self._lock = threading.Lock()
         self._failed = False
         self._proc = None
@@ -136,15 +149,21 @@ class NvidiaDmonReader:
             parts = line.split()
             if len(parts) >= 2:
                 try:
-                    with self._lock:
-                        self._power_w = float(parts[1])
+                    gpu, power_w = int(parts[0]), float(parts[1])
                 except ValueError:
-                    pass
+                    continue
+                with self._lock:
+                    self._power_by_gpu[gpu] = power_w
 
     def get_power(self) -> float:
-        """Return the most recently read GPU power in watts."""
+        """Return the most recently read GPU power in watts, summed over all GPUs."""
+        with self._lock:
+            return sum(self._power_by_gpu.values())
+
+    def get_power_by_gpu(self) -> dict:
+        """Return {gpu_index: watts} from the most recent row for each GPU."""
         with self._lock:
-            return self._power_w
+            return dict(self._power_by_gpu)
 
     def stop(self):
         """Terminate the dmon process. The reader thread exits naturally."""
@@ -154,13 +173,140 @@ class NvidiaDmonReader:
             self._proc = None
 
 
+class NvidiaPmonReader:
+    """
+    Wraps a long-running `nvidia-smi pmon` process for per-process GPU utilization.
+
+    pmon output format (-s u gives utilization):
+        # gpu         pid   type     sm    mem    enc    dec    command
+        # Idx           #    C/G      %      %      %      %    name
+            0       48213     C     93     61      -      -    ollama_llama_se
+            1           -     -      -      -      -      -    -
+
+    A daemon thread keeps the latest SM % per (gpu, pid). Rows for processes
+    that stop appearing expire after `ttl_s` seconds, so a finished runner
+    does not keep claiming a share of the GPU.
+    """
+
+    def __init__(self, ttl_s: float = 3.0):
+        self._ttl_s = ttl_s
+        self._util = {}  # (gpu, pid) -> (sm_pct, seen_at)
+        self._lock = threading.Lock()
+        self._failed = False
+        self._proc = None
+        try:
+            self._proc = subprocess.Popen(
+                ["nvidia-smi", "pmon", "-s", "u", "-d", "1"],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                text=True,
+            )
+            self._thread = threading.Thread(target=self._read_loop, daemon=True)
+            self._thread.start()
+        except (FileNotFoundError, OSError):
+            self._failed = True
+
+    def _read_loop(self):
+        for line in self._proc.stdout:
+            if line.startswith("#") or not line.strip():
+                continue
+            parts = line.split()
+            if len(parts) < 4:
+                continue
+            try:
+                gpu, pid = int(parts[0]), int(parts[1])
+            except ValueError:
+                continue  # idle GPU rows carry "-" for the pid
+            try:
+                sm_pct = float(parts[3])
+            except ValueError:
+                sm_pct = 0.0
+            with self._lock:
+                self._util[(gpu, pid)] = (sm_pct, time.monotonic())
+
+    def get_utilization(self) -> dict:
+        """Return {gpu_index: {pid: sm_pct}} for processes seen within ttl_s."""
+        cutoff = time.monotonic() - self._ttl_s
+        by_gpu = {}
+        with self._lock:
+            for (gpu, pid), (sm_pct, seen_at) in list(self._util.items()):
+                if seen_at < cutoff:
+                    del self._util[(gpu, pid)]
+                else:
+                    by_gpu.setdefault(gpu, {})[pid] = sm_pct
+        return by_gpu
+
+    def stop(self):
+        """Terminate the pmon process. The reader thread exits naturally."""
+        if self._proc:
+            self._proc.terminate()
+            self._proc.wait()
+            self._proc = None
+
+
+_ollama_pids_cache = (float("-inf"), frozenset())
+
+
+def ollama_runner_pids(max_age_s: float = 5.0) -> frozenset:
+    """
+    Return the PIDs of running Ollama processes (server and model runners).
+
+    Scanning the process table is far slower than a power sample, so the
+    result is cached for max_age_s seconds.
+    """
+    global _ollama_pids_cache
+    checked_at, pids = _ollama_pids_cache
+    now = time.monotonic()
+    if now - checked_at < max_age_s:
+        return pids
+    try:
+        pids = frozenset(
+            p.pid
+            for p in psutil.process_iter(["name"])
+            if "ollama" in (p.info.get("name") or "").lower()
+        )
+    except psutil.Error:
+        pids = frozenset()
+    _ollama_pids_cache = (now, pids)
+    return pids
+
+
+def attribute_gpu_power(power_by_gpu: dict, util_by_gpu: dict, pids) -> dict:
+    """
+    Split each GPU's power by SM utilization and return the share used by `pids`.
+
+    A GPU's power is attributed to the listed processes in proportion to
+    their SM % over the SM % of every process on that GPU. A GPU with no
+    busy process attributes nothing: its draw is idle power.
+
+    Returns:
+        {gpu_index: watts attributed to pids}, for every GPU in power_by_gpu.
+    """
+    attributed = {}
+    for gpu, power_w in power_by_gpu.items():
+        util = util_by_gpu.get(gpu, {})
+        total = sum(util.values())
+        ours = sum(sm for pid, sm in util.items() if pid in pids)
+        attributed[gpu] = power_w * ours / total if total > 0 else 0.0
+    return attributed
+
+
+#: Optional sample keys: {gpu_index: watts} per GPU, and the part of it
+#: attributed to Ollama processes (gpu_attribution mode only).
+GPU_POWER_KEY = "gpu_power_by_index"
+OLLAMA_GPU_POWER_KEY = "ollama_gpu_power_by_index"
+_GPU_KEYS = (GPU_POWER_KEY, OLLAMA_GPU_POWER_KEY)
+
+
 class LinuxPowerMonitor:
     """
     Background daemon thread that samples Linux CPU/GPU power every second.
 
-    Maintains a fixed-size deque of (timestamp, sample_dict) tuples covering
-    the last `window_size` seconds — identical interface to samplerMac.PowerMonitor
-    so that measure_power_linux() can use the same logic as measure_power_mac().
+    Maintains a fixed-size SampleBuffer covering the last `window_size`
+    samples. It accepts and yields (timestamp, sample_dict) tuples like the
+    deque samplerMac.PowerMonitor uses, but stores them as NumPy columns so
+    measure_power_linux() and get_range_average() binary-search the window
+    instead of scanning every sample.
 
     CPU mode is auto-detected at construction time:
       - "rapl":          Intel/AMD energy counter (ground truth)
@@ -168,39 +314,74 @@ class LinuxPowerMonitor:
       - "linear_tdp":    cpu_percent * cpu_tdp_w fallback
 
     GPU mode:
+      - gpuBackend NVML reads (in-process) when pynvml is available
       - NvidiaDmonReader (single long-running process) if nvidia-smi is available
-      - Per-call subprocess fallback if dmon fails to start
+      - Per-call nvidia-smi fallback if dmon fails to start
+    Power is read per GPU index and summed into gpu_power_w. The per-GPU
+    readings also go into gpu_samples, a second SampleBuffer with one column
+    per GPU seen so far (a GPU that reports late gets its column then). With
+    gpu_attribution=True, an NvidiaPmonReader supplies per-process SM
+    utilization and gpu_samples gains one column per GPU for the power
+    attributed to Ollama's processes (see attribute_gpu_power()).
+
+    Sampling is fixed-rate at sample_interval unless active_interval is
+    given, in which case begin_activity()/end_activity() (called by
+    core.run_prompt around each prompt) switch between the two rates.
+    status() reports the current rate and the sampler's own CPU cost.
 
     Usage:
-        monitor = LinuxPowerMonitor(cpu_tdp_w=23.0)
+        monitor = LinuxPowerMonitor(cpu_tdp_w=23.0, active_interval=0.1)
         monitor.start()
         time.sleep(5)   # warm up before first prompt
         # Use sysUsage.measure_power_linux(start, end, monitor) to get metrics.
         monitor.stop()
 
     Attributes:
-        samples: deque of (float timestamp, dict{cpu_power_w, gpu_power_w,
-            combined_power_w}) tuples. Protected by self._lock.
+        samples: SampleBuffer of (float timestamp, dict{cpu_power_w,
+            gpu_power_w, combined_power_w}) samples.
         running: bool, True while the background thread is active.
         cpu_tdp_w: float, CPU TDP used in linear_tdp fallback mode.
         _cpu_mode: str, one of "rapl", "arm_biglittle", "linear_tdp".
     """
 
-    def __init__(self, sample_interval: int = 1, window_size: int = 600, cpu_tdp_w: float = 40.0):
+    def __init__(
+        self,
+        sample_interval: float = 1,
+        window_size: "int | None" = None,
+        cpu_tdp_w: float = 40.0,
+        active_interval: "float | None" = None,
+        gpu_attribution: bool = False,
+    ):
         """
         Args:
-            sample_interval: Seconds between samples (default 1).
-            window_size: Max samples to retain; 600 = 10-minute window.
+            sample_interval: Seconds between samples when idle (default 1).
+            window_size: Max samples to retain. Defaults to 10 minutes at the
+                fastest sampling rate (600 at 1 Hz). Memory is fixed at 144
+                bytes per sample, so hours at 10 Hz are fine.
             cpu_tdp_w: CPU TDP in watts for linear_tdp fallback mode. Ignored when
                 RAPL or arm_biglittle is detected. Edit CPU_TDP_W in constants.py.
+            active_interval: Seconds between samples while a prompt is in
+                flight (e.g. 0.1), or None to always sample at sample_interval.
+            gpu_attribution: Also run `nvidia-smi pmon` and record the share
+                of each GPU's power used by Ollama processes.
         """
-        self.samples = deque(maxlen=window_size)
+        self._schedule = SampleScheduler(sample_interval, active_interval)
+        self.samples = SampleBuffer(window_size or window_samples(600, self._schedule))
         self.running = False
         self.sample_interval = sample_interval
         self.cpu_tdp_w = cpu_tdp_w
         self._lock = threading.Lock()
         self._stop_event = threading.Event()
         self.thread = threading.Thread(target=self._run, daemon=True)
+        self.gpu_attribution = gpu_attribution
+        # Per-GPU columns, one per (sample key, gpu index) seen so far:
+        # gpu_samples holds them, _gpu_columns maps each back to its key and
+        # index. Both are replaced, under _lock, when a new GPU appears.
+        self.gpu_samples = None
+        self._gpu_columns = []
+        self._pmon = None
+        # Cumulative RAPL energy (J), reported in rapl-mode samples.
+        self._rapl_total_j = 0.0
 
         # CPU mode detection: rapl > arm_biglittle > linear_tdp
         rapl_path = _detect_rapl_path()
@@ -225,29 +406,96 @@ class LinuxPowerMonitor:
         psutil.cpu_percent(percpu=True, interval=0.1)
 
     def _run(self):
+        schedule = self._schedule
         while self.running:
-            power = self.sample_once()
+            started = time.perf_counter()
+            power = schedule.sample(self.sample_once)
             if power:
+                ts = time.time()
                 with self._lock:
-                    self.samples.append((time.time(), power))
-            # threading.Event.wait wakes immediately when stop() sets the event,
-            # avoiding the up-to-1s sleep() latency of the old implementation.
-            self._stop_event.wait(timeout=self.sample_interval)
+                    self.samples.append((ts, power))
+                if GPU_POWER_KEY in power:
+                    self._append_gpu_sample(ts, power)
+            # The wait wakes immediately when stop() or begin_activity() fires,
+            # and subtracts the time spent sampling from the interval.
+            schedule.wait(started)
+
+    def _append_gpu_sample(self, ts: float, power: dict):
+        """
+        Record the per-GPU readings of one sample in gpu_samples.
+
+        dmon reports one GPU per line, so a sample can be taken before some
+        GPU's first reading has arrived. When a sample brings a GPU index
+        (or an attributed-power column) not seen before, the buffer is
+        rebuilt with the extra column; earlier samples read 0 W in it.
+        """
+        columns = {
+            (key, gpu)
+            for key in _GPU_KEYS
+            if isinstance(power.get(key), dict)
+            for gpu in power[key]
+        }
+        with self._lock:
+            if self.gpu_samples is None or not columns <= set(self._gpu_columns):
+                self._rebuild_gpu_samples(columns)
+            row = {
+                field: power.get(key, {}).get(gpu, 0.0)
+                for field, (key, gpu) in zip(
+                    self.gpu_samples.FIELDS, self._gpu_columns
+                )
+            }
+            self.gpu_samples.append((ts, row))
+
+    def _rebuild_gpu_samples(self, columns: set):
+        """Replace gpu_samples with a buffer that also has `columns` (lock held)."""
+        # New columns go after the existing ones, so the old column list is a
+        # prefix of the new one and gpu_breakdown() can pair either buffer
+        # with either list without taking the lock.
+        self._gpu_columns = self._gpu_columns + sorted(
+            columns - set(self._gpu_columns),
+            key=lambda column: (_GPU_KEYS.index(column[0]), column[1]),
+        )
+        old = self.gpu_samples
+        self.gpu_samples = SampleBuffer(
+            self.samples.maxlen,
+            fields=[f"{key}[{gpu}]" for key, gpu in self._gpu_columns],
+        )
+        if old is not None:
+            # Rows are keyed by field name; the new columns default to 0.0.
+            self.gpu_samples.extend(old)
+
+    def gpu_breakdown(self, start_ts: float, end_ts: float, edge_window: float) -> dict:
+        """
+        Average power per GPU over [start_ts, end_ts], integrated like the totals.
+
+        Returns:
+            {"gpu_power_by_index": {gpu: W}} plus, in gpu_attribution mode,
+            {"ollama_gpu_power_by_index": {gpu: W}}; {} when no per-GPU
+            samples cover the window. GPU indexes are strings so the dict
+            survives a JSON round trip unchanged.
+        """
+        gpu_samples, columns = self.gpu_samples, self._gpu_columns
+        if gpu_samples is None:
+            return {}
+        window = gpu_samples.integrate(start_ts, end_ts, edge_window)
+        if window is None:
+            return {}
+        out = {}
+        for (key, gpu), power_w in zip(columns, window.power_w.tolist()):
+            out.setdefault(key, {})[str(gpu)] = power_w
+        return out
 
     def _check_gpu(self) -> bool:
-        """Return True if nvidia-smi is available and reports a GPU. Cached after first check."""
+        """Return True if the GPU backend reports at least one GPU. Cached after first check."""
         if self._gpu_available is not None:
             return self._gpu_available
         try:
-            result = subprocess.check_output(
-                ["nvidia-smi", "-L"], stderr=subprocess.DEVNULL
-            ).decode().strip()
-            self._gpu_available = bool(result)
-        except (subprocess.CalledProcessError, FileNotFoundError, OSError):
+            self._gpu_available = get_gpu_backend().device_count() > 0
+        except Exception:
             self._gpu_available = False
-            if not self._gpu_unavailable_warned:
-                print("LinuxPowerMonitor: nvidia-smi not available — GPU power will be 0.0 W")
-                self._gpu_unavailable_warned = True
+        if not self._gpu_available and not self._gpu_unavailable_warned:
+            print("LinuxPowerMonitor: no NVIDIA GPU found — GPU power will be 0.0 W")
+            self._gpu_unavailable_warned = True
         return self._gpu_available
 
     def _sample_cpu_rapl(self) -> float:
@@ -256,7 +504,8 @@ class LinuxPowerMonitor:
 
         Reads energy_uj, computes delta since last call, divides by elapsed seconds.
         Returns 0.0 on the first call (no prior baseline) and on read errors.
-        Handles counter overflow via max_energy_range_uj.
+        Handles counter overflow via max_energy_range_uj. Adds each delta to
+        _rapl_total_j, the wrap-free cumulative energy reported in samples.
         """
         try:
             with open(self._rapl_path) as f:
@@ -275,6 +524,7 @@ class LinuxPowerMonitor:
                 delta_uj += max_range
             delta_s = ts - self._rapl_last_ts
             self._rapl_last_energy, self._rapl_last_ts = energy_uj, ts
+            self._rapl_total_j += delta_uj / 1_000_000.0
             return (delta_uj / 1_000_000.0) / delta_s if delta_s > 0 else 0.0
         except (OSError, ValueError):
             return 0.0
@@ -321,10 +571,12 @@ class LinuxPowerMonitor:
         Take a single power sample.
 
         CPU: dispatches to _sample_cpu_rapl, _sample_cpu_biglittle, or linear_tdp.
-        GPU: reads from NvidiaDmonReader if active, else falls back to per-call nvidia-smi.
+        GPU: reads from NvidiaDmonReader if active, else from the gpuBackend
+        (in-process NVML, or per-call nvidia-smi).
 
         Returns:
-            dict with keys cpu_power_w, gpu_power_w, combined_power_w,
+            dict with keys cpu_power_w, gpu_power_w, combined_power_w (plus
+            cpu_energy_j, the cumulative RAPL energy, in rapl mode),
             or None if sampling fails entirely.
         """
         try:
@@ -335,28 +587,28 @@ class LinuxPowerMonitor:
             else:
                 cpu_power_w = (psutil.cpu_percent(interval=None) / 100.0) * self.cpu_tdp_w
 
-            gpu_power_w = 0.0
+            by_gpu = {}
             if self._dmon is not None:
-                gpu_power_w = self._dmon.get_power()
+                by_gpu = self._dmon.get_power_by_gpu()
             elif self._check_gpu():
-                try:
-                    raw = subprocess.check_output(
-                        [
-                            "nvidia-smi",
-                            "--query-gpu=power.draw",
-                            "--format=csv,nounits,noheader",
-                        ],
-                        stderr=subprocess.DEVNULL,
-                    ).decode()
-                    gpu_power_w = _parse_nvidia_power(raw)
-                except (subprocess.CalledProcessError, FileNotFoundError, OSError):
-                    gpu_power_w = 0.0
-
-            return {
+                by_gpu = get_gpu_backend().power_by_gpu()
+            gpu_power_w = sum(by_gpu.values())
+
+            sample = {
                 "cpu_power_w": cpu_power_w,
                 "gpu_power_w": gpu_power_w,
                 "combined_power_w": cpu_power_w + gpu_power_w,
             }
+            if self._cpu_mode == "rapl":
+                sample[SampleBuffer.COUNTER_FIELD] = self._rapl_total_j
+            if by_gpu:
+                sample[GPU_POWER_KEY] = by_gpu
+                pmon = self._pmon
+                if pmon is not None:
+                    sample[OLLAMA_GPU_POWER_KEY] = attribute_gpu_power(
+                        by_gpu, pmon.get_utilization(), ollama_runner_pids()
+                    )
+            return sample
         except Exception as e:
             print(f"LinuxPowerMonitor: error sampling: {e}")
             return None
@@ -365,33 +617,77 @@ class LinuxPowerMonitor:
         """Start the background sampling thread and GPU dmon reader."""
         print("Starting Linux power monitor...")
         print(f"  CPU mode: {self._cpu_mode}")
-        try:
-            self._dmon = NvidiaDmonReader()
-            if self._dmon._failed:
-                print("  GPU: dmon unavailable, using per-call nvidia-smi fallback")
+        if get_gpu_backend().name == "nvml":
+            # NVML reads are in-process and current; dmon would only lag them.
+            self._dmon = None
+            print("  GPU: NVML backend active")
+        else:
+            try:
+                self._dmon = NvidiaDmonReader()
+                if self._dmon._failed:
+                    print("  GPU: dmon unavailable, using per-call nvidia-smi fallback")
+                    self._dmon = None
+                else:
+                    print("  GPU: nvidia-smi dmon streaming reader active")
+            except Exception:
                 self._dmon = None
+        if self.gpu_attribution and (self._dmon is not None or self._check_gpu()):
+            self._pmon = NvidiaPmonReader()
+            if self._pmon._failed:
+                print("  GPU: pmon unavailable, per-process attribution disabled")
+                self._pmon = None
             else:
-                print("  GPU: nvidia-smi dmon streaming reader active")
-        except Exception:
-            self._dmon = None
+                print("  GPU: nvidia-smi pmon per-process attribution active")
         self.running = True
         self.thread.start()
 
     def stop(self):
-        """Stop the background sampling thread and dmon reader."""
+        """Stop the background sampling thread and the dmon/pmon readers."""
         print("Stopping Linux power monitor...")
         self.running = False
         self._stop_event.set()
+        self._schedule.wake()
         self.thread.join()
         if self._dmon:
             self._dmon.stop()
             self._dmon = None
+        if self._pmon:
+            self._pmon.stop()
+            self._pmon = None
+
+    def begin_activity(self):
+        """Mark a prompt as in flight: sample at active_interval until it ends."""
+        self._schedule.begin_activity()
+
+    def end_activity(self):
+        """Mark a prompt as finished; idle sampling resumes once none remain."""
+        self._schedule.end_activity()
+
+    def status(self) -> dict:
+        """
+        Report the sampler's state, cadence and overhead.
+
+        Returns:
+            SampleScheduler.status() plus running, cpu_mode, buffered_samples,
+            gpus (indexes seen so far) and gpu_attribution (pmon active).
+        """
+        return {
+            "running": self.running,
+            "cpu_mode": self._cpu_mode,
+            "buffered_samples": len(self.samples),
+            "gpus": sorted({gpu for _, gpu in self._gpu_columns}),
+            "gpu_attribution": self._pmon is not None,
+            **self._schedule.status(),
+        }
 
     def get_range_average(self, start_ts: float, end_ts: float) -> "float | None":
         """
-        Compute the average combined power (W) for samples in [start_ts, end_ts].
+        Compute the time-weighted average combined power (W) for samples in
+        [start_ts, end_ts].
 
-        Thread-safe: takes a snapshot of self.samples under self._lock before filtering.
+        Two binary searches and one difference of the buffer's running
+        energy, so the cost does not grow with the range; SampleBuffer takes
+        its own lock for the read.
 
         Args:
             start_ts: Unix timestamp for the start of the range.
@@ -400,7 +696,8 @@ class LinuxPowerMonitor:
         Returns:
             Average combined_power_w as a float, or None if no samples found.
         """
-        with self._lock:
-            snapshot = list(self.samples)
-        relevant = [s["combined_power_w"] for ts, s in snapshot if start_ts <= ts <= end_ts]
-        return sum(relevant) / len(relevant) if relevant else None
+        buf = as_sample_buffer(self.samples, self._lock)
+        avg = buf.range_average(start_ts, end_ts)
+        if avg is None:
+            return None
+        return float(avg[SampleBuffer.COMBINED])
@@ -1,9 +1,16 @@
 """
 samplerMac.py — Continuous macOS power sampling via powermetrics.
 
-Provides PowerMonitor, a daemon thread that calls `sudo powermetrics` every
-second and maintains a 10-minute ring buffer of CPU/GPU/combined power
-readings.
+Provides PowerMonitor, which keeps a 10-minute samplerCommon.SampleBuffer of
+CPU/GPU/combined power readings from powermetrics. With an active_interval it
+samples faster while a prompt is in flight (see samplerCommon.SampleScheduler).
+
+Sampling uses one long-running `sudo -n powermetrics -i <ms>` process
+(PowermetricsStreamReader) whose output a daemon thread parses line by line,
+the way samplerLinux.NvidiaDmonReader reads `nvidia-smi dmon`. There is no
+sudo/powermetrics startup per sample and no extra sleep between samples, so
+the rate is exactly the -i interval. If the stream cannot be started, or
+exits, PowerMonitor falls back to forking `powermetrics -n 1` per sample.
 
 powermetrics requires root, but the greenprompt process itself does NOT need
 to run as root. Instead, configure passwordless sudo for powermetrics once:
@@ -18,10 +25,16 @@ This module is macOS-only. For Linux/Windows, see samplerLinux.py and
 docs/platform-support.md.
 """
 
-from collections import deque
+import re
 import threading
 import time
 import subprocess
+from greenprompt.samplerCommon import (
+    SampleBuffer,
+    SampleScheduler,
+    as_sample_buffer,
+    window_samples,
+)
 from greenprompt.sysUsage import parse_powermetrics_output
 
 _SUDOERS_HINT = (
@@ -46,52 +59,221 @@ def _check_powermetrics_sudo() -> bool:
         return False
 
 
+# One line of `powermetrics --samplers cpu_power` output, e.g.
+# "CPU Power: 1234 mW" or "Combined Power (CPU + GPU + ANE): 1500 mW".
+_POWER_LINE_RE = re.compile(r"(CPU|GPU|Combined) Power[^:]*:\s+([\d.]+)\s+mW")
+# Every sample block starts with this line.
+_SAMPLE_HEADER = "*** Sampled system activity"
+
+
+class PowermetricsStreamParser:
+    """
+    Incremental parser for streamed `powermetrics --samplers cpu_power` text.
+
+    feed() takes one line at a time and returns a sample dict (cpu_power_w,
+    gpu_power_w, combined_power_w) when a block is complete: at its
+    "Combined Power" line, or at the next block header for output that has
+    none (Intel Macs). Lines without "Power" are rejected with a substring
+    test before any regex runs, so most of a block costs almost nothing.
+    """
+
+    def __init__(self):
+        self._current = {}
+
+    def feed(self, line: str) -> "dict | None":
+        if line.startswith(_SAMPLE_HEADER):
+            return self._finish()
+        if "Power" not in line:
+            return None
+        match = _POWER_LINE_RE.match(line)
+        if match is None:
+            return None
+        self._current[match.group(1)] = float(match.group(2)) / 1000
+        return self._finish() if match.group(1) == "Combined" else None
+
+    def _finish(self) -> "dict | None":
+        current, self._current = self._current, {}
+        if not current:
+            return None
+        cpu = current.get("CPU", 0.0)
+        gpu = current.get("GPU", 0.0)
+        return {
+            "cpu_power_w": cpu,
+            "gpu_power_w": gpu,
+            "combined_power_w": current.get("Combined", cpu + gpu),
+        }
+
+
+class PowermetricsStreamReader:
+    """
+    Wraps a single long-running `sudo -n powermetrics` process.
+
+    A daemon thread reads its stdout, feeds each line to a
+    PowermetricsStreamParser and passes every completed sample to
+    `on_sample(sample)`. The thread's CPU time per sample (reading, parsing
+    and the callback) is charged to `schedule` when one is given.
+    `on_exit()` is called if the process ends — e.g. sudo refused, or
+    powermetrics was killed — so the owner can fall back to polling.
+    """
+
+    def __init__(self, interval_s, on_sample, schedule=None, on_exit=None):
+        self._on_sample = on_sample
+        self._on_exit = on_exit
+        self._schedule = schedule
+        self._stopping = False
+        self._failed = False
+        self._proc = None
+        try:
+            self._proc = subprocess.Popen(
+                [
+                    "sudo",
+                    "-n",
+                    "powermetrics",
+                    "--samplers",
+                    "cpu_power",
+                    "-i",
+                    str(max(1, int(interval_s * 1000))),
+                ],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                text=True,
+                bufsize=1,
+            )
+            self._thread = threading.Thread(target=self._read_loop, daemon=True)
+            self._thread.start()
+        except (FileNotFoundError, OSError):
+            self._failed = True
+
+    def _read_loop(self):
+        parser = PowermetricsStreamParser()
+        cpu0 = time.thread_time()
+        for line in self._proc.stdout:
+            sample = parser.feed(line)
+            if sample is None:
+                continue
+            self._on_sample(sample)
+            cpu = time.thread_time()
+            if self._schedule is not None:
+                self._schedule.charge(cpu - cpu0)
+            cpu0 = cpu
+        if self._on_exit and not self._stopping:
+            self._on_exit()
+
+    def stop(self):
+        """Terminate powermetrics. The reader thread exits at end of stream."""
+        self._stopping = True
+        if self._proc:
+            self._proc.terminate()
+            try:
+                self._proc.wait(timeout=2)
+            except subprocess.TimeoutExpired:
+                self._proc.kill()
+
+
 class PowerMonitor:
     """
-    Background daemon thread that samples macOS CPU/GPU power every second.
+    Samples macOS CPU/GPU power every second from a powermetrics stream.
 
-    Maintains a fixed-size deque of (timestamp, sample_dict) tuples covering
-    the last `window_size` seconds. Callers filter by timestamp range to
-    compute average power and energy for any time interval within the window.
+    Maintains a fixed-size SampleBuffer covering the last `window_size`
+    samples. measure_power_mac() integrates it over any time interval within
+    the window using binary-search lookups.
+
+    Sampling is fixed-rate at sample_interval unless active_interval is
+    given, in which case begin_activity()/end_activity() (called by
+    core.run_prompt around each prompt) switch between the two rates. The
+    powermetrics stream runs at the faster rate throughout; while idle,
+    consecutive readings are averaged into one sample per sample_interval,
+    so the buffer fills at the idle rate and no energy is dropped.
 
     Usage:
-        monitor = PowerMonitor()
+        monitor = PowerMonitor(active_interval=0.1)
         monitor.start()
         # ... run workload ...
         # Use sysUsage.measure_power_mac(start, end, monitor) to get metrics.
         monitor.stop()
 
     Attributes:
-        samples: deque of (float timestamp, dict{cpu_power_w, gpu_power_w,
-            combined_power_w}) tuples.
+        samples: SampleBuffer of (float timestamp, dict{cpu_power_w,
+            gpu_power_w, combined_power_w}) samples.
         running: bool, True while the background thread is active.
     """
-    def __init__(self, sample_interval=1, window_size=600):  # store 10 minutes
-        self.samples = deque(maxlen=window_size)
+    def __init__(self, sample_interval=1, window_size=None, active_interval=None):
+        # window_size defaults to 10 minutes at the fastest sampling rate
+        self._schedule = SampleScheduler(sample_interval, active_interval)
+        self.samples = SampleBuffer(window_size or window_samples(600, self._schedule))
         self.running = False
         self.sample_interval = sample_interval
         self.thread = threading.Thread(target=self._run, daemon=True)
         self._sudo_ok = None  # checked lazily on first start()
+        self._stream = None
+        self._source_lock = threading.Lock()  # guards _stream / fallback start
+        self._pending = None  # idle readings not yet folded into a sample
+        self._fold = max(1, round(sample_interval / self._schedule.min_interval))
 
     def _run(self):
+        schedule = self._schedule
         while self.running:
-            power = self.sample_once()
+            started = time.perf_counter()
+            power = schedule.sample(self.sample_once)
             if power:
                 self.samples.append((time.time(), power))
-            time.sleep(self.sample_interval)
+            schedule.wait(started)
+
+    def _on_stream_sample(self, sample):
+        """
+        Store one streamed reading; called on the reader thread.
+
+        While a prompt is in flight (or when sampling is fixed-rate) every
+        reading is stored. While idle, readings are summed until `_fold` of
+        them cover one sample_interval, and their mean is stored.
+        """
+        now = time.time()
+        schedule = self._schedule
+        if self._fold == 1 or schedule.active:
+            self._flush_pending()
+            self.samples.append((now, sample))
+            return
+        if self._pending is None:
+            self._pending = {"n": 0, **dict.fromkeys(SampleBuffer.FIELDS, 0.0)}
+        pending = self._pending
+        pending["n"] += 1
+        pending["ts"] = now
+        for field in SampleBuffer.FIELDS:
+            pending[field] += sample[field]
+        if pending["n"] >= self._fold:
+            self._flush_pending()
+
+    def _flush_pending(self):
+        pending, self._pending = self._pending, None
+        if pending:
+            n = pending["n"]
+            self.samples.append(
+                (pending["ts"], {f: pending[f] / n for f in SampleBuffer.FIELDS})
+            )
+
+    def _on_stream_exit(self):
+        """The powermetrics stream ended unexpectedly: poll instead."""
+        with self._source_lock:
+            self._stream = None
+            if self.running and self.thread.ident is None:
+                print("Warning: powermetrics stream ended; falling back to polling")
+                self.thread.start()
 
     def sample_once(self):
         """
         Take a single powermetrics sample and return parsed power values.
 
-        Runs `sudo powermetrics --samplers cpu_power -n 1 -i 1000` as a
-        subprocess (1-second interval, 1 sample). Parses the output with
-        parse_powermetrics_output().
+        Used by the polling fallback (_run) when the stream is unavailable.
+
+        Runs `sudo powermetrics --samplers cpu_power -n 1 -i <ms>` as a
+        subprocess (one sample over the current sampling interval). Parses
+        the output with parse_powermetrics_output().
 
         Returns:
             dict with keys cpu_power_w, gpu_power_w, combined_power_w,
             or None if the subprocess fails.
         """
+        interval = self._schedule.interval
         try:
             out = subprocess.check_output(
                 [
@@ -102,11 +284,11 @@ class PowerMonitor:
                     "-n",
                     "1",
                     "-i",
-                    "1000",
+                    str(max(1, int(interval * 1000))),
                 ],
                 stderr=subprocess.DEVNULL,
             ).decode()
-            parsed = parse_powermetrics_output(out, 1)  # use 1 second sample duration
+            parsed = parse_powermetrics_output(out, interval)
             return {
                 "combined_power_w": parsed["combined_power_w"],
                 "cpu_power_w": parsed["cpu_power_w"],
@@ -122,16 +304,59 @@ class PowerMonitor:
             print(f"Warning: {_SUDOERS_HINT}")
         print("Starting power monitor...")
         self.running = True
-        self.thread.start()
+        # Held while choosing a source so a stream that exits at once (e.g.
+        # sudo refused) cannot start the fallback before we are done here.
+        with self._source_lock:
+            if self._sudo_ok:
+                stream = PowermetricsStreamReader(
+                    self._schedule.min_interval,
+                    self._on_stream_sample,
+                    schedule=self._schedule,
+                    on_exit=self._on_stream_exit,
+                )
+                self._stream = None if stream._failed else stream
+            if self._stream is not None:
+                print("  powermetrics streaming reader active")
+            else:
+                self.thread.start()
 
     def stop(self):
         print("Stopping power monitor...")
         self.running = False
-        self.thread.join()
+        if self._stream is not None:
+            self._stream.stop()
+            self._stream = None
+        self._schedule.wake()
+        if self.thread.ident is not None:
+            self.thread.join()
+
+    def begin_activity(self):
+        """Mark a prompt as in flight: sample at active_interval until it ends."""
+        self._schedule.begin_activity()
+
+    def end_activity(self):
+        """Mark a prompt as finished; idle sampling resumes once none remain."""
+        self._schedule.end_activity()
+
+    def status(self):
+        """
+        Report the sampler's state, cadence and overhead.
+
+        Returns:
+            SampleScheduler.status() plus running, buffered_samples and
+            source ("stream" or "poll").
+        """
+        return {
+            "running": self.running,
+            "source": "stream" if self._stream is not None else "poll",
+            "buffered_samples": len(self.samples),
+            **self._schedule.status(),
+        }
 
     def get_range_average(self, start_ts, end_ts):
         """
-        Compute the average combined power (W) for samples in [start_ts, end_ts].
+        Compute the time-weighted average combined power (W) for samples in
+        [start_ts, end_ts], from the buffer's running energy.
 
         Args:
             start_ts: Unix timestamp (float) for the start of the range.
@@ -140,8 +365,7 @@ class PowerMonitor:
         Returns:
             Average combined_power_w as a float, or None if no samples found.
         """
-        relevant = [s for ts, s in self.samples if start_ts <= ts <= end_ts]
-        if not relevant:
+        avg = as_sample_buffer(self.samples).range_average(start_ts, end_ts)
+        if avg is None:
             return None
-        combined = [r["combined_power_w"] for r in relevant]
-        return sum(combined) / len(combined)
+        return float(avg[SampleBuffer.COMBINED])
@@ -14,172 +14,232 @@ Decomposition, Positive/Negative Examples, Iterative Refinement, Creativity
 Control, Tone & Style, Error Prevention, Evaluation & Validation, Sensitivity
 & Inclusivity, Efficiency & Sustainability, Energy Awareness, Keyword Richness.
 
+Each prompt is tokenized and POS-tagged once per text form (the raw prompt
+and its normalized, lower-cased form, which are the same object when the
+prompt is already normalized); every dimension reads from that shared
+analysis. Each dimension's regex alternatives are compiled once, at import,
+into a single pattern. The has_*/get_verbs helpers remain for callers that
+want one check on its own.
+
+Importing this module does no I/O: the NLTK data it needs is downloaded by
+`greenprompt setup`, and NLTK loads it on the first score. Without it,
+scoring raises NLTK's LookupError naming the missing resource.
+
 See docs/prompt-scoring.md for a full reference with examples.
 """
 
 import re
+from functools import lru_cache
+
 import nltk
 from nltk.corpus import stopwords
 
-nltk.download("punkt", quiet=True)
-nltk.download("averaged_perceptron_tagger", quiet=True)
-nltk.download("wordnet", quiet=True)
-nltk.download("stopwords", quiet=True)
+#: Identifies the scoring rules. Bump it whenever a change can alter a
+#: score, so scores cached by scoreCache under the old rules are not reused.
+SCORER_VERSION = "1"
 
 
 def normalize(text):
     return re.sub(r"\s+", " ", text.lower()).strip()
 
 
-def get_verbs(text):
-    tokens = nltk.word_tokenize(text)
-    pos_tags = nltk.pos_tag(tokens)
-    return [word for word, tag in pos_tags if tag.startswith("VB")]
+def _pattern(*alternatives):
+    """Compile regex alternatives into one case-insensitive pattern."""
+    return re.compile("|".join(f"(?:{a})" for a in alternatives), re.I)
+
+
+ROLE = _pattern(r"you are (an?|the)?\s?\w+", r"pretend to be", r"act as", r"role:")
+CONTEXT = _pattern(r"context:", r"background:", r"for\s+\w+", r"audience:")
+FORMAT = _pattern(
+    r"format:", r"output as", r"provide.*(table|bullets|list|json|csv|markdown)"
+)
+# Inline or few-shot examples
+EXAMPLES = _pattern(
+    r"example:", r"Q:", r"A:", r"sample output", r"for instance", r"e\.g\."
+)
+# Sequences: "First ... Then ..." or stepwise instructions
+DECOMPOSITION = _pattern(r"first.*then", r"step [0-9]")
+# Inclusion/exclusion rules
+INCLUSION = _pattern(r"do not|exclude|not include|except")
+ITERATIVE = _pattern(r"revise|improve|refine|rewrite|repeat")
+CREATIVITY = _pattern(r"creative|imaginative|unusual|original|unique|be bold|inventive")
+TONE = _pattern(
+    r"tone:|style:|use a .+ tone|in a .+ style|formal|casual|friendly|professional|humorous|serious"
+)
+ERROR_PREVENTION = _pattern(
+    r"do not guess|only answer if sure|if unsure, say so|if you do not know"
+)
+VALIDATION = _pattern(
+    r"double-check|verify|validate|ensure accuracy|cross-check|review your answer"
+)
+INCLUSIVITY = _pattern(r"inclusive|respectful|avoid bias|unbiased|sensitive to")
+BREVITY = _pattern(
+    r"concise|briefly|short answer|max \d+ words|minimize tokens|eco-friendly|efficient"
+)
+ENERGY = _pattern(r"energy usage|carbon|footprint|sustainable|green|efficient")
+
+# Strong action verbs for tasks
+CORE_VERBS = frozenset(
+    [
+        "summarize",
+        "list",
+        "explain",
+        "describe",
+        "define",
+        "compare",
+        "generate",
+        "analyze",
+        "write",
+        "compose",
+        "translate",
+        "solve",
+        "classify",
+        "extract",
+        "categorize",
+        "review",
+        "evaluate",
+    ]
+)
+
+FILLERS = (
+    "could you",
+    "please",
+    "would you mind",
+    "kindly",
+    "if possible",
+    "try to",
+    "attempt to",
+    "please try",
+    "just",
+    "simply",
+    "I would like you to",
+    "I want you to",
+    "can you",
+    "could you",
+)
+
+# Dimensions worth 2 points when their pattern matches the normalized prompt,
+# in the order they appear in score_details.
+PATTERN_DIMENSIONS = (
+    ("Examples & Few-Shot", EXAMPLES),
+    ("Task Decomposition", DECOMPOSITION),
+    ("Positive/Negative Examples", INCLUSION),
+    ("Iterative Refinement", ITERATIVE),
+    ("Creativity Control", CREATIVITY),
+    ("Tone & Style", TONE),
+    ("Error Prevention", ERROR_PREVENTION),
+    ("Evaluation & Validation", VALIDATION),
+    ("Sensitivity & Inclusivity", INCLUSIVITY),
+    ("Efficiency & Sustainability", BREVITY),
+    ("Energy Awareness", ENERGY),
+)
+
+
+#: Dimension names in the order score_prompt() reports them.
+DIMENSIONS = (
+    (
+        "RTCF Structure",
+        "Clarity & Specificity",
+        "Conciseness",
+        "Contextual Priming",
+        "Output Specification",
+        "Instructional Tone",
+    )
+    + tuple(dimension for dimension, _ in PATTERN_DIMENSIONS)
+    + ("Keyword Richness",)
+)
 
 
-def count_unique_keywords(text):
-    stop_words = set(stopwords.words("english"))
-    words = nltk.word_tokenize(text)
+@lru_cache(maxsize=1)
+def _stop_words():
+    return frozenset(stopwords.words("english"))
+
+
+def _tag(text):
+    return nltk.pos_tag(nltk.word_tokenize(text))
+
+
+def _verbs(tagged):
+    return [word for word, tag in tagged if tag.startswith("VB")]
+
+
+def _has_task_verb(verbs):
+    return any(v.lower() in CORE_VERBS for v in verbs)
+
+
+def _unique_keywords(words):
+    stop_words = _stop_words()
     return len(
-        set([w.lower() for w in words if w.lower() not in stop_words and w.isalpha()])
+        {w.lower() for w in words if w.lower() not in stop_words and w.isalpha()}
     )
 
 
+def get_verbs(text):
+    return _verbs(_tag(text))
+
+
+def count_unique_keywords(text):
+    return _unique_keywords(nltk.word_tokenize(text))
+
+
 def has_explicit_role(text):
-    patterns = [r"you are (an?|the)?\s?\w+", r"pretend to be", r"act as", r"role:"]
-    return any(re.search(p, text, re.I) for p in patterns)
+    return bool(ROLE.search(text))
 
 
 def has_explicit_task(text):
-    verbs = get_verbs(text)
-    # Strong action verbs for tasks
-    core_verbs = set(
-        [
-            "summarize",
-            "list",
-            "explain",
-            "describe",
-            "define",
-            "compare",
-            "generate",
-            "analyze",
-            "write",
-            "compose",
-            "translate",
-            "solve",
-            "classify",
-            "extract",
-            "categorize",
-            "review",
-            "evaluate",
-        ]
-    )
-    return any(v.lower() in core_verbs for v in verbs)
+    return _has_task_verb(get_verbs(text))
 
 
 def has_context(text):
-    patterns = [r"context:", r"background:", r"for\s+\w+", r"audience:"]
-    return any(re.search(p, text, re.I) for p in patterns)
+    return bool(CONTEXT.search(text))
 
 
 def has_format(text):
-    patterns = [
-        r"format:",
-        r"output as",
-        r"provide.*(table|bullets|list|json|csv|markdown)",
-    ]
-    return any(re.search(p, text, re.I) for p in patterns)
+    return bool(FORMAT.search(text))
 
 
 def has_examples(text):
-    # Detect inline or few-shot examples
-    patterns = [r"example:", r"Q:", r"A:", r"sample output", r"for instance", r"e\.g\."]
-    return any(re.search(p, text, re.I) for p in patterns)
+    return bool(EXAMPLES.search(text))
 
 
 def has_task_decomposition(text):
-    # Look for sequences: "First ... Then ..." or stepwise instructions
-    return bool(
-        re.search(r"first.*then", text, re.I) or re.search(r"step [0-9]", text, re.I)
-    )
+    return bool(DECOMPOSITION.search(text))
 
 
 def positive_negative_examples(text):
-    # Look for inclusion/exclusion rules
-    return bool(re.search(r"(do not|exclude|not include|except)", text, re.I))
+    return bool(INCLUSION.search(text))
 
 
 def iterative_refinement(text):
-    # Look for iterative wording
-    return bool(re.search(r"(revise|improve|refine|rewrite|repeat)", text, re.I))
+    return bool(ITERATIVE.search(text))
 
 
 def creativity_control(text):
-    # Look for explicit creativity control or style cues
-    return bool(
-        re.search(
-            r"(creative|imaginative|unusual|original|unique|be bold|inventive)",
-            text,
-            re.I,
-        )
-    )
+    return bool(CREATIVITY.search(text))
 
 
 def tone_style(text):
-    # Look for tone or style specifications
-    return bool(
-        re.search(
-            r"(tone:|style:|use a .+ tone|in a .+ style|formal|casual|friendly|professional|humorous|serious)",
-            text,
-            re.I,
-        )
-    )
+    return bool(TONE.search(text))
 
 
 def error_prevention(text):
-    return bool(
-        re.search(
-            r"(do not guess|only answer if sure|if unsure, say so|if you do not know)",
-            text,
-            re.I,
-        )
-    )
+    return bool(ERROR_PREVENTION.search(text))
 
 
 def eval_validation(text):
-    return bool(
-        re.search(
-            r"(double-check|verify|validate|ensure accuracy|cross-check|review your answer)",
-            text,
-            re.I,
-        )
-    )
+    return bool(VALIDATION.search(text))
 
 
 def sensitivity_inclusivity(text):
-    return bool(
-        re.search(
-            r"(inclusive|respectful|avoid bias|unbiased|sensitive to)", text, re.I
-        )
-    )
+    return bool(INCLUSIVITY.search(text))
 
 
 def brevity_eco(text):
-    return bool(
-        re.search(
-            r"(concise|briefly|short answer|max \d+ words|minimize tokens|eco-friendly|efficient)",
-            text,
-            re.I,
-        )
-    )
+    return bool(BREVITY.search(text))
 
 
 def energy_awareness(text):
-    return bool(
-        re.search(
-            r"(energy usage|carbon|footprint|sustainable|green|efficient)", text, re.I
-        )
-    )
+    return bool(ENERGY.search(text))
 
 
 def score_prompt(prompt):
@@ -200,98 +260,47 @@ def score_prompt(prompt):
             details (dict): Per-dimension scores keyed by dimension name.
     """
     prompt_norm = normalize(prompt)
+    # Task verbs are read from the normalized text, instructional tone and
+    # keywords from the raw prompt; case changes the tags, so both are kept.
+    tagged_norm = _tag(prompt_norm)
+    tagged = tagged_norm if prompt == prompt_norm else _tag(prompt)
+    has_task = _has_task_verb(_verbs(tagged_norm))
+    context = has_context(prompt_norm)
+    output_format = has_format(prompt_norm)
     score_details = {}
 
     # RTCF Structure
     score_details["RTCF Structure"] = (
         int(has_explicit_role(prompt_norm))
-        + int(has_explicit_task(prompt_norm))
-        + int(has_context(prompt_norm))
-        + int(has_format(prompt_norm))
+        + int(has_task)
+        + int(context)
+        + int(output_format)
     )
 
     # Clarity & Specificity
     score_details["Clarity & Specificity"] = (
-        5
-        if has_explicit_task(prompt_norm) and len(prompt) < 400
-        else 3
-        if has_explicit_task(prompt_norm)
-        else 0
+        5 if has_task and len(prompt) < 400 else 3 if has_task else 0
     )
 
     # Conciseness
-    fillers = [
-        "could you",
-        "please",
-        "would you mind",
-        "kindly",
-        "if possible",
-        "try to",
-        "attempt to",
-        "please try",
-        "just",
-        "simply",
-        "I would like you to",
-        "I want you to",
-        "can you",
-        "could you",
-    ]
-    filler_count = sum(prompt_norm.count(f) for f in fillers)
+    filler_count = sum(prompt_norm.count(f) for f in FILLERS)
     score_details["Conciseness"] = 5 - min(filler_count, 5)
 
     # Contextual Priming
-    score_details["Contextual Priming"] = 3 if has_context(prompt_norm) else 0
+    score_details["Contextual Priming"] = 3 if context else 0
 
     # Output Specification
-    score_details["Output Specification"] = 5 if has_format(prompt_norm) else 0
+    score_details["Output Specification"] = 5 if output_format else 0
 
     # Instructional Tone
-    instr_verbs = get_verbs(prompt)
-    score_details["Instructional Tone"] = 3 if len(instr_verbs) > 0 else 0
-
-    # Examples & Few-Shot Learning
-    score_details["Examples & Few-Shot"] = 2 if has_examples(prompt_norm) else 0
-
-    # Task Decomposition
-    score_details["Task Decomposition"] = (
-        2 if has_task_decomposition(prompt_norm) else 0
-    )
-
-    # Positive & Negative Examples
-    score_details["Positive/Negative Examples"] = (
-        2 if positive_negative_examples(prompt_norm) else 0
-    )
-
-    # Iterative Refinement
-    score_details["Iterative Refinement"] = (
-        2 if iterative_refinement(prompt_norm) else 0
-    )
-
-    # Creativity Control
-    score_details["Creativity Control"] = 2 if creativity_control(prompt_norm) else 0
-
-    # Tone & Style Consistency
-    score_details["Tone & Style"] = 2 if tone_style(prompt_norm) else 0
-
-    # Error Prevention
-    score_details["Error Prevention"] = 2 if error_prevention(prompt_norm) else 0
-
-    # Evaluation & Validation
-    score_details["Evaluation & Validation"] = 2 if eval_validation(prompt_norm) else 0
-
-    # Sensitivity & Inclusivity
-    score_details["Sensitivity & Inclusivity"] = (
-        2 if sensitivity_inclusivity(prompt_norm) else 0
-    )
-
-    # Efficiency & Sustainability
-    score_details["Efficiency & Sustainability"] = 2 if brevity_eco(prompt_norm) else 0
+    score_details["Instructional Tone"] = 3 if _verbs(tagged) else 0
 
-    # Energy Awareness
-    score_details["Energy Awareness"] = 2 if energy_awareness(prompt_norm) else 0
+    # Examples through Energy Awareness: 2 points each on a pattern match
+    for dimension, pattern in PATTERN_DIMENSIONS:
+        score_details[dimension] = 2 if pattern.search(prompt_norm) else 0
 
     # Keyword Richness (bonus: how many non-stopword, non-filler unique tokens)
-    kw_count = count_unique_keywords(prompt)
+    kw_count = _unique_keywords(word for word, _ in tagged)
     score_details["Keyword Richness"] = (
         2 if kw_count >= 5 else 1 if kw_count >= 2 else 0
     )
@@ -0,0 +1,125 @@
+"""
+scoreBatch.py — Score large prompt collections across worker processes.
+
+score_prompt() handles one string at a time and spends most of it in NLTK's
+tokenizer and POS tagger, which hold the GIL — threads do not help. For
+prompt libraries of hundreds of thousands of entries, score_prompts() cuts
+the input into chunks of CHUNK_SIZE and sends them to a process pool:
+
+    - Each worker loads NLTK's models once (the pool initializer scores a
+      throwaway prompt) and keeps them for every chunk it handles.
+    - The input is read lazily and at most two chunks per worker are in
+      flight, so memory stays flat however long the input is.
+    - Results come back in input order, one dict per prompt, so callers can
+      stream them to stdout or a file while the rest is still scoring.
+    - Workers are spawned, not forked: a fork of a threaded process (the
+      API server, a monitor's sampler thread) can copy a held lock into the
+      child and hang it.
+
+`greenprompt score --file prompts.jsonl` is the command-line front end.
+"""
+
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from greenprompt.scoreBasic import score_prompt
+
+#: Prompts sent to a worker at a time; amortizes the pickling round trip.
+CHUNK_SIZE = 64
+
+
+def score_prompts(prompts, workers=None, chunk_size=CHUNK_SIZE):
+    """
+    Score prompts in a pool of worker processes.
+
+    Args:
+        prompts: Iterable of prompt strings or dicts with "prompt" and
+            optionally "id" (echoed back). Consumed lazily.
+        workers: Worker processes; defaults to os.cpu_count(). 1 or less
+            scores in this process.
+        chunk_size: Prompts per task sent to a worker.
+
+    Yields:
+        One dict per prompt, in input order: the score_prompt() result plus
+        "index", "prompt" and "id" when given — or {"index", "id",
+        "prompt", "error"} if that prompt could not be scored.
+
+    Closing the generator early cancels chunks that have not started.
+    """
+    workers = (os.cpu_count() or 1) if workers is None else int(workers)
+    chunks = _chunks(enumerate(prompts), max(1, int(chunk_size)))
+    if workers <= 1:
+        for chunk in chunks:
+            yield from _merge(chunk, _score_chunk([p for _, p, _ in chunk]))
+        return
+
+    pool = ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+    )
+
+    def submit(chunk):
+        pending.append((chunk, pool.submit(_score_chunk, [p for _, p, _ in chunk])))
+
+    pending = deque()
+    try:
+        for chunk in islice(chunks, 2 * workers):
+            submit(chunk)
+        while pending:
+            chunk, future = pending.popleft()
+            results = future.result()
+            for chunk_next in islice(chunks, 1):
+                submit(chunk_next)
+            yield from _merge(chunk, results)
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def _chunks(items, size):
+    """Group (index, item) pairs into lists of (index, prompt, id)."""
+    while True:
+        chunk = [(index, *_unpack(item)) for index, item in islice(items, size)]
+        if not chunk:
+            return
+        yield chunk
+
+
+def _unpack(item):
+    """(prompt, id) for a prompt string or {"prompt", "id"} dict."""
+    if isinstance(item, dict):
+        return item.get("prompt"), item.get("id")
+    return item, None
+
+
+def _merge(chunk, results):
+    for (index, prompt, item_id), result in zip(chunk, results):
+        tag = {"index": index}
+        if item_id is not None:
+            tag["id"] = item_id
+        yield {**tag, "prompt": prompt, **result}
+
+
+def _score_chunk(prompts):
+    """Score one chunk; runs in a worker process."""
+    results = []
+    for prompt in prompts:
+        if not isinstance(prompt, str) or not prompt:
+            results.append({"error": "prompt is required"})
+            continue
+        try:
+            results.append(score_prompt(prompt))
+        except Exception as e:
+            results.append({"error": str(e)})
+    return results
+
+
+def _init_worker():
+    """Load NLTK's tokenizer, tagger and stopwords before the first chunk."""
+    try:
+        score_prompt("Explain how workers load the tagger.")
+    except Exception:
+        pass  # reported per prompt by _score_chunk
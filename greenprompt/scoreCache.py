@@ -0,0 +1,129 @@
+"""
+scoreCache.py — Memoized prompt scores for the prompt endpoints.
+
+The same system prompts and templates reach /api/prompt over and over, and
+each time scoreBasic.score_prompt() re-runs NLTK's tokenizer and tagger.
+ScoreCache keeps recent results in an in-memory LRU of SCORE_CACHE_SIZE
+entries, backed by the score_cache table in the usage database so a
+restarted server starts warm (tieredCache.TieredCache):
+
+    memory hit  — return the stored result; no scoring, no database access.
+    stored hit  — read it from score_cache and keep it in memory.
+    miss        — score, time it, store it in both.
+
+Entries are keyed by a SHA-256 of scoreBasic.SCORER_VERSION and the exact
+prompt text. The raw text, not the normalized one, is hashed because some
+dimensions read it (Instructional Tone and Keyword Richness tag the prompt
+as written, Clarity uses its length), so two prompts that normalize alike
+can still score differently.
+
+score_prompt() here is a drop-in for scoreBasic.score_prompt(). stats()
+reports hits, misses, hit rate and the scoring time saved, as measured when
+each hit entry was first scored; GET /api/scores/cache serves it.
+
+Database errors never fail a prompt: the cache degrades to memory only.
+"""
+
+import hashlib
+import threading
+import time
+
+from greenprompt import constants, dbconn, scoreBasic
+from greenprompt.tieredCache import TieredCache
+
+#: Rows kept in score_cache; the oldest beyond this are pruned.
+MAX_STORED = 100_000
+
+#: Stores between prunes of the score_cache table.
+PRUNE_EVERY = 1000
+
+
+def cache_key(prompt):
+    """Hex SHA-256 of the scorer version and the prompt text."""
+    return hashlib.sha256(
+        f"{scoreBasic.SCORER_VERSION}\n{prompt}".encode("utf-8")
+    ).hexdigest()
+
+
+def _copy(result):
+    # Callers get their own dicts; the cached one is never handed out.
+    return {**result, "details": dict(result.get("details", {}))}
+
+
+class ScoreCache(TieredCache):
+    """
+    Thread-safe LRU of score_prompt() results, persisted in the usage DB.
+
+    Usage:
+        cache = ScoreCache()
+        result = cache.score(prompt)
+        cache.stats()
+    """
+
+    what = "prompt score"
+
+    def __init__(self, max_size=None):
+        super().__init__(constants.SCORE_CACHE_SIZE if max_size is None else max_size)
+        self.time_saved_s = 0.0
+
+    def score(self, prompt):
+        """Return scoreBasic.score_prompt(prompt), from the cache when possible."""
+        if self.max_size <= 0:
+            return scoreBasic.score_prompt(prompt)
+        key = cache_key(prompt)
+        entry = self.lookup(key)
+        if entry is not None:
+            return _copy(entry[0])
+
+        started = time.perf_counter()
+        result = scoreBasic.score_prompt(prompt)
+        cost = time.perf_counter() - started
+        self.insert(key, (_copy(result), cost))
+        return result
+
+    def stats(self):
+        """Hit/miss counters, hit rate and seconds of scoring avoided."""
+        with self._lock:
+            return {
+                "enabled": self.max_size > 0,
+                **self._counts(),
+                "time_saved_s": round(self.time_saved_s, 6),
+                "scorer_version": scoreBasic.SCORER_VERSION,
+            }
+
+    def clear(self):
+        """Forget the in-memory entries and counters (the table is kept)."""
+        super().clear()
+        with self._lock:
+            self.time_saved_s = 0.0
+
+    def _on_hit(self, entry):
+        self.time_saved_s += entry[1]
+
+    def _load(self, key):
+        return dbconn.get_cached_score(key)
+
+    def _save(self, key, entry):
+        dbconn.save_cached_score(key, scoreBasic.SCORER_VERSION, *entry)
+
+    def _prune(self, stores):
+        if stores % PRUNE_EVERY == 1:
+            dbconn.prune_score_cache(scoreBasic.SCORER_VERSION, MAX_STORED)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_score_cache() -> ScoreCache:
+    """Return the process-wide ScoreCache, created on first use."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ScoreCache()
+        return _cache
+
+
+def score_prompt(prompt):
+    """scoreBasic.score_prompt(), memoized through the process-wide ScoreCache."""
+    return get_score_cache().score(prompt)
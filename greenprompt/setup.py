@@ -3,8 +3,9 @@ setup.py — one-time GreenPrompt initialization.
 
 Run via `greenprompt setup`. Detects hardware, writes the user config file
 (~/.greenprompt/config.json by default — see constants.config_path()),
-configures passwordless sudo for powermetrics on macOS, downloads NLTK data,
-verifies Ollama, and creates the SQLite database.
+configures passwordless sudo for powermetrics on macOS, downloads the NLTK
+data the scorer needs (only what is not already installed), verifies Ollama,
+and creates the SQLite database. Nothing else downloads NLTK data.
 
 The config is written outside the package so that setup works from any
 directory and survives reinstalls. Platform values (OS, machine, etc.) are
@@ -20,27 +21,53 @@ from greenprompt import constants
 from greenprompt.sysUsage import get_system_info
 from greenprompt.dbconn import init_db, DB_PATH
 import subprocess
-import nltk
 
 # Ollama URL for local server
 OLLAMA_URL = "http://127.0.0.1:11434"
 monitor = None
 
 
+#: NLTK downloads and the nltk.data directory each one installs (the
+#: trailing slash also matches a zipped copy). Newer NLTK releases load
+#: punkt_tab and averaged_perceptron_tagger_eng.
+NLTK_RESOURCES = {
+    "punkt": "tokenizers/punkt/",
+    "punkt_tab": "tokenizers/punkt_tab/",
+    "averaged_perceptron_tagger": "taggers/averaged_perceptron_tagger/",
+    "averaged_perceptron_tagger_eng": "taggers/averaged_perceptron_tagger_eng/",
+    "wordnet": "corpora/wordnet/",
+    "stopwords": "corpora/stopwords/",
+}
+
+
+def missing_nltk_data():
+    """Return the NLTK_RESOURCES not found on nltk.data.path."""
+    import nltk
+
+    missing = []
+    for resource, path in NLTK_RESOURCES.items():
+        try:
+            nltk.data.find(path)
+        except LookupError:
+            missing.append(resource)
+    return missing
+
+
 def download_nltk_data():
-    resources = [
-        "punkt",
-        "averaged_perceptron_tagger",
-        "wordnet",
-        "stopwords",
-        "punkt_tab",
-        "averaged_perceptron_tagger_eng",
-    ]
-    for resource in resources:
+    """
+    Download the NLTK resources that are not installed yet.
+
+    Returns:
+        The resources still missing afterwards (empty when all are present).
+    """
+    import nltk
+
+    for resource in missing_nltk_data():
         try:
-            nltk.download(resource)
+            nltk.download(resource, quiet=True)
         except Exception as e:
             print(f"Could not download NLTK resource '{resource}': {e}")
+    return missing_nltk_data()
 
 
 def detect_cpu_power_source() -> str:
@@ -207,7 +234,8 @@ def main():
     print("Setting up GreenPrompt...")
 
     # Report detected hardware. Not persisted — constants.py derives platform
-    # values live, and get_system_info() is recorded per-prompt in the database.
+    # values live, and the host profile is recorded in the database's hosts table
+    # the first time a prompt is saved.
     system_info = get_system_info()
     print(
         f"Detected: {system_info['OS']} / {system_info['Machine']} / "
@@ -228,9 +256,12 @@ def main():
     configure_powermetrics_sudoers()
 
     # Download required NLTK data
-    print("Downloading required NLTK data...")
-    download_nltk_data()
-    print("✅ NLTK data downloaded.")
+    print("Checking NLTK data...")
+    missing = download_nltk_data()
+    if missing:
+        print(f"⚠️  NLTK data missing, prompt scoring will fail: {', '.join(missing)}")
+    else:
+        print("✅ NLTK data ready.")
 
     # Check if Ollama is installed
     check_ollama()
@@ -2,36 +2,61 @@
 sysUsage.py — OS-agnostic system information and power measurement dispatch.
 
 Provides:
-- get_system_info(): CPU, RAM, disk, OS metadata as a dict.
+- get_system_info(): CPU, RAM, disk, OS metadata as a dict (cached, TTL-refreshed).
+- get_host_profile(): the static subset of get_system_info(), probed once per process.
 - measure_power_for_pid(): Dispatches to the correct OS-specific power function.
 - measure_power_mac(): Reads from a PowerMonitor sample buffer (macOS only).
 - measure_power_linux(): Reads from a LinuxPowerMonitor sample buffer (Linux only).
 - measure_power_windows(): Placeholder — not yet implemented.
 - has_gpu(): Detects GPU presence on all platforms.
-- get_gpu_usage(): Returns GPU utilization stats (Linux/Windows via nvidia-smi).
+- get_gpu_usage(): Returns GPU utilization stats (Linux/Windows via gpuBackend).
 - parse_powermetrics_output(): Parses raw macOS powermetrics text output.
 """
 
+import hashlib
+import json
 import platform
 import psutil
 import socket
 import cpuinfo
 import shutil
 import subprocess
+import threading
 import time
 import re
 from greenprompt import constants
+from greenprompt.gpuBackend import get_gpu_backend
+from greenprompt.samplerCommon import SampleBuffer, as_sample_buffer
 
-def get_system_info():
+#: Seconds before the volatile fields of the cached host profile (current CPU
+#: frequency, disk used/free) are re-read. Static facts are read once per process.
+HOST_PROFILE_TTL_S = 60.0
+
+_profile_lock = threading.Lock()
+_static_profile = None
+_volatile_fields = None
+_volatile_read_at = 0.0
+
+
+def _gb(n_bytes):
+    return f"{round(n_bytes / (1024 ** 3), 2)} GB"
+
+
+def _read_static_profile():
     """
-    Collect static system hardware and OS metadata.
+    Read hardware and OS facts that cannot change while the process runs.
 
-    Returns:
-        dict with keys: OS, OS Version, Platform, Machine, Processor, CPU,
-        CPU Cores (Physical), CPU Cores (Total), CPU Frequency (Current/Min/Max),
-        RAM (Total), Disk (Total/Used/Free), Hostname, IP Address.
+    This is the expensive part of get_system_info(): cpuinfo.get_cpu_info() can
+    take hundreds of milliseconds and spawn subprocesses, and the IP lookup goes
+    through the resolver. Each probe is made exactly once.
     """
-    info = {
+    freq = psutil.cpu_freq()
+    hostname = socket.gethostname()
+    try:
+        ip_address = socket.gethostbyname(hostname)
+    except OSError:
+        ip_address = "N/A"
+    return {
         "OS": platform.system(),
         "OS Version": platform.version(),
         "Platform": platform.platform(),
@@ -40,65 +65,163 @@ def get_system_info():
         "CPU": cpuinfo.get_cpu_info().get('brand_raw', 'N/A'),
         "CPU Cores (Physical)": psutil.cpu_count(logical=False),
         "CPU Cores (Total)": psutil.cpu_count(logical=True),
-        "CPU Frequency (Current)": f"{psutil.cpu_freq().current:.2f} MHz" if psutil.cpu_freq() else "N/A",
-        "CPU Frequency (Min)": f"{psutil.cpu_freq().min:.2f} MHz" if psutil.cpu_freq() else "N/A",
-        "CPU Frequency (Max)": f"{psutil.cpu_freq().max:.2f} MHz" if psutil.cpu_freq() else "N/A",
-        "RAM (Total)": f"{round(psutil.virtual_memory().total / (1024 ** 3), 2)} GB",
-        "Disk (Total)": f"{round(shutil.disk_usage('/').total / (1024 ** 3), 2)} GB",
-        "Disk (Used)": f"{round(shutil.disk_usage('/').used / (1024 ** 3), 2)} GB",
-        "Disk (Free)": f"{round(shutil.disk_usage('/').free / (1024 ** 3), 2)} GB",
-        "Hostname": socket.gethostname(),
-        "IP Address": socket.gethostbyname(socket.gethostname()),
+        "CPU Frequency (Min)": f"{freq.min:.2f} MHz" if freq else "N/A",
+        "CPU Frequency (Max)": f"{freq.max:.2f} MHz" if freq else "N/A",
+        "RAM (Total)": _gb(psutil.virtual_memory().total),
+        "Disk (Total)": _gb(shutil.disk_usage('/').total),
+        "Hostname": hostname,
+        "IP Address": ip_address,
+    }
+
+
+def _read_volatile_fields():
+    """Read the system_info fields that drift over time (one cpu_freq, one disk_usage)."""
+    freq = psutil.cpu_freq()
+    disk = shutil.disk_usage('/')
+    return {
+        "CPU Frequency (Current)": f"{freq.current:.2f} MHz" if freq else "N/A",
+        "Disk (Used)": _gb(disk.used),
+        "Disk (Free)": _gb(disk.free),
     }
 
-    return info
+
+def get_host_profile():
+    """
+    Return the static hardware/OS profile of this machine, computed once per process.
+
+    This is what dbconn stores in the hosts table; it deliberately excludes the
+    volatile fields so that one machine always maps to one profile.
+
+    Returns:
+        dict with keys: OS, OS Version, Platform, Machine, Processor, CPU,
+        CPU Cores (Physical), CPU Cores (Total), CPU Frequency (Min/Max),
+        RAM (Total), Disk (Total), Hostname, IP Address.
+    """
+    global _static_profile
+    with _profile_lock:
+        if _static_profile is None:
+            _static_profile = _read_static_profile()
+        return dict(_static_profile)
+
+
+def host_fingerprint(profile):
+    """Return a stable SHA-256 hex digest identifying a get_host_profile() dict."""
+    blob = json.dumps(profile, sort_keys=True, default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def refresh_host_profile():
+    """Drop the cached profile so the next call re-probes the hardware."""
+    global _static_profile, _volatile_fields, _volatile_read_at
+    with _profile_lock:
+        _static_profile = None
+        _volatile_fields = None
+        _volatile_read_at = 0.0
+
+
+def get_system_info():
+    """
+    Collect system hardware and OS metadata.
+
+    Static facts come from the per-process get_host_profile() cache; the
+    volatile fields are re-read at most once every HOST_PROFILE_TTL_S seconds,
+    so calling this per prompt costs a dict copy rather than a hardware probe.
+
+    Returns:
+        dict with keys: OS, OS Version, Platform, Machine, Processor, CPU,
+        CPU Cores (Physical), CPU Cores (Total), CPU Frequency (Current/Min/Max),
+        RAM (Total), Disk (Total/Used/Free), Hostname, IP Address.
+    """
+    global _volatile_fields, _volatile_read_at
+    static = get_host_profile()
+    with _profile_lock:
+        now = time.monotonic()
+        if _volatile_fields is None or now - _volatile_read_at >= HOST_PROFILE_TTL_S:
+            _volatile_fields = _read_volatile_fields()
+            _volatile_read_at = now
+        volatile = dict(_volatile_fields)
+
+    keys = (
+        "OS", "OS Version", "Platform", "Machine", "Processor", "CPU",
+        "CPU Cores (Physical)", "CPU Cores (Total)", "CPU Frequency (Current)",
+        "CPU Frequency (Min)", "CPU Frequency (Max)", "RAM (Total)",
+        "Disk (Total)", "Disk (Used)", "Disk (Free)", "Hostname", "IP Address",
+    )
+    merged = {**static, **volatile}
+    return {key: merged[key] for key in keys}
 
 # Platform-specific power consumption measurement placeholders
+def _integrate_monitor(monitor, start_time, end_time):
+    """
+    Integrate a monitor's samples over a prompt window and the 60 s before it.
+
+    Both windows use SampleBuffer.integrate() with neighbours up to
+    2 × sample_interval outside each edge. The baseline requires at least one
+    sample inside its window; the prompt window may be estimated purely from
+    neighbours (WindowEnergy.extrapolated) when it is shorter than the
+    sampling interval.
+
+    Returns:
+        (window, baseline) — WindowEnergy or None each.
+    """
+    threshold = 2 * getattr(monitor, "sample_interval", 1)
+    buf = as_sample_buffer(getattr(monitor, "samples", ()), getattr(monitor, "_lock", None))
+    window = buf.integrate(start_time, end_time, threshold)
+    baseline = buf.integrate(start_time - 60, start_time, threshold, require_inside=True)
+    return window, baseline
+
+
 def measure_power_mac(start_time, end_time, monitor=None):
     """
     Uses PowerMonitor samples for macOS. Returns average CPU/GPU/Combined power and energy.
+
+    Energy is the trapezoidal integral of the samples over [start_time,
+    end_time], interpolated at both edges (see _integrate_monitor); the powers
+    are time-weighted averages. Sub-second prompts with no sample inside the
+    window are interpolated from neighbouring samples and flagged with
+    "extrapolated": True. Returns {"error": ...} when no usable samples exist.
     """
     duration = end_time - start_time
+    window, baseline = _integrate_monitor(monitor, start_time, end_time)
     # Baseline: average combined power for 1 minute before prompt start
-    baseline_start = start_time - 60
-    baseline_end = start_time
-    baseline_samples = [s for ts, s in getattr(monitor, "samples", []) if baseline_start <= ts <= baseline_end]
-    if baseline_samples:
-        baseline_avg = sum(s.get("combined_power_w", 0.0) for s in baseline_samples) / len(baseline_samples)
+    if baseline is not None:
+        baseline_avg = float(baseline.power_w[SampleBuffer.COMBINED])
         baseline_energy_wh = (baseline_avg * 60) / 3600.0
     else:
         baseline_avg = None
         baseline_energy_wh = None
-    # Filter monitor.samples for timestamps in [start_time, end_time]
-    samples = [s for ts, s in getattr(monitor, "samples", []) if start_time <= ts <= end_time]
-    if not samples:
+    if window is None:
         return {"error": "No power samples found between start_time and end_time. Try increasing monitor window or sample interval."}
-    avg_cpu = sum(s.get("cpu_power_w", 0) for s in samples) / len(samples)
-    avg_gpu = sum(s.get("gpu_power_w", 0) for s in samples) / len(samples)
-    avg_combined = sum(s.get("combined_power_w", 0) for s in samples) / len(samples)
-    energy_wh = (avg_combined * duration) / 3600
-    return {
-        "cpu_power_w": avg_cpu,
-        "gpu_power_w": avg_gpu,
-        "combined_power_w": avg_combined,
+    result = {
+        "cpu_power_w": float(window.power_w[SampleBuffer.CPU]),
+        "gpu_power_w": float(window.power_w[SampleBuffer.GPU]),
+        "combined_power_w": float(window.power_w[SampleBuffer.COMBINED]),
         "duration_sec": duration,
-        "energy_wh": energy_wh,
+        "energy_wh": float(window.energy_j[SampleBuffer.COMBINED]) / 3600,
         "baseline_power_w": baseline_avg,
         "baseline_energy_wh": baseline_energy_wh,
     }
+    if window.extrapolated:
+        result["extrapolated"] = True
+    return result
 
 def measure_power_linux(start_time: float, end_time: float, monitor=None) -> dict:
     """
     Compute power and energy metrics for a Linux prompt run from LinuxPowerMonitor samples.
 
-    Takes a single thread-safe snapshot of monitor.samples, then filters for the
-    prompt window [start_time, end_time] and a 60-second idle baseline before it.
+    energy_wh is the time-weighted trapezoidal integral of the samples over
+    [start_time, end_time], with power interpolated at both edges, so partial
+    intervals and irregular sample spacing are accounted for. In RAPL mode the
+    samples carry the cumulative package-energy counter and CPU energy is its
+    delta over the window. The reported powers are energy / duration, and the
+    baseline is the same integral over the 60 seconds before start_time.
+    monitor.samples is normally a SampleBuffer; any other iterable of
+    (timestamp, dict) tuples is converted first.
 
-    Short-prompt interpolation: if the prompt duration is shorter than the sampler
-    interval (typically 1s), the window may contain zero samples. In that case,
-    up to two neighboring samples (one before, one after the window, within
-    2 × sample_interval seconds) are used as a proxy. The result includes
-    "extrapolated": True when this path is taken.
+    Short prompts: if the prompt is shorter than the sampler interval
+    (typically 1s), the window may contain zero samples. Power is then
+    interpolated from the neighbouring samples within 2 × sample_interval of
+    the window, and the result includes "extrapolated": True.
 
     Args:
         start_time: Unix timestamp when the prompt started.
@@ -108,7 +231,9 @@ def measure_power_linux(start_time: float, end_time: float, monitor=None) -> dic
     Returns:
         dict with keys: cpu_power_w, gpu_power_w, combined_power_w, duration_sec,
         energy_wh, baseline_power_w, baseline_energy_wh.
-        Optional key: extrapolated (True if neighboring samples were used).
+        Optional keys: extrapolated (True if neighboring samples were used);
+        gpu_power_by_index and ollama_gpu_power_by_index ({gpu: W} averages
+        from LinuxPowerMonitor.gpu_breakdown()) when per-GPU data exists.
     """
     duration = end_time - start_time
 
@@ -126,63 +251,35 @@ def measure_power_linux(start_time: float, end_time: float, monitor=None) -> dic
         print("Warning: LinuxPowerMonitor not running — energy_wh will be 0. Start with 'greenprompt run'.")
         return _zero
 
-    # Single thread-safe snapshot — avoids two separate deque iterations that
-    # could be inconsistent if the sampler appends between them.
-    if hasattr(monitor, "_lock"):
-        with monitor._lock:
-            all_samples = list(monitor.samples)
-    else:
-        all_samples = list(getattr(monitor, "samples", []))
-
-    baseline_start = start_time - 60
-    baseline_samples = [s for ts, s in all_samples if baseline_start <= ts <= start_time]
-    prompt_samples = [s for ts, s in all_samples if start_time <= ts <= end_time]
-
-    # Short-prompt interpolation: find nearest neighbors when window is empty
-    extrapolated = False
-    if not prompt_samples:
-        sample_interval = getattr(monitor, "sample_interval", 1)
-        threshold = 2 * sample_interval
-
-        before = [(ts, s) for ts, s in all_samples if ts < start_time]
-        after  = [(ts, s) for ts, s in all_samples if ts > end_time]
-
-        neighbors = []
-        if before and (start_time - before[-1][0]) <= threshold:
-            neighbors.append(before[-1][1])
-        if after and (after[0][0] - end_time) <= threshold:
-            neighbors.append(after[0][1])
-
-        if neighbors:
-            prompt_samples = neighbors
-            extrapolated = True
-        else:
-            print("Warning: No power samples in prompt window — monitor may need more warm-up time.")
-            return _zero
-
-    avg_cpu      = sum(s.get("cpu_power_w", 0.0)      for s in prompt_samples) / len(prompt_samples)
-    avg_gpu      = sum(s.get("gpu_power_w", 0.0)      for s in prompt_samples) / len(prompt_samples)
-    avg_combined = sum(s.get("combined_power_w", 0.0) for s in prompt_samples) / len(prompt_samples)
-    energy_wh    = (avg_combined * duration) / 3600.0
+    window, baseline = _integrate_monitor(monitor, start_time, end_time)
+    if window is None:
+        print("Warning: No power samples in prompt window — monitor may need more warm-up time.")
+        return _zero
 
-    if baseline_samples:
-        baseline_avg       = sum(s.get("combined_power_w", 0.0) for s in baseline_samples) / len(baseline_samples)
+    if baseline is not None:
+        baseline_avg       = float(baseline.power_w[SampleBuffer.COMBINED])
         baseline_energy_wh = (baseline_avg * 60.0) / 3600.0
     else:
         baseline_avg       = 0.0
         baseline_energy_wh = 0.0
 
     result = {
-        "cpu_power_w":        avg_cpu,
-        "gpu_power_w":        avg_gpu,
-        "combined_power_w":   avg_combined,
+        "cpu_power_w":        float(window.power_w[SampleBuffer.CPU]),
+        "gpu_power_w":        float(window.power_w[SampleBuffer.GPU]),
+        "combined_power_w":   float(window.power_w[SampleBuffer.COMBINED]),
         "duration_sec":       duration,
-        "energy_wh":          energy_wh,
+        "energy_wh":          float(window.energy_j[SampleBuffer.COMBINED]) / 3600.0,
         "baseline_power_w":   baseline_avg,
         "baseline_energy_wh": baseline_energy_wh,
     }
-    if extrapolated:
+    if window.extrapolated:
         result["extrapolated"] = True
+    if hasattr(monitor, "gpu_breakdown"):
+        result.update(
+            monitor.gpu_breakdown(
+                start_time, end_time, 2 * getattr(monitor, "sample_interval", 1)
+            )
+        )
     return result
 
 def measure_power_windows(pid, start_time, end_time):  # noqa: ARG001
@@ -241,7 +338,8 @@ def has_gpu():
     Detect whether a GPU is present on the current machine.
 
     macOS: checks system_profiler SPDisplaysDataType for a Chipset Model entry.
-    Linux/Windows: runs nvidia-smi -L and checks for non-empty output.
+    Linux/Windows: asks the gpuBackend for an NVIDIA device count (NVML, or
+    `nvidia-smi -L` once per process).
 
     Returns:
         True if a GPU is detected, False otherwise or on error.
@@ -253,23 +351,24 @@ def has_gpu():
             output = subprocess.check_output(["system_profiler", "SPDisplaysDataType"]).decode()
             return "Chipset Model" in output  # heuristic
         elif os_type in ["Linux", "Windows"]:
-            # Check if nvidia-smi exists and returns at least one GPU
-            try:
-                result = subprocess.check_output(["nvidia-smi", "-L"], stderr=subprocess.DEVNULL).decode()
-                return bool(result.strip())
-            except subprocess.CalledProcessError:
-                return False
+            return get_gpu_backend().device_count() > 0
         else:
             return False
     except Exception:
         return False
-    
+
+
+def _fmt(value, unit, spec=".2f"):
+    return "N/A" if value is None else f"{value:{spec}} {unit}"
+
+
 def get_gpu_usage():
     """
     Return current GPU utilization and power statistics.
 
-    Linux/Windows: queries nvidia-smi for power draw, utilization, memory,
-    and temperature. Handles [N/A] fields gracefully.
+    Linux/Windows: reads power draw, utilization, memory and temperature from
+    the gpuBackend (NVML or nvidia-smi). Unsupported fields print as N/A.
+    Multiple GPUs are joined with "; ".
     macOS: returns a not-supported message (powermetrics covers GPU on macOS).
 
     Returns:
@@ -280,32 +379,27 @@ def get_gpu_usage():
         if os_type == "Darwin":
             return "GPU usage monitoring not supported on macOS"
         elif os_type in ["Linux", "Windows"]:
-            output = subprocess.check_output(
-                [
-                    "nvidia-smi",
-                    "--query-gpu=name,power.draw,power.limit,utilization.gpu,"
-                    "utilization.memory,memory.used,memory.total,temperature.gpu",
-                    "--format=csv,noheader",
-                ],
-                stderr=subprocess.DEVNULL,
-            ).decode().strip()
-            # Parse and reformat so [N/A] values are visible but don't crash callers
-            parts = [p.strip() for p in output.split(",")]
-            labels = ["name", "power_draw", "power_limit", "gpu_util",
-                      "mem_util", "mem_used", "mem_total", "temperature"]
-            stats = dict(zip(labels, parts))
-            return (
-                f"GPU: {stats.get('name', 'N/A')} | "
-                f"Power: {stats.get('power_draw', 'N/A')} / {stats.get('power_limit', 'N/A')} | "
-                f"GPU util: {stats.get('gpu_util', 'N/A')} | "
-                f"Mem: {stats.get('mem_used', 'N/A')} / {stats.get('mem_total', 'N/A')} | "
-                f"Temp: {stats.get('temperature', 'N/A')}"
+            return "; ".join(
+                f"GPU: {gpu['name'] or 'N/A'} | "
+                f"Power: {_fmt(gpu['power_draw_w'], 'W')} / {_fmt(gpu['power_limit_w'], 'W')} | "
+                f"GPU util: {_fmt(gpu['gpu_util_pct'], '%', '.0f')} | "
+                f"Mem: {_fmt(gpu['mem_used_mib'], 'MiB', '.0f')} / {_fmt(gpu['mem_total_mib'], 'MiB', '.0f')} | "
+                f"Temp: {_fmt(gpu['temperature_c'], 'C', '.0f')}"
+                for gpu in get_gpu_backend().usage()
             )
         else:
             return "GPU usage monitoring not supported on this OS."
     except (subprocess.CalledProcessError, FileNotFoundError, OSError) as e:
         return f"Error retrieving GPU usage: {e}"
     
+# powermetrics patterns, compiled once rather than on every call. The
+# streaming reader in samplerMac parses line by line with its own patterns.
+_PM_CPU_POWER_RE = re.compile(r"CPU Power:\s+([\d.]+)\s+mW")
+_PM_GPU_POWER_RE = re.compile(r"GPU Power:\s+([\d.]+)\s+mW")
+_PM_COMBINED_POWER_RE = re.compile(r"Combined Power.*?:\s+([\d.]+)\s+mW")
+_PM_CPU_ACTIVE_RE = re.compile(r"CPU \d+ active residency:\s+([\d.]+)%")
+
+
 def parse_powermetrics_output(output: str, duration_sec: float) -> dict:
     """
     Parses powermetrics output from macOS and estimates CPU usage, power usage, and energy.
@@ -324,9 +418,9 @@ def parse_powermetrics_output(output: str, duration_sec: float) -> dict:
         }
     """
     # Extract CPU/GPU/Combined power in mW
-    cpu_power_match = re.search(r"CPU Power:\s+([\d.]+)\s+mW", output)
-    gpu_power_match = re.search(r"GPU Power:\s+([\d.]+)\s+mW", output)
-    combined_power_match = re.search(r"Combined Power.*?:\s+([\d.]+)\s+mW", output)
+    cpu_power_match = _PM_CPU_POWER_RE.search(output)
+    gpu_power_match = _PM_GPU_POWER_RE.search(output)
+    combined_power_match = _PM_COMBINED_POWER_RE.search(output)
 
     # Fallback defaults
     cpu_power = float(cpu_power_match.group(1)) / 1000 if cpu_power_match else 0.0
@@ -334,7 +428,7 @@ def parse_powermetrics_output(output: str, duration_sec: float) -> dict:
     combined_power = float(combined_power_match.group(1)) / 1000 if combined_power_match else cpu_power + gpu_power
 
     # Try to get an average CPU active residency
-    cpu_active_matches = re.findall(r"CPU \d+ active residency:\s+([\d.]+)%", output)
+    cpu_active_matches = _PM_CPU_ACTIVE_RE.findall(output)
     if cpu_active_matches:
         cpu_active_avg = sum(float(p) for p in cpu_active_matches) / len(cpu_active_matches)
     else:
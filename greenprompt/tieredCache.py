@@ -0,0 +1,143 @@
+"""
+tieredCache.py — In-memory LRU in front of a table in the usage database.
+
+scoreCache and responseCache both keep recent entries in memory and every
+entry in a table of the usage database, so a restarted server starts warm.
+TieredCache is the part they share:
+
+    memory hit  — the entry is in an LRU of max_size entries.
+    stored hit  — it is read from the table and kept in memory.
+    miss        — neither has it; the caller computes it and insert()s it,
+                  which keeps it in both.
+
+Subclasses supply the table access (_load, _save, _prune) and may reject
+stale entries (_fresh) or add their own accounting to each hit (_on_hit).
+Entries are tuples and never modified once stored.
+
+Database errors never propagate: a failed read counts as a miss and a failed
+write prints a warning, so the cache degrades to memory only.
+"""
+
+import sqlite3
+import threading
+from collections import OrderedDict
+
+
+class TieredCache:
+    """
+    Thread-safe LRU backed by a usage-database table, with hit counters.
+
+    Usage (in a subclass):
+        entry = self.lookup(key)
+        if entry is None:
+            entry = ...  # compute it
+            self.insert(key, entry)
+    """
+
+    #: What the table holds, for the warning printed when a store fails.
+    what = "cache entry"
+
+    def __init__(self, max_size):
+        """
+        Args:
+            max_size: Entries kept in memory; 0 keeps none, so every lookup
+                goes to the table.
+        """
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._stores = 0
+        self.memory_hits = 0
+        self.stored_hits = 0
+        self.misses = 0
+
+    def lookup(self, key):
+        """Return the entry under `key` from memory or the table, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and not self._fresh(entry):
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+                self._on_hit(entry)
+                return entry
+
+        try:
+            entry = self._load(key)
+        except (sqlite3.Error, ValueError):
+            entry = None
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.stored_hits += 1
+            self._on_hit(entry)
+            self._remember(key, entry)
+            return entry
+
+    def insert(self, key, entry, **row):
+        """
+        Keep `entry` in memory and store it in the table.
+
+        Keyword arguments go to _save(), for columns the entry does not carry.
+        """
+        with self._lock:
+            self._remember(key, entry)
+        try:
+            self._save(key, entry, **row)
+            with self._lock:
+                self._stores += 1
+                stores = self._stores
+            self._prune(stores)
+        except sqlite3.Error as e:
+            print(f"Warning: Failed to store {self.what}: {e}")
+
+    def clear(self):
+        """Forget the in-memory entries and counters (the table is kept)."""
+        with self._lock:
+            self._entries.clear()
+            self.memory_hits = self.stored_hits = self.misses = 0
+
+    def _counts(self):
+        """Size and hit/miss counters for a subclass's stats() (lock held)."""
+        hits = self.memory_hits + self.stored_hits
+        lookups = hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "memory_hits": self.memory_hits,
+            "stored_hits": self.stored_hits,
+            "misses": self.misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+        }
+
+    def _remember(self, key, entry):
+        """Insert into the LRU, evicting the oldest entry (lock held)."""
+        if self.max_size <= 0:
+            return
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    # --- Hooks ---------------------------------------------------------------
+
+    def _load(self, key):
+        """Return the stored entry under `key`, or None."""
+        raise NotImplementedError
+
+    def _save(self, key, entry, **row):
+        """Store `entry` under `key` in the table."""
+        raise NotImplementedError
+
+    def _prune(self, stores):
+        """Called after each store with the number of stores so far."""
+
+    def _fresh(self, entry):
+        """Whether an in-memory entry may still be served (lock held)."""
+        return True
+
+    def _on_hit(self, entry):
+        """Account for a memory or stored hit (lock held)."""
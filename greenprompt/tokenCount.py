@@ -0,0 +1,212 @@
+"""
+tokenCount.py — Pre-flight token counts for prompts.
+
+core.estimate_tokens_from_prompt() used to look up a tiktoken encoding on
+every call and count every Ollama model with cl100k_base, OpenAI's
+tokenizer, which can be well off for llama or mistral prompts. TokenCounter
+gives a cheap count before a prompt is dispatched, from one of two sources:
+
+    tiktoken  — the model's own encoding when tiktoken knows the model
+                (gpt-*), FALLBACK_ENCODING otherwise. The encoder is resolved
+                once per model, and a batch is encoded in one call.
+    ollama    — with OLLAMA_TOKENIZE on, models tiktoken does not know are
+                counted by their real tokenizer through Ollama's
+                POST /api/tokenize, which only newer Ollama builds serve.
+                Counts are memoized per (model, text) in an LRU of
+                TOKEN_CACHE_SIZE entries. When the server rejects the call
+                (no such endpoint or model), that model is counted with
+                tiktoken from then on; when Ollama cannot be reached, only
+                the current batch is.
+
+count_tokens() and count_tokens_batch() use the process-wide counter;
+POST /api/tokens/count serves them.
+"""
+
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+import requests
+
+from greenprompt import constants
+from greenprompt.ollamaClient import get_ollama_client
+
+TOKENIZE_PATH = "/api/tokenize"
+
+#: tiktoken encoding for models tiktoken has no mapping for.
+FALLBACK_ENCODING = "cl100k_base"
+
+
+@lru_cache(maxsize=None)
+def _encoding_name(model):
+    """Return (tiktoken encoding name, whether it is the model's own)."""
+    import tiktoken
+
+    try:
+        return tiktoken.encoding_name_for_model(model), True
+    except KeyError:
+        return FALLBACK_ENCODING, False
+
+
+def _encoder(model):
+    """tiktoken Encoding for a model; tiktoken keeps one per encoding name."""
+    import tiktoken
+
+    return tiktoken.get_encoding(_encoding_name(model)[0])
+
+
+class TokenCounter:
+    """
+    Thread-safe token counter with per-model encoders and memoized Ollama counts.
+
+    Usage:
+        counter = TokenCounter()
+        counter.count("Explain entropy.", "llama3.2:latest")
+        counts, source = counter.count_batch(prompts, "llama3.2:latest")
+    """
+
+    def __init__(self, use_ollama=None, max_size=None):
+        """
+        Args:
+            use_ollama: Count models tiktoken does not know through Ollama.
+                Defaults to constants.OLLAMA_TOKENIZE.
+            max_size: Memoized Ollama counts; defaults to
+                constants.TOKEN_CACHE_SIZE. 0 disables memoization.
+        """
+        self.use_ollama = (
+            constants.OLLAMA_TOKENIZE if use_ollama is None else use_ollama
+        )
+        self.max_size = constants.TOKEN_CACHE_SIZE if max_size is None else max_size
+        self._lock = threading.Lock()
+        self._counts = OrderedDict()
+        self._no_tokenize = set()
+        self.hits = 0
+        self.misses = 0
+
+    def count(self, text, model):
+        """Return the number of tokens text takes in model."""
+        return self.count_batch([text], model)[0][0]
+
+    def count_batch(self, texts, model):
+        """
+        Count tokens for many texts in one call.
+
+        Returns:
+            (counts, source): one count per text, in order, and where they
+            came from — "ollama" or "tiktoken:<encoding name>". A batch is
+            never mixed: if any Ollama count fails, all are from tiktoken.
+        """
+        texts = list(texts)
+        if self._via_ollama(model):
+            counts = self._ollama_counts(texts, model)
+            if counts is not None:
+                return counts, "ollama"
+        encoding = _encoder(model)
+        counts = [len(tokens) for tokens in encoding.encode_ordinary_batch(texts)]
+        return counts, f"tiktoken:{encoding.name}"
+
+    def stats(self):
+        """Memo size and hit counters, and models Ollama could not count."""
+        with self._lock:
+            return {
+                "ollama": bool(self.use_ollama),
+                "size": len(self._counts),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "tiktoken_fallback_models": sorted(self._no_tokenize),
+            }
+
+    def clear(self):
+        """Forget memoized counts and models marked as not countable by Ollama."""
+        with self._lock:
+            self._counts.clear()
+            self._no_tokenize.clear()
+            self.hits = self.misses = 0
+
+    def _via_ollama(self, model):
+        if not self.use_ollama or _encoding_name(model)[1]:
+            return False
+        with self._lock:
+            return model not in self._no_tokenize
+
+    def _ollama_counts(self, texts, model):
+        """Counts from the memo or Ollama; None if any could not be fetched."""
+        counts = [None] * len(texts)
+        pending = {}  # text -> indices still to count
+        with self._lock:
+            for i, text in enumerate(texts):
+                key = (model, text)
+                if key in self._counts:
+                    self._counts.move_to_end(key)
+                    counts[i] = self._counts[key]
+                    self.hits += 1
+                else:
+                    pending.setdefault(text, []).append(i)
+
+        for text, indices in pending.items():
+            count = self._tokenize(text, model)
+            if count is None:
+                return None
+            for i in indices:
+                counts[i] = count
+            with self._lock:
+                self.misses += 1
+                if self.max_size > 0:
+                    self._counts[(model, text)] = count
+                    while len(self._counts) > self.max_size:
+                        self._counts.popitem(last=False)
+        return counts
+
+    def _tokenize(self, text, model):
+        """Token count from Ollama's tokenizer, or None if it is unavailable."""
+        try:
+            resp = get_ollama_client().post(
+                TOKENIZE_PATH, json={"model": model, "content": text}
+            )
+        except requests.exceptions.RequestException as e:
+            print(f"Warning: Ollama token count failed, using tiktoken: {e}")
+            return None
+        tokens = None
+        if resp.ok:
+            try:
+                tokens = resp.json().get("tokens")
+            except ValueError:
+                pass
+        if isinstance(tokens, list):
+            return len(tokens)
+        if resp.status_code >= 500:
+            print(
+                f"Warning: Ollama token count failed ({resp.status_code}), using tiktoken"
+            )
+            return None
+        with self._lock:
+            self._no_tokenize.add(model)
+        print(
+            f"Warning: Ollama cannot tokenize for {model} ({resp.status_code}); "
+            "counting its tokens with tiktoken"
+        )
+        return None
+
+
+_counter = None
+_counter_lock = threading.Lock()
+
+
+def get_token_counter() -> TokenCounter:
+    """Return the process-wide TokenCounter, created on first use."""
+    global _counter
+    with _counter_lock:
+        if _counter is None:
+            _counter = TokenCounter()
+        return _counter
+
+
+def count_tokens(text, model):
+    """Token count for text in model, through the process-wide TokenCounter."""
+    return get_token_counter().count(text, model)
+
+
+def count_tokens_batch(texts, model):
+    """(counts, source) for many texts, through the process-wide TokenCounter."""
+    return get_token_counter().count_batch(texts, model)
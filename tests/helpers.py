@@ -0,0 +1,44 @@
+"""
+Fixtures shared by the test modules that need a usage database.
+
+TempDbTestCase gives each test a throwaway database file: dbconn.DB_PATH is
+patched to point at it and the host profile is stubbed, and the connection
+pool, any BatchWriter and the patches are torn down afterwards.
+"""
+
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from unittest.mock import patch
+
+
+class TempDbTestCase(unittest.TestCase):
+    """Points dbconn.DB_PATH at a fresh file and stubs the host profile."""
+
+    #: What dbconn.get_host_profile() returns; tests may reassign it.
+    profile = {"Hostname": "testhost"}
+
+    def setUp(self):
+        from greenprompt import dbconn
+
+        self._dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self._dir, "greenprompt_usage.db")
+        patch("greenprompt.dbconn.DB_PATH", self.db_path).start()
+        patch(
+            "greenprompt.dbconn.get_host_profile",
+            side_effect=lambda: dict(self.profile),
+        ).start()
+        self.addCleanup(shutil.rmtree, self._dir, ignore_errors=True)
+        self.addCleanup(dbconn.close_connections)
+        self.addCleanup(dbconn.disable_batch_writes)
+        self.addCleanup(patch.stopall)
+
+    def _raw(self, sql, params=()):
+        """Run one query on a separate connection and return all its rows."""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            return conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
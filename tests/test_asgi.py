@@ -0,0 +1,297 @@
+"""
+Tests for asgi.py — the ASGI entry point wrapping the Flask app.
+
+Covers:
+  - WsgiBridge request/response translation (status, headers, body, query)
+  - incremental streaming of chunked (SSE) responses
+  - concurrent requests on the worker pool without blocking the event loop
+  - client disconnect closing the response iterator
+  - lifespan: process-wide monitor started once, stopped at shutdown
+  - `greenprompt run --async --workers N` command line
+
+The ASGI app is driven directly with asyncio; uvicorn is not required.
+"""
+
+import asyncio
+import json
+import sys
+import threading
+import time
+import types
+import unittest
+from unittest.mock import MagicMock, patch
+
+from flask import Flask, Response
+
+# ---------------------------------------------------------------------------
+# Helpers / lightweight fakes
+# ---------------------------------------------------------------------------
+
+
+async def _call(app, method="GET", path="/", body=b"", headers=(), disconnect=None):
+    """
+    Run one HTTP request through an ASGI app and return (status, headers, chunks).
+
+    disconnect: an asyncio.Event; once set, receive() reports http.disconnect.
+    """
+    scope = {
+        "type": "http",
+        "http_version": "1.1",
+        "method": method,
+        "path": path.split("?")[0],
+        "query_string": path.partition("?")[2].encode(),
+        "headers": [(k.encode(), v.encode()) for k, v in headers],
+        "server": ("127.0.0.1", 5000),
+        "client": ("127.0.0.1", 40000),
+    }
+    sent_body = False
+    disconnect = disconnect or asyncio.Event()
+    out = {"status": None, "headers": {}, "chunks": []}
+
+    async def receive():
+        nonlocal sent_body
+        if not sent_body:
+            sent_body = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await disconnect.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            out["status"] = message["status"]
+            out["headers"] = {k.decode(): v.decode() for k, v in message["headers"]}
+        elif message["body"]:
+            out["chunks"].append(message["body"])
+
+    await app(scope, receive, send)
+    return out["status"], out["headers"], out["chunks"]
+
+
+def _flask_app():
+    app = Flask(__name__)
+    app.closed = threading.Event()
+
+    @app.route("/echo", methods=["POST"])
+    def echo():
+        from flask import request
+
+        return {"json": request.get_json(), "q": request.args.get("q")}
+
+    @app.route("/slow")
+    def slow():
+        time.sleep(0.2)
+        return "done"
+
+    @app.route("/stream")
+    def stream():
+        def gen():
+            try:
+                for i in range(3):
+                    yield f"data: {i}\n\n"
+                    time.sleep(0.05)
+            finally:
+                app.closed.set()
+
+        return Response(gen(), mimetype="text/event-stream")
+
+    @app.route("/endless")
+    def endless():
+        def gen():
+            try:
+                while True:
+                    yield "tick\n"
+                    time.sleep(0.01)
+            finally:
+                app.closed.set()
+
+        return Response(gen(), mimetype="text/plain")
+
+    return app
+
+
+def _bridge(app, workers=4):
+    from greenprompt.asgi import WsgiBridge
+
+    return WsgiBridge(app, workers)
+
+
+# ===========================================================================
+# 1. Request/response translation
+# ===========================================================================
+
+
+class TestWsgiBridge(unittest.TestCase):
+    def test_post_json_and_query_string(self):
+        status, headers, chunks = asyncio.run(
+            _call(
+                _bridge(_flask_app()),
+                "POST",
+                "/echo?q=x",
+                body=b'{"a": 1}',
+                headers=[("content-type", "application/json"), ("content-length", "8")],
+            )
+        )
+        self.assertEqual(status, 200)
+        self.assertEqual(headers["content-type"], "application/json")
+        self.assertEqual(json.loads(b"".join(chunks)), {"json": {"a": 1}, "q": "x"})
+
+    def test_404(self):
+        status, _, _ = asyncio.run(_call(_bridge(_flask_app()), "GET", "/missing"))
+        self.assertEqual(status, 404)
+
+    def test_api_app_served(self):
+        from greenprompt import api
+        from greenprompt.asgi import create_app
+
+        with patch.object(api, "monitor", None):
+            status, _, chunks = asyncio.run(
+                _call(create_app(workers=2), "GET", "/api/monitor/status")
+            )
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(b"".join(chunks)), {"running": False})
+
+    def test_streamed_chunks_arrive_separately(self):
+        status, headers, chunks = asyncio.run(
+            _call(_bridge(_flask_app()), "GET", "/stream")
+        )
+        self.assertEqual(status, 200)
+        self.assertTrue(headers["content-type"].startswith("text/event-stream"))
+        self.assertEqual(chunks, [f"data: {i}\n\n".encode() for i in range(3)])
+
+    def test_concurrent_requests_overlap(self):
+        bridge = _bridge(_flask_app(), workers=4)
+
+        async def run():
+            ticks = 0
+
+            async def ticker():
+                nonlocal ticks
+                while True:
+                    await asyncio.sleep(0.01)
+                    ticks += 1
+
+            t = asyncio.ensure_future(ticker())
+            started = time.perf_counter()
+            results = await asyncio.gather(
+                *(_call(bridge, "GET", "/slow") for _ in range(4))
+            )
+            elapsed = time.perf_counter() - started
+            t.cancel()
+            return results, elapsed, ticks
+
+        results, elapsed, ticks = asyncio.run(run())
+        self.assertEqual([r[2] for r in results], [[b"done"]] * 4)
+        self.assertLess(elapsed, 0.6)  # 4 x 0.2 s serially would be 0.8 s
+        self.assertGreater(ticks, 5)  # the event loop kept running meanwhile
+
+    def test_disconnect_closes_iterator(self):
+        app = _flask_app()
+        bridge = _bridge(app)
+
+        async def run():
+            gone = asyncio.Event()
+            task = asyncio.ensure_future(
+                _call(bridge, "GET", "/endless", disconnect=gone)
+            )
+            await asyncio.sleep(0.1)
+            gone.set()
+            return await asyncio.wait_for(task, 2.0)
+
+        _, _, chunks = asyncio.run(run())
+        self.assertTrue(app.closed.wait(1.0))
+        self.assertGreater(len(chunks), 0)
+
+
+# ===========================================================================
+# 2. Lifespan and the process-wide monitor
+# ===========================================================================
+
+
+class TestLifespan(unittest.TestCase):
+    def setUp(self):
+        from greenprompt import api
+
+        api.monitor = None
+        self.addCleanup(setattr, api, "monitor", None)
+
+    def _lifespan(self, app):
+        async def run():
+            inbox = asyncio.Queue()
+            sent = []
+            for kind in ("lifespan.startup", "lifespan.shutdown"):
+                inbox.put_nowait({"type": kind})
+
+            async def send(message):
+                sent.append(message["type"])
+
+            await app({"type": "lifespan"}, inbox.get, send)
+            return sent
+
+        return asyncio.run(run())
+
+    def test_monitor_started_once_and_stopped(self):
+        from greenprompt import api
+        from greenprompt.asgi import create_app
+
+        monitor_cls = MagicMock()
+        with (
+            patch("greenprompt.constants.OS", "Linux"),
+            patch("greenprompt.samplerLinux.LinuxPowerMonitor", monitor_cls),
+        ):
+            self.assertIs(api.start_monitor(), monitor_cls.return_value)
+            sent = self._lifespan(create_app(workers=2))
+        monitor_cls.assert_called_once()
+        monitor_cls.return_value.start.assert_called_once()
+        monitor_cls.return_value.stop.assert_called_once()
+        self.assertIsNone(api.monitor)
+        self.assertEqual(
+            sent, ["lifespan.startup.complete", "lifespan.shutdown.complete"]
+        )
+
+    def test_startup_failure_reported(self):
+        from greenprompt.asgi import WsgiBridge
+
+        def boom():
+            raise RuntimeError("no sampler")
+
+        app = WsgiBridge(_flask_app(), on_startup=boom)
+        with patch("logging.error"):
+            sent = self._lifespan(app)
+        self.assertEqual(sent, ["lifespan.startup.failed"])
+
+
+# ===========================================================================
+# 3. CLI
+# ===========================================================================
+
+
+class TestRunAsync(unittest.TestCase):
+    def _run_api(self, **kwargs):
+        from greenprompt.cli import run_api
+
+        with (
+            patch("greenprompt.cli.subprocess.run", return_value=MagicMock(stdout="")),
+            patch("greenprompt.cli.subprocess.Popen") as popen,
+            patch("builtins.print"),
+        ):
+            run_api(5001, **kwargs)
+        return popen.call_args.args[0]
+
+    def test_async_launches_asgi_module(self):
+        with patch.dict(sys.modules, {"uvicorn": types.ModuleType("uvicorn")}):
+            cmd = self._run_api(use_async=True, workers=8)
+        self.assertEqual(
+            cmd[1:], ["-m", "greenprompt.asgi", "--port=5001", "--workers=8"]
+        )
+
+    def test_default_launches_flask_server(self):
+        self.assertEqual(self._run_api()[1:], ["-m", "greenprompt.api", "--port=5001"])
+
+    def test_async_without_uvicorn_exits(self):
+        with patch.dict(sys.modules, {"uvicorn": None}):
+            with self.assertRaises(SystemExit):
+                self._run_api(use_async=True)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
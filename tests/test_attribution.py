@@ -0,0 +1,288 @@
+"""
+Tests for attribution.py — splitting power among overlapping prompts.
+
+Covers:
+  - equal split: shares for solo, fully and partially overlapping windows
+  - segments weighted by measured energy from the monitor's samples
+  - per-prompt energies summing to the machine's energy over the union
+  - "tokens" weighting by generation rate, with equal fallback; shares
+    still add up to the union when later finishers take the remainder
+  - "off" weighting and pruning of finished windows
+  - core.run_prompt: concurrent prompts report energy_share and scaled energy
+
+Clock values are patched so windows are exact; no Ollama server is used.
+"""
+
+import threading
+import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+
+def _monitor(points):
+    """A monitor stand-in whose samples are (ts, combined watts) pairs."""
+    from greenprompt.samplerCommon import SampleBuffer
+
+    buf = SampleBuffer(maxlen=100)
+    for ts, watts in points:
+        buf.append(
+            (ts, {"cpu_power_w": watts, "gpu_power_w": 0.0, "combined_power_w": watts})
+        )
+    return SimpleNamespace(samples=buf, sample_interval=1.0)
+
+
+def _play(events, monitor=None, weighting="equal", tokens=None):
+    """
+    Replay (time, "begin"|"end", key) events on a fresh tracker.
+
+    Returns {key: Span}; tokens maps key -> completion tokens set before end.
+    """
+    from greenprompt.attribution import AttributionTracker
+
+    tracker = AttributionTracker()
+    spans = {}
+    for t, kind, key in events:
+        with patch("greenprompt.attribution.time.time", return_value=t):
+            if kind == "begin":
+                spans[key] = tracker.begin()
+            else:
+                spans[key].tokens = (tokens or {}).get(key)
+                tracker.finish(spans[key], monitor, weighting)
+    return spans
+
+
+# ===========================================================================
+# 1. Equal split
+# ===========================================================================
+
+
+class TestEqualSplit(unittest.TestCase):
+    def test_alone(self):
+        spans = _play([(0, "begin", "a"), (2, "end", "a")])
+        self.assertEqual(spans["a"].share, 1.0)
+
+    def test_full_overlap_halves(self):
+        spans = _play(
+            [(0, "begin", "a"), (0, "begin", "b"), (4, "end", "a"), (4, "end", "b")]
+        )
+        self.assertEqual((spans["a"].share, spans["b"].share), (0.5, 0.5))
+
+    def test_partial_overlap(self):
+        # a: [0, 4], b: [2, 6]; the overlap [2, 4] is split between them.
+        spans = _play(
+            [(0, "begin", "a"), (2, "begin", "b"), (4, "end", "a"), (6, "end", "b")]
+        )
+        self.assertAlmostEqual(spans["a"].share, 0.75)
+        self.assertAlmostEqual(spans["b"].share, 0.75)
+
+    def test_three_way_nested(self):
+        # a: [0, 6], b: [1, 5], c: [2, 4]
+        spans = _play(
+            [
+                (0, "begin", "a"),
+                (1, "begin", "b"),
+                (2, "begin", "c"),
+                (4, "end", "c"),
+                (5, "end", "b"),
+                (6, "end", "a"),
+            ]
+        )
+        self.assertAlmostEqual(spans["c"].share, 1 / 3)
+        self.assertAlmostEqual(spans["b"].share, (2 / 2 + 2 / 3) / 4)
+        self.assertAlmostEqual(spans["a"].share, (2 + 2 / 2 + 2 / 3) / 6)
+        # Shares × window lengths cover the 6 s exactly once.
+        covered = sum(s.share * (s.end - s.start) for s in spans.values())
+        self.assertAlmostEqual(covered, 6.0)
+
+    def test_disjoint_windows_unaffected(self):
+        spans = _play(
+            [(0, "begin", "a"), (1, "end", "a"), (2, "begin", "b"), (3, "end", "b")]
+        )
+        self.assertEqual((spans["a"].share, spans["b"].share), (1.0, 1.0))
+
+
+# ===========================================================================
+# 2. Energy-weighted segments
+# ===========================================================================
+
+
+class TestMeasuredEnergy(unittest.TestCase):
+    def _energy(self, monitor, start, end):
+        window = monitor.samples.integrate(start, end, 2.0)
+        return float(window.energy_j[2])
+
+    def test_segments_weighted_by_power(self):
+        # 10 W while a runs alone [0, 2], 30 W while a and b overlap [2, 4].
+        monitor = _monitor([(0, 10), (1.999, 10), (2, 30), (4, 30)])
+        spans = _play(
+            [(0, "begin", "a"), (2, "begin", "b"), (4, "end", "a"), (4, "end", "b")],
+            monitor,
+        )
+        a_window = self._energy(monitor, 0, 4)
+        # a: all of [0, 2] plus half of [2, 4]
+        expected = (self._energy(monitor, 0, 2) + self._energy(monitor, 2, 4) / 2) / (
+            a_window
+        )
+        self.assertAlmostEqual(spans["a"].share, expected, places=6)
+        self.assertAlmostEqual(spans["b"].share, 0.5)
+
+    def test_attributed_energy_sums_to_measured(self):
+        monitor = _monitor([(t / 2, 10 + 7 * (t % 3)) for t in range(0, 21)])
+        spans = _play(
+            [
+                (0.0, "begin", "a"),
+                (1.3, "begin", "b"),
+                (2.1, "begin", "c"),
+                (4.4, "end", "a"),
+                (6.0, "end", "c"),
+                (9.2, "end", "b"),
+            ],
+            monitor,
+        )
+        attributed = sum(
+            s.share * self._energy(monitor, s.start, s.end) for s in spans.values()
+        )
+        self.assertAlmostEqual(attributed, self._energy(monitor, 0.0, 9.2), places=6)
+
+    def test_no_samples_falls_back_to_duration(self):
+        monitor = _monitor([])
+        spans = _play(
+            [(0, "begin", "a"), (0, "begin", "b"), (2, "end", "a"), (2, "end", "b")],
+            monitor,
+        )
+        self.assertEqual(spans["a"].share, 0.5)
+
+    def test_mock_monitor_tolerated(self):
+        spans = _play(
+            [(0, "begin", "a"), (0, "begin", "b"), (2, "end", "a"), (2, "end", "b")],
+            MagicMock(),
+        )
+        self.assertEqual(spans["a"].share, 0.5)
+
+
+# ===========================================================================
+# 3. Weightings and bookkeeping
+# ===========================================================================
+
+
+class TestWeightings(unittest.TestCase):
+    EVENTS = [(0, "begin", "a"), (0, "begin", "b"), (4, "end", "a"), (4, "end", "b")]
+
+    def test_tokens_weighted_by_rate(self):
+        # c (alone, 100 tok/s) sets the running rate. a and b then overlap
+        # fully; when a (300 tok/s) finishes, b is assumed to run at 100 tok/s
+        # and a claims 3/4; b, finishing last, gets what is left.
+        spans = _play(
+            [(0, "begin", "c"), (1, "end", "c")]
+            + [(2, "begin", "a"), (2, "begin", "b"), (6, "end", "a"), (6, "end", "b")],
+            weighting="tokens",
+            tokens={"c": 100, "a": 1200, "b": 400},
+        )
+        self.assertAlmostEqual(spans["a"].share, 0.75)
+        self.assertAlmostEqual(spans["b"].share, 0.25)
+
+    def test_tokens_shares_cover_window_once(self):
+        spans = _play(
+            [
+                (0, "begin", "a"),
+                (1, "begin", "b"),
+                (2, "begin", "c"),
+                (4, "end", "c"),
+                (5, "end", "a"),
+                (7, "end", "b"),
+            ],
+            weighting="tokens",
+            tokens={"a": 50, "b": 600, "c": 90},
+        )
+        covered = sum(s.share * (s.end - s.start) for s in spans.values())
+        self.assertAlmostEqual(covered, 7.0)
+
+    def test_tokens_without_counts_is_equal(self):
+        spans = _play(self.EVENTS, weighting="tokens")
+        self.assertEqual((spans["a"].share, spans["b"].share), (0.5, 0.5))
+
+    def test_off(self):
+        spans = _play(self.EVENTS, weighting="off")
+        self.assertEqual((spans["a"].share, spans["b"].share), (1.0, 1.0))
+
+    def test_default_from_constants(self):
+        with patch("greenprompt.constants.ENERGY_ATTRIBUTION", "off"):
+            spans = _play(self.EVENTS, weighting=None)
+        self.assertEqual(spans["a"].share, 1.0)
+
+    def test_finished_windows_pruned(self):
+        from greenprompt.attribution import AttributionTracker
+
+        tracker = AttributionTracker()
+        spans = [tracker.begin() for _ in range(5)]
+        self.assertEqual(tracker.open_count(), 5)
+        for span in spans:
+            tracker.finish(span)
+        self.assertEqual(tracker.open_count(), 0)
+        self.assertEqual(tracker._spans, {})
+
+
+# ===========================================================================
+# 4. core integration
+# ===========================================================================
+
+
+class TestRunPromptShares(unittest.TestCase):
+    def test_concurrent_prompts_split_energy(self):
+        from greenprompt.core import run_prompt
+
+        barrier = threading.Barrier(2)
+
+        def post(*args, **kwargs):
+            barrier.wait(timeout=5)  # both prompts are in flight together
+            response = MagicMock(status_code=200)
+            response.json.return_value = {"response": "ok", "eval_count": 2}
+            barrier.wait(timeout=5)
+            return response
+
+        power = {
+            "cpu_power_w": 6.0,
+            "gpu_power_w": 4.0,
+            "combined_power_w": 10.0,
+            "duration_sec": 1.0,
+            "energy_wh": 1.0,
+            "baseline_power_w": 2.0,
+            "baseline_energy_wh": 0.1,
+        }
+        results = []
+        with (
+            patch("greenprompt.core.get_ollama_client") as client,
+            patch("greenprompt.core.measure_power_for_pid", return_value=power),
+            patch("greenprompt.core.has_gpu", return_value=False),
+            patch("greenprompt.core.get_system_info", return_value={}),
+            patch("greenprompt.core.save_prompt_usage"),
+            patch(
+                "greenprompt.core.score_prompt",
+                return_value={"score_percent": 50.0, "details": {}},
+            ),
+            patch("builtins.print"),
+        ):
+            client.return_value.post.side_effect = post
+            threads = [
+                threading.Thread(target=lambda: results.append(run_prompt("hi", "m")))
+                for _ in range(2)
+            ]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+
+        self.assertEqual(len(results), 2)
+        for r in results:
+            self.assertLess(r["energy_share"], 0.9)
+            self.assertAlmostEqual(r["total_energy (Wh)"], r["energy_share"])
+            self.assertAlmostEqual(r["combined_power_w (W)"], 10 * r["energy_share"])
+            self.assertEqual(r["baseline_power (W)"], 2.0)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,258 @@
+"""
+Tests for batch.py — running many prompts with bounded concurrency.
+
+Covers:
+  - input parsing: strings, dicts, default model, ids, validation errors
+  - run_batch: concurrency bound, completion order, per-prompt errors,
+    overlap share passed on, bulk saves stamped per prompt, early close
+  - POST /api/prompts/batch: NDJSON streaming and 400 on bad input
+  - `greenprompt batch` file reading
+
+Ollama is replaced by patching batch.generate; no server is contacted.
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+
+# ---------------------------------------------------------------------------
+# Helpers / lightweight fakes
+# ---------------------------------------------------------------------------
+
+
+class _FakeGenerate:
+    """
+    Stands in for core.generate(): sleeps per prompt, records concurrency.
+
+    Windows are opened on the real attribution tracker, so overlapping
+    prompts get shares below 1 as they would in production.
+    """
+
+    def __init__(self, delays=None, fail=()):
+        self.delays = delays or {}
+        self.fail = set(fail)
+        self.lock = threading.Lock()
+        self.now = 0
+        self.peak = 0
+
+    def __call__(self, prompt, model, monitor=False, options=None):
+        from greenprompt.attribution import get_tracker
+
+        with self.lock:
+            self.now += 1
+            self.peak = max(self.peak, self.now)
+        span = get_tracker().begin()
+        try:
+            time.sleep(self.delays.get(prompt, 0.02))
+            if prompt in self.fail:
+                raise RuntimeError(f"❌ Ollama error: 500 – {prompt}")
+            data = {"response": prompt.upper(), "prompt_eval_count": 1, "eval_count": 2}
+            return data, span
+        finally:
+            get_tracker().finish(span, monitor, "equal")
+            with self.lock:
+                self.now -= 1
+
+
+def _fake_record(prompt, model, data, response_text, start, end, *args, **kwargs):
+    share = kwargs.get("share", 1.0)
+    return {
+        "prompt": prompt,
+        "model": model,
+        "response": response_text,
+        "total_tokens": 3,
+        "total_energy (Wh)": 1.0 * share,
+        "share": share,
+        "duration_sec": end - start,
+    }
+
+
+class _BatchTestCase(unittest.TestCase):
+    def setUp(self):
+        self.save = patch("greenprompt.batch.save_prompt_usage_many").start()
+        patch("greenprompt.batch.record_completion", side_effect=_fake_record).start()
+        patch("greenprompt.batch._detect_gpu_usage", return_value="No GPU").start()
+        self.addCleanup(patch.stopall)
+
+    def _run(self, items, fake=None, **kwargs):
+        from greenprompt.batch import run_batch
+
+        fake = fake or _FakeGenerate()
+        with patch("greenprompt.batch.generate", fake):
+            return list(run_batch(items, **kwargs)), fake
+
+
+# ===========================================================================
+# 1. Parsing
+# ===========================================================================
+
+
+class TestParseItems(unittest.TestCase):
+    def test_strings_and_dicts(self):
+        from greenprompt.batch import parse_items
+
+        parsed = parse_items(["a", {"prompt": "b", "model": "m2", "id": "x"}], "m1")
+        self.assertEqual(
+            parsed,
+            [
+                {"prompt": "a", "model": "m1", "id": None, "options": None},
+                {"prompt": "b", "model": "m2", "id": "x", "options": None},
+            ],
+        )
+
+    def test_invalid_input(self):
+        from greenprompt.batch import parse_items
+
+        for items in ([], "abc", {"prompt": "a"}, [{"model": "m"}], ["a", ""], [3]):
+            with self.subTest(items=items), self.assertRaises(ValueError):
+                parse_items(items, "m")
+
+
+# ===========================================================================
+# 2. run_batch
+# ===========================================================================
+
+
+class TestRunBatch(_BatchTestCase):
+    def test_concurrency_bounded(self):
+        results, fake = self._run([f"p{i}" for i in range(12)], concurrency=3)
+        self.assertEqual(len(results), 12)
+        self.assertLessEqual(fake.peak, 3)
+        self.assertGreater(fake.peak, 1)
+        self.assertEqual(sorted(r["index"] for r in results), list(range(12)))
+
+    def test_results_in_completion_order(self):
+        fake = _FakeGenerate(delays={"slow": 0.3, "fast": 0.01})
+        results, _ = self._run(["slow", "fast"], fake, concurrency=2)
+        self.assertEqual([r["index"] for r in results], [1, 0])
+        self.assertEqual(results[0]["response"], "FAST")
+
+    def test_failed_prompt_reported_and_not_saved(self):
+        fake = _FakeGenerate(fail={"bad"})
+        items = [{"prompt": "ok", "id": "a"}, {"prompt": "bad", "id": "b"}]
+        results, _ = self._run(items, fake, concurrency=1)
+        by_id = {r["id"]: r for r in results}
+        self.assertIn("500", by_id["b"]["error"])
+        self.assertNotIn("error", by_id["a"])
+        saved = [r for call in self.save.call_args_list for _, r in call.args[0]]
+        self.assertEqual([r["prompt"] for r in saved], ["ok"])
+
+    def test_overlap_share_passed_to_record(self):
+        results, _ = self._run(["a", "b"], _FakeGenerate({"a": 0.2, "b": 0.2}))
+        for r in results:
+            self.assertLess(r["share"], 0.75)
+
+    def test_sequential_prompts_unshared(self):
+        results, _ = self._run(["a", "b"], concurrency=1)
+        self.assertEqual([r["share"] for r in results], [1.0, 1.0])
+
+    def test_saved_in_bulk(self):
+        with patch("greenprompt.batch.SAVE_EVERY", 4):
+            self._run([f"p{i}" for i in range(10)], concurrency=2)
+        self.assertEqual([len(c.args[0]) for c in self.save.call_args_list], [4, 4, 2])
+
+    def test_saved_with_completion_times(self):
+        fake = _FakeGenerate(delays={"slow": 0.3, "fast": 0.01})
+        self._run(["slow", "fast"], fake, concurrency=2)
+        (records,) = [c.args[0] for c in self.save.call_args_list]
+        stamps = {r["prompt"]: ts for ts, r in records}
+        # Stamped as each prompt finished, not once when the batch was saved.
+        gap = datetime.fromisoformat(stamps["slow"]) - datetime.fromisoformat(
+            stamps["fast"]
+        )
+        self.assertGreater(gap.total_seconds(), 0.2)
+
+    def test_early_close_saves_yielded_results(self):
+        from greenprompt.batch import run_batch
+
+        with patch("greenprompt.batch.generate", _FakeGenerate()):
+            results = run_batch([f"p{i}" for i in range(20)], concurrency=2)
+            first = next(results)
+            results.close()
+            time.sleep(0.1)  # let the in-flight prompt finish while patched
+        saved = [r for call in self.save.call_args_list for _, r in call.args[0]]
+        self.assertIn(first["prompt"], [r["prompt"] for r in saved])
+        self.assertLess(len(saved), 20)
+
+    def test_validation_before_any_prompt(self):
+        from greenprompt.batch import run_batch
+
+        fake = _FakeGenerate()
+        with patch("greenprompt.batch.generate", fake), self.assertRaises(ValueError):
+            run_batch([{"model": "m"}])
+        self.assertEqual(fake.peak, 0)
+
+
+# ===========================================================================
+# 3. API endpoint and CLI
+# ===========================================================================
+
+
+class TestBatchEndpoint(_BatchTestCase):
+    def setUp(self):
+        super().setUp()
+        from greenprompt import api
+
+        patch.object(api, "monitor", None).start()
+        patch("greenprompt.batch.generate", _FakeGenerate()).start()
+        self.client = api.app.test_client()
+
+    def test_streams_ndjson(self):
+        resp = self.client.post(
+            "/api/prompts/batch",
+            json={"prompts": ["a", {"prompt": "b", "id": 7}], "model": "m"},
+        )
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.mimetype, "application/x-ndjson")
+        lines = [json.loads(line) for line in resp.data.splitlines()]
+        self.assertEqual(sorted(r["index"] for r in lines), [0, 1])
+        self.assertEqual({r["model"] for r in lines}, {"m"})
+        self.assertEqual([r.get("id") for r in lines if r["index"] == 1], [7])
+
+    def test_bad_requests(self):
+        for body in (
+            {},
+            ["a"],
+            {"prompts": []},
+            {"prompts": "abc"},
+            {"prompts": [{"model": "m"}]},
+            {"prompts": ["a"], "concurrency": 0},
+            {"prompts": ["a"], "concurrency": "x"},
+        ):
+            with self.subTest(body=body), patch("logging.error"):
+                resp = self.client.post("/api/prompts/batch", json=body)
+                self.assertEqual(resp.status_code, 400)
+                self.assertIn("error", resp.get_json())
+
+
+class TestBatchFile(unittest.TestCase):
+    def _file(self, text):
+        fd, path = tempfile.mkstemp(suffix=".jsonl")
+        with os.fdopen(fd, "w") as f:
+            f.write(text)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test_read_jsonl(self):
+        from greenprompt.cli import read_batch_file
+
+        path = self._file('"plain"\n\n{"prompt": "obj", "model": "m"}\n')
+        self.assertEqual(
+            read_batch_file(path), ["plain", {"prompt": "obj", "model": "m"}]
+        )
+
+    def test_invalid_line_reports_position(self):
+        from greenprompt.cli import read_batch_file
+
+        path = self._file('"ok"\nnot json\n')
+        with self.assertRaisesRegex(ValueError, r":2: invalid JSON"):
+            read_batch_file(path)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,247 @@
+"""
+Tests for prompt execution in core.py and the endpoints that wrap it.
+
+Covers:
+  - run_prompt_stream: token events, time-to-first-token, prefill/decode split,
+    mid-stream Ollama errors, connection errors, monitor begin/end_activity
+  - API: /api/prompt/stream SSE framing and error mapping
+
+Ollama is never contacted — requests.Session.request (behind ollamaClient) is
+patched with canned NDJSON.
+"""
+
+import json
+import threading
+import unittest
+from collections import deque
+from unittest.mock import MagicMock, patch
+
+import requests
+
+
+# ---------------------------------------------------------------------------
+# Helpers / lightweight fakes
+# ---------------------------------------------------------------------------
+
+
+def _ollama_stream(tokens, prompt_eval_count=4):
+    """Return a fake streaming requests.Response emitting Ollama NDJSON chunks."""
+    lines = [json.dumps({"response": t, "done": False}).encode() for t in tokens]
+    lines.append(
+        json.dumps(
+            {
+                "response": "",
+                "done": True,
+                "prompt_eval_count": prompt_eval_count,
+                "eval_count": len(tokens),
+            }
+        ).encode()
+    )
+    resp = MagicMock()
+    resp.status_code = 200
+    resp.iter_lines.return_value = iter(lines)
+    return resp
+
+
+class _FakeMonitor:
+    """Constant-power monitor exposing the get_range_average() read API."""
+
+    def __init__(self, watts=36.0):
+        self.watts = watts
+        self.samples = deque()
+        self._lock = threading.Lock()
+        self.sample_interval = 1
+
+    def get_range_average(self, start_ts, end_ts):
+        return self.watts
+
+
+_SCORE = {"score_percent": 50.0, "details": {}}
+
+
+def _core_patches():
+    """Patch out the GPU probes, scorer, system info and DB write used by core.py."""
+    return (
+        patch("greenprompt.core.has_gpu", return_value=False),
+        patch("greenprompt.core.get_system_info", return_value={}),
+        patch("greenprompt.core.save_prompt_usage"),
+        patch("greenprompt.core.score_prompt", return_value=_SCORE),
+    )
+
+
+# ===========================================================================
+# 1. run_prompt_stream
+# ===========================================================================
+
+
+class TestRunPromptStream(unittest.TestCase):
+    def _run(self, resp, monitor=None):
+        from greenprompt.core import run_prompt_stream
+
+        p_gpu, p_info, p_save, p_score = _core_patches()
+        with (
+            p_gpu,
+            p_info,
+            p_score,
+            p_save as save,
+            patch("requests.Session.request", return_value=resp),
+        ):
+            events = list(run_prompt_stream("List 3 colors.", "llama3.2", monitor))
+        return events, save
+
+    def test_yields_tokens_then_done(self):
+        events, _ = self._run(_ollama_stream(["Red", ", blue", ", green"]))
+        self.assertEqual([e["event"] for e in events], ["token"] * 3 + ["done"])
+        self.assertEqual([e["index"] for e in events[:3]], [0, 1, 2])
+        self.assertEqual(events[-1]["response"], "Red, blue, green")
+
+    def test_done_event_carries_token_counts(self):
+        events, _ = self._run(_ollama_stream(["a", "b"], prompt_eval_count=7))
+        done = events[-1]
+        self.assertEqual(done["prompt_tokens"], 7)
+        self.assertEqual(done["completion_tokens"], 2)
+        self.assertEqual(done["total_tokens"], 9)
+
+    def test_time_to_first_token_is_constant_across_events(self):
+        events, _ = self._run(_ollama_stream(["a", "b", "c"]))
+        ttfts = {e["time_to_first_token_sec"] for e in events}
+        self.assertEqual(len(ttfts), 1)
+        self.assertGreaterEqual(ttfts.pop(), 0.0)
+
+    def test_running_energy_uses_monitor(self):
+        monitor = _FakeMonitor(watts=3600.0)  # 1 Wh per second
+        events, _ = self._run(_ollama_stream(["a", "b"]), monitor=monitor)
+        for e in events[:-1]:
+            self.assertAlmostEqual(e["running_energy (Wh)"], e["elapsed_sec"], places=6)
+
+    def test_monitor_activity_brackets_prompt(self):
+        monitor = _FakeMonitor()
+        monitor.begin_activity = MagicMock()
+        monitor.end_activity = MagicMock()
+        self._run(_ollama_stream(["a"]), monitor=monitor)
+        monitor.begin_activity.assert_called_once()
+        monitor.end_activity.assert_called_once()
+
+    def test_monitor_activity_ended_on_error(self):
+        monitor = _FakeMonitor()
+        monitor.begin_activity = MagicMock()
+        monitor.end_activity = MagicMock()
+        resp = MagicMock()
+        resp.status_code = 200
+        resp.iter_lines.return_value = iter([b'{"error": "model crashed"}'])
+        with self.assertRaises(RuntimeError):
+            self._run(resp, monitor=monitor)
+        monitor.end_activity.assert_called_once()
+
+    def test_running_energy_zero_without_monitor(self):
+        events, _ = self._run(_ollama_stream(["a"]))
+        self.assertEqual(events[0]["running_energy (Wh)"], 0.0)
+
+    def test_prefill_and_decode_reported(self):
+        events, _ = self._run(_ollama_stream(["a"]))
+        done = events[-1]
+        self.assertIn("prefill_energy (Wh)", done)
+        self.assertIn("decode_energy (Wh)", done)
+
+    def test_result_is_saved_once(self):
+        _, save = self._run(_ollama_stream(["a", "b"]))
+        save.assert_called_once()
+        self.assertEqual(save.call_args[0][0]["response"], "ab")
+
+    def test_mid_stream_error_raises(self):
+        resp = MagicMock()
+        resp.status_code = 200
+        resp.iter_lines.return_value = iter(
+            [json.dumps({"response": "a"}).encode(), b'{"error": "model crashed"}']
+        )
+        with self.assertRaises(RuntimeError):
+            self._run(resp)
+
+    def test_non_200_raises_before_first_event(self):
+        from greenprompt.core import run_prompt_stream
+
+        resp = MagicMock(status_code=404, text="model not found")
+        p_gpu, p_info, p_save, p_score = _core_patches()
+        with (
+            p_gpu,
+            p_info,
+            p_save,
+            p_score,
+            patch("requests.Session.request", return_value=resp),
+        ):
+            with self.assertRaises(RuntimeError):
+                next(run_prompt_stream("hi", "missing"))
+
+    def test_connection_error_raises_runtime_error(self):
+        from greenprompt.core import run_prompt_stream
+
+        p_gpu, p_info, p_save, p_score = _core_patches()
+        with (
+            p_gpu,
+            p_info,
+            p_save,
+            p_score,
+            patch(
+                "requests.Session.request",
+                side_effect=requests.exceptions.ConnectionError,
+            ),
+        ):
+            with self.assertRaises(RuntimeError):
+                next(run_prompt_stream("hi", "llama3.2"))
+
+
+# ===========================================================================
+# 2. /api/prompt/stream
+# ===========================================================================
+
+
+class TestPromptStreamEndpoint(unittest.TestCase):
+    def setUp(self):
+        from greenprompt.api import app
+
+        app.config["TESTING"] = True
+        self.client = app.test_client()
+
+    def test_empty_prompt_returns_400(self):
+        resp = self.client.post("/api/prompt/stream", json={"prompt": ""})
+        self.assertEqual(resp.status_code, 400)
+
+    def test_streams_sse_frames(self):
+        def fake_stream(prompt, model, monitor=None):
+            yield {"event": "token", "token": "hi", "index": 0}
+            yield {"event": "done", "response": "hi", "time_to_first_token_sec": 0.1}
+
+        with patch("greenprompt.api.run_prompt_stream", side_effect=fake_stream):
+            resp = self.client.post("/api/prompt/stream", json={"prompt": "hello"})
+            body = resp.get_data(as_text=True)
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp.mimetype.startswith("text/event-stream"))
+        frames = [f for f in body.split("\n\n") if f]
+        self.assertEqual(len(frames), 2)
+        self.assertTrue(frames[0].startswith("event: token\ndata: "))
+        self.assertEqual(json.loads(frames[1].split("data: ", 1)[1])["response"], "hi")
+
+    def test_error_before_first_token_returns_400(self):
+        def failing(prompt, model, monitor=None):
+            raise RuntimeError("could not connect")
+            yield  # pragma: no cover
+
+        with patch("greenprompt.api.run_prompt_stream", side_effect=failing):
+            resp = self.client.post("/api/prompt/stream", json={"prompt": "hello"})
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn("error", resp.get_json())
+
+    def test_error_mid_stream_becomes_error_event(self):
+        def flaky(prompt, model, monitor=None):
+            yield {"event": "token", "token": "a", "index": 0}
+            raise RuntimeError("model crashed")
+
+        with patch("greenprompt.api.run_prompt_stream", side_effect=flaky):
+            resp = self.client.post("/api/prompt/stream", json={"prompt": "hello"})
+            body = resp.get_data(as_text=True)
+        self.assertIn("event: error", body)
+        self.assertIn("model crashed", body)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
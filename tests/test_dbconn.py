@@ -0,0 +1,766 @@
+"""
+Tests for the SQLite persistence layer (dbconn.py) and the host profile it stores.
+
+Covers:
+  - sysUsage host profile: static facts probed once, volatile fields on a TTL
+  - hosts table: one row per machine, prompt_usage rows reference it by id
+  - get_prompt_usage: system_info resolved from hosts or the legacy inline blob
+  - schema migration of databases created before host_id existed
+  - connection pool: WAL mode, connection reuse, one-time schema creation
+  - BatchWriter: grouped commits, flush/stop semantics, concurrent submitters
+  - save_prompt_usage_many: one transaction per call, or via the BatchWriter;
+    each record keeps its own timestamp
+  - usage queries: indexes, keyset pagination, column projection, /api/usage/*
+  - usage_rollup: incremental upserts, backfill, batch writes, dashboard reads
+  - dashboard figure cache: data version, lazy per-figure rebuilds, ETag/304
+
+Every test runs against a throwaway database file; DB_PATH is patched.
+"""
+
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import unittest
+from unittest.mock import patch
+
+from tests.helpers import TempDbTestCase
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+
+_PROFILE = {
+    "OS": "Linux",
+    "OS Version": "#1 SMP",
+    "Platform": "Linux-6.0-x86_64",
+    "Machine": "x86_64",
+    "Processor": "x86_64",
+    "CPU": "Test CPU",
+    "CPU Cores (Physical)": 4,
+    "CPU Cores (Total)": 8,
+    "CPU Frequency (Min)": "800.00 MHz",
+    "CPU Frequency (Max)": "3600.00 MHz",
+    "RAM (Total)": "16.0 GB",
+    "Disk (Total)": "512.0 GB",
+    "Hostname": "testhost",
+    "IP Address": "127.0.0.1",
+}
+
+
+def _record(**overrides):
+    data = {
+        "prompt": "Explain inertia.",
+        "prompt_score": 40.0,
+        "prompt_score_details": {"RTCF Structure": 1},
+        "response": "An object at rest...",
+        "model": "llama3.2:latest",
+        "prompt_tokens": 4,
+        "completion_tokens": 20,
+        "total_tokens": 24,
+        "total_energy (Wh)": 0.001,
+        "duration_sec": 1.5,
+        "combined_power_w (W)": 2.4,
+        "cpu_power_w (W)": 2.0,
+        "gpu_power_w (W)": 0.4,
+        "energy_estimate_tokens": 0.00024,
+        "energy_estimate_prompt": 0.00004,
+        "baseline_energy (Wh)": 0.0001,
+        "baseline_power (W)": 1.0,
+    }
+    data.update(overrides)
+    return data
+
+
+class _TempDbTestCase(TempDbTestCase):
+    profile = _PROFILE
+
+
+# ===========================================================================
+# 1. Host profile cache (sysUsage)
+# ===========================================================================
+
+
+class TestHostProfileCache(unittest.TestCase):
+    def setUp(self):
+        from greenprompt import sysUsage
+
+        self.sysUsage = sysUsage
+        sysUsage.refresh_host_profile()
+        self.addCleanup(sysUsage.refresh_host_profile)
+
+    def test_cpuinfo_probed_once(self):
+        with patch(
+            "greenprompt.sysUsage.cpuinfo.get_cpu_info",
+            return_value={"brand_raw": "Fake CPU"},
+        ) as cpu:
+            for _ in range(5):
+                info = self.sysUsage.get_system_info()
+        self.assertEqual(cpu.call_count, 1)
+        self.assertEqual(info["CPU"], "Fake CPU")
+
+    def test_hostname_resolved_once(self):
+        with (
+            patch("greenprompt.sysUsage.cpuinfo.get_cpu_info", return_value={}),
+            patch(
+                "greenprompt.sysUsage.socket.gethostbyname", return_value="10.0.0.2"
+            ) as dns,
+        ):
+            for _ in range(5):
+                self.sysUsage.get_system_info()
+        self.assertEqual(dns.call_count, 1)
+
+    def test_unresolvable_hostname_does_not_raise(self):
+        with (
+            patch("greenprompt.sysUsage.cpuinfo.get_cpu_info", return_value={}),
+            patch("greenprompt.sysUsage.socket.gethostbyname", side_effect=OSError),
+        ):
+            info = self.sysUsage.get_system_info()
+        self.assertEqual(info["IP Address"], "N/A")
+
+    def test_volatile_fields_refresh_after_ttl(self):
+        with (
+            patch("greenprompt.sysUsage.cpuinfo.get_cpu_info", return_value={}),
+            patch("greenprompt.sysUsage.HOST_PROFILE_TTL_S", 0.0),
+            patch(
+                "greenprompt.sysUsage.shutil.disk_usage",
+                wraps=shutil.disk_usage,
+            ) as disk,
+        ):
+            self.sysUsage.get_system_info()
+            self.sysUsage.get_system_info()
+        # One call for the static total, then one per volatile refresh.
+        self.assertEqual(disk.call_count, 3)
+
+    def test_volatile_fields_cached_within_ttl(self):
+        with (
+            patch("greenprompt.sysUsage.cpuinfo.get_cpu_info", return_value={}),
+            patch("greenprompt.sysUsage.HOST_PROFILE_TTL_S", 3600.0),
+            patch(
+                "greenprompt.sysUsage.shutil.disk_usage",
+                wraps=shutil.disk_usage,
+            ) as disk,
+        ):
+            for _ in range(5):
+                self.sysUsage.get_system_info()
+        self.assertEqual(disk.call_count, 2)
+
+    def test_system_info_keys_unchanged(self):
+        with patch("greenprompt.sysUsage.cpuinfo.get_cpu_info", return_value={}):
+            info = self.sysUsage.get_system_info()
+        self.assertEqual(len(info), 17)
+        for key in (
+            "CPU Frequency (Current)",
+            "Disk (Used)",
+            "Disk (Free)",
+            "IP Address",
+        ):
+            self.assertIn(key, info)
+
+    def test_host_profile_excludes_volatile_fields(self):
+        with patch("greenprompt.sysUsage.cpuinfo.get_cpu_info", return_value={}):
+            profile = self.sysUsage.get_host_profile()
+        self.assertNotIn("Disk (Free)", profile)
+        self.assertNotIn("CPU Frequency (Current)", profile)
+
+    def test_fingerprint_stable_and_content_sensitive(self):
+        fp = self.sysUsage.host_fingerprint
+        self.assertEqual(fp(_PROFILE), fp(dict(reversed(list(_PROFILE.items())))))
+        self.assertNotEqual(fp(_PROFILE), fp({**_PROFILE, "Hostname": "other"}))
+
+
+# ===========================================================================
+# 2. hosts table
+# ===========================================================================
+
+
+class TestHostsTable(_TempDbTestCase):
+    def test_one_host_row_for_many_prompts(self):
+        from greenprompt.dbconn import save_prompt_usage
+
+        for _ in range(5):
+            save_prompt_usage(_record())
+        self.assertEqual(self._raw("SELECT COUNT(*) FROM hosts")[0][0], 1)
+        host_ids = self._raw("SELECT DISTINCT host_id FROM prompt_usage")
+        self.assertEqual(len(host_ids), 1)
+        self.assertIsNotNone(host_ids[0][0])
+
+    def test_new_rows_do_not_repeat_system_info(self):
+        from greenprompt.dbconn import save_prompt_usage
+
+        save_prompt_usage(_record())
+        self.assertIsNone(self._raw("SELECT system_info FROM prompt_usage")[0][0])
+
+    def test_get_prompt_usage_resolves_profile(self):
+        from greenprompt.dbconn import get_prompt_usage, save_prompt_usage
+
+        save_prompt_usage(_record())
+        row = get_prompt_usage()[0]
+        self.assertEqual(json.loads(row["system_info"])["Hostname"], "testhost")
+
+    def test_distinct_machines_get_distinct_rows(self):
+        from greenprompt.dbconn import get_prompt_usage, save_prompt_usage
+
+        save_prompt_usage(_record())
+        self.profile = {**_PROFILE, "Hostname": "otherhost"}
+        save_prompt_usage(_record())
+        self.assertEqual(self._raw("SELECT COUNT(*) FROM hosts")[0][0], 2)
+        hostnames = [
+            json.loads(r["system_info"])["Hostname"] for r in get_prompt_usage()
+        ]
+        self.assertEqual(hostnames, ["testhost", "otherhost"])
+
+    def test_recreated_database_gets_its_host_row(self):
+        from greenprompt import dbconn
+
+        dbconn.save_prompt_usage(_record())
+        dbconn.close_connections()
+        os.remove(self.db_path)
+        # Another machine takes hosts.id 1 in the new file.
+        self.profile = {**_PROFILE, "Hostname": "otherhost"}
+        dbconn.save_prompt_usage(_record())
+        self.profile = _PROFILE
+        dbconn.save_prompt_usage(_record())
+        hostnames = [
+            json.loads(r["system_info"])["Hostname"] for r in dbconn.get_prompt_usage()
+        ]
+        self.assertEqual(hostnames, ["otherhost", "testhost"])
+
+    def test_legacy_database_is_migrated(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute(
+            "CREATE TABLE prompt_usage (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "timestamp TEXT NOT NULL, prompt TEXT, prompt_score INTEGER, "
+            "prompt_score_details TEXT, response TEXT, model TEXT, "
+            "prompt_tokens INTEGER, completion_tokens INTEGER, total_tokens INTEGER, "
+            "energy_estimate_prompt REAL, energy_estimate_tokens REAL, "
+            "duration_sec REAL, energy_wh REAL, baseline_power_w REAL, "
+            "baseline_energy_wh REAL, cpu_power_w REAL, gpu_power_w REAL, "
+            "combined_power_w REAL, system_info TEXT)"
+        )
+        conn.execute(
+            "INSERT INTO prompt_usage (timestamp, model, system_info) VALUES (?, ?, ?)",
+            ("2025-01-01T00:00:00", "llama2", json.dumps({"Hostname": "legacy"})),
+        )
+        conn.commit()
+        conn.close()
+
+        from greenprompt.dbconn import get_prompt_usage, save_prompt_usage
+
+        save_prompt_usage(_record())
+        rows = get_prompt_usage()
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(json.loads(rows[0]["system_info"])["Hostname"], "legacy")
+        self.assertIsNone(rows[0]["host_id"])
+        self.assertEqual(json.loads(rows[1]["system_info"])["Hostname"], "testhost")
+        self.assertIsNone(rows[0]["load_duration_sec"])
+
+
+# ===========================================================================
+# 3. Connection pool
+# ===========================================================================
+
+
+class TestConnectionPool(_TempDbTestCase):
+    def test_wal_journal_mode(self):
+        from greenprompt.dbconn import get_prompt_usage
+
+        get_prompt_usage()
+        self.assertEqual(self._raw("PRAGMA journal_mode")[0][0], "wal")
+
+    def test_connections_are_reused(self):
+        from greenprompt import dbconn
+
+        with patch("greenprompt.dbconn._connect", wraps=dbconn._connect) as connect:
+            for _ in range(10):
+                dbconn.save_prompt_usage(_record())
+                dbconn.get_prompt_usage()
+        self.assertEqual(connect.call_count, 1)
+
+    def test_schema_created_once_per_process(self):
+        from greenprompt import dbconn
+
+        with patch(
+            "greenprompt.dbconn._create_schema", wraps=dbconn._create_schema
+        ) as create:
+            for _ in range(5):
+                dbconn.save_prompt_usage(_record())
+                dbconn.get_prompt_usage()
+        self.assertEqual(create.call_count, 1)
+
+    def test_failed_write_is_rolled_back_before_reuse(self):
+        from greenprompt import dbconn
+
+        dbconn.init_db()
+        with self.assertRaises(sqlite3.OperationalError):
+            with dbconn._pool().connection() as conn:
+                conn.execute(
+                    "INSERT INTO prompt_usage (timestamp) VALUES ('2025-01-01')"
+                )
+                conn.execute("SELECT * FROM no_such_table")
+        self.assertEqual(dbconn.get_prompt_usage(), [])
+
+    def test_concurrent_saves(self):
+        from greenprompt.dbconn import get_prompt_usage, save_prompt_usage
+
+        errors = []
+
+        def worker():
+            try:
+                for _ in range(20):
+                    save_prompt_usage(_record())
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(len(get_prompt_usage()), 160)
+
+    def test_get_connection_returns_caller_owned_connection(self):
+        from greenprompt.dbconn import get_connection
+
+        conn = get_connection()
+        self.assertIsInstance(conn, sqlite3.Connection)
+        conn.close()
+
+
+# ===========================================================================
+# 4. BatchWriter
+# ===========================================================================
+
+
+class TestBatchWriter(_TempDbTestCase):
+    def test_rows_visible_after_flush(self):
+        from greenprompt import dbconn
+
+        writer = dbconn.enable_batch_writes(flush_interval=0.05)
+        for i in range(25):
+            dbconn.save_prompt_usage(_record(prompt=f"p{i}"))
+        writer.flush()
+        rows = dbconn.get_prompt_usage()
+        self.assertEqual([r["prompt"] for r in rows], [f"p{i}" for i in range(25)])
+
+    def test_inserts_grouped_into_few_transactions(self):
+        from greenprompt import dbconn
+
+        with patch(
+            "greenprompt.dbconn._insert_usage", wraps=dbconn._insert_usage
+        ) as insert:
+            writer = dbconn.enable_batch_writes(flush_interval=0.5)
+            for _ in range(50):
+                dbconn.save_prompt_usage(_record())
+            writer.flush()
+        self.assertLess(insert.call_count, 5)
+        self.assertEqual(len(dbconn.get_prompt_usage()), 50)
+
+    def test_disable_flushes_pending_rows(self):
+        from greenprompt import dbconn
+
+        dbconn.enable_batch_writes(flush_interval=5.0)
+        for _ in range(3):
+            dbconn.save_prompt_usage(_record())
+        dbconn.disable_batch_writes()
+        self.assertEqual(len(dbconn.get_prompt_usage()), 3)
+
+    def test_enable_is_idempotent(self):
+        from greenprompt import dbconn
+
+        self.assertIs(dbconn.enable_batch_writes(), dbconn.enable_batch_writes())
+
+    def test_concurrent_submitters(self):
+        from greenprompt import dbconn
+
+        writer = dbconn.enable_batch_writes(flush_interval=0.02)
+
+        def worker():
+            for _ in range(25):
+                dbconn.save_prompt_usage(_record())
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        writer.flush()
+        self.assertEqual(len(dbconn.get_prompt_usage()), 100)
+
+    def test_write_failure_does_not_kill_writer(self):
+        from greenprompt import dbconn
+
+        writer = dbconn.enable_batch_writes(flush_interval=0.01)
+        with patch(
+            "greenprompt.dbconn._insert_usage", side_effect=sqlite3.Error("disk")
+        ):
+            dbconn.save_prompt_usage(_record())
+            writer.flush()
+        dbconn.save_prompt_usage(_record())
+        writer.flush()
+        self.assertEqual(len(dbconn.get_prompt_usage()), 1)
+
+    def test_save_many_single_transaction(self):
+        from greenprompt import dbconn
+
+        with patch(
+            "greenprompt.dbconn._insert_usage", wraps=dbconn._insert_usage
+        ) as insert:
+            dbconn.save_prompt_usage_many(
+                (f"2026-01-01T10:{i:02d}:00", _record(prompt=f"p{i}"))
+                for i in range(30)
+            )
+            dbconn.save_prompt_usage_many([])
+        self.assertEqual(insert.call_count, 1)
+        rows = dbconn.get_prompt_usage()
+        self.assertEqual([r["prompt"] for r in rows], [f"p{i}" for i in range(30)])
+        rollup = dbconn.get_usage_rollup("all")
+        self.assertEqual(rollup[0]["prompt_count"], 30)
+
+    def test_save_many_keeps_each_records_timestamp(self):
+        from greenprompt import dbconn
+
+        stamps = ["2026-01-01T10:00:30", "2026-01-01T10:01:10", "2026-01-01T11:00:00"]
+        dbconn.save_prompt_usage_many((ts, _record()) for ts in stamps)
+        self.assertEqual([r["timestamp"] for r in dbconn.get_prompt_usage()], stamps)
+        minutes = dbconn.get_usage_rollup("minute")
+        self.assertEqual(
+            [(r["bucket_start"], r["prompt_count"]) for r in minutes],
+            [("2026-01-01T10:00", 1), ("2026-01-01T10:01", 1), ("2026-01-01T11:00", 1)],
+        )
+
+    def test_save_many_goes_through_active_writer(self):
+        from greenprompt import dbconn
+
+        writer = dbconn.enable_batch_writes(flush_interval=0.05)
+        dbconn.save_prompt_usage_many(
+            [(dbconn.usage_timestamp(), _record()) for _ in range(2)]
+        )
+        writer.flush()
+        self.assertEqual(len(dbconn.get_prompt_usage()), 2)
+
+
+# ===========================================================================
+# 5. Indexed, paginated and projected usage queries
+# ===========================================================================
+
+
+class TestUsageQueries(_TempDbTestCase):
+    def _seed(self, n, model="llama3.2:latest"):
+        from greenprompt.dbconn import save_prompt_usage
+
+        for i in range(n):
+            save_prompt_usage(_record(model=model, prompt=f"prompt {i}"))
+
+    def test_indexes_created(self):
+        from greenprompt.dbconn import init_db
+
+        init_db()
+        names = {r[0] for r in self._raw("SELECT name FROM sqlite_master")}
+        self.assertIn("idx_prompt_usage_timestamp", names)
+        self.assertIn("idx_prompt_usage_model_timestamp", names)
+
+    def test_pages_cover_every_row_once(self):
+        from greenprompt.dbconn import get_prompt_usage_page
+
+        self._seed(7)
+        seen, cursor = [], None
+        while True:
+            rows, cursor = get_prompt_usage_page(limit=3, cursor=cursor)
+            seen.extend(r["id"] for r in rows)
+            if cursor is None:
+                break
+        self.assertEqual(seen, sorted(seen))
+        self.assertEqual(len(seen), 7)
+        self.assertEqual(len(set(seen)), 7)
+
+    def test_pagination_stable_with_identical_timestamps(self):
+        from greenprompt.dbconn import get_prompt_usage_page
+
+        self._seed(5)
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("UPDATE prompt_usage SET timestamp = '2025-01-01T00:00:00'")
+        conn.commit()
+        conn.close()
+        first, cursor = get_prompt_usage_page(limit=2)
+        rest, _ = get_prompt_usage_page(limit=10, cursor=cursor)
+        ids = [r["id"] for r in first + rest]
+        self.assertEqual(ids, [1, 2, 3, 4, 5])
+
+    def test_descending_limit_returns_newest(self):
+        from greenprompt.dbconn import get_prompt_usage
+
+        self._seed(5)
+        rows = get_prompt_usage(columns=["prompt"], limit=2, descending=True)
+        self.assertEqual([r["prompt"] for r in rows], ["prompt 4", "prompt 3"])
+
+    def test_projection_returns_only_requested_columns(self):
+        from greenprompt.dbconn import get_prompt_usage
+
+        self._seed(1)
+        row = get_prompt_usage(columns=["model", "energy_wh"])[0]
+        self.assertEqual(set(row), {"model", "energy_wh"})
+
+    def test_projection_resolves_system_info(self):
+        from greenprompt.dbconn import get_prompt_usage
+
+        self._seed(1)
+        row = get_prompt_usage(columns=["system_info"])[0]
+        self.assertEqual(json.loads(row["system_info"])["Hostname"], "testhost")
+
+    def test_model_filter_with_pagination(self):
+        from greenprompt.dbconn import get_prompt_usage_page
+
+        self._seed(3, model="a")
+        self._seed(3, model="b")
+        rows, cursor = get_prompt_usage_page(model="b", limit=2)
+        more, end = get_prompt_usage_page(model="b", limit=2, cursor=cursor)
+        self.assertEqual({r["model"] for r in rows + more}, {"b"})
+        self.assertEqual(len(rows + more), 3)
+        self.assertIsNone(end)
+
+    def test_invalid_arguments_raise_value_error(self):
+        from greenprompt.dbconn import get_prompt_usage_page
+
+        for kwargs in (
+            {"columns": ["nope"]},
+            {"limit": 0},
+            {"limit": 5, "cursor": "not-a-cursor"},
+        ):
+            with self.subTest(**kwargs), self.assertRaises(ValueError):
+                get_prompt_usage_page(**kwargs)
+
+    def test_api_next_cursor_header(self):
+        from greenprompt.api import app
+
+        self._seed(3)
+        client = app.test_client()
+        resp = client.get("/api/usage/all?limit=2&fields=model,energy_wh")
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(len(resp.get_json()), 2)
+        self.assertEqual(
+            set(resp.get_json()[0]), {"id", "timestamp", "model", "energy_wh"}
+        )
+        cursor = resp.headers["X-Next-Cursor"]
+        last = client.get(f"/api/usage/all?limit=2&cursor={cursor}")
+        self.assertEqual(len(last.get_json()), 1)
+        self.assertNotIn("X-Next-Cursor", last.headers)
+
+    def test_api_bad_field_returns_400(self):
+        from greenprompt.api import app
+
+        resp = app.test_client().get("/api/usage/all?fields=bogus")
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn("error", resp.get_json())
+
+
+# ===========================================================================
+# 6. usage_rollup
+# ===========================================================================
+
+
+class TestUsageRollup(_TempDbTestCase):
+    def _save(self, **overrides):
+        from greenprompt.dbconn import save_prompt_usage
+
+        save_prompt_usage(_record(**overrides))
+
+    def _by_model(self, granularity="all"):
+        from greenprompt.dbconn import get_usage_rollup
+
+        return {r["model"]: r for r in get_usage_rollup(granularity)}
+
+    def test_totals_match_prompt_usage(self):
+        for energy in (0.001, 0.002, 0.004):
+            self._save(**{"total_energy (Wh)": energy})
+        self._save(model="mistral")
+        rollup = self._by_model()
+        self.assertEqual(rollup["llama3.2:latest"]["prompt_count"], 3)
+        self.assertAlmostEqual(rollup["llama3.2:latest"]["energy_wh"], 0.007)
+        self.assertEqual(rollup["llama3.2:latest"]["total_tokens"], 72)
+        self.assertEqual(rollup["mistral"]["prompt_count"], 1)
+
+    def test_every_granularity_updated(self):
+        from greenprompt.dbconn import ROLLUP_GRANULARITIES, get_usage_rollup
+
+        self._save()
+        for granularity, width in ROLLUP_GRANULARITIES.items():
+            rows = get_usage_rollup(granularity)
+            self.assertEqual(len(rows), 1, granularity)
+            self.assertEqual(len(rows[0]["bucket_start"]), width)
+
+    def test_missing_values_count_as_zero(self):
+        self._save(model=None, **{"total_energy (Wh)": None})
+        row = self._by_model()[""]
+        self.assertEqual(row["prompt_count"], 1)
+        self.assertEqual(row["energy_wh"], 0)
+
+    def test_existing_rows_backfilled(self):
+        from greenprompt import dbconn
+
+        self._save()
+        self._save(model="mistral")
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("DROP TABLE usage_rollup")
+        conn.commit()
+        conn.close()
+        dbconn.close_connections()
+        rollup = self._by_model("day")
+        self.assertEqual(set(rollup), {"llama3.2:latest", "mistral"})
+        self._save()
+        self.assertEqual(self._by_model()["llama3.2:latest"]["prompt_count"], 2)
+
+    def test_rebuild_matches_incremental(self):
+        from greenprompt.dbconn import get_usage_rollup, rebuild_usage_rollup
+
+        for i in range(4):
+            self._save(model=f"m{i % 2}")
+        before = get_usage_rollup("minute")
+        rebuild_usage_rollup()
+        self.assertEqual(get_usage_rollup("minute"), before)
+
+    def test_batched_writes_aggregate(self):
+        from greenprompt import dbconn
+
+        writer = dbconn.enable_batch_writes(flush_interval=0.05)
+        for _ in range(20):
+            self._save()
+        writer.flush()
+        self.assertEqual(self._by_model()["llama3.2:latest"]["prompt_count"], 20)
+
+    def test_time_window_filter(self):
+        from greenprompt.dbconn import get_usage_rollup
+
+        self._save()
+        self.assertEqual(get_usage_rollup("hour", start_time="2999-01-01"), [])
+        self.assertEqual(len(get_usage_rollup("hour", end_time="2999-01-01")), 1)
+
+    def test_unknown_granularity_raises(self):
+        from greenprompt.dbconn import get_usage_rollup
+
+        with self.assertRaises(ValueError):
+            get_usage_rollup("week")
+
+    def test_dashboard_figures_from_rollup(self):
+        from greenprompt.analytics import (
+            load_usage_rollup,
+            model_comparison,
+            total_prompts_energy_usage,
+        )
+
+        self._save(**{"total_energy (Wh)": 0.002})
+        self._save(**{"total_energy (Wh)": 0.004})
+        totals = load_usage_rollup("all")
+        indicator = total_prompts_energy_usage(totals).data[0]
+        self.assertEqual(indicator.value, 2)
+        bar = model_comparison(totals).data[0]
+        self.assertAlmostEqual(list(bar.y)[0], 0.003)
+
+    def test_rollup_endpoint(self):
+        from greenprompt.api import app
+
+        self._save()
+        client = app.test_client()
+        resp = client.get("/api/usage/rollup?granularity=day")
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.get_json()[0]["prompt_count"], 1)
+        self.assertEqual(client.get("/api/usage/rollup?granularity=x").status_code, 400)
+
+
+# ===========================================================================
+# 7. Dashboard figure cache
+# ===========================================================================
+
+
+class TestFigureCache(_TempDbTestCase):
+    def setUp(self):
+        super().setUp()
+        from greenprompt import analytics
+
+        self.cache = analytics.FigureCache()
+        self.loads = {"totals": 0, "recent": 0}
+        sources = {}
+        for source, loader in analytics.DASHBOARD_SOURCES.items():
+
+            def counting(source=source, loader=loader):
+                self.loads[source] += 1
+                return loader()
+
+            sources[source] = counting
+        p = patch.dict(analytics.DASHBOARD_SOURCES, sources)
+        p.start()
+        self.addCleanup(p.stop)
+
+    def _save(self):
+        from greenprompt.dbconn import save_prompt_usage
+
+        save_prompt_usage(_record())
+
+    def test_version_changes_on_insert_and_rebuild(self):
+        from greenprompt.dbconn import get_data_version, rebuild_usage_rollup
+
+        v0 = get_data_version()
+        self.assertEqual(get_data_version(), v0)
+        self._save()
+        v1 = get_data_version()
+        self.assertNotEqual(v1, v0)
+        rebuild_usage_rollup()
+        self.assertNotEqual(get_data_version(), v1)
+
+    def test_cached_until_new_rows(self):
+        self._save()
+        first, _ = self.cache.get("model_comparison")
+        again, _ = self.cache.get("model_comparison")
+        self.assertIs(again, first)
+        self.assertEqual(self.loads["totals"], 1)
+        self._save()
+        self.cache.get("model_comparison")
+        self.assertEqual(self.loads["totals"], 2)
+
+    def test_only_requested_figures_built(self):
+        self._save()
+        self.cache.get("total_prompts_energy")
+        self.assertEqual(self.loads, {"totals": 1, "recent": 0})
+
+    def test_source_shared_between_figures(self):
+        from greenprompt.analytics import DASHBOARD_FIGURES
+
+        self._save()
+        for name in DASHBOARD_FIGURES:
+            figure, _ = self.cache.get(name)
+            self.assertIn("data", json.loads(figure))
+        self.assertEqual(self.loads, {"totals": 1, "recent": 1})
+
+    def test_unknown_figure_raises(self):
+        with self.assertRaises(KeyError):
+            self.cache.get("nope")
+
+    def test_figure_endpoint_etag(self):
+        from greenprompt import api
+
+        with patch.object(api, "figure_cache", self.cache):
+            client = api.app.test_client()
+            resp = client.get("/api/dashboard/figures/energy_usage")
+            self.assertEqual(resp.status_code, 200)
+            self.assertIn("layout", resp.get_json())
+            etag = resp.headers["ETag"]
+            cached = client.get(
+                "/api/dashboard/figures/energy_usage",
+                headers={"If-None-Match": etag},
+            )
+            self.assertEqual(cached.status_code, 304)
+            self._save()
+            fresh = client.get(
+                "/api/dashboard/figures/energy_usage",
+                headers={"If-None-Match": etag},
+            )
+            self.assertEqual(fresh.status_code, 200)
+            missing = client.get("/api/dashboard/figures/nope")
+            self.assertEqual(missing.status_code, 404)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
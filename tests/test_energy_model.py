@@ -0,0 +1,230 @@
+"""
+Tests for energyModel.py — energy and latency fitted from measured history.
+
+Covers:
+  - least squares recovering per-model coefficients from synthetic runs
+  - incremental refresh: only new rows read, fits updated
+  - host fit preferred, other hosts' data next, static rate without history
+  - defaults from history (completion tokens, load time)
+  - load_duration_sec stored from Ollama's load_duration
+  - MODEL_ENERGY_MAP matching Ollama tags by family prefix
+  - POST /api/estimate
+
+Every test runs against a throwaway database file; DB_PATH is patched and the
+host profile stubbed.
+"""
+
+import unittest
+from unittest.mock import patch
+
+from tests.helpers import TempDbTestCase
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+# Synthetic hardware: Wh per prefill token, per decode token, per load
+# second, per request; seconds likewise.
+ENERGY = (1e-6, 2e-5, 5e-3, 1e-4)
+LATENCY = (2e-4, 4e-2, 1.0, 0.05)
+
+
+def _run(prompt_tokens, completion_tokens, load_s=0.0, model="llama3.2:latest"):
+    x = (prompt_tokens, completion_tokens, load_s, 1.0)
+    return {
+        "prompt": "p",
+        "model": model,
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+        "load_duration_sec": load_s,
+        "total_energy (Wh)": sum(a * b for a, b in zip(x, ENERGY)),
+        "duration_sec": sum(a * b for a, b in zip(x, LATENCY)),
+    }
+
+
+def _history(n=12, **kwargs):
+    return [
+        _run(20 + 13 * i, 5 + (7 * i) % 40, 1.5 if i % 4 == 0 else 0.0, **kwargs)
+        for i in range(n)
+    ]
+
+
+class _EnergyTestCase(TempDbTestCase):
+    def save(self, records):
+        from greenprompt.dbconn import save_prompt_usage_many, usage_timestamp
+
+        save_prompt_usage_many((usage_timestamp(), data) for data in records)
+
+    def model(self):
+        from greenprompt.energyModel import EnergyModel
+
+        return EnergyModel()
+
+    def host_id(self):
+        from greenprompt.dbconn import get_current_host_id
+
+        return get_current_host_id()
+
+
+# ===========================================================================
+# 1. Fitting
+# ===========================================================================
+
+
+class TestFit(_EnergyTestCase):
+    def test_recovers_coefficients(self):
+        self.save(_history())
+        estimate = self.model().estimate(
+            "llama3.2:latest", 500, 100, 0.0, host_id=self.host_id()
+        )
+        self.assertEqual((estimate["source"], estimate["samples"]), ("host", 12))
+        fitted = estimate["coefficients"]["energy_wh"]
+        for name, expected in zip(
+            ("prompt_tokens", "completion_tokens", "load_duration_sec"), ENERGY
+        ):
+            self.assertAlmostEqual(fitted[name] / expected, 1.0, places=6)
+        self.assertAlmostEqual(
+            estimate["energy_wh"], 500 * ENERGY[0] + 100 * ENERGY[1] + ENERGY[3]
+        )
+        self.assertAlmostEqual(
+            estimate["duration_sec"], 500 * LATENCY[0] + 100 * LATENCY[1] + LATENCY[3]
+        )
+
+    def test_incremental_refresh(self):
+        model = self.model()
+        self.save(_history(10))
+        self.assertEqual(model.refresh(), 10)
+        self.assertEqual(model.refresh(), 0)
+        self.save(_history(3))
+        with patch("greenprompt.energyModel.REFRESH_BATCH", 2):
+            self.assertEqual(model.refresh(), 3)
+        self.assertEqual(model.estimate("llama3.2:latest", 10)["samples"], 13)
+
+    def test_unmeasured_rows_skipped(self):
+        self.save(_history(10) + [{**_run(5, 5), "total_energy (Wh)": 0}])
+        self.assertEqual(self.model().refresh(), 10)
+
+    def test_defaults_from_history(self):
+        records = [_run(10 * i, 30, 2.0 if i == 0 else 0.0) for i in range(1, 9)]
+        self.save(records)
+        estimate = self.model().estimate("llama3.2:latest", 100)
+        self.assertEqual(estimate["completion_tokens"], 30)
+        self.assertAlmostEqual(estimate["load_duration_sec"], 0.0)
+
+
+# ===========================================================================
+# 2. Fallbacks
+# ===========================================================================
+
+
+class TestFallback(_EnergyTestCase):
+    def test_other_hosts_then_static(self):
+        self.profile = {"Hostname": "gpu-box"}
+        self.save(_history())
+        self.profile = {"Hostname": "laptop"}
+        estimate = self.model().estimate(
+            "llama3.2:latest", 100, 10, host_id=self.host_id()
+        )
+        self.assertEqual((estimate["source"], estimate["samples"]), ("model", 12))
+
+        static = self.model().estimate("mistral:7b", 100)
+        self.assertEqual(static["source"], "static")
+        self.assertEqual(static["completion_tokens"], 256)
+        self.assertIsNone(static["duration_sec"])
+        self.assertAlmostEqual(static["energy_wh"], 356 / 1000 * 0.008)
+
+    def test_too_few_samples_is_static(self):
+        self.save(_history(7))
+        self.assertEqual(
+            self.model().estimate("llama3.2:latest", 1)["source"], "static"
+        )
+
+    def test_static_rate_matches_tags(self):
+        from greenprompt.core import energy_per_1k_tokens
+
+        cases = {
+            "llama2:13b": 0.01,
+            "Mistral:latest": 0.008,
+            "gpt-4o-mini": 0.04,
+            "gpt-4": 0.06,
+            "phi3:mini": 0.005,
+            "qwen2.5:7b": 0.01,
+        }
+        for model, rate in cases.items():
+            with self.subTest(model=model):
+                self.assertEqual(energy_per_1k_tokens(model), rate)
+
+
+# ===========================================================================
+# 3. Recording and API
+# ===========================================================================
+
+
+class TestIntegration(_EnergyTestCase):
+    def test_load_duration_recorded(self):
+        from greenprompt.core import _build_result
+        from greenprompt.dbconn import get_prompt_usage, save_prompt_usage
+
+        power = dict.fromkeys(
+            (
+                "total_energy",
+                "combined_power_w",
+                "cpu_power",
+                "gpu_power",
+                "baseline_energy",
+                "baseline_power",
+            ),
+            0.0,
+        )
+        with (
+            patch("greenprompt.core.score_prompt", return_value={}),
+            patch("greenprompt.core.get_system_info", return_value={}),
+        ):
+            result = _build_result(
+                "p", "m", {"load_duration": 2_500_000_000}, "ok", 3.0, power, ""
+            )
+        self.assertEqual(result["load_duration_sec"], 2.5)
+        save_prompt_usage(result)
+        self.assertEqual(get_prompt_usage()[0]["load_duration_sec"], 2.5)
+
+    def test_estimate_endpoint(self):
+        from greenprompt import api, energyModel
+
+        self.save(_history())
+        patch.object(energyModel, "_model", self.model()).start()
+        client = api.app.test_client()
+        resp = client.post(
+            "/api/estimate",
+            json={
+                "prompt_tokens": 500,
+                "completion_tokens": 100,
+                "load_duration_sec": 0,
+            },
+        )
+        self.assertEqual(resp.status_code, 200)
+        body = resp.get_json()
+        self.assertEqual((body["source"], body["host_id"]), ("host", self.host_id()))
+        self.assertAlmostEqual(
+            body["energy_wh"], 500 * ENERGY[0] + 100 * ENERGY[1] + ENERGY[3]
+        )
+
+        with patch("greenprompt.api.count_tokens", return_value=42) as count:
+            body = client.post("/api/estimate", json={"prompt": "Hi"}).get_json()
+        count.assert_called_once_with("Hi", "llama3.2:latest")
+        self.assertEqual(body["prompt_tokens"], 42)
+
+        for bad in (
+            {},
+            [1],
+            {"prompt_tokens": -1},
+            {"prompt": "x", "completion_tokens": "9"},
+        ):
+            with self.subTest(body=bad):
+                self.assertEqual(
+                    client.post("/api/estimate", json=bad).status_code, 400
+                )
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
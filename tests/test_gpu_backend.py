@@ -0,0 +1,316 @@
+"""
+Tests for gpuBackend.py and its callers.
+
+Covers:
+  - NvmlBackend against a fake pynvml module: cached handles, mW → W,
+    unsupported readings, shutdown
+  - NvidiaSmiBackend: cached device count, N/A parsing, failure handling
+  - get_gpu_backend selection (auto / nvml / nvidia-smi, missing pynvml)
+  - has_gpu / get_gpu_usage and LinuxPowerMonitor reading through the backend
+
+NVML is never loaded — a fake module stands in for pynvml.
+"""
+
+import subprocess
+import sys
+import types
+import unittest
+from collections import namedtuple
+from unittest.mock import patch
+
+# ---------------------------------------------------------------------------
+# Helpers / lightweight fakes
+# ---------------------------------------------------------------------------
+
+_Utilization = namedtuple("_Utilization", "gpu memory")
+_Memory = namedtuple("_Memory", "total free used")
+
+
+class _NVMLError(Exception):
+    pass
+
+
+def _fake_nvml(devices):
+    """
+    Build a module with the slice of the pynvml API gpuBackend uses.
+
+    devices: one dict per GPU with name, power_mw, limit_mw, util, mem_util,
+    used, total, temp. A value of None makes that call raise NVMLError.
+    """
+    nvml = types.ModuleType("pynvml")
+    nvml.NVMLError = _NVMLError
+    nvml.NVML_TEMPERATURE_GPU = 0
+    nvml.calls = {"init": 0, "handle": 0, "shutdown": 0}
+
+    def _get(key):
+        def read(handle, *args):
+            value = devices[handle][key]
+            if value is None:
+                raise _NVMLError(key)
+            return value
+
+        return read
+
+    def init():
+        nvml.calls["init"] += 1
+
+    def handle(i):
+        nvml.calls["handle"] += 1
+        return i
+
+    def shutdown():
+        nvml.calls["shutdown"] += 1
+
+    nvml.nvmlInit = init
+    nvml.nvmlShutdown = shutdown
+    nvml.nvmlDeviceGetCount = lambda: len(devices)
+    nvml.nvmlDeviceGetHandleByIndex = handle
+    nvml.nvmlDeviceGetName = _get("name")
+    nvml.nvmlDeviceGetPowerUsage = _get("power_mw")
+    nvml.nvmlDeviceGetEnforcedPowerLimit = _get("limit_mw")
+    nvml.nvmlDeviceGetTemperature = _get("temp")
+
+    def utilization(h):
+        d = devices[h]
+        return _Utilization(d["util"], d["mem_util"])
+
+    def memory(h):
+        d = devices[h]
+        return _Memory(d["total"], d["total"] - d["used"], d["used"])
+
+    nvml.nvmlDeviceGetUtilizationRates = utilization
+    nvml.nvmlDeviceGetMemoryInfo = memory
+    return nvml
+
+
+def _device(name=b"NVIDIA RTX 4090", power_mw=35200, **overrides):
+    device = {
+        "name": name,
+        "power_mw": power_mw,
+        "limit_mw": 450000,
+        "util": 12,
+        "mem_util": 3,
+        "used": 1024 * 2**20,
+        "total": 24564 * 2**20,
+        "temp": 45,
+    }
+    device.update(overrides)
+    return device
+
+
+class _BackendTestCase(unittest.TestCase):
+    """Resets the shared backend around each test."""
+
+    def setUp(self):
+        from greenprompt import gpuBackend
+
+        gpuBackend.reset_gpu_backend()
+        self.addCleanup(gpuBackend.reset_gpu_backend)
+
+
+# ===========================================================================
+# 1. NvmlBackend
+# ===========================================================================
+
+
+class TestNvmlBackend(unittest.TestCase):
+    def _backend(self, devices):
+        from greenprompt.gpuBackend import NvmlBackend
+
+        nvml = _fake_nvml(devices)
+        return NvmlBackend(nvml), nvml
+
+    def test_power_converted_to_watts(self):
+        backend, _ = self._backend([_device(), _device(power_mw=210000)])
+        self.assertEqual(backend.power_by_gpu(), {0: 35.2, 1: 210.0})
+
+    def test_handles_cached_across_reads(self):
+        backend, nvml = self._backend([_device(), _device()])
+        for _ in range(5):
+            backend.power_by_gpu()
+            backend.usage()
+        self.assertEqual(nvml.calls, {"init": 1, "handle": 2, "shutdown": 0})
+
+    def test_unsupported_power_reads_zero(self):
+        backend, _ = self._backend([_device(power_mw=None)])
+        self.assertEqual(backend.power_by_gpu(), {0: 0.0})
+        self.assertIsNone(backend.usage()[0]["power_draw_w"])
+
+    def test_usage_fields(self):
+        backend, _ = self._backend([_device()])
+        gpu = backend.usage()[0]
+        self.assertEqual(gpu["name"], "NVIDIA RTX 4090")
+        self.assertAlmostEqual(gpu["power_limit_w"], 450.0)
+        self.assertEqual(gpu["gpu_util_pct"], 12)
+        self.assertAlmostEqual(gpu["mem_used_mib"], 1024.0)
+        self.assertAlmostEqual(gpu["mem_total_mib"], 24564.0)
+        self.assertEqual(gpu["temperature_c"], 45)
+
+    def test_shutdown(self):
+        backend, nvml = self._backend([_device()])
+        backend.shutdown()
+        self.assertEqual(nvml.calls["shutdown"], 1)
+        self.assertEqual(backend.device_count(), 0)
+
+
+# ===========================================================================
+# 2. NvidiaSmiBackend
+# ===========================================================================
+
+
+class TestNvidiaSmiBackend(unittest.TestCase):
+    def test_device_count_cached(self):
+        from greenprompt.gpuBackend import NvidiaSmiBackend
+
+        backend = NvidiaSmiBackend()
+        listing = b"GPU 0: A (UUID: x)\nGPU 1: B (UUID: y)\n"
+        with patch("subprocess.check_output", return_value=listing) as check:
+            self.assertEqual(backend.device_count(), 2)
+            self.assertEqual(backend.device_count(), 2)
+        check.assert_called_once()
+
+    def test_missing_nvidia_smi_means_no_gpus(self):
+        from greenprompt.gpuBackend import NvidiaSmiBackend
+
+        backend = NvidiaSmiBackend()
+        with patch("subprocess.check_output", side_effect=FileNotFoundError):
+            self.assertEqual(backend.device_count(), 0)
+            self.assertEqual(backend.power_by_gpu(), {})
+            with self.assertRaises(OSError):
+                backend.usage()
+
+    def test_power_one_line_per_gpu(self):
+        from greenprompt.gpuBackend import NvidiaSmiBackend
+
+        with patch("subprocess.check_output", return_value=b"45.5\n[N/A]\n120\n"):
+            self.assertEqual(
+                NvidiaSmiBackend().power_by_gpu(), {0: 45.5, 1: 0.0, 2: 120.0}
+            )
+
+    def test_usage_parses_na(self):
+        from greenprompt.gpuBackend import NvidiaSmiBackend
+
+        out = b"NVIDIA GB10, [N/A], [N/A], 7, 0, 2048, 131072, 41\n"
+        with patch("subprocess.check_output", return_value=out):
+            gpu = NvidiaSmiBackend().usage()[0]
+        self.assertEqual(gpu["name"], "NVIDIA GB10")
+        self.assertIsNone(gpu["power_draw_w"])
+        self.assertEqual(gpu["mem_total_mib"], 131072.0)
+
+
+# ===========================================================================
+# 3. Backend selection
+# ===========================================================================
+
+
+class TestGetGpuBackend(_BackendTestCase):
+    def _select(self, choice, nvml):
+        from greenprompt.gpuBackend import get_gpu_backend
+
+        with (
+            patch("greenprompt.constants.GPU_BACKEND", choice),
+            patch.dict(sys.modules, {"pynvml": nvml}),
+        ):
+            return get_gpu_backend()
+
+    def test_auto_prefers_nvml(self):
+        self.assertEqual(self._select("auto", _fake_nvml([_device()])).name, "nvml")
+
+    def test_auto_without_pynvml_uses_nvidia_smi(self):
+        # A None entry in sys.modules makes `import pynvml` raise ImportError.
+        self.assertEqual(self._select("auto", None).name, "nvidia-smi")
+
+    def test_nvml_init_failure_falls_back(self):
+        nvml = _fake_nvml([])
+
+        def no_driver():
+            raise _NVMLError("driver not loaded")
+
+        nvml.nvmlInit = no_driver
+        with patch("builtins.print"):
+            self.assertEqual(self._select("nvml", nvml).name, "nvidia-smi")
+
+    def test_nvidia_smi_forced(self):
+        backend = self._select("nvidia-smi", _fake_nvml([_device()]))
+        self.assertEqual(backend.name, "nvidia-smi")
+
+    def test_backend_shared(self):
+        from greenprompt.gpuBackend import get_gpu_backend
+
+        first = self._select("auto", _fake_nvml([_device()]))
+        self.assertIs(get_gpu_backend(), first)
+
+
+# ===========================================================================
+# 4. Callers
+# ===========================================================================
+
+
+class TestCallersUseBackend(_BackendTestCase):
+    def setUp(self):
+        super().setUp()
+        from greenprompt.gpuBackend import NvmlBackend
+
+        self.nvml = _fake_nvml([_device(), _device(power_mw=None)])
+        patcher = patch(
+            "greenprompt.gpuBackend._load_nvml", return_value=NvmlBackend(self.nvml)
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_has_gpu_and_usage_without_subprocess(self):
+        from greenprompt.sysUsage import get_gpu_usage, has_gpu
+
+        with (
+            patch("greenprompt.constants.OS", "Linux"),
+            patch("subprocess.check_output", side_effect=AssertionError) as check,
+        ):
+            self.assertTrue(has_gpu())
+            usage = get_gpu_usage()
+        check.assert_not_called()
+        first, second = usage.split("; ")
+        self.assertEqual(
+            first,
+            "GPU: NVIDIA RTX 4090 | Power: 35.20 W / 450.00 W | GPU util: 12 % | "
+            "Mem: 1024 MiB / 24564 MiB | Temp: 45 C",
+        )
+        self.assertIn("Power: N/A / 450.00 W", second)
+
+    def test_get_gpu_usage_reports_nvidia_smi_failure(self):
+        from greenprompt import gpuBackend
+        from greenprompt.sysUsage import get_gpu_usage
+
+        gpuBackend._backend = gpuBackend.NvidiaSmiBackend()
+        with (
+            patch("greenprompt.constants.OS", "Linux"),
+            patch(
+                "subprocess.check_output",
+                side_effect=subprocess.CalledProcessError(9, "nvidia-smi"),
+            ),
+        ):
+            self.assertTrue(get_gpu_usage().startswith("Error retrieving GPU usage"))
+
+    def test_linux_monitor_samples_via_nvml(self):
+        from greenprompt.samplerLinux import GPU_POWER_KEY, LinuxPowerMonitor
+
+        with (
+            patch("greenprompt.samplerLinux._detect_rapl_path", return_value=None),
+            patch("greenprompt.samplerLinux._detect_cpu_clusters", return_value={}),
+            patch("psutil.cpu_percent", return_value=[10.0] * 4),
+        ):
+            m = LinuxPowerMonitor()
+        with (
+            patch("psutil.cpu_percent", return_value=10.0),
+            patch("greenprompt.samplerLinux.NvidiaDmonReader") as dmon,
+            patch("builtins.print"),
+        ):
+            m.start()
+            sample = m.sample_once()
+            m.stop()
+        dmon.assert_not_called()
+        self.assertEqual(sample[GPU_POWER_KEY], {0: 35.2, 1: 0.0})
+        self.assertAlmostEqual(sample["gpu_power_w"], 35.2)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -4,7 +4,9 @@ Stress tests and edge-case coverage for Linux power monitoring.
 Covers:
   - CPU arch simulation (RAPL / ARM big.LITTLE / single-cluster / linear_tdp fallback)
   - sysfs failure modes (missing files, bad values, RAPL counter overflow)
-  - NvidiaDmonReader (unavailable, garbled output, process death mid-run)
+  - NvidiaDmonReader (unavailable, garbled output, process death mid-run,
+    multiple GPUs) and NvidiaPmonReader / attribute_gpu_power (per-process
+    GPU power attribution, per-GPU breakdown in measure_power_linux)
   - LinuxPowerMonitor thread safety (concurrent read/write under lock)
   - LinuxPowerMonitor lifecycle (rapid start/stop, deque rotation, no-GPU path)
   - measure_power_linux edge cases (None monitor, 0 samples, zero duration,
@@ -26,7 +28,7 @@ from unittest.mock import MagicMock, patch, mock_open
 
 
 def _make_monitor(samples=None, sample_interval=1):
-    """Return a minimal LinuxPowerMonitor-like object without starting a thread."""
+    """Return a linear_tdp LinuxPowerMonitor over a plain deque, not started."""
     from greenprompt.samplerLinux import LinuxPowerMonitor
 
     with (
@@ -34,20 +36,9 @@ def _make_monitor(samples=None, sample_interval=1):
         patch("greenprompt.samplerLinux._detect_cpu_clusters", return_value={}),
         patch("psutil.cpu_percent", return_value=[10.0] * 20),
     ):
-        m = LinuxPowerMonitor.__new__(LinuxPowerMonitor)
-        m.samples = deque(maxlen=600)
-        m.running = False
-        m.sample_interval = sample_interval
-        m.cpu_tdp_w = 23.0
-        m._lock = threading.Lock()
-        m._stop_event = threading.Event()
-        m._cpu_mode = "linear_tdp"
-        m._gpu_available = None
-        m._gpu_unavailable_warned = False
-        m._dmon = None
-        if samples:
-            m.samples.extend(samples)
-        return m
+        m = LinuxPowerMonitor(sample_interval=sample_interval, cpu_tdp_w=23.0)
+    m.samples = deque(samples or (), maxlen=600)
+    return m
 
 
 def _sample(cpu=5.0, gpu=3.0):
@@ -499,6 +490,117 @@ class TestNvidiaDmonReader(unittest.TestCase):
             t.join()
         self.assertEqual(errors, [])
 
+    def test_multi_gpu_rows_tracked_per_index(self):
+        from greenprompt.samplerLinux import NvidiaDmonReader
+
+        lines = ["# gpu pwr\n", "    0   40\n", "    1  210\n", "    0   45\n"]
+        proc = MagicMock()
+        proc.stdout = iter(lines)
+        with patch("subprocess.Popen", return_value=proc):
+            r = NvidiaDmonReader()
+            r._thread.join(timeout=1.0)
+        self.assertEqual(r.get_power_by_gpu(), {0: 45.0, 1: 210.0})
+        self.assertAlmostEqual(r.get_power(), 255.0)
+
+
+class TestGpuAttribution(unittest.TestCase):
+    _PMON = [
+        "# gpu         pid   type     sm    mem    enc    dec    command\n",
+        "# Idx           #    C/G      %      %      %      %    name\n",
+        "    0       4821     C     60     40      -      -    ollama_llama_se\n",
+        "    0       5000     C     20      5      -      -    python\n",
+        "    1          -     -      -      -      -      -    -\n",
+        "    1       4821     C      -      -      -      -    ollama_llama_se\n",
+    ]
+
+    def _pmon(self, lines):
+        from greenprompt.samplerLinux import NvidiaPmonReader
+
+        proc = MagicMock()
+        proc.stdout = iter(lines)
+        with patch("subprocess.Popen", return_value=proc):
+            r = NvidiaPmonReader()
+            r._thread.join(timeout=1.0)
+        return r
+
+    def test_pmon_parses_utilization(self):
+        r = self._pmon(self._PMON)
+        self.assertEqual(
+            r.get_utilization(), {0: {4821: 60.0, 5000: 20.0}, 1: {4821: 0.0}}
+        )
+
+    def test_pmon_rows_expire(self):
+        r = self._pmon(self._PMON)
+        r._ttl_s = 0.0
+        time.sleep(0.01)
+        self.assertEqual(r.get_utilization(), {})
+
+    def test_pmon_unavailable_sets_failed(self):
+        from greenprompt.samplerLinux import NvidiaPmonReader
+
+        with patch("subprocess.Popen", side_effect=FileNotFoundError):
+            self.assertTrue(NvidiaPmonReader()._failed)
+
+    def test_power_split_by_sm_share(self):
+        from greenprompt.samplerLinux import attribute_gpu_power
+
+        util = {0: {4821: 60.0, 5000: 20.0}, 1: {4821: 0.0}}
+        attributed = attribute_gpu_power({0: 200.0, 1: 30.0}, util, {4821})
+        self.assertAlmostEqual(attributed[0], 150.0)
+        self.assertEqual(attributed[1], 0.0)  # idle GPU: nothing attributed
+
+    def test_measure_power_linux_reports_per_gpu_breakdown(self):
+        from greenprompt.samplerLinux import (
+            GPU_POWER_KEY,
+            OLLAMA_GPU_POWER_KEY,
+            LinuxPowerMonitor,
+        )
+        from greenprompt.sysUsage import measure_power_linux
+
+        with (
+            patch("greenprompt.samplerLinux._detect_rapl_path", return_value=None),
+            patch("greenprompt.samplerLinux._detect_cpu_clusters", return_value={}),
+            patch("psutil.cpu_percent", return_value=[10.0] * 4),
+        ):
+            m = LinuxPowerMonitor(gpu_attribution=True)
+        for i in range(10):
+            sample = {
+                **_sample(cpu=5.0, gpu=250.0),
+                GPU_POWER_KEY: {0: 200.0, 1: 50.0},
+                OLLAMA_GPU_POWER_KEY: {0: 150.0, 1: 0.0},
+            }
+            m.samples.append((100.0 + i, sample))
+            m._append_gpu_sample(100.0 + i, sample)
+        result = measure_power_linux(102.0, 106.0, m)
+        self.assertEqual(result["gpu_power_by_index"], {"0": 200.0, "1": 50.0})
+        self.assertEqual(result["ollama_gpu_power_by_index"], {"0": 150.0, "1": 0.0})
+        self.assertAlmostEqual(result["gpu_power_w"], 250.0)
+        self.assertEqual(m.status()["gpus"], [0, 1])
+
+    def test_gpu_reporting_one_sample_late_gets_its_column(self):
+        # dmon parses one GPU per line: the first sample can predate GPU 1.
+        from greenprompt.samplerLinux import GPU_POWER_KEY, LinuxPowerMonitor
+        from greenprompt.sysUsage import measure_power_linux
+
+        with (
+            patch("greenprompt.samplerLinux._detect_rapl_path", return_value=None),
+            patch("greenprompt.samplerLinux._detect_cpu_clusters", return_value={}),
+            patch("psutil.cpu_percent", return_value=[10.0] * 4),
+        ):
+            m = LinuxPowerMonitor()
+        for i in range(10):
+            by_gpu = {0: 200.0} if i == 0 else {0: 200.0, 1: 50.0}
+            sample = {
+                **_sample(cpu=5.0, gpu=sum(by_gpu.values())),
+                GPU_POWER_KEY: by_gpu,
+            }
+            m.samples.append((100.0 + i, sample))
+            m._append_gpu_sample(100.0 + i, sample)
+        self.assertEqual(len(list(m.gpu_samples)), 10)
+        result = measure_power_linux(102.0, 106.0, m)
+        self.assertEqual(result["gpu_power_by_index"], {"0": 200.0, "1": 50.0})
+        self.assertEqual(m.status()["gpus"], [0, 1])
+
 
 # ===========================================================================
 # 7. LinuxPowerMonitor lifecycle
@@ -690,7 +792,9 @@ class TestMeasurePowerLinux(unittest.TestCase):
         m = _make_monitor(samples=samples)
         result = self._call(now - 1.0, now, m)
         self.assertGreater(result["energy_wh"], 0.0)
-        self.assertAlmostEqual(result["cpu_power_w"], 5.0)
+        # Time-weighted: 4 W held for 0.2 s, ramp 4→6 W over 0.4 s, 6 W held
+        # for 0.4 s → (0.8 + 2.0 + 2.4) J / 1 s = 5.2 W.
+        self.assertAlmostEqual(result["cpu_power_w"], 5.2)
         self.assertAlmostEqual(result["gpu_power_w"], 2.0)
 
     def test_short_prompt_interpolates_from_neighbors(self):
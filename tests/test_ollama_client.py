@@ -0,0 +1,276 @@
+"""
+Tests for ollamaClient.py — the pooled HTTP client used for Ollama calls.
+
+Covers:
+  - keep-alive: consecutive requests reuse one TCP connection
+  - retries: 503 retried with backoff, POSTs that reached the server not resent
+  - timeouts: default (connect, read) applied, ReadTimeout surfaces
+  - max_in_flight bound for request() and the asyncio API; max_streams and
+    stream_wait_s for stream(), which never holds up request()
+  - core.run_prompt going through the shared client
+  - /ollama/api proxy: forwarded via the client, 502 when Ollama is down
+
+A throwaway http.server on 127.0.0.1 stands in for Ollama.
+"""
+
+import asyncio
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+import requests
+
+# ---------------------------------------------------------------------------
+# Helpers / lightweight fakes
+# ---------------------------------------------------------------------------
+
+
+class _FakeOllama(BaseHTTPRequestHandler):
+    """Replies from server.script (a list of statuses), then 200 with JSON."""
+
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def _reply(self):
+        server = self.server
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        with server.lock:
+            server.requests.append((self.command, self.path, body))
+            server.ports.add(self.client_address[1])
+            status = server.script.pop(0) if server.script else 200
+        if server.delay:
+            time.sleep(server.delay)
+        payload = json.dumps({"response": "ok", "done": True}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    do_GET = do_POST = _reply
+
+    def log_message(self, *args):
+        pass
+
+
+class _ServerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _FakeOllama)
+        self.server.daemon_threads = True
+        self.server.lock = threading.Lock()
+        self.server.requests = []
+        self.server.ports = set()
+        self.server.script = []
+        self.server.delay = 0.0
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def _client(self, **kwargs):
+        from greenprompt.ollamaClient import OllamaClient
+
+        kwargs.setdefault("backoff", 0.0)
+        client = OllamaClient(self.base_url, **kwargs)
+        self.addCleanup(client.close)
+        return client
+
+
+# ===========================================================================
+# 1. Pooling, retries, timeouts
+# ===========================================================================
+
+
+class TestOllamaClient(_ServerTestCase):
+    def test_connections_reused(self):
+        client = self._client()
+        for _ in range(5):
+            self.assertEqual(client.get("/api/tags").status_code, 200)
+        self.assertEqual(len(self.server.requests), 5)
+        self.assertEqual(len(self.server.ports), 1)
+
+    def test_503_retried_then_succeeds(self):
+        self.server.script = [503, 503]
+        client = self._client(retries=2)
+        resp = client.post("/api/generate", json={"prompt": "hi"})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(len(self.server.requests), 3)
+
+    def test_503_returned_when_retries_exhausted(self):
+        self.server.script = [503, 503, 503]
+        resp = self._client(retries=1).post("/api/generate", json={})
+        self.assertEqual(resp.status_code, 503)
+        self.assertEqual(len(self.server.requests), 2)
+
+    def test_server_error_not_resent(self):
+        self.server.script = [500]
+        resp = self._client(retries=3).post("/api/generate", json={})
+        self.assertEqual(resp.status_code, 500)
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_connection_refused_raises(self):
+        from greenprompt.ollamaClient import OllamaClient
+
+        self.server.shutdown()
+        self.server.server_close()
+        client = OllamaClient(self.base_url, retries=1, backoff=0.0)
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            client.get("/api/tags")
+
+    def test_read_timeout(self):
+        self.server.delay = 0.5
+        client = self._client(read_timeout=0.1, retries=0)
+        with self.assertRaises(requests.exceptions.ReadTimeout):
+            client.get("/api/tags")
+
+    def test_default_timeout_passed(self):
+        client = self._client(connect_timeout=2, read_timeout=30)
+        with patch.object(client.session, "request") as send:
+            client.post("/api/generate", json={})
+        self.assertEqual(send.call_args.kwargs["timeout"], (2.0, 30.0))
+        self.assertEqual(send.call_args.args[1], f"{self.base_url}/api/generate")
+
+
+# ===========================================================================
+# 2. Concurrency bound
+# ===========================================================================
+
+
+class TestInFlightBound(_ServerTestCase):
+    def _track(self, client):
+        """Wrap client.session.request to record peak concurrency."""
+        state = {"now": 0, "peak": 0}
+        lock = threading.Lock()
+        send = client.session.request
+
+        def tracked(*args, **kwargs):
+            with lock:
+                state["now"] += 1
+                state["peak"] = max(state["peak"], state["now"])
+            try:
+                return send(*args, **kwargs)
+            finally:
+                with lock:
+                    state["now"] -= 1
+
+        client.session.request = tracked
+        return state
+
+    def test_request_bounded(self):
+        self.server.delay = 0.05
+        client = self._client(max_in_flight=2)
+        state = self._track(client)
+        threads = [
+            threading.Thread(target=client.get, args=("/api/tags",)) for _ in range(8)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(len(self.server.requests), 8)
+        self.assertLessEqual(state["peak"], 2)
+
+    def test_stream_holds_slot_until_closed(self):
+        client = self._client(max_in_flight=1, max_streams=1)
+        entered = threading.Event()
+
+        def second_stream():
+            with client.stream("POST", "/api/generate", json={}):
+                entered.set()
+
+        with client.stream("POST", "/api/generate", json={}) as resp:
+            self.assertEqual(resp.status_code, 200)
+            # Plain requests have their own slots.
+            self.assertEqual(client.get("/api/tags").status_code, 200)
+            t = threading.Thread(target=second_stream)
+            t.start()
+            self.assertFalse(entered.wait(0.2))
+        self.assertTrue(entered.wait(2.0))
+        t.join()
+
+    def test_stream_gives_up_when_slots_stay_busy(self):
+        from greenprompt.ollamaClient import OllamaBusyError
+
+        client = self._client(max_streams=1, stream_wait_s=0.1)
+        with client.stream("POST", "/api/generate", json={}):
+            with self.assertRaises(OllamaBusyError):
+                with client.stream("POST", "/api/generate", json={}):
+                    pass
+        with client.stream("POST", "/api/generate", json={}) as resp:
+            self.assertEqual(resp.status_code, 200)
+
+    def test_async_api_shares_bound(self):
+        self.server.delay = 0.05
+        client = self._client(max_in_flight=2)
+        state = self._track(client)
+
+        async def run():
+            return await asyncio.gather(
+                *(client.apost("/api/generate", json={}) for _ in range(6))
+            )
+
+        responses = asyncio.run(run())
+        self.assertEqual([r.status_code for r in responses], [200] * 6)
+        self.assertLessEqual(state["peak"], 2)
+
+
+# ===========================================================================
+# 3. Callers
+# ===========================================================================
+
+
+class TestCallersUseClient(_ServerTestCase):
+    def setUp(self):
+        super().setUp()
+        from greenprompt import ollamaClient
+
+        ollamaClient.reset_ollama_client()
+        patcher = patch("greenprompt.constants.OLLAMA_URL", self.base_url)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(ollamaClient.reset_ollama_client)
+
+    def test_run_prompt_reuses_connection(self):
+        from greenprompt.core import run_prompt
+
+        with (
+            patch("greenprompt.core.has_gpu", return_value=False),
+            patch("greenprompt.core.get_system_info", return_value={}),
+            patch("greenprompt.core.save_prompt_usage"),
+            patch(
+                "greenprompt.core.score_prompt",
+                return_value={"score_percent": 50.0, "details": {}},
+            ),
+            patch("builtins.print"),
+        ):
+            for _ in range(3):
+                self.assertEqual(run_prompt("hi", "llama3.2")["response"], "ok")
+        self.assertEqual([r[1] for r in self.server.requests], ["/api/generate"] * 3)
+        self.assertEqual(len(self.server.ports), 1)
+
+    def test_proxy_forwards_through_client(self):
+        from greenprompt.api import app
+
+        client = app.test_client()
+        resp = client.get("/ollama/api/tags?x=1")
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(self.server.requests[-1][:2], ("GET", "/api/tags?x=1"))
+
+    def test_proxy_returns_502_when_ollama_down(self):
+        from greenprompt.api import app
+
+        self.server.shutdown()
+        self.server.server_close()
+        with (
+            patch("greenprompt.constants.OLLAMA_RETRIES", 0),
+            patch("logging.error"),
+        ):
+            resp = app.test_client().get("/ollama/api/tags")
+        self.assertEqual(resp.status_code, 502)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,377 @@
+"""
+Tests for the /ollama/api reverse proxy and core.CompletionMeter.
+
+Covers:
+  - streamed Ollama replies relayed chunk by chunk, not buffered
+  - upstream connection released when the client stops reading
+  - a stalled stream never blocks run_prompt(); 503 when stream slots stay busy
+  - METER_PROXY: /api/generate and /api/chat calls measured and saved, also
+    when the client goes away right after the last chunk
+  - no metering when METER_PROXY is off, for other paths, or without "done"
+  - CompletionMeter NDJSON parsing across chunk boundaries
+  - ASGI backpressure: a slow client bounds what the worker buffers
+
+A throwaway http.server on 127.0.0.1 stands in for Ollama.
+"""
+
+import asyncio
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+from flask import Flask, Response
+
+# ---------------------------------------------------------------------------
+# Helpers / lightweight fakes
+# ---------------------------------------------------------------------------
+
+
+def _ndjson(*objs):
+    return [(json.dumps(o) + "\n").encode() for o in objs]
+
+
+GENERATE_LINES = _ndjson(
+    {"model": "llama3.2", "response": "Hel", "done": False},
+    {"model": "llama3.2", "response": "lo", "done": False},
+    {
+        "model": "llama3.2",
+        "response": "",
+        "done": True,
+        "prompt_eval_count": 5,
+        "eval_count": 2,
+    },
+)
+
+CHAT_LINES = _ndjson(
+    {"message": {"role": "assistant", "content": "Hi"}, "done": False},
+    {"message": {"role": "assistant", "content": " there"}, "done": False},
+    {"message": {"role": "assistant", "content": ""}, "done": True, "eval_count": 2},
+)
+
+
+class _StreamingOllama(BaseHTTPRequestHandler):
+    """Sends server.lines as a chunked NDJSON body, server.gap seconds apart."""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def _reply(self):
+        server = self.server
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        server.requests.append((self.command, self.path, body))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for line in server.lines:
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+                self.wfile.flush()
+                time.sleep(server.gap)
+            self.wfile.write(b"0\r\n\r\n")
+        except OSError:
+            server.aborted.set()
+
+    do_GET = do_POST = _reply
+
+    def log_message(self, *args):
+        pass
+
+
+class _ProxyTestCase(unittest.TestCase):
+    def setUp(self):
+        from greenprompt import api, ollamaClient
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _StreamingOllama)
+        self.server.daemon_threads = True
+        self.server.requests = []
+        self.server.lines = GENERATE_LINES
+        self.server.gap = 0.0
+        self.server.aborted = threading.Event()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+        ollamaClient.reset_ollama_client()
+        self.addCleanup(ollamaClient.reset_ollama_client)
+        base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        for patcher in (
+            patch("greenprompt.constants.OLLAMA_URL", base_url),
+            patch.object(api, "monitor", None),
+            patch("greenprompt.core.has_gpu", return_value=False),
+            patch("greenprompt.core.get_system_info", return_value={}),
+            patch(
+                "greenprompt.core.score_prompt",
+                return_value={"score_percent": 50.0, "details": {}},
+            ),
+            patch("builtins.print"),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.save = patch("greenprompt.core.save_prompt_usage").start()
+        self.addCleanup(patch.stopall)
+        self.client = api.app.test_client()
+
+    def _post(self, path, payload, **kwargs):
+        return self.client.post(
+            f"/ollama/api/{path}", data=json.dumps(payload), **kwargs
+        )
+
+    def _complete(self, path, payload):
+        """POST, read the whole reply and close it, as a real server would."""
+        resp = self._post(path, payload)
+        resp.get_data()
+        resp.close()
+        return resp
+
+
+# ===========================================================================
+# 1. Streaming relay
+# ===========================================================================
+
+
+class TestProxyStreaming(_ProxyTestCase):
+    def test_chunks_arrive_as_upstream_sends_them(self):
+        self.server.gap = 0.2
+        resp = self._post("generate", {"model": "llama3.2"}, buffered=False)
+        arrivals = []
+        started = time.perf_counter()
+        for chunk in resp.response:
+            if chunk:
+                arrivals.append((time.perf_counter() - started, chunk))
+        resp.close()
+        self.assertEqual(b"".join(c for _, c in arrivals), b"".join(GENERATE_LINES))
+        self.assertGreaterEqual(len(arrivals), 2)
+        # The first line is relayed well before the upstream finishes (~0.6 s).
+        self.assertLess(arrivals[0][0], 0.3)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.headers["Content-Type"], "application/x-ndjson")
+
+    def test_body_and_query_forwarded(self):
+        resp = self._complete("generate?keep=1", {"model": "m", "prompt": "hi"})
+        self.assertEqual(resp.status_code, 200)
+        method, path, body = self.server.requests[-1]
+        self.assertEqual((method, path), ("POST", "/api/generate?keep=1"))
+        self.assertEqual(json.loads(body), {"model": "m", "prompt": "hi"})
+
+    def test_abandoned_stream_closes_upstream(self):
+        from greenprompt.ollamaClient import get_ollama_client
+
+        self.server.lines = _ndjson(*({"response": "x"} for _ in range(200)))
+        self.server.gap = 0.01
+        resp = self._post("generate", {"model": "m"}, buffered=False)
+        next(iter(resp.response))
+        resp.close()
+        self.assertTrue(self.server.aborted.wait(3.0))
+        # The stream slot was released with the stream.
+        client = get_ollama_client()
+        self.assertTrue(client._stream_slots.acquire(timeout=1.0))
+        client._stream_slots.release()
+
+    def _stall(self):
+        """Open a long proxied stream, read one chunk and leave it open."""
+        self.server.lines = _ndjson(*({"response": "x"} for _ in range(200)))
+        self.server.gap = 0.05
+        resp = self._post("generate", {"model": "m"}, buffered=False)
+        next(iter(resp.response))
+        self.addCleanup(resp.close)
+        # Later requests get a short reply; the open stream keeps its lines.
+        self.server.lines = _ndjson({"response": "ok", "done": True})
+        self.server.gap = 0.0
+        return resp
+
+    def test_stalled_stream_does_not_block_run_prompt(self):
+        from greenprompt.core import run_prompt
+
+        with patch("greenprompt.constants.OLLAMA_MAX_IN_FLIGHT", 1):
+            self._stall()
+            results = []
+            t = threading.Thread(
+                target=lambda: results.append(run_prompt("hi", "m")), daemon=True
+            )
+            t.start()
+            t.join(5.0)
+        self.assertFalse(t.is_alive())
+        self.assertEqual(results[0]["response"], "ok")
+
+    def test_busy_stream_slots_return_503(self):
+        with (
+            patch("greenprompt.constants.OLLAMA_MAX_STREAMS", 1),
+            patch("greenprompt.constants.OLLAMA_STREAM_WAIT_S", 0.1),
+            patch("logging.warning"),
+        ):
+            self._stall()
+            resp = self._post("generate", {"model": "m"})
+        self.assertEqual(resp.status_code, 503)
+        self.assertIn("busy", resp.get_json()["error"])
+
+
+# ===========================================================================
+# 2. Metering
+# ===========================================================================
+
+
+class TestProxyMetering(_ProxyTestCase):
+    def test_generate_metered_when_enabled(self):
+        with patch("greenprompt.constants.METER_PROXY", True):
+            resp = self._complete("generate", {"model": "llama3.2", "prompt": "hey"})
+        self.assertEqual(resp.status_code, 200)
+        self.save.assert_called_once()
+        record = self.save.call_args.args[0]
+        self.assertEqual(record["prompt"], "hey")
+        self.assertEqual(record["model"], "llama3.2")
+        self.assertEqual(record["response"], "Hello")
+        self.assertEqual(record["prompt_tokens"], 5)
+        self.assertEqual(record["completion_tokens"], 2)
+
+    def test_chat_metered_with_last_user_message(self):
+        self.server.lines = CHAT_LINES
+        payload = {
+            "model": "llama3.2",
+            "messages": [
+                {"role": "user", "content": "first"},
+                {"role": "assistant", "content": "ok"},
+                {"role": "user", "content": "second"},
+            ],
+        }
+        with patch("greenprompt.constants.METER_PROXY", True):
+            self._complete("chat", payload)
+        record = self.save.call_args.args[0]
+        self.assertEqual(record["prompt"], "second")
+        self.assertEqual(record["response"], "Hi there")
+
+    def test_not_metered_by_default(self):
+        self._complete("generate", {"model": "llama3.2", "prompt": "hey"})
+        self.save.assert_not_called()
+
+    def test_other_paths_not_metered(self):
+        with patch("greenprompt.constants.METER_PROXY", True):
+            self.client.get("/ollama/api/tags").close()
+            self._complete("embed", {"model": "m", "input": "x"})
+        self.save.assert_not_called()
+
+    def test_incomplete_reply_not_recorded(self):
+        self.server.lines = GENERATE_LINES[:2]
+        with patch("greenprompt.constants.METER_PROXY", True):
+            self._complete("generate", {"model": "llama3.2", "prompt": "hey"})
+        self.save.assert_not_called()
+
+    def test_closed_at_last_chunk_still_recorded(self):
+        # The ASGI bridge closes the body iterator when the client
+        # disconnects, possibly right after the "done" chunk was handed out.
+        with patch("greenprompt.constants.METER_PROXY", True):
+            resp = self._post(
+                "generate", {"model": "llama3.2", "prompt": "hey"}, buffered=False
+            )
+            received = b""
+            for chunk in resp.response:
+                received += chunk
+                if b'"done": true' in received:
+                    break
+            resp.close()
+        self.save.assert_called_once()
+        self.assertEqual(self.save.call_args.args[0]["response"], "Hello")
+
+
+class TestCompletionMeter(unittest.TestCase):
+    def _meter(self, path, payload, chunks):
+        from greenprompt.core import CompletionMeter
+
+        meter = CompletionMeter.for_request(path, "POST", json.dumps(payload), None)
+        with (
+            patch("greenprompt.core.record_completion", return_value="saved") as rec,
+            meter,
+        ):
+            for chunk in chunks:
+                meter.feed(chunk)
+        return meter, rec
+
+    def test_lines_split_across_chunks(self):
+        data = b"".join(GENERATE_LINES)
+        chunks = [data[i : i + 7] for i in range(0, len(data), 7)]
+        meter, rec = self._meter("generate", {"model": "m", "prompt": "p"}, chunks)
+        self.assertEqual(meter.result, "saved")
+        args = rec.call_args.args
+        self.assertEqual(args[:2], ("p", "m"))
+        self.assertEqual(args[2]["eval_count"], 2)
+        self.assertEqual(args[3], "Hello")
+
+    def test_single_json_reply_without_newline(self):
+        body = json.dumps({"response": "whole", "done": True}).encode()
+        _, rec = self._meter("generate", {"model": "m", "prompt": "p"}, [body])
+        self.assertEqual(rec.call_args.args[3], "whole")
+
+    def test_for_request_filters(self):
+        from greenprompt.core import CompletionMeter
+
+        self.assertIsNone(CompletionMeter.for_request("generate", "GET", b"", None))
+        self.assertIsNone(CompletionMeter.for_request("tags", "POST", b"{}", None))
+        self.assertIsNone(CompletionMeter.for_request("chat", "POST", b"[1]", None))
+        self.assertIsNone(CompletionMeter.for_request("chat", "POST", b"{x", None))
+        self.assertIsNotNone(CompletionMeter.for_request("chat", "POST", b"{}", None))
+
+
+# ===========================================================================
+# 3. ASGI backpressure
+# ===========================================================================
+
+
+class TestAsgiBackpressure(unittest.TestCase):
+    def test_slow_client_bounds_buffering(self):
+        from greenprompt import asgi
+
+        app = Flask(__name__)
+        produced = []
+
+        @app.route("/firehose")
+        def firehose():
+            def gen():
+                for i in range(100):
+                    produced.append(i)
+                    yield b"x" * 1024
+
+            return Response(gen())
+
+        bridge = asgi.WsgiBridge(app, workers=2)
+        scope = {
+            "type": "http",
+            "method": "GET",
+            "path": "/firehose",
+            "query_string": b"",
+            "headers": [],
+        }
+
+        async def run():
+            first = True
+            received = []
+            ahead = []
+
+            async def receive():
+                nonlocal first
+                if first:
+                    first = False
+                    return {"type": "http.request", "body": b"", "more_body": False}
+                await asyncio.Event().wait()
+
+            async def send(message):
+                if message["type"] == "http.response.body" and message["body"]:
+                    received.append(message["body"])
+                    if len(received) == 1:
+                        await asyncio.sleep(0.3)  # a stalled client
+                        ahead.append(len(produced))
+
+            await bridge(scope, receive, send)
+            return received, ahead[0]
+
+        received, ahead = asyncio.run(run())
+        self.assertEqual(len(received), 100)
+        # While the client stalled, the worker ran at most a queue's worth ahead.
+        self.assertLessEqual(ahead, asgi.QUEUE_CHUNKS + 3)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,281 @@
+"""
+Tests for responseCache.py — Ollama replies reused for repeated requests.
+
+Covers:
+  - memory hits; stored hits after a restart (fresh cache, same database)
+  - keys: model, prompt and options (key order ignored); "context" not kept
+  - TTL expiry in both tiers, LRU eviction, the cache switched off,
+    database errors tolerated, response_cache pruning
+  - run_prompt(): a hit skips Ollama and is saved with cache_hit, no
+    measured energy and the original run's energy avoided; use_cache=False;
+    options sent to Ollama
+  - run_batch() serving repeats; item options validated
+  - /api/prompt options validation and GET /api/responses/cache
+
+Every test runs against a throwaway database file; DB_PATH is patched, and
+Ollama and the power measurement are mocked.
+"""
+
+import sqlite3
+import unittest
+from unittest.mock import MagicMock, patch
+
+from tests.helpers import TempDbTestCase
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+
+def _reply(text="ok", prompt_tokens=4, completion_tokens=6):
+    return {
+        "response": text,
+        "prompt_eval_count": prompt_tokens,
+        "eval_count": completion_tokens,
+        "load_duration": 2_000_000_000,
+        "context": list(range(100)),
+        "done": True,
+    }
+
+
+class _CacheTestCase(TempDbTestCase):
+    def setUp(self):
+        super().setUp()
+        patch("builtins.print").start()
+
+    def cache(self, **kwargs):
+        from greenprompt.responseCache import ResponseCache
+
+        kwargs.setdefault("enabled", True)
+        kwargs.setdefault("max_size", 100)
+        kwargs.setdefault("ttl_s", 3600)
+        return ResponseCache(**kwargs)
+
+    def _rows(self, sql="SELECT key, reply FROM response_cache"):
+        return self._raw(sql)
+
+
+# ===========================================================================
+# 1. Hits and misses
+# ===========================================================================
+
+
+class TestResponseCache(_CacheTestCase):
+    def test_memory_then_stored_hits(self):
+        cache = self.cache()
+        self.assertIsNone(cache.get("m", "hi"))
+        cache.put("m", "hi", None, _reply(), 0.5, 3.0)
+        entry = cache.get("m", "hi")
+        self.assertEqual(entry["reply"]["response"], "ok")
+        self.assertNotIn("context", entry["reply"])
+        self.assertEqual((entry["energy_wh"], entry["duration_sec"]), (0.5, 3.0))
+
+        restarted = self.cache()
+        self.assertEqual(restarted.get("m", "hi")["energy_wh"], 0.5)
+        restarted.get("m", "hi")
+        stats = restarted.stats()
+        self.assertEqual(
+            (stats["stored_hits"], stats["memory_hits"], stats["misses"]), (1, 1, 0)
+        )
+        self.assertEqual(stats["energy_avoided_wh"], 1.0)
+        self.assertEqual(stats["duration_avoided_s"], 6.0)
+        self.assertEqual(stats["tokens_avoided"], 20)
+        self.assertEqual(cache.stats()["hit_rate"], 0.5)
+
+    def test_keys(self):
+        from greenprompt.responseCache import cache_key
+
+        cache = self.cache()
+        cache.put("m", "hi", {"temperature": 0, "seed": 1}, _reply(), 0.1, 1.0)
+        self.assertIsNotNone(cache.get("m", "hi", {"seed": 1, "temperature": 0}))
+        self.assertIsNone(cache.get("m", "hi", {"seed": 2, "temperature": 0}))
+        self.assertIsNone(cache.get("m2", "hi", {"seed": 1, "temperature": 0}))
+        self.assertIsNone(cache.get("m", "hi "))
+        self.assertEqual(cache_key("m", "hi"), cache_key("m", "hi", {}))
+        self.assertNotIn("context", self._rows()[0][1])
+
+    def test_ttl_expires_both_tiers(self):
+        cache = self.cache(ttl_s=60)
+        with patch("greenprompt.responseCache.time.time", return_value=1000.0):
+            cache.put("m", "hi", None, _reply(), 0.1, 1.0)
+        with patch("greenprompt.responseCache.time.time", return_value=1059.0):
+            self.assertIsNotNone(cache.get("m", "hi"))
+        with patch("greenprompt.responseCache.time.time", return_value=1061.0):
+            self.assertIsNone(cache.get("m", "hi"))
+            self.assertIsNone(self.cache(ttl_s=60).get("m", "hi"))
+            self.assertIsNotNone(self.cache(ttl_s=0).get("m", "hi"))
+        self.assertEqual(cache.stats()["size"], 0)
+
+    def test_lru_and_disabled(self):
+        cache = self.cache(max_size=2)
+        for prompt in ("a", "b", "c"):
+            cache.put("m", prompt, None, _reply(), 0.1, 1.0)
+        self.assertEqual(cache.stats()["size"], 2)
+        # "a" left memory but is still stored.
+        self.assertIsNotNone(cache.get("m", "a"))
+        self.assertEqual(cache.stats()["stored_hits"], 1)
+
+        off = self.cache(enabled=False)
+        off.put("m", "d", None, _reply(), 0.1, 1.0)
+        self.assertIsNone(off.get("m", "a"))
+        self.assertEqual(len(self._rows()), 3)
+        self.assertEqual(off.stats()["misses"], 0)
+
+    def test_database_errors_tolerated(self):
+        cache = self.cache()
+        with (
+            patch(
+                "greenprompt.dbconn.save_cached_response",
+                side_effect=sqlite3.OperationalError("locked"),
+            ),
+            patch(
+                "greenprompt.dbconn.get_cached_response",
+                side_effect=sqlite3.OperationalError("locked"),
+            ),
+        ):
+            cache.put("m", "hi", None, _reply(), 0.1, 1.0)
+            self.assertIsNotNone(cache.get("m", "hi"))
+            self.assertIsNone(cache.get("m", "other"))
+
+    def test_prune(self):
+        from greenprompt import dbconn
+
+        for i in range(5):
+            dbconn.save_cached_response(f"k{i}", "m", {}, 0.1, 1.0, 1000.0 + i)
+        self.assertEqual(dbconn.prune_response_cache(1001.0, 3), 2)
+        self.assertEqual(sorted(r[0] for r in self._rows()), ["k2", "k3", "k4"])
+
+
+# ===========================================================================
+# 2. run_prompt and run_batch
+# ===========================================================================
+
+
+class TestServing(_CacheTestCase):
+    def setUp(self):
+        super().setUp()
+        self.response_cache = self.cache()
+        patch(
+            "greenprompt.core.get_response_cache", return_value=self.response_cache
+        ).start()
+        patch(
+            "greenprompt.batch.get_response_cache", return_value=self.response_cache
+        ).start()
+        self.client = patch("greenprompt.core.get_ollama_client").start()
+        self.post = self.client.return_value.post
+        self.post.side_effect = lambda path, json: MagicMock(
+            status_code=200, json=MagicMock(return_value=_reply(json["prompt"]))
+        )
+        power = {
+            "energy_wh": 0.25,
+            "combined_power_w": 10.0,
+            "cpu_power_w": 6.0,
+            "gpu_power_w": 4.0,
+            "baseline_energy_wh": 0.01,
+            "baseline_power_w": 1.0,
+        }
+        patch("greenprompt.core.measure_power_for_pid", return_value=power).start()
+        patch("greenprompt.core.has_gpu", return_value=False).start()
+        patch("greenprompt.core.get_system_info", return_value={}).start()
+        patch(
+            "greenprompt.core.score_prompt",
+            return_value={"score_percent": 50.0, "details": {}},
+        ).start()
+
+    def test_hit_skips_ollama_and_is_saved(self):
+        from greenprompt.core import run_prompt
+        from greenprompt.dbconn import get_cache_savings, get_prompt_usage
+
+        first = run_prompt("hi", "m", options={"seed": 1})
+        second = run_prompt("hi", "m", options={"seed": 1})
+        self.assertEqual(self.post.call_count, 1)
+        self.assertEqual(self.post.call_args.kwargs["json"]["options"], {"seed": 1})
+        self.assertFalse(first["cache_hit"])
+        self.assertTrue(second["cache_hit"])
+        self.assertEqual(second["response"], "hi")
+        self.assertEqual(second["total_tokens"], 10)
+        self.assertEqual(second["total_energy (Wh)"], 0)
+        self.assertEqual(second["load_duration_sec"], 0)
+        self.assertEqual(second["energy_avoided (Wh)"], 0.25)
+        self.assertEqual(second["duration_avoided_sec"], first["duration_sec"])
+
+        rows = {row["cache_hit"]: row for row in get_prompt_usage()}
+        self.assertEqual(rows[0]["energy_wh"], 0.25)
+        self.assertIsNone(rows[0]["energy_avoided_wh"])
+        self.assertEqual(rows[1]["energy_wh"], 0)
+        self.assertEqual(rows[1]["energy_avoided_wh"], 0.25)
+        self.assertEqual(
+            get_cache_savings(),
+            {"hits": 1, "tokens_avoided": 10, "energy_avoided_wh": 0.25},
+        )
+
+    def test_bypass_and_unmeasured_runs(self):
+        from greenprompt.core import run_prompt
+
+        with patch("greenprompt.core.measure_power_for_pid", return_value=None):
+            run_prompt("hi", "m")
+        run_prompt("hi", "m", use_cache=False)
+        self.assertEqual(self.post.call_count, 2)
+        self.assertNotIn("options", self.post.call_args.kwargs["json"])
+        # The bypassing run replaced the unmeasured entry.
+        self.assertEqual(run_prompt("hi", "m")["energy_avoided (Wh)"], 0.25)
+
+        self.response_cache.clear()
+        with patch("greenprompt.core.measure_power_for_pid", return_value=None):
+            run_prompt("new", "m")
+        # Nothing measured: the token-based estimate is recorded as avoided.
+        self.assertAlmostEqual(
+            run_prompt("new", "m")["energy_avoided (Wh)"], 10 / 1000 * 0.01
+        )
+
+    def test_batch_serves_repeats(self):
+        from greenprompt.batch import parse_items, run_batch
+
+        list(run_batch(["a", "b"], "m", concurrency=1))
+        results = list(
+            run_batch(
+                ["a", {"prompt": "b", "options": {"seed": 1}}, "a"], "m", concurrency=1
+            )
+        )
+        self.assertEqual(self.post.call_count, 3)
+        self.assertEqual(
+            sorted((r["index"], r["cache_hit"]) for r in results),
+            [(0, True), (1, False), (2, True)],
+        )
+        list(run_batch(["a"], "m", use_cache=False))
+        self.assertEqual(self.post.call_count, 4)
+        with self.assertRaises(ValueError):
+            parse_items([{"prompt": "a", "options": [1]}], "m")
+
+
+# ===========================================================================
+# 3. API
+# ===========================================================================
+
+
+class TestApi(_CacheTestCase):
+    def test_prompt_options_and_status(self):
+        from greenprompt import api
+
+        client = api.app.test_client()
+        resp = client.post("/api/prompt", json={"prompt": "hi", "options": 3})
+        self.assertEqual(resp.status_code, 400)
+        with patch("greenprompt.api.run_prompt", return_value={"ok": 1}) as run:
+            client.post(
+                "/api/prompt",
+                json={"prompt": "hi", "options": {"seed": 1}, "cache": False},
+            )
+        self.assertEqual(run.call_args.kwargs["options"], {"seed": 1})
+        self.assertFalse(run.call_args.kwargs["use_cache"])
+
+        cache = self.cache()
+        cache.put("m", "hi", None, _reply(), 0.5, 3.0)
+        cache.get("m", "hi")
+        with patch("greenprompt.api.get_response_cache", return_value=cache):
+            body = client.get("/api/responses/cache").get_json()
+        self.assertEqual((body["memory_hits"], body["energy_avoided_wh"]), (1, 0.5))
+        self.assertEqual(body["all_time"]["hits"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,608 @@
+"""
+Tests for the sample storage shared by the power monitors (samplerCommon.py).
+
+Covers:
+  - SampleBuffer: deque-compatible append/extend/len/iter, eviction at maxlen,
+    wrap-around, out-of-order timestamps, range slices and time-weighted
+    averages
+  - as_sample_buffer: legacy deque conversion
+  - SampleBuffer.integrate: trapezoidal energy, edge interpolation, neighbour
+    estimates for short windows, RAPL counter deltas, and agreement of the
+    running-energy lookups with a direct integral after wrap-around
+  - LinuxPowerMonitor, PowerMonitor and measure_power_* reading a SampleBuffer
+  - SampleScheduler: adaptive interval switching, early wake-up, overhead
+    accounting; monitor status() and /api/monitor/status
+  - powermetrics streaming: incremental parser, reader thread over a fake
+    process, idle folding and the polling fallback in PowerMonitor
+
+Samples are appended by hand; the only sampling threads started use a
+patched sample_once().
+"""
+
+import threading
+import time
+import unittest
+from collections import deque
+
+import numpy as np
+
+
+def _sample(cpu=5.0, gpu=3.0):
+    return {"cpu_power_w": cpu, "gpu_power_w": gpu, "combined_power_w": cpu + gpu}
+
+
+# ===========================================================================
+# 1. SampleBuffer
+# ===========================================================================
+
+
+class TestSampleBuffer(unittest.TestCase):
+    def _buffer(self, n, maxlen=10):
+        from greenprompt.samplerCommon import SampleBuffer
+
+        buf = SampleBuffer(maxlen)
+        buf.extend((float(i), _sample(cpu=float(i))) for i in range(n))
+        return buf
+
+    def test_iterates_as_tuples(self):
+        buf = self._buffer(3)
+        items = list(buf)
+        self.assertEqual(len(buf), 3)
+        self.assertEqual(items[1], (1.0, _sample(cpu=1.0)))
+
+    def test_evicts_oldest_at_maxlen(self):
+        buf = self._buffer(25, maxlen=10)
+        self.assertEqual(len(buf), 10)
+        self.assertEqual([ts for ts, _ in buf], [float(i) for i in range(15, 25)])
+
+    def test_slice_across_wrap_point(self):
+        buf = self._buffer(17, maxlen=10)  # head has wrapped around the ring
+        ts, values = buf.slice(8.5, 13.0)
+        self.assertEqual(ts.tolist(), [9.0, 10.0, 11.0, 12.0, 13.0])
+        self.assertEqual(values[:, buf.CPU].tolist(), [9.0, 10.0, 11.0, 12.0, 13.0])
+
+    def test_slice_bounds_inclusive(self):
+        ts, _ = self._buffer(5).slice(1.0, 3.0)
+        self.assertEqual(ts.tolist(), [1.0, 2.0, 3.0])
+
+    def test_range_average(self):
+        buf = self._buffer(5)
+        avg = buf.range_average(1.0, 3.0)
+        self.assertAlmostEqual(avg[buf.CPU], 2.0)
+        self.assertAlmostEqual(avg[buf.COMBINED], 5.0)
+        self.assertIsNone(buf.range_average(10.0, 20.0))
+
+    def test_range_average_is_time_weighted(self):
+        from greenprompt.samplerCommon import SampleBuffer
+
+        buf = SampleBuffer(10)
+        for ts, cpu in [(0.0, 2.0), (1.0, 2.0), (2.0, 12.0), (10.0, 12.0)]:
+            buf.append((ts, _sample(cpu=cpu, gpu=0.0)))
+        # A sample mean says 7 W; the time-weighted average is 105 J / 10 s.
+        self.assertAlmostEqual(buf.range_average(0.0, 10.0)[buf.CPU], 10.5)
+        self.assertAlmostEqual(buf.range_average(9.0, 11.0)[buf.CPU], 12.0)
+
+    def test_missing_keys_stored_as_zero(self):
+        from greenprompt.samplerCommon import SampleBuffer
+
+        buf = SampleBuffer(4)
+        buf.append((1.0, {"cpu_power_w": 2.0, "gpu_power_w": None}))
+        self.assertEqual(
+            list(buf)[0][1],
+            {"cpu_power_w": 2.0, "gpu_power_w": 0.0, "combined_power_w": 0.0},
+        )
+
+    def test_backwards_timestamp_clamped(self):
+        from greenprompt.samplerCommon import SampleBuffer
+
+        buf = SampleBuffer(4)
+        buf.append((10.0, _sample()))
+        buf.append((9.0, _sample()))
+        self.assertEqual([ts for ts, _ in buf], [10.0, 10.0])
+
+    def test_clear(self):
+        buf = self._buffer(5)
+        buf.clear()
+        self.assertEqual(len(buf), 0)
+        self.assertEqual(list(buf), [])
+
+    def test_invalid_maxlen(self):
+        from greenprompt.samplerCommon import SampleBuffer
+
+        with self.assertRaises(ValueError):
+            SampleBuffer(0)
+
+    def test_concurrent_append_and_query(self):
+        from greenprompt.samplerCommon import SampleBuffer
+
+        buf = SampleBuffer(50)
+        errors = []
+        stop = threading.Event()
+
+        def writer():
+            t = 0.0
+            while not stop.is_set():
+                buf.append((t, _sample()))
+                t += 1.0
+
+        def reader():
+            while not stop.is_set():
+                try:
+                    ts, _ = buf.slice(0.0, float("inf"))
+                    if len(ts) and not np.all(np.diff(ts) >= 0):
+                        errors.append("unsorted slice")
+                except Exception as e:
+                    errors.append(e)
+
+        threads = [threading.Thread(target=writer)] + [
+            threading.Thread(target=reader) for _ in range(3)
+        ]
+        for t in threads:
+            t.start()
+        time.sleep(0.3)
+        stop.set()
+        for t in threads:
+            t.join()
+        self.assertEqual(errors, [])
+
+    def test_as_sample_buffer_converts_deque(self):
+        from greenprompt.samplerCommon import SampleBuffer, as_sample_buffer
+
+        legacy = deque([(1.0, _sample(cpu=1.0)), (2.0, _sample(cpu=3.0))])
+        buf = as_sample_buffer(legacy, threading.Lock())
+        self.assertIsInstance(buf, SampleBuffer)
+        self.assertAlmostEqual(buf.range_average(0.0, 5.0)[buf.CPU], 2.0)
+        self.assertIs(as_sample_buffer(buf), buf)
+
+
+# ===========================================================================
+# 2. Trapezoidal integration
+# ===========================================================================
+
+
+class TestIntegrate(unittest.TestCase):
+    def _buffer(self, points, counter=None):
+        from greenprompt.samplerCommon import SampleBuffer
+
+        buf = SampleBuffer(100)
+        for i, (ts, cpu) in enumerate(points):
+            sample = _sample(cpu=cpu, gpu=0.0)
+            if counter is not None:
+                sample[SampleBuffer.COUNTER_FIELD] = counter[i]
+            buf.append((ts, sample))
+        return buf
+
+    def test_constant_power(self):
+        buf = self._buffer([(0.0, 10.0), (1.0, 10.0), (2.0, 10.0)])
+        w = buf.integrate(0.5, 1.5, 2.0)
+        self.assertAlmostEqual(w.energy_j[buf.CPU], 10.0)
+        self.assertAlmostEqual(w.power_w[buf.CPU], 10.0)
+        self.assertEqual(w.samples, 1)
+        self.assertFalse(w.extrapolated)
+
+    def test_ramp_interpolated_at_edges(self):
+        # Power ramps 0 → 10 W over 10 s; the window [2, 4] averages 3 W.
+        buf = self._buffer([(0.0, 0.0), (10.0, 10.0)])
+        w = buf.integrate(2.0, 4.0, 20.0)
+        self.assertAlmostEqual(w.energy_j[buf.CPU], 6.0)
+        self.assertTrue(w.extrapolated)
+
+    def test_irregular_spacing_is_time_weighted(self):
+        # Two samples a second apart at 2 W, then 12 W for 8 s: a plain
+        # sample mean says 7 W; the integral is (2 + 7 + 96) J / 10 s.
+        buf = self._buffer([(0.0, 2.0), (1.0, 2.0), (2.0, 12.0), (10.0, 12.0)])
+        w = buf.integrate(0.0, 10.0, 1.0)
+        self.assertAlmostEqual(w.power_w[buf.CPU], 10.5)
+
+    def test_neighbours_beyond_edge_window_ignored(self):
+        buf = self._buffer([(0.0, 100.0), (10.0, 5.0), (11.0, 5.0)])
+        w = buf.integrate(9.5, 11.0, 1.0)
+        self.assertAlmostEqual(w.power_w[buf.CPU], 5.0)
+        self.assertIsNone(buf.integrate(5.0, 6.0, 1.0))
+
+    def test_require_inside(self):
+        buf = self._buffer([(0.0, 5.0), (2.0, 5.0)])
+        self.assertIsNone(buf.integrate(0.5, 1.5, 2.0, require_inside=True))
+
+    def test_zero_duration_reports_instant_power(self):
+        buf = self._buffer([(0.0, 4.0), (2.0, 8.0)])
+        w = buf.integrate(1.0, 1.0, 2.0)
+        self.assertEqual(w.energy_j[buf.CPU], 0.0)
+        self.assertAlmostEqual(w.power_w[buf.CPU], 6.0)
+
+    def test_counter_delta_used_for_cpu(self):
+        # Power samples claim 10 W, but the counter says 30 J over [1, 3].
+        buf = self._buffer(
+            [(0.0, 10.0), (1.0, 10.0), (2.0, 10.0), (3.0, 10.0)],
+            counter=[0.0, 10.0, 25.0, 40.0],
+        )
+        w = buf.integrate(1.0, 3.0, 2.0)
+        self.assertAlmostEqual(w.energy_j[buf.CPU], 30.0)
+        self.assertAlmostEqual(w.energy_j[buf.COMBINED], 30.0)
+
+    def test_counter_extended_past_last_reading(self):
+        buf = self._buffer([(0.0, 0.0), (1.0, 8.0)], counter=[0.0, 8.0])
+        w = buf.integrate(0.5, 1.5, 2.0)
+        # 4 J from the counter over [0.5, 1] plus 8 W held for 0.5 s.
+        self.assertAlmostEqual(w.energy_j[buf.CPU], 8.0)
+
+    def test_mixed_counter_falls_back_to_integral(self):
+        from greenprompt.samplerCommon import SampleBuffer
+
+        buf = SampleBuffer(10)
+        buf.append((0.0, _sample(cpu=10.0, gpu=0.0)))
+        buf.append((1.0, {**_sample(cpu=10.0, gpu=0.0), "cpu_energy_j": 99.0}))
+        w = buf.integrate(0.0, 1.0, 1.0)
+        self.assertAlmostEqual(w.energy_j[buf.CPU], 10.0)
+
+    def test_matches_direct_integral_after_wrap(self):
+        from greenprompt.samplerCommon import SampleBuffer
+
+        rng = np.random.default_rng(7)
+        ts = np.cumsum(rng.uniform(0.05, 1.5, 400))
+        cpu = rng.uniform(1.0, 40.0, 400)
+        buf = SampleBuffer(100)
+        buf.extend((t, _sample(cpu=c, gpu=1.0)) for t, c in zip(ts, cpu))
+        ts, cpu = ts[-100:], cpu[-100:]  # what survives eviction
+
+        for _ in range(50):
+            start, end = np.sort(rng.uniform(ts[0], ts[-1], 2))
+            # Reference: interpolate the edges, trapezoid over the knots.
+            inside = (ts >= start) & (ts <= end)
+            knots = np.concatenate(([start], ts[inside], [end]))
+            power = np.interp(knots, ts, cpu)
+            expected = ((power[1:] + power[:-1]) / 2 * np.diff(knots)).sum()
+            w = buf.integrate(start, end, edge_window=10.0)
+            self.assertAlmostEqual(w.energy_j[buf.CPU], expected, places=6)
+            self.assertAlmostEqual(w.energy_j[buf.GPU], end - start, places=6)
+
+
+# ===========================================================================
+# 3. Monitors backed by SampleBuffer
+# ===========================================================================
+
+
+class TestLinuxMonitorBuffer(unittest.TestCase):
+    def _monitor(self, window_size=600):
+        from unittest.mock import patch
+
+        from greenprompt.samplerLinux import LinuxPowerMonitor
+
+        with (
+            patch("greenprompt.samplerLinux._detect_rapl_path", return_value=None),
+            patch("greenprompt.samplerLinux._detect_cpu_clusters", return_value={}),
+            patch("psutil.cpu_percent", return_value=[5.0] * 4),
+        ):
+            return LinuxPowerMonitor(window_size=window_size)
+
+    def test_samples_is_sample_buffer(self):
+        from greenprompt.samplerCommon import SampleBuffer
+
+        m = self._monitor(window_size=36000)
+        self.assertIsInstance(m.samples, SampleBuffer)
+        self.assertEqual(m.samples.maxlen, 36000)
+
+    def test_measure_power_linux_over_long_window(self):
+        from greenprompt.sysUsage import measure_power_linux
+
+        m = self._monitor(window_size=36000)
+        m.sample_interval = 0.1
+        now = 1_700_000_000.0
+        m.samples.extend(
+            (now - 3600 + i * 0.1, _sample(cpu=4.0 if i % 2 else 6.0, gpu=1.0))
+            for i in range(36000)
+        )
+        result = measure_power_linux(now - 10.05, now - 0.05, m)
+        self.assertAlmostEqual(result["cpu_power_w"], 5.0, places=2)
+        self.assertAlmostEqual(result["baseline_power_w"], 6.0, places=1)
+        self.assertFalse(result.get("extrapolated", False))
+
+    def test_rapl_samples_carry_cumulative_counter(self):
+        from unittest.mock import mock_open, patch
+
+        from greenprompt.samplerLinux import LinuxPowerMonitor
+
+        with (
+            patch(
+                "greenprompt.samplerLinux._detect_rapl_path",
+                return_value="/tmp/fake_energy_uj",
+            ),
+            patch("greenprompt.samplerLinux._detect_cpu_clusters", return_value={}),
+            patch("psutil.cpu_percent", return_value=[5.0] * 4),
+        ):
+            m = LinuxPowerMonitor()
+        m._check_gpu = lambda: False
+        readings = iter(["1000000", "3000000", "6000000"])
+        totals = []
+        for t in (100.0, 101.0, 102.0):
+            with (
+                patch("builtins.open", mock_open(read_data=next(readings))),
+                patch("time.time", return_value=t),
+            ):
+                totals.append(m.sample_once()["cpu_energy_j"])
+        self.assertEqual(totals, [0.0, 2.0, 5.0])
+
+    def test_measure_power_linux_uses_rapl_counter(self):
+        from greenprompt.sysUsage import measure_power_linux
+
+        m = self._monitor()
+        for i, total in enumerate([0.0, 2.0, 5.0, 9.0]):
+            m.samples.append(
+                (100.0 + i, {**_sample(cpu=1.0, gpu=1.0), "cpu_energy_j": total})
+            )
+        result = measure_power_linux(101.0, 103.0, m)
+        # CPU: 7 J counter delta over 2 s; GPU: 1 W.
+        self.assertAlmostEqual(result["cpu_power_w"], 3.5)
+        self.assertAlmostEqual(result["energy_wh"], 9.0 / 3600.0)
+
+
+class TestMacMonitorBuffer(unittest.TestCase):
+    def test_power_monitor_uses_sample_buffer(self):
+        from greenprompt.samplerCommon import SampleBuffer
+        from greenprompt.samplerMac import PowerMonitor
+
+        m = PowerMonitor(window_size=30)
+        self.assertIsInstance(m.samples, SampleBuffer)
+        m.samples.append((1.0, _sample(cpu=4.0, gpu=0.0)))
+        m.samples.append((2.0, _sample(cpu=6.0, gpu=0.0)))
+        self.assertAlmostEqual(m.get_range_average(0.0, 3.0), 5.0)
+
+    def test_measure_power_mac_integrates(self):
+        from greenprompt.samplerMac import PowerMonitor
+        from greenprompt.sysUsage import measure_power_mac
+
+        m = PowerMonitor()
+        m.samples.extend((100.0 + i, _sample(cpu=4.0, gpu=2.0)) for i in range(70))
+        result = measure_power_mac(165.0, 167.5, m)
+        self.assertAlmostEqual(result["combined_power_w"], 6.0)
+        self.assertAlmostEqual(result["energy_wh"], 6.0 * 2.5 / 3600.0)
+        self.assertAlmostEqual(result["baseline_power_w"], 6.0)
+
+    def test_measure_power_mac_short_prompt_uses_neighbours(self):
+        from greenprompt.samplerMac import PowerMonitor
+        from greenprompt.sysUsage import measure_power_mac
+
+        m = PowerMonitor()
+        m.samples.extend([(100.0, _sample()), (101.0, _sample())])
+        result = measure_power_mac(100.4, 100.6, m)
+        self.assertTrue(result["extrapolated"])
+        self.assertIn("error", measure_power_mac(200.0, 201.0, m))
+
+
+# ===========================================================================
+# 4. Adaptive sampling
+# ===========================================================================
+
+
+class TestSampleScheduler(unittest.TestCase):
+    def test_fixed_rate_ignores_activity(self):
+        from greenprompt.samplerCommon import SampleScheduler
+
+        schedule = SampleScheduler(1.0)
+        schedule.begin_activity()
+        self.assertEqual(schedule.interval, 1.0)
+        self.assertEqual(schedule.status()["mode"], "fixed")
+
+    def test_active_interval_while_activity_outstanding(self):
+        from greenprompt.samplerCommon import SampleScheduler
+
+        schedule = SampleScheduler(1.0, 0.05)
+        self.assertEqual(schedule.interval, 1.0)
+        schedule.begin_activity()
+        schedule.begin_activity()  # two overlapping prompts
+        schedule.end_activity()
+        self.assertEqual(schedule.interval, 0.05)
+        schedule.end_activity()
+        schedule.end_activity()  # unmatched end is harmless
+        self.assertEqual(schedule.interval, 1.0)
+        self.assertEqual(schedule.active, 0)
+
+    def test_begin_activity_wakes_idle_wait(self):
+        from greenprompt.samplerCommon import SampleScheduler
+
+        schedule = SampleScheduler(30.0, 0.05)
+        waiter = threading.Thread(target=schedule.wait, args=(time.perf_counter(),))
+        waiter.start()
+        time.sleep(0.05)
+        schedule.begin_activity()
+        waiter.join(timeout=2.0)
+        self.assertFalse(waiter.is_alive())
+
+    def test_sample_charges_overhead(self):
+        from greenprompt.samplerCommon import SampleScheduler
+
+        schedule = SampleScheduler(1.0)
+        self.assertEqual(schedule.sample(lambda: "x"), "x")
+        schedule.sample(lambda: sum(range(200_000)))
+        overhead = schedule.status()["overhead"]
+        self.assertEqual(overhead["samples_taken"], 2)
+        self.assertGreater(overhead["sampler_cpu_sec"], 0.0)
+        self.assertGreaterEqual(overhead["cpu_percent"], 0.0)
+
+    def test_rejects_non_positive_interval(self):
+        from greenprompt.samplerCommon import SampleScheduler
+
+        with self.assertRaises(ValueError):
+            SampleScheduler(1.0, 0.0)
+
+
+class TestAdaptiveMonitors(unittest.TestCase):
+    def _linux(self, **kwargs):
+        from unittest.mock import patch
+
+        from greenprompt.samplerLinux import LinuxPowerMonitor
+
+        with (
+            patch("greenprompt.samplerLinux._detect_rapl_path", return_value=None),
+            patch("greenprompt.samplerLinux._detect_cpu_clusters", return_value={}),
+            patch("psutil.cpu_percent", return_value=[5.0] * 4),
+        ):
+            return LinuxPowerMonitor(**kwargs)
+
+    def test_default_window_covers_ten_minutes_at_fast_rate(self):
+        from greenprompt.samplerMac import PowerMonitor
+
+        self.assertEqual(self._linux().samples.maxlen, 600)
+        self.assertEqual(self._linux(active_interval=0.1).samples.maxlen, 6000)
+        self.assertEqual(PowerMonitor(active_interval=0.05).samples.maxlen, 12000)
+
+    def test_linux_samples_fast_only_during_activity(self):
+        m = self._linux(sample_interval=30.0, active_interval=0.01)
+        m.sample_once = lambda: _sample()
+        m.running = True
+        m.thread.start()
+        try:
+            time.sleep(0.1)
+            idle = len(m.samples)
+            m.begin_activity()
+            time.sleep(0.3)
+            m.end_activity()
+            active = len(m.samples) - idle
+        finally:
+            m.running = False
+            m._schedule.wake()
+            m.thread.join(timeout=2.0)
+        self.assertEqual(idle, 1)
+        self.assertGreater(active, 5)
+        self.assertFalse(m.thread.is_alive())
+
+    def test_status_reports_rate_and_overhead(self):
+        m = self._linux(active_interval=0.1)
+        m.begin_activity()
+        status = m.status()
+        self.assertEqual(status["mode"], "adaptive")
+        self.assertEqual(status["interval_sec"], 0.1)
+        self.assertEqual(status["active_prompts"], 1)
+        self.assertEqual(status["cpu_mode"], "linear_tdp")
+        self.assertIn("cpu_percent", status["overhead"])
+
+    def test_status_endpoint(self):
+        from unittest.mock import patch
+
+        from greenprompt.api import app
+
+        client = app.test_client()
+        with patch("greenprompt.api.monitor", None):
+            self.assertEqual(
+                client.get("/api/monitor/status").get_json(), {"running": False}
+            )
+        with patch("greenprompt.api.monitor", self._linux(active_interval=0.1)):
+            body = client.get("/api/monitor/status").get_json()
+        self.assertEqual(body["active_interval_sec"], 0.1)
+        self.assertIn("overhead", body)
+
+
+# ===========================================================================
+# 5. powermetrics stream (macOS)
+# ===========================================================================
+
+_PM_BLOCK = """*** Sampled system activity (Wed Jan  1 12:00:00 2025 -0800) (100.12ms elapsed) ***
+
+**** Processor usage ****
+
+E-Cluster HW active frequency: 1020 MHz
+CPU 0 active residency:  25.00%
+CPU Power: {cpu} mW
+GPU Power: {gpu} mW
+ANE Power: 0 mW
+Combined Power (CPU + GPU + ANE): {combined} mW
+
+"""
+
+
+class TestPowermetricsStream(unittest.TestCase):
+    def _lines(self, *blocks):
+        return "".join(_PM_BLOCK.format(**b) for b in blocks).splitlines(True)
+
+    def test_parser_emits_one_sample_per_block(self):
+        from greenprompt.samplerMac import PowermetricsStreamParser
+        from greenprompt.sysUsage import parse_powermetrics_output
+
+        parser = PowermetricsStreamParser()
+        blocks = [
+            {"cpu": 1500, "gpu": 250, "combined": 1750},
+            {"cpu": 900, "gpu": 100, "combined": 1000},
+        ]
+        out = [x for x in map(parser.feed, self._lines(*blocks)) if x]
+        self.assertEqual(len(out), 2)
+        self.assertAlmostEqual(out[0]["cpu_power_w"], 1.5)
+        self.assertAlmostEqual(out[1]["combined_power_w"], 1.0)
+        # Same numbers as the one-shot parser.
+        whole = parse_powermetrics_output(_PM_BLOCK.format(**blocks[0]), 0.1)
+        for field in ("cpu_power_w", "gpu_power_w", "combined_power_w"):
+            self.assertAlmostEqual(out[0][field], whole[field])
+
+    def test_parser_without_combined_line_emits_at_next_header(self):
+        from greenprompt.samplerMac import PowermetricsStreamParser
+
+        parser = PowermetricsStreamParser()
+        lines = [
+            "*** Sampled system activity (100ms elapsed) ***\n",
+            "CPU Power: 800 mW\n",
+        ]
+        self.assertEqual([parser.feed(line) for line in lines], [None, None])
+        sample = parser.feed(lines[0])
+        self.assertAlmostEqual(sample["combined_power_w"], 0.8)
+
+    def test_reader_streams_samples_and_charges_overhead(self):
+        from unittest.mock import MagicMock, patch
+
+        from greenprompt.samplerCommon import SampleScheduler
+        from greenprompt.samplerMac import PowermetricsStreamReader
+
+        proc = MagicMock()
+        proc.stdout = iter(
+            self._lines(*[{"cpu": 1000, "gpu": 0, "combined": 1000}] * 3)
+        )
+        schedule = SampleScheduler(1.0, 0.1)
+        received, exited = [], threading.Event()
+        with patch(
+            "greenprompt.samplerMac.subprocess.Popen", return_value=proc
+        ) as popen:
+            reader = PowermetricsStreamReader(
+                0.1, received.append, schedule=schedule, on_exit=exited.set
+            )
+            reader._thread.join(timeout=2.0)
+        self.assertIn("100", popen.call_args[0][0])
+        self.assertEqual(len(received), 3)
+        self.assertEqual(schedule.status()["overhead"]["samples_taken"], 3)
+        self.assertTrue(exited.is_set())
+
+    def test_idle_readings_are_folded(self):
+        from greenprompt.samplerMac import PowerMonitor
+
+        m = PowerMonitor(sample_interval=1, active_interval=0.25)
+        for cpu in [1.0, 2.0, 3.0, 4.0, 5.0]:
+            m._on_stream_sample(_sample(cpu=cpu, gpu=0.0))
+        self.assertEqual(len(m.samples), 1)
+        self.assertAlmostEqual(list(m.samples)[0][1]["cpu_power_w"], 2.5)
+        m.begin_activity()
+        m._on_stream_sample(_sample(cpu=9.0, gpu=0.0))
+        # The partial idle fold (5 W) is flushed before the active reading.
+        powers = [s["cpu_power_w"] for _, s in m.samples]
+        self.assertEqual(powers, [2.5, 5.0, 9.0])
+
+    def test_monitor_falls_back_to_polling_when_stream_ends(self):
+        from unittest.mock import MagicMock, patch
+
+        from greenprompt.samplerMac import PowerMonitor
+
+        proc = MagicMock()
+        proc.stdout = iter([])  # e.g. sudo refused: no output at all
+        m = PowerMonitor(sample_interval=0.05)
+        m.sample_once = lambda: _sample()
+        with (
+            patch("greenprompt.samplerMac._check_powermetrics_sudo", return_value=True),
+            patch("greenprompt.samplerMac.subprocess.Popen", return_value=proc),
+        ):
+            m.start()
+            deadline = time.time() + 2.0
+            while len(m.samples) < 2 and time.time() < deadline:
+                time.sleep(0.02)
+            m.stop()
+        self.assertEqual(m.status()["source"], "poll")
+        self.assertGreaterEqual(len(m.samples), 2)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
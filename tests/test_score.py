@@ -0,0 +1,271 @@
+"""
+Tests for scoreBasic.py — the single-pass prompt scorer.
+
+Covers:
+  - each pattern dimension scored from the normalized prompt
+  - dimensions sharing a keyword ("efficient") both scoring
+  - RTCF, clarity, conciseness and keyword richness
+  - one tokenize/tag per text form, one for an already-normal prompt
+  - the has_*/get_verbs helpers agreeing with score_prompt
+  - score_prompts: input order, ids, per-prompt errors, a spawned process pool
+  - `greenprompt score --file`: JSON lines and CSV output
+
+NLTK's tokenizer, tagger and stopword list are replaced by small stand-ins,
+so no NLTK data is needed. The fake tagger is case-sensitive, like the real
+one: only lower-case task verbs are tagged as verbs.
+"""
+
+import csv
+import io
+import json
+import os
+import re
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+# ---------------------------------------------------------------------------
+# Helpers / lightweight fakes
+# ---------------------------------------------------------------------------
+
+VERBS = {"explain", "write", "list", "summarize", "compare", "describe", "verify"}
+
+
+def _tokenize(text):
+    return re.findall(r"\w+|[^\w\s]", text)
+
+
+def _tag(tokens):
+    return [(t, "VB" if t in VERBS else "NN") for t in tokens]
+
+
+class _ScoreTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tokenize = patch(
+            "greenprompt.scoreBasic.nltk.word_tokenize", side_effect=_tokenize
+        ).start()
+        self.pos_tag = patch(
+            "greenprompt.scoreBasic.nltk.pos_tag", side_effect=_tag
+        ).start()
+        patch(
+            "greenprompt.scoreBasic._stop_words",
+            return_value=frozenset({"the", "a", "of", "to", "for", "in", "and"}),
+        ).start()
+        self.addCleanup(patch.stopall)
+
+    def details(self, prompt):
+        from greenprompt.scoreBasic import score_prompt
+
+        return score_prompt(prompt)["details"]
+
+
+# ===========================================================================
+# 1. Dimensions
+# ===========================================================================
+
+
+class TestDimensions(_ScoreTestCase):
+    def test_pattern_dimensions(self):
+        cases = {
+            "Examples & Few-Shot": "Answer. Example: 2+2=4",
+            "Task Decomposition": "First read it, then answer",
+            "Positive/Negative Examples": "Answer but exclude prices",
+            "Iterative Refinement": "Refine the draft",
+            "Creativity Control": "Be imaginative",
+            "Tone & Style": "Tone: playful",
+            "Error Prevention": "If unsure, say so",
+            "Evaluation & Validation": "Double-check the sums",
+            "Sensitivity & Inclusivity": "Keep it inclusive",
+            "Efficiency & Sustainability": "Answer briefly",
+            "Energy Awareness": "Mind the carbon cost",
+        }
+        for dimension, prompt in cases.items():
+            with self.subTest(dimension=dimension):
+                details = self.details(prompt)
+                self.assertEqual(details[dimension], 2)
+                others = [d for d in cases if d != dimension and details[d]]
+                self.assertEqual(others, [])
+
+    def test_shared_keyword_scores_both(self):
+        details = self.details("Be efficient")
+        self.assertEqual(details["Efficiency & Sustainability"], 2)
+        self.assertEqual(details["Energy Awareness"], 2)
+
+    def test_rtcf_and_clarity(self):
+        details = self.details(
+            "You are a chemist.\nExplain   bonds for students. Format: table"
+        )
+        self.assertEqual(details["RTCF Structure"], 4)
+        self.assertEqual(details["Clarity & Specificity"], 5)
+        self.assertEqual(details["Contextual Priming"], 3)
+        self.assertEqual(details["Output Specification"], 5)
+        self.assertEqual(
+            self.details("Explain " + "x " * 250)["Clarity & Specificity"], 3
+        )
+        self.assertEqual(self.details("Hello there")["Clarity & Specificity"], 0)
+
+    def test_task_from_normalized_tone_from_raw(self):
+        # "Explain" is only tagged as a verb once lower-cased.
+        details = self.details("Explain gravity")
+        self.assertEqual(details["RTCF Structure"], 1)
+        self.assertEqual(details["Instructional Tone"], 0)
+        self.assertEqual(self.details("explain gravity")["Instructional Tone"], 3)
+
+    def test_conciseness_and_keywords(self):
+        details = self.details("Could you please just list the planets?")
+        # "could you" is listed twice among the fillers, so it counts twice.
+        self.assertEqual(details["Conciseness"], 1)
+        self.assertEqual(details["Keyword Richness"], 2)
+        self.assertEqual(self.details("the sun")["Keyword Richness"], 0)
+
+    def test_total_and_percent(self):
+        from greenprompt.scoreBasic import score_prompt
+
+        result = score_prompt("explain gravity")
+        self.assertEqual(result["total_score"], sum(result["details"].values()))
+        self.assertEqual(result["max_score"], 50)
+        self.assertAlmostEqual(result["score_percent"], result["total_score"] * 2)
+        self.assertEqual(len(result["details"]), 18)
+
+
+# ===========================================================================
+# 2. Single pass
+# ===========================================================================
+
+
+class TestSinglePass(_ScoreTestCase):
+    def test_tags_each_form_once(self):
+        self.details("You are a tutor. Explain and compare two sorts.")
+        self.assertEqual(self.tokenize.call_count, 2)
+        self.assertEqual(self.pos_tag.call_count, 2)
+
+    def test_normal_prompt_tagged_once(self):
+        self.details("explain and compare two sorts.")
+        self.assertEqual(self.tokenize.call_count, 1)
+        self.assertEqual(self.pos_tag.call_count, 1)
+
+    def test_helpers_agree(self):
+        from greenprompt import scoreBasic as sb
+
+        prompt = sb.normalize("Act as a guide. Write for tourists. Output as JSON.")
+        details = self.details(prompt)
+        self.assertTrue(sb.has_explicit_role(prompt))
+        self.assertTrue(sb.has_explicit_task(prompt))
+        self.assertTrue(sb.has_context(prompt))
+        self.assertTrue(sb.has_format(prompt))
+        self.assertEqual(details["RTCF Structure"], 4)
+        self.assertEqual(sb.get_verbs(prompt), ["write"])
+        self.assertEqual(sb.count_unique_keywords(prompt), 7)
+
+
+# ===========================================================================
+# 3. Batch scoring
+# ===========================================================================
+
+
+class TestScorePrompts(_ScoreTestCase):
+    ITEMS = ["explain gravity", {"prompt": "list planets", "id": "p2"}, "", {"id": 4}]
+
+    def _score(self, items, **kwargs):
+        from greenprompt.scoreBatch import score_prompts
+
+        return list(score_prompts(items, **kwargs))
+
+    def test_in_order_with_ids_and_errors(self):
+        results = self._score(self.ITEMS, workers=1, chunk_size=3)
+        self.assertEqual([r["index"] for r in results], [0, 1, 2, 3])
+        self.assertEqual(results[0]["details"], self.details("explain gravity"))
+        self.assertEqual(
+            (results[1]["id"], results[1]["prompt"]), ("p2", "list planets")
+        )
+        self.assertNotIn("id", results[0])
+        self.assertEqual(results[2]["error"], "prompt is required")
+        self.assertEqual(
+            (results[3]["id"], results[3]["error"]), (4, "prompt is required")
+        )
+
+    def test_input_consumed_lazily(self):
+        from greenprompt.scoreBatch import score_prompts
+
+        consumed = []
+
+        def source():
+            for i in range(100):
+                consumed.append(i)
+                yield f"explain item {i}"
+
+        results = score_prompts(source(), workers=1, chunk_size=10)
+        next(results)
+        self.assertEqual(len(consumed), 10)
+        results.close()
+
+    def test_scoring_error_reported(self):
+        with patch(
+            "greenprompt.scoreBatch.score_prompt", side_effect=LookupError("no punkt")
+        ):
+            results = self._score(["a", "b"], workers=1)
+        self.assertEqual([r["error"] for r in results], ["no punkt"] * 2)
+
+
+class TestScorePool(unittest.TestCase):
+    def test_process_pool_matches_in_process(self):
+        # Spawned workers do not see the NLTK stand-ins, so both runs use the
+        # real scorer (scores, or the same LookupError without NLTK data).
+        from greenprompt.scoreBatch import score_prompts
+
+        items = [f"Explain topic {i}." for i in range(9)] + [{"id": "x"}]
+        pooled = list(score_prompts(items, workers=2, chunk_size=2))
+        self.assertEqual(pooled, list(score_prompts(items, workers=1)))
+        self.assertEqual([r["index"] for r in pooled], list(range(10)))
+
+
+class TestScoreFile(_ScoreTestCase):
+    def setUp(self):
+        super().setUp()
+        fd, self.path = tempfile.mkstemp(suffix=".jsonl")
+        with os.fdopen(fd, "w") as f:
+            f.write('"explain gravity"\n{"prompt": "list planets", "id": 9}\n')
+        self.addCleanup(os.remove, self.path)
+        patch("sys.stderr", io.StringIO()).start()
+
+    def test_json_lines_to_stdout(self):
+        from greenprompt.cli import score_file
+
+        with patch("sys.stdout", io.StringIO()) as out:
+            score_file(self.path, workers=1)
+        lines = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([r["index"] for r in lines], [0, 1])
+        self.assertEqual(lines[1]["id"], 9)
+        self.assertIn("Scored 2/2 prompts", sys.stderr.getvalue())
+
+    def test_csv_output(self):
+        from greenprompt.cli import score_file
+        from greenprompt.scoreBasic import DIMENSIONS
+
+        fd, output = tempfile.mkstemp(suffix=".csv")
+        os.close(fd)
+        self.addCleanup(os.remove, output)
+        score_file(self.path, workers=1, output=output)
+        with open(output, newline="") as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual(
+            [r["prompt"] for r in rows], ["explain gravity", "list planets"]
+        )
+        self.assertEqual(rows[1]["id"], "9")
+        for dimension in DIMENSIONS:
+            self.assertIn(dimension, rows[0])
+        self.assertEqual(rows[0]["Instructional Tone"], "3")
+
+    def test_unscorable_prompt_exits_1(self):
+        from greenprompt.cli import score_file
+
+        with open(self.path, "a") as f:
+            f.write('{"id": "x"}\n')
+        with patch("sys.stdout", io.StringIO()), self.assertRaises(SystemExit) as cm:
+            score_file(self.path, workers=1)
+        self.assertEqual(cm.exception.code, 1)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
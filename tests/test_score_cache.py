@@ -0,0 +1,217 @@
+"""
+Tests for scoreCache.py — memoized prompt scores backed by SQLite.
+
+Covers:
+  - memory hits skip scoring; copies are handed out, not the cached dict
+  - stored hits after a restart (fresh cache, same database)
+  - keys: exact prompt text and scorer version
+  - LRU eviction, SCORE_CACHE_SIZE = 0, database errors tolerated
+  - score_cache pruning by scorer version and row count
+  - stats(): hit rate and time saved; GET /api/scores/cache
+  - core scoring goes through the cache
+
+Every test runs against a throwaway database file; DB_PATH is patched and
+scoreBasic.score_prompt is replaced by a counting stand-in.
+"""
+
+import os
+import sqlite3
+import unittest
+from unittest.mock import patch
+
+from tests.helpers import TempDbTestCase
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+
+def _fake_score(prompt):
+    return {
+        "total_score": len(prompt),
+        "max_score": 50,
+        "score_percent": len(prompt) * 2.0,
+        "details": {"Conciseness": len(prompt)},
+    }
+
+
+class _CacheTestCase(TempDbTestCase):
+    def setUp(self):
+        super().setUp()
+        self.scorer = patch(
+            "greenprompt.scoreBasic.score_prompt", side_effect=_fake_score
+        ).start()
+
+    def cache(self, max_size=100):
+        from greenprompt.scoreCache import ScoreCache
+
+        return ScoreCache(max_size)
+
+    def _rows(self, sql="SELECT key, scorer_version FROM score_cache"):
+        return self._raw(sql)
+
+
+# ===========================================================================
+# 1. Hits and misses
+# ===========================================================================
+
+
+class TestScoreCache(_CacheTestCase):
+    def test_memory_hit_skips_scoring(self):
+        cache = self.cache()
+        first = cache.score("Explain X")
+        second = cache.score("Explain X")
+        self.assertEqual(first, second)
+        self.assertEqual(self.scorer.call_count, 1)
+        stats = cache.stats()
+        self.assertEqual((stats["misses"], stats["memory_hits"]), (1, 1))
+        self.assertEqual(stats["hit_rate"], 0.5)
+
+    def test_results_are_copies(self):
+        cache = self.cache()
+        cache.score("Explain X")["details"]["Conciseness"] = -1
+        self.assertEqual(cache.score("Explain X")["details"]["Conciseness"], 9)
+
+    def test_restart_reads_stored_score(self):
+        self.cache().score("Explain X")
+        restarted = self.cache()
+        self.assertEqual(restarted.score("Explain X"), _fake_score("Explain X"))
+        self.assertEqual(self.scorer.call_count, 1)
+        self.assertEqual(restarted.stats()["stored_hits"], 1)
+        # Now held in memory as well.
+        restarted.score("Explain X")
+        self.assertEqual(restarted.stats()["memory_hits"], 1)
+
+    def test_key_uses_exact_text_and_version(self):
+        from greenprompt.scoreCache import cache_key
+
+        self.assertNotEqual(cache_key("Explain X"), cache_key("explain x"))
+        cache = self.cache()
+        cache.score("Explain X")
+        cache.score("explain  x")
+        self.assertEqual(self.scorer.call_count, 2)
+        key = cache_key("Explain X")
+        with patch("greenprompt.scoreBasic.SCORER_VERSION", "next"):
+            self.assertNotEqual(cache_key("Explain X"), key)
+            self.cache().score("Explain X")
+        self.assertEqual(self.scorer.call_count, 3)
+
+    def test_lru_eviction(self):
+        cache = self.cache(max_size=2)
+        for prompt in ("a", "b", "a", "c"):  # "b" is least recently used
+            cache.score(prompt)
+        self.assertEqual(cache.stats()["size"], 2)
+        with patch("greenprompt.dbconn.get_cached_score", return_value=None):
+            cache.score("a")
+            cache.score("b")
+        self.assertEqual(self.scorer.call_count, 4)
+
+    def test_disabled(self):
+        cache = self.cache(max_size=0)
+        cache.score("Explain X")
+        cache.score("Explain X")
+        self.assertEqual(self.scorer.call_count, 2)
+        self.assertFalse(cache.stats()["enabled"])
+        self.assertFalse(os.path.exists(self.db_path))
+
+    def test_database_errors_tolerated(self):
+        cache = self.cache()
+        error = sqlite3.OperationalError("database is locked")
+        with (
+            patch("greenprompt.dbconn.get_cached_score", side_effect=error),
+            patch("greenprompt.dbconn.save_cached_score", side_effect=error),
+            patch("builtins.print") as warn,
+        ):
+            self.assertEqual(cache.score("Explain X"), _fake_score("Explain X"))
+            cache.score("Explain X")
+        self.assertEqual(self.scorer.call_count, 1)
+        self.assertIn("database is locked", warn.call_args.args[0])
+
+    def test_time_saved(self):
+        cache = self.cache()
+        with patch("greenprompt.scoreCache.time.perf_counter", side_effect=[0.0, 0.25]):
+            cache.score("Explain X")
+        cache.score("Explain X")
+        cache.score("Explain X")
+        self.assertAlmostEqual(cache.stats()["time_saved_s"], 0.5)
+
+
+# ===========================================================================
+# 2. score_cache table
+# ===========================================================================
+
+
+class TestStoredScores(_CacheTestCase):
+    def test_prune_by_version_and_rows(self):
+        from greenprompt import dbconn
+
+        for i in range(5):
+            dbconn.save_cached_score(f"k{i}", "1", _fake_score("x"), 0.01)
+        dbconn.save_cached_score("old", "0", _fake_score("x"), 0.01)
+        self.assertEqual(dbconn.prune_score_cache("1", 3), 3)
+        self.assertEqual(sorted(v for _, v in self._rows()), ["1", "1", "1"])
+
+    def test_stores_pruned_periodically(self):
+        cache = self.cache()
+        with (
+            patch("greenprompt.scoreCache.PRUNE_EVERY", 2),
+            patch("greenprompt.scoreCache.MAX_STORED", 1),
+        ):
+            for prompt in ("a", "b", "c"):
+                cache.score(prompt)
+        # Pruned after the 1st and 3rd store.
+        self.assertEqual([k for k, _ in self._rows()], [_key("c")])
+
+
+def _key(prompt):
+    from greenprompt.scoreCache import cache_key
+
+    return cache_key(prompt)
+
+
+# ===========================================================================
+# 3. API and core integration
+# ===========================================================================
+
+
+class TestIntegration(_CacheTestCase):
+    def setUp(self):
+        super().setUp()
+        from greenprompt import scoreCache
+
+        patch.object(scoreCache, "_cache", self.cache()).start()
+
+    def test_status_endpoint(self):
+        from greenprompt import api, scoreCache
+
+        scoreCache.score_prompt("Explain X")
+        scoreCache.score_prompt("Explain X")
+        resp = api.app.test_client().get("/api/scores/cache")
+        self.assertEqual(resp.status_code, 200)
+        body = resp.get_json()
+        self.assertEqual((body["misses"], body["memory_hits"]), (1, 1))
+        self.assertEqual(body["scorer_version"], "1")
+
+    def test_core_scores_through_cache(self):
+        from greenprompt.core import _build_result
+
+        power = {
+            "total_energy": 0.0,
+            "combined_power_w": 0.0,
+            "cpu_power": 0.0,
+            "gpu_power": 0.0,
+            "baseline_energy": 0.0,
+            "baseline_power": 0.0,
+        }
+        with (
+            patch("greenprompt.core.get_system_info", return_value={}),
+            patch("greenprompt.core.has_gpu", return_value=False),
+        ):
+            for _ in range(3):
+                result = _build_result("Explain X", "m", {}, "ok", 1.0, power, "")
+        self.assertEqual(result["prompt_score"], 18.0)
+        self.assertEqual(self.scorer.call_count, 1)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,161 @@
+"""
+Tests for cold start — what importing the CLI and the API server costs.
+
+Covers:
+  - `import greenprompt.cli` loads neither NLTK, the scorer, the database
+    layer nor the dashboard's pandas/Plotly
+  - `import greenprompt.api` downloads nothing, leaves the log file alone and
+    defers analytics; configure_logging() clears the log once, at startup
+  - setup verifies NLTK data and downloads only what is missing
+
+Import checks run in a fresh interpreter, since this process has already
+imported most of the package.
+"""
+
+import json
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+
+def _run(code):
+    """Run code in a fresh interpreter; return the JSON it prints."""
+    proc = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        env=dict(os.environ, PYTHONPATH=ROOT),
+        timeout=120,
+    )
+    if proc.returncode:
+        raise AssertionError(proc.stderr)
+    return json.loads(proc.stdout.splitlines()[-1])
+
+
+# ===========================================================================
+# 1. Import cost
+# ===========================================================================
+
+
+class TestImports(unittest.TestCase):
+    def test_cli_import_is_light(self):
+        loaded = _run(
+            "import json, sys\n"
+            "import greenprompt.cli\n"
+            "print(json.dumps(sorted(sys.modules)))\n"
+        )
+        for module in (
+            "nltk",
+            "pandas",
+            "plotly",
+            "greenprompt.scoreBasic",
+            "greenprompt.dbconn",
+            "greenprompt.sysUsage",
+        ):
+            self.assertNotIn(module, loaded)
+
+    def test_api_import_has_no_side_effects(self):
+        result = _run(
+            "import builtins, json, sys\n"
+            "import nltk\n"
+            "opened = []\n"
+            "real_open = builtins.open\n"
+            "def spy(file, *args, **kwargs):\n"
+            "    opened.append(str(file))\n"
+            "    return real_open(file, *args, **kwargs)\n"
+            "builtins.open = spy\n"
+            "nltk.download = lambda *a, **k: opened.append('download')\n"
+            "import greenprompt.api as api\n"
+            "print(json.dumps({'opened': opened, 'log': api.LOG_FILE,\n"
+            "    'analytics': 'greenprompt.analytics' in sys.modules}))\n"
+        )
+        self.assertNotIn("download", result["opened"])
+        self.assertNotIn(result["log"], result["opened"])
+        self.assertFalse(result["analytics"])
+
+
+class TestConfigureLogging(unittest.TestCase):
+    def test_clears_log_once(self):
+        from greenprompt import api
+
+        fd, log_file = tempfile.mkstemp(suffix=".log")
+        with os.fdopen(fd, "w") as f:
+            f.write("previous run\n")
+        self.addCleanup(os.remove, log_file)
+        root = logging.getLogger()
+        handlers, level = root.handlers[:], root.level
+        root.handlers = []
+
+        def restore():
+            for handler in root.handlers:
+                handler.close()
+            root.handlers, root.level = handlers, level
+
+        self.addCleanup(restore)
+        with patch.object(api, "_logging_configured", False):
+            api.configure_logging(log_file)
+            api.configure_logging(log_file)
+            self.assertEqual(len(root.handlers), 2)
+        logging.info("server started")
+        with open(log_file) as f:
+            content = f.read()
+        self.assertNotIn("previous run", content)
+        self.assertIn("server started", content)
+
+
+# ===========================================================================
+# 2. NLTK data
+# ===========================================================================
+
+
+class TestNltkData(unittest.TestCase):
+    def setUp(self):
+        import nltk
+
+        self.data_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.data_dir, ignore_errors=True)
+        patch.object(nltk.data, "path", [self.data_dir]).start()
+        self.addCleanup(patch.stopall)
+
+    def _install(self, resource, **kwargs):
+        from greenprompt.setup import NLTK_RESOURCES
+
+        os.makedirs(os.path.join(self.data_dir, NLTK_RESOURCES[resource]))
+        return True
+
+    def test_missing_resources(self):
+        from greenprompt.setup import NLTK_RESOURCES, missing_nltk_data
+
+        self._install("stopwords")
+        missing = missing_nltk_data()
+        self.assertNotIn("stopwords", missing)
+        self.assertEqual(len(missing), len(NLTK_RESOURCES) - 1)
+
+    def test_downloads_only_missing(self):
+        from greenprompt.setup import download_nltk_data
+
+        self._install("stopwords")
+        with patch("nltk.download", side_effect=self._install) as download:
+            self.assertEqual(download_nltk_data(), [])
+        downloaded = [c.args[0] for c in download.call_args_list]
+        self.assertNotIn("stopwords", downloaded)
+        self.assertIn("punkt_tab", downloaded)
+        with patch("nltk.download") as download:
+            download_nltk_data()
+        download.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
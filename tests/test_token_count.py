@@ -0,0 +1,202 @@
+"""
+Tests for tokenCount.py — pre-flight token counts.
+
+Covers:
+  - tiktoken: the model's own encoding when known, cl100k_base otherwise;
+    a batch encoded in one call
+  - Ollama counts (OLLAMA_TOKENIZE): memoized per (model, text), duplicates
+    counted once, LRU bound, known tiktoken models never sent to Ollama
+  - fallbacks: a rejected /api/tokenize marks the model, a connection error
+    or 5xx only affects the current batch, a batch is never mixed
+  - POST /api/tokens/count and core.estimate_tokens_from_prompt()
+
+tiktoken's encodings are replaced by a whitespace stand-in (loading the real
+ones needs a download) and Ollama by a mocked client.
+"""
+
+import unittest
+from unittest.mock import MagicMock, patch
+
+import requests
+
+# ---------------------------------------------------------------------------
+# Helpers / lightweight fakes
+# ---------------------------------------------------------------------------
+
+
+class _FakeEncoding:
+    def __init__(self, name):
+        self.name = name
+
+    def encode_ordinary_batch(self, texts):
+        return [text.split() for text in texts]
+
+
+def _response(status=200, tokens=None):
+    resp = MagicMock()
+    resp.status_code = status
+    resp.ok = status < 400
+    resp.json.return_value = {} if tokens is None else {"tokens": tokens}
+    return resp
+
+
+class _CounterTestCase(unittest.TestCase):
+    def setUp(self):
+        self.get_encoding = patch(
+            "tiktoken.get_encoding", side_effect=_FakeEncoding
+        ).start()
+        self.client = MagicMock()
+        # Ollama's tokenizer: one token per character.
+        self.client.post.side_effect = lambda path, json: _response(
+            tokens=list(json["content"])
+        )
+        patch(
+            "greenprompt.tokenCount.get_ollama_client", return_value=self.client
+        ).start()
+        patch("builtins.print").start()
+        self.addCleanup(patch.stopall)
+
+    def counter(self, use_ollama=True, max_size=100):
+        from greenprompt.tokenCount import TokenCounter
+
+        return TokenCounter(use_ollama=use_ollama, max_size=max_size)
+
+
+# ===========================================================================
+# 1. tiktoken
+# ===========================================================================
+
+
+class TestTiktoken(_CounterTestCase):
+    def test_model_encoding_or_fallback(self):
+        counter = self.counter(use_ollama=False)
+        self.assertEqual(
+            counter.count_batch(["a b", "c"], "gpt-4o"), ([2, 1], "tiktoken:o200k_base")
+        )
+        self.assertEqual(
+            counter.count_batch(["a b c"], "llama3.2:latest"),
+            ([3], "tiktoken:cl100k_base"),
+        )
+        self.assertEqual(counter.count("a b", "mistral"), 2)
+        self.client.post.assert_not_called()
+
+    def test_known_models_skip_ollama(self):
+        counts, source = self.counter().count_batch(["a b"], "gpt-4")
+        self.assertEqual((counts, source), ([2], "tiktoken:cl100k_base"))
+        self.client.post.assert_not_called()
+
+
+# ===========================================================================
+# 2. Ollama counts
+# ===========================================================================
+
+
+class TestOllamaCounts(_CounterTestCase):
+    def test_counts_memoized(self):
+        counter = self.counter()
+        self.assertEqual(
+            counter.count_batch(["abc", "de", "abc"], "llama3"), ([3, 2, 3], "ollama")
+        )
+        self.assertEqual(self.client.post.call_count, 2)
+        self.client.post.assert_any_call(
+            "/api/tokenize", json={"model": "llama3", "content": "abc"}
+        )
+        self.assertEqual(counter.count("abc", "llama3"), 3)
+        self.assertEqual(self.client.post.call_count, 2)
+        # Memoized per model.
+        counter.count("abc", "mistral")
+        self.assertEqual(self.client.post.call_count, 3)
+        stats = counter.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["size"]), (1, 3, 3))
+
+    def test_lru_bound(self):
+        counter = self.counter(max_size=2)
+        for text in ("a", "b", "a", "c", "b"):  # "b" was evicted by "c"
+            counter.count(text, "llama3")
+        self.assertEqual(self.client.post.call_count, 4)
+        self.assertEqual(counter.stats()["size"], 2)
+
+    def test_rejected_model_falls_back_for_good(self):
+        self.client.post.side_effect = None
+        self.client.post.return_value = _response(404)
+        counter = self.counter()
+        self.assertEqual(
+            counter.count_batch(["a b"], "llama3"), ([2], "tiktoken:cl100k_base")
+        )
+        counter.count("a b", "llama3")
+        self.assertEqual(self.client.post.call_count, 1)
+        self.assertEqual(counter.stats()["tiktoken_fallback_models"], ["llama3"])
+        counter.clear()
+        counter.count("a b", "llama3")
+        self.assertEqual(self.client.post.call_count, 2)
+
+    def test_transient_failures_retry_next_batch(self):
+        counter = self.counter()
+        for failure in (requests.exceptions.ConnectionError("refused"), None):
+            self.client.post.side_effect = failure
+            self.client.post.return_value = _response(503)
+            self.assertEqual(
+                counter.count_batch(["a b"], "llama3"), ([2], "tiktoken:cl100k_base")
+            )
+        self.client.post.side_effect = None
+        self.client.post.return_value = _response(tokens=[1, 2, 3])
+        self.assertEqual(counter.count_batch(["a b"], "llama3"), ([3], "ollama"))
+
+    def test_batch_never_mixed(self):
+        self.client.post.side_effect = [
+            _response(tokens=[1]),
+            requests.exceptions.Timeout("slow"),
+        ]
+        counts, source = self.counter().count_batch(["x", "y z"], "llama3")
+        self.assertEqual((counts, source), ([1, 2], "tiktoken:cl100k_base"))
+
+
+# ===========================================================================
+# 3. API and core
+# ===========================================================================
+
+
+class TestIntegration(_CounterTestCase):
+    def setUp(self):
+        super().setUp()
+        from greenprompt import tokenCount
+
+        patch.object(tokenCount, "_counter", self.counter()).start()
+
+    def _post(self, body):
+        from greenprompt import api
+
+        return api.app.test_client().post("/api/tokens/count", json=body)
+
+    def test_endpoint(self):
+        resp = self._post({"prompt": "abcd"})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(
+            resp.get_json(),
+            {
+                "model": "llama3.2:latest",
+                "source": "ollama",
+                "counts": [4],
+                "total": 4,
+                "count": 4,
+            },
+        )
+        body = self._post({"prompts": ["a b", "c"], "model": "gpt-4"}).get_json()
+        self.assertEqual(body["counts"], [2, 1])
+        self.assertEqual(body["total"], 3)
+        self.assertNotIn("count", body)
+
+    def test_endpoint_validation(self):
+        for body in ({}, ["a"], {"prompt": ""}, {"prompts": []}, {"prompts": ["a", 3]}):
+            with self.subTest(body=body):
+                self.assertEqual(self._post(body).status_code, 400)
+
+    def test_core_estimate(self):
+        from greenprompt.core import estimate_tokens_from_prompt
+
+        self.assertEqual(estimate_tokens_from_prompt("a b c"), 3)
+        self.assertEqual(estimate_tokens_from_prompt("abc", "llama3"), 3)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)